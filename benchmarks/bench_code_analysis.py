@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""代码特征检测的微基准：旧实现（AST + 每个别名一次 re.search + 子串判断）对比单次扫描实现。
+
+用法（在仓库根目录）：python benchmarks/bench_code_analysis.py [--lines 5000] [--packages 300] [--repeat 5]
+"""
+import argparse
+import ast
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.analysis import PACKAGE_MAPPING, SCRIPT_FILENAME, CodeAnalyzer  # noqa: E402
+from common.settings import Settings  # noqa: E402
+
+
+def legacy_detect(code: str, mapping: dict) -> tuple[list, bool]:
+    """重构前 _detect_imports + `'plt' in code` 的行为"""
+    required = set()
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return [], False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for name in node.names:
+                base = name.name.split('.')[0]
+                if base in mapping:
+                    required.add(mapping[base])
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module.split('.')[0] if node.module else ''
+            if base in mapping:
+                required.add(mapping[base])
+    for package_name in mapping:
+        if re.search(r'\b' + re.escape(package_name) + r'\.', code):
+            required.add(mapping[package_name])
+    return sorted(required), ('plt' in code or 'matplotlib' in code)
+
+
+def build_mapping(extra: int) -> dict:
+    mapping = dict(PACKAGE_MAPPING)
+    for i in range(extra):
+        mapping[f"pkg{i}"] = f"package-{i}"
+    return mapping
+
+
+def generate_script(lines: int, mapping: dict, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    names = list(mapping)
+    out = ["import numpy as np", "import pandas as pd", "import matplotlib.pyplot as plt", ""]
+    for i in range(lines):
+        kind = i % 4
+        if kind == 0:
+            out.append(f"v{i} = {rng.choice(names)}.call_{i}({i}, 'data_{i}.csv')")
+        elif kind == 1:
+            out.append(f"def f{i}(x):\n    return x * {i} + len('text {i}')")
+        elif kind == 2:
+            out.append(f"# comment {i} about values")
+        else:
+            out.append(f"items_{i} = [n for n in range({i % 50})]")
+    return "\n".join(out) + "\n"
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--packages", type=int, default=300, help="额外生成的别名数量")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    mapping = build_mapping(args.packages)
+    code = generate_script(args.lines, mapping)
+    settings = Settings(code_analysis_cache_size=0)
+
+    def single_pass():
+        analysis = CodeAnalyzer(settings, names=mapping).analyze(code)
+        return analysis.features.packages(mapping), analysis.features.uses_matplotlib
+
+    # 两种实现都包含 ast.parse；新实现额外做了 compile 检查
+    assert legacy_detect(code, mapping) == single_pass(), "结果不一致"
+
+    cached = CodeAnalyzer(Settings(), names=mapping)
+    cached.analyze(code)
+
+    tree = ast.parse(code)
+    legacy = timed(lambda: legacy_detect(code, mapping), args.repeat)
+    new = timed(single_pass, args.repeat)
+    compile_only = timed(lambda: compile(tree, SCRIPT_FILENAME, "exec"), args.repeat)
+    hit = timed(lambda: cached.analyze(code), args.repeat)
+    print(f"script: {len(code.splitlines())} lines, {len(code) // 1024} KiB, {len(mapping)} aliases")
+    print(f"legacy detection (per-alias regex):  {legacy * 1000:8.2f} ms")
+    print(f"single pass, incl. compile check:    {new * 1000:8.2f} ms")
+    print(f"  of which compile check:            {compile_only * 1000:8.2f} ms")
+    print(f"  detection only:                    {(new - compile_only) * 1000:8.2f} ms")
+    print(f"cache hit:                           {hit * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""执行结果返回体的序列化基准：JSONResponse（标准库 json）对比 orjson 快速路径，以及动态压缩的耗时与体积。
+
+用法（在仓库根目录）：python benchmarks/bench_json_response.py [--sizes 1,8,32] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.responses import JSONResponse  # noqa: E402
+
+from common.contracts import ExecuteResult, OutputFile, ResourceUsage  # noqa: E402
+from gateway import responses  # noqa: E402
+
+
+def generate_stdout(size_mb: float, seed: int = 0) -> str:
+    """类似 print(df) / 日志的输出：数字表格为主，夹杂中文与转义字符"""
+    rng = random.Random(seed)
+    lines, size = [], 0
+    target = int(size_mb * 1024 * 1024)
+    while size < target:
+        kind = rng.randrange(4)
+        if kind == 0:
+            line = "  ".join(f"{rng.random() * 1000:10.4f}" for _ in range(8))
+        elif kind == 1:
+            line = f"{rng.randrange(10 ** 6):>8}  样本{rng.randrange(100)}  状态=正常\t\"ok\""
+        elif kind == 2:
+            line = f"epoch {rng.randrange(100)} loss={rng.random():.6f} acc={rng.random():.4f}"
+        else:
+            line = "path\\to\\file_%d.csv" % rng.randrange(1000)
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def build_result(size_mb: float) -> ExecuteResult:
+    return ExecuteResult(
+        stdout=generate_stdout(size_mb),
+        stderr=None,
+        execution_time=1.234,
+        files=[OutputFile(filename=f"out_e_{i}_data.csv", original_name="data.csv", size_bytes=1024) for i in range(5)],
+        resource_usage=ResourceUsage(cpu_user_seconds=1.0, peak_memory_bytes=1 << 28, code_hash="0" * 64),
+    )
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,8,32", help="stdout 大小（MB，逗号分隔）")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"orjson: {'yes' if responses.orjson is not None else 'no (stdlib fallback)'}; "
+          f"encoders: {', '.join(responses.response_encoders())}")
+    for size_mb in (float(s) for s in args.sizes.split(",") if s.strip()):
+        result = build_result(size_mb)
+        payload = result.to_legacy_dict()
+        body = responses.dumps(payload)
+        assert body == JSONResponse(content=payload).body, "输出与 JSONResponse 不一致"
+
+        legacy = timed(lambda: JSONResponse(content=result.to_legacy_dict()).body, args.repeat)
+        fast = timed(lambda: responses.dumps(result.to_legacy_dict()), args.repeat)
+        print(f"\nstdout {size_mb:g} MB -> body {len(body) / 1024 / 1024:.2f} MB")
+        print(f"  JSONResponse (stdlib json):  {legacy * 1000:8.2f} ms")
+        print(f"  orjson fast path:            {fast * 1000:8.2f} ms  ({legacy / fast:.1f}x)")
+        for encoding, encoder in responses.response_encoders().items():
+            compressed = encoder(body)
+            seconds = timed(lambda: encoder(body), max(1, args.repeat // 2))
+            print(f"  + {encoding:<4} {seconds * 1000:8.2f} ms -> {len(compressed) / 1024 / 1024:.2f} MB "
+                  f"({len(compressed) / len(body):.0%})")
+
+
+if __name__ == "__main__":
+    main()
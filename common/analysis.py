@@ -0,0 +1,316 @@
+"""Pre-flight static analysis: compile check, policy check and a per-code-hash cache of the result."""
+from __future__ import annotations
+
+import ast
+import hashlib
+import io
+import re
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from common.metrics import MetricsRegistry
+from common.settings import Settings
+
+# 与容器内脚本路径一致，编译错误的提示和真正执行时看到的一样
+SCRIPT_FILENAME = "/code/script.py"
+
+# 常用包及其对应的pip包名（有些包的import名和pip安装名不一致）；键也是按 `别名.` 识别的名字
+PACKAGE_MAPPING = {
+    'pd': 'pandas',
+    'pandas': 'pandas',
+    'np': 'numpy',
+    'numpy': 'numpy',
+    'plt': 'matplotlib',
+    'matplotlib': 'matplotlib',
+    'sklearn': 'scikit-learn',
+    'tensorflow': 'tensorflow',
+    'torch': 'torch',
+    'cv2': 'opencv-python',
+    'requests': 'requests',
+    'bs4': 'beautifulsoup4',
+    'seaborn': 'seaborn',
+    # 可以继续添加更多包的映射
+}
+MATPLOTLIB_NAMES = frozenset({"plt", "matplotlib"})
+
+# 形如 data.csv、/code/input/a.xlsx、./out/result.json 的字符串常量
+_PATH_RE = re.compile(r"^(?:\.{0,2}/)?[\w\-. /]*\w\.[A-Za-z][A-Za-z0-9]{0,7}$")
+_MAX_PATH_LENGTH = 255
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8", errors="replace")).hexdigest()
+
+
+# 关注的名字不多时编译成一个交替正则；Python re 的交替在每个位置逐一尝试分支，名字多了会线性变慢，
+# 超过该数量改为按标识符切分后查集合，耗时与名字数量无关。两种方式结果一致
+_ALTERNATION_MAX_NAMES = 64
+_IDENTIFIER_RE = re.compile(r"\b([A-Za-z_]\w*)\b(\.)?")
+
+
+class NameScanner:
+    """一次扫描全文，找出出现过的关注名字，以及以 `名字.` 形式出现的名字"""
+
+    def __init__(self, names: Iterable[str]):
+        self.names = frozenset(n for n in names if n)
+        self.pattern = _IDENTIFIER_RE
+        if 0 < len(self.names) <= _ALTERNATION_MAX_NAMES:
+            alternatives = "|".join(re.escape(n) for n in sorted(self.names, key=len, reverse=True))
+            self.pattern = re.compile(r"\b(" + alternatives + r")\b(\.)?")
+
+    def scan(self, code: str) -> tuple[frozenset, frozenset]:
+        if not self.names:
+            return frozenset(), frozenset()
+        names = self.names
+        seen, attributes = set(), set()
+        for match in self.pattern.finditer(code):
+            name = match.group(1)
+            if name in names:
+                seen.add(name)
+                if match.group(2):
+                    attributes.add(name)
+        return frozenset(seen), frozenset(attributes)
+
+
+@dataclass(frozen=True)
+class CodeFeatures:
+    """一次 AST 遍历 + 一次标识符扫描得到的代码特征"""
+
+    # 顶层模块名（import a.b -> a；相对导入不计入）
+    imports: frozenset = frozenset()
+    # 以 `名字.` 形式使用的已知别名（如 pd.DataFrame -> pd；与旧的文本匹配一致，字符串里出现也算）
+    attribute_names: frozenset = frozenset()
+    uses_matplotlib: bool = False
+    # 代码中以字符串常量出现的文件路径
+    file_paths: tuple[str, ...] = ()
+
+    def packages(self, mapping: dict[str, str]) -> list[str]:
+        """映射成需要安装的 pip 包名"""
+        packages = {mapping[name] for name in self.imports if name in mapping}
+        packages.update(mapping[name] for name in self.attribute_names if name in mapping)
+        return sorted(packages)
+
+
+@dataclass(frozen=True)
+class CodeAnalysis:
+    code_hash: str
+    features: CodeFeatures = field(default_factory=CodeFeatures)
+    error: str = ""
+    violations: tuple[str, ...] = ()
+    tree: Optional[ast.Module] = field(default=None, compare=False, repr=False)
+
+    @property
+    def ok(self) -> bool:
+        return not self.error and not self.violations
+
+    @property
+    def imports(self) -> frozenset:
+        return self.features.imports
+
+    @property
+    def short_hash(self) -> str:
+        return self.code_hash[:16]
+
+    def error_message(self) -> str:
+        if self.error:
+            return self.error
+        return "\n".join(self.violations)
+
+
+def _dotted_name(node: ast.AST) -> str:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return ""
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+@dataclass(frozen=True)
+class CodePolicy:
+    """禁止导入的模块（含子模块）与禁止调用的函数（eval 只匹配直接调用，os.system 按点号全名匹配）"""
+
+    forbidden_modules: frozenset = frozenset()
+    forbidden_calls: frozenset = frozenset()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "CodePolicy":
+        return cls(
+            forbidden_modules=frozenset(settings.code_forbidden_modules or ()),
+            forbidden_calls=frozenset(settings.code_forbidden_calls or ()),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.forbidden_modules or self.forbidden_calls)
+
+    def _module_forbidden(self, module: str) -> bool:
+        module = module.lower()
+        return any(module == m or module.startswith(m + ".") for m in self.forbidden_modules)
+
+    def check_node(self, node: ast.AST) -> list[str]:
+        violations = []
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if self._module_forbidden(alias.name):
+                    violations.append(f"line {node.lineno}: import of '{alias.name}' is not allowed")
+        elif isinstance(node, ast.ImportFrom):
+            if node.module and not node.level and self._module_forbidden(node.module):
+                violations.append(f"line {node.lineno}: import of '{node.module}' is not allowed")
+        elif isinstance(node, ast.Call) and self.forbidden_calls:
+            # 不带点的条目只匹配直接调用（eval(...)），不匹配同名方法（model.eval()）；带点的条目匹配点号全名
+            name = _dotted_name(node.func)
+            if name and name.lower() in self.forbidden_calls:
+                violations.append(f"line {node.lineno}: call to '{name}' is not allowed")
+        return [f"PolicyViolation: {v}" for v in violations]
+
+    def check(self, tree: ast.Module) -> tuple[str, ...]:
+        violations = []
+        for node in ast.walk(tree):
+            violations.extend(self.check_node(node))
+        return tuple(violations)
+
+
+class CodeAnalyzer:
+    """
+    在占用调度名额、容器之前对代码做一次静态检查：语法/编译错误和策略违规直接返回；
+    解析出的 AST 与代码特征按代码哈希缓存（LRU），后续阶段复用，不再重复解析。
+    """
+
+    def __init__(self, settings: Settings, metrics: MetricsRegistry = None, names: Iterable[str] = None):
+        self.policy = CodePolicy.from_settings(settings)
+        self.name_scanner = NameScanner(set(PACKAGE_MAPPING if names is None else names) | MATPLOTLIB_NAMES)
+        self.cache_size = max(0, int(settings.code_analysis_cache_size))
+        self.metrics = metrics or MetricsRegistry()
+        self._cache: OrderedDict[str, CodeAnalysis] = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics.describe("code_analysis_total", "counter", "Pre-flight analyses by result")
+        self.metrics.describe("code_analysis_cache_hits_total", "counter", "Pre-flight analyses served from cache")
+        self.metrics.describe("code_analysis_seconds", "summary", "Time spent parsing and checking code")
+
+    def cached(self, code: str) -> Optional[CodeAnalysis]:
+        """只查缓存（不解析）；未命中返回 None，调用方可以把 analyze 放到线程池中执行"""
+        digest = code_hash(code)
+        with self._lock:
+            cached = self._cache.get(digest)
+            if cached is not None:
+                self._cache.move_to_end(digest)
+        if cached is not None:
+            self.metrics.inc("code_analysis_cache_hits_total")
+        return cached
+
+    def analyze(self, code: str) -> CodeAnalysis:
+        cached = self.cached(code)
+        if cached is not None:
+            return cached
+
+        digest = code_hash(code)
+        start = time.perf_counter()
+        analysis = self._analyze(code, digest)
+        self.metrics.observe("code_analysis_seconds", time.perf_counter() - start)
+        result = "ok" if analysis.ok else ("syntax_error" if analysis.error else "policy")
+        self.metrics.inc("code_analysis_total", result=result)
+
+        if self.cache_size:
+            with self._lock:
+                self._cache[digest] = analysis
+                self._cache.move_to_end(digest)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return analysis
+
+    def _analyze(self, code: str, digest: str) -> CodeAnalysis:
+        try:
+            tree = ast.parse(code, filename=SCRIPT_FILENAME)
+            # 部分错误（如函数外的 return、nonlocal）只在编译阶段报出
+            compile(tree, SCRIPT_FILENAME, "exec", dont_inherit=True)
+        except (SyntaxError, ValueError) as e:
+            error = "".join(traceback.format_exception_only(type(e), e)).rstrip("\n")
+            return CodeAnalysis(code_hash=digest, error=error)
+
+        imports, paths, violations = set(), [], []
+        check_policy = self.policy.enabled
+        for node in ast.walk(tree):
+            # ast 节点类型没有子类，按 type 精确比较比 isinstance 链更快
+            node_type = type(node)
+            if node_type is ast.Constant:
+                value = node.value
+                if type(value) is str and len(value) <= _MAX_PATH_LENGTH and _PATH_RE.match(value):
+                    paths.append(value)
+            elif node_type is ast.Import:
+                imports.update(alias.name.split(".")[0] for alias in node.names)
+            elif node_type is ast.ImportFrom:
+                if node.module and not node.level:
+                    imports.add(node.module.split(".")[0])
+            if check_policy:
+                violations.extend(self.policy.check_node(node))
+
+        seen, attribute_names = self.name_scanner.scan(code)
+        features = CodeFeatures(
+            imports=frozenset(imports),
+            attribute_names=attribute_names,
+            uses_matplotlib="matplotlib" in imports or bool(seen & MATPLOTLIB_NAMES),
+            file_paths=tuple(dict.fromkeys(paths)),
+        )
+        return CodeAnalysis(
+            code_hash=digest,
+            features=features,
+            violations=tuple(violations),
+            tree=tree,
+        )
+
+
+def _char_offset(lines: list[str], lineno: int, col_offset: int) -> int:
+    """ast 的 (行号, UTF-8 字节列偏移) -> 字符串下标"""
+    offset = sum(len(line) for line in lines[:lineno - 1])
+    line = lines[lineno - 1] if lineno - 1 < len(lines) else ""
+    return offset + len(line.encode("utf-8")[:col_offset].decode("utf-8", errors="ignore"))
+
+
+def wrap_last_expression(code: str, tree: Optional[ast.Module], func: str) -> str:
+    """
+    把顶层最后一条表达式语句 `expr` 改写成 `func(expr)`，用于输出它的值（与交互式解释器一致）。
+    只改动这一段文本，行号不变；以 `;` 结尾（交互式环境中表示不显示）或不是表达式时原样返回。
+    """
+    if tree is None or not tree.body or not isinstance(tree.body[-1], ast.Expr):
+        return code
+    node = tree.body[-1].value
+    if getattr(node, "end_lineno", None) is None:
+        return code
+    # 按 \n、\r、\r\n 分行（与 ast 一致；str.splitlines 还会在 \x0c 等字符处分行）
+    lines = io.StringIO(code, newline="").readlines()
+    start = _char_offset(lines, node.lineno, node.col_offset)
+    end = _char_offset(lines, node.end_lineno, node.end_col_offset)
+    rest = code[end:].split("\n", 1)[0].split("#", 1)[0].strip()
+    if rest.startswith(";"):
+        return code
+    # 表达式可能跨行（括号内或续行符），整体放进调用的括号里仍然合法
+    return f"{code[:start]}{func}({code[start:end]}){code[end:]}"
+
+
+def future_imports_end(code: str, tree: Optional[ast.Module]) -> int:
+    """
+    顶层 `from __future__ import ...`（之前只能有模块文档字符串）结束处的字符串下标（该行行尾之后），没有时为 0。
+    在代码前插入的语句必须放在这之后，否则 __future__ 导入会编译失败。
+    """
+    if tree is None:
+        return 0
+    last = None
+    for index, node in enumerate(tree.body):
+        if isinstance(node, ast.ImportFrom) and node.module == "__future__" and not node.level:
+            last = node
+        elif not (
+            index == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str)
+        ):
+            break
+    if last is None or getattr(last, "end_lineno", None) is None:
+        return 0
+    lines = io.StringIO(code, newline="").readlines()
+    return sum(len(line) for line in lines[:last.end_lineno])
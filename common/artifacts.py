@@ -0,0 +1,737 @@
+"""Artifact store: content-addressed blobs with a SQLite index, reference counts, TTL and size-based GC.
+
+Objects can additionally be published to a remote backend (see common.object_storage)."""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from common.metrics import MetricsRegistry
+from common.object_storage import ArtifactBackend, create_artifact_backend
+from common.settings import Settings
+
+ARTIFACT_KINDS = ("images", "files")
+
+# 内容寻址的 blob 目录（位于各类产物根目录下）：<root>/.blobs/<sha256 前两位>/<sha256>
+BLOB_DIR = ".blobs"
+# 入库前的临时目录，与 blob 同一文件系统，保证最终 rename 是原子的
+_INCOMING_DIR = os.path.join(BLOB_DIR, ".incoming")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    execution_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    uploaded INTEGER NOT NULL DEFAULT 0,
+    sha256 TEXT NOT NULL DEFAULT '',
+    encodings TEXT NOT NULL DEFAULT '',
+    tenant TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (kind, name)
+);
+CREATE INDEX IF NOT EXISTS artifacts_created_at ON artifacts (created_at);
+CREATE INDEX IF NOT EXISTS artifacts_execution ON artifacts (execution_id);
+CREATE INDEX IF NOT EXISTS artifacts_path ON artifacts (kind, path);
+CREATE TABLE IF NOT EXISTS blobs (
+    kind TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    refcount INTEGER NOT NULL,
+    encodings TEXT NOT NULL DEFAULT '',
+    precompressed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (kind, digest)
+);
+"""
+
+_SELECT = (
+    "SELECT kind, name, execution_id, path, size_bytes, created_at, uploaded, sha256, encodings, tenant FROM artifacts"
+)
+
+# 旧索引缺少的列：启动时补齐
+_MIGRATIONS = {
+    "uploaded": "INTEGER NOT NULL DEFAULT 0",
+    "sha256": "TEXT NOT NULL DEFAULT ''",
+    "encodings": "TEXT NOT NULL DEFAULT ''",
+    "tenant": "TEXT NOT NULL DEFAULT ''",
+}
+
+ENCODING_SUFFIXES = {"br": ".br", "zstd": ".zst", "gzip": ".gz"}
+
+
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _available_encoders() -> list[tuple[str, str, object]]:
+    """(Content-Encoding, 文件后缀, 压缩函数)；brotli / zstandard 为可选依赖，不可用时跳过"""
+    encoders: list[tuple[str, str, object]] = []
+    try:
+        import brotli
+
+        encoders.append(("br", ENCODING_SUFFIXES["br"], lambda data: brotli.compress(data, quality=11)))
+    except ImportError:
+        pass
+    try:
+        import zstandard
+
+        encoders.append(
+            ("zstd", ENCODING_SUFFIXES["zstd"], lambda data: zstandard.ZstdCompressor(level=19).compress(data))
+        )
+    except ImportError:
+        pass
+    encoders.append(("gzip", ENCODING_SUFFIXES["gzip"], _gzip))
+    return encoders
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_blob_path(path: str) -> bool:
+    return path.startswith(BLOB_DIR + os.sep)
+
+
+@dataclass(frozen=True)
+class ArtifactRecord:
+    kind: str
+    name: str
+    execution_id: str
+    # 相对产物根目录的路径：新产物指向 .blobs 下的共享 blob；为空表示本机副本已释放（仅存于远端）
+    path: str
+    size_bytes: int
+    created_at: float
+    uploaded: bool = False
+    sha256: str = ""
+    # 已预压缩的编码（如 ("br", "gzip")），变体文件与原文件同目录，后缀见 ENCODING_SUFFIXES
+    encodings: tuple[str, ...] = ()
+    # 产物所属租户（执行请求的租户）；旧记录为空
+    tenant: str = ""
+
+
+class ArtifactStore:
+    """
+    图片/文件产物存储。
+    内容按 SHA-256 去重：同样的图表/CSV 只落盘一份 blob，每次执行的对外文件名只是指向它的索引记录，
+    blob 带引用计数，最后一个引用被淘汰时才删除。后台按 TTL 与本机磁盘总容量淘汰最旧的产物。
+    配置远端后端（S3 兼容）时，执行结束后并行上传，响应返回预签名/直链 URL，网关不再回传字节。
+    """
+
+    def __init__(self, settings: Settings, metrics: MetricsRegistry = None, backend: ArtifactBackend = None):
+        self.settings = settings
+        self.metrics = metrics or MetricsRegistry()
+        self.backend = backend or create_artifact_backend(settings)
+        self.key_prefix = settings.artifact_s3_prefix.strip("/")
+        self.url_expires_seconds = max(1, int(settings.artifact_url_expires_seconds))
+        self.keep_local = bool(settings.artifact_keep_local)
+        self.upload_concurrency = max(1, int(settings.artifact_upload_concurrency))
+        self.precompress_extensions = settings.artifact_precompress_extensions or set()
+        self.precompress_min_bytes = max(0, int(settings.artifact_precompress_min_bytes))
+        self._upload_executor: Optional[ThreadPoolExecutor] = None
+        self.roots = {
+            "images": settings.image_store_path,
+            "files": settings.file_store_path,
+        }
+        self.index_path = settings.artifact_index_path or os.path.join(
+            settings.file_store_path, ".artifacts.sqlite3"
+        )
+        self.ttl_seconds = max(0, int(settings.artifact_ttl_seconds))
+        self.max_bytes = max(0, int(settings.artifact_max_bytes))
+        self.gc_interval_seconds = max(1, int(settings.artifact_gc_interval_seconds))
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # kind -> [本机磁盘字节数, 产物（引用）数, blob 数]
+        self._totals: dict[str, list[int]] = {kind: [0, 0, 0] for kind in ARTIFACT_KINDS}
+        self._gc_task = None
+        self._gc_stop_event = asyncio.Event()
+        self.metrics.describe("artifact_evictions_total", "counter", "Artifacts removed by GC")
+        self.metrics.describe("artifact_uploads_total", "counter", "Artifact uploads to the remote backend")
+        self.metrics.describe("artifact_upload_seconds", "summary", "Time spent uploading one artifact")
+        self.metrics.describe("artifact_dedup_hits_total", "counter", "Artifacts stored as a reference to an existing blob")
+        self.metrics.describe("artifact_dedup_bytes_total", "counter", "Bytes not written thanks to deduplication")
+        self.metrics.gauge_callback(
+            "artifact_store_bytes",
+            lambda: [({"kind": kind}, totals[0]) for kind, totals in self._totals.items()],
+            "Bytes held in the artifact store",
+        )
+        self.metrics.gauge_callback(
+            "artifact_store_objects",
+            lambda: [({"kind": kind}, totals[1]) for kind, totals in self._totals.items()],
+            "Artifacts held in the artifact store",
+        )
+        self.metrics.gauge_callback(
+            "artifact_store_blobs",
+            lambda: [({"kind": kind}, totals[2]) for kind, totals in self._totals.items()],
+            "Unique content blobs held in the artifact store",
+        )
+
+    # ---- 索引 ----
+
+    def _db(self) -> sqlite3.Connection:
+        """调用方需持有 self._lock；首次使用时才打开索引（避免仅构造即落盘）"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+            conn = sqlite3.connect(self.index_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(artifacts)")}
+            if columns:
+                for column, definition in _MIGRATIONS.items():
+                    if column not in columns:
+                        conn.execute(f"ALTER TABLE artifacts ADD COLUMN {column} {definition}")
+            conn.executescript(_SCHEMA)
+            for kind, count in conn.execute("SELECT kind, COUNT(*) FROM artifacts GROUP BY kind"):
+                if kind in self._totals:
+                    self._totals[kind][1] = int(count)
+            for kind, total, count in conn.execute(
+                "SELECT kind, COALESCE(SUM(size_bytes), 0), COUNT(*) FROM blobs GROUP BY kind"
+            ):
+                if kind in self._totals:
+                    self._totals[kind][0] += int(total)
+                    self._totals[kind][2] = int(count)
+            # 去重之前写入的旧产物独占文件，直接计入磁盘占用
+            for kind, total in conn.execute(
+                "SELECT kind, COALESCE(SUM(size_bytes), 0) FROM artifacts "
+                "WHERE path != '' AND path NOT LIKE ? GROUP BY kind",
+                (BLOB_DIR + os.sep + "%",),
+            ):
+                if kind in self._totals:
+                    self._totals[kind][0] += int(total)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        if self._upload_executor is not None:
+            self._upload_executor.shutdown(wait=True)
+            self._upload_executor = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _absolute(self, kind: str, relative_path: str) -> str:
+        return os.path.join(self.roots[kind], relative_path)
+
+    @staticmethod
+    def _blob_relative_path(digest: str) -> str:
+        return os.path.join(BLOB_DIR, digest[:2], digest)
+
+    # ---- 读写 ----
+
+    def put(self, kind: str, execution_id: str, name: str, src_path: str, tenant: str = "") -> ArtifactRecord:
+        """
+        把 src_path 存入内容寻址的 blob 并登记索引。
+        内容已存在时只增加引用计数并删除 src_path，不再写盘。
+        """
+        digest = _file_sha256(src_path)
+        relative_path = self._blob_relative_path(digest)
+        size_bytes = int(os.path.getsize(src_path))
+
+        blob = self._reference_blob(kind, digest)
+        if blob is None:
+            # 先移到同文件系统的临时目录（可能跨盘拷贝，耗时操作不持锁），再原子 rename 成 blob
+            incoming_dir = self._absolute(kind, _INCOMING_DIR)
+            os.makedirs(incoming_dir, exist_ok=True)
+            tmp_path = os.path.join(incoming_dir, uuid.uuid4().hex)
+            shutil.move(src_path, tmp_path)
+            os.chmod(tmp_path, 0o666)
+            with self._lock:
+                blob = self._reference_blob_locked(kind, digest)
+                if blob is None:
+                    blob_path = self._absolute(kind, relative_path)
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.replace(tmp_path, blob_path)
+                    blob = (digest, size_bytes, "")
+                    self._db().execute(
+                        "INSERT INTO blobs (kind, digest, sha256, size_bytes, refcount, created_at) "
+                        "VALUES (?, ?, ?, ?, 1, ?)",
+                        (kind, digest, digest, size_bytes, time.time()),
+                    )
+                    totals = self._totals[kind]
+                    totals[0] += size_bytes
+                    totals[2] += 1
+                    tmp_path = None
+            if tmp_path is not None:
+                os.remove(tmp_path)
+                self._count_dedup(kind, size_bytes)
+        else:
+            os.remove(src_path)
+            self._count_dedup(kind, size_bytes)
+
+        sha256, blob_size, encodings = blob
+        record = ArtifactRecord(
+            kind=kind,
+            name=name,
+            execution_id=execution_id,
+            path=relative_path,
+            size_bytes=blob_size,
+            created_at=time.time(),
+            sha256=sha256,
+            encodings=tuple(e for e in encodings.split(",") if e),
+            tenant=tenant,
+        )
+        self._insert(record)
+        return record
+
+    def _count_dedup(self, kind: str, size_bytes: int):
+        self.metrics.inc("artifact_dedup_hits_total", kind=kind)
+        self.metrics.inc("artifact_dedup_bytes_total", size_bytes, kind=kind)
+
+    def _reference_blob(self, kind: str, digest: str) -> Optional[tuple[str, int, str]]:
+        with self._lock:
+            return self._reference_blob_locked(kind, digest)
+
+    def _reference_blob_locked(self, kind: str, digest: str) -> Optional[tuple[str, int, str]]:
+        """blob 已存在时引用计数 +1，返回 (当前内容 sha256, 大小, 预压缩编码)"""
+        db = self._db()
+        row = db.execute(
+            "SELECT sha256, size_bytes, encodings FROM blobs WHERE kind = ? AND digest = ?", (kind, digest)
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute("UPDATE blobs SET refcount = refcount + 1 WHERE kind = ? AND digest = ?", (kind, digest))
+        return row[0], int(row[1]), row[2]
+
+    def _release_locked(self, kind: str, path: str, size_bytes: int, encodings: tuple[str, ...]):
+        """释放一个产物对本机文件的引用（调用方持锁）；blob 引用计数归零时删除 blob 与压缩变体"""
+        if not path:
+            return
+        db = self._db()
+        totals = self._totals[kind]
+        if _is_blob_path(path):
+            digest = os.path.basename(path)
+            row = db.execute(
+                "SELECT refcount, size_bytes, encodings FROM blobs WHERE kind = ? AND digest = ?", (kind, digest)
+            ).fetchone()
+            if row is None:
+                return
+            if int(row[0]) > 1:
+                db.execute("UPDATE blobs SET refcount = refcount - 1 WHERE kind = ? AND digest = ?", (kind, digest))
+                return
+            db.execute("DELETE FROM blobs WHERE kind = ? AND digest = ?", (kind, digest))
+            totals[0] -= int(row[1])
+            totals[2] -= 1
+            encodings = tuple(e for e in row[2].split(",") if e)
+        else:
+            totals[0] -= size_bytes
+
+        # 删除文件也在锁内进行，避免与同内容的并发 put 竞争同一路径
+        absolute = self._absolute(kind, path)
+        for suffix in [""] + [ENCODING_SUFFIXES[e] for e in encodings if e in ENCODING_SUFFIXES]:
+            try:
+                os.remove(absolute + suffix)
+            except OSError:
+                pass
+        # 顺带删除空的分片目录
+        parent = os.path.dirname(absolute)
+        for _ in range(2):
+            if os.path.abspath(parent) == os.path.abspath(self.roots[kind]):
+                break
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+
+    def _insert(self, record: ArtifactRecord):
+        """登记产物；同名记录只能被同一次执行覆盖（产物对外不可变，ETag 依赖这一点）"""
+        with self._lock:
+            db = self._db()
+            previous = db.execute(
+                "SELECT path, size_bytes, encodings, execution_id FROM artifacts WHERE kind = ? AND name = ?",
+                (record.kind, record.name),
+            ).fetchone()
+            if previous and previous[3] != record.execution_id:
+                self._release_locked(record.kind, record.path, record.size_bytes, record.encodings)
+                raise ValueError(f"Artifact name already in use: {record.kind}/{record.name}")
+            db.execute(
+                "INSERT OR REPLACE INTO artifacts "
+                "(kind, name, execution_id, path, size_bytes, created_at, sha256, encodings, tenant) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record.kind,
+                    record.name,
+                    record.execution_id,
+                    record.path,
+                    record.size_bytes,
+                    record.created_at,
+                    record.sha256,
+                    ",".join(record.encodings),
+                    record.tenant,
+                ),
+            )
+            totals = self._totals[record.kind]
+            if previous:
+                totals[1] -= 1
+                self._release_locked(
+                    record.kind, previous[0], int(previous[1]), tuple(e for e in previous[2].split(",") if e)
+                )
+            totals[1] += 1
+            if not _is_blob_path(record.path):
+                totals[0] += record.size_bytes
+
+    def get(self, kind: str, name: str) -> Optional[ArtifactRecord]:
+        records = self._select("WHERE kind = ? AND name = ?", (kind, name))
+        return records[0] if records else None
+
+    def resolve(self, kind: str, name: str) -> Optional[str]:
+        """对外文件名 -> 磁盘绝对路径；兼容迁移前平铺在根目录下的旧文件"""
+        if kind not in self.roots:
+            return None
+        record = self.get(kind, name)
+        if record is not None:
+            if not record.path:
+                return None
+            path = self._absolute(kind, record.path)
+            return path if os.path.isfile(path) else None
+        legacy_path = os.path.join(self.roots[kind], name)
+        return legacy_path if os.path.isfile(legacy_path) else None
+
+    def local_path(self, record: ArtifactRecord, encoding: str = "") -> str:
+        path = self._absolute(record.kind, record.path)
+        return path + ENCODING_SUFFIXES[encoding] if encoding else path
+
+    def blob_refcount(self, record: ArtifactRecord) -> int:
+        """产物所引用 blob 的引用计数；去重之前的旧产物独占文件，视为 1"""
+        if not _is_blob_path(record.path):
+            return 1 if record.path else 0
+        with self._lock:
+            row = self._db().execute(
+                "SELECT refcount FROM blobs WHERE kind = ? AND digest = ?",
+                (record.kind, os.path.basename(record.path)),
+            ).fetchone()
+        return int(row[0]) if row else 0
+
+    def content_hash(self, record: ArtifactRecord) -> str:
+        """内容 SHA-256；旧记录（迁移前登记的）首次访问时补算并回写索引"""
+        if record.sha256:
+            return record.sha256
+        digest = _file_sha256(self.local_path(record))
+        with self._lock:
+            self._db().execute(
+                "UPDATE artifacts SET sha256 = ? WHERE kind = ? AND name = ?", (digest, record.kind, record.name)
+            )
+        return digest
+
+    def precompress(self, kind: str, name: str) -> tuple[str, ...]:
+        """
+        为文本类产物预先生成 br / zstd / gzip 变体（产物不可变，只需压缩一次），
+        只保留比原文件小的变体，返回生成的编码列表。同一 blob 只压缩一次，后续引用直接复用。
+        """
+        record = self.get(kind, name)
+        ext = os.path.splitext(name)[1].lower().lstrip(".")
+        if record is None or not record.path or ext not in self.precompress_extensions:
+            return ()
+        if record.size_bytes < self.precompress_min_bytes:
+            return ()
+
+        is_blob = _is_blob_path(record.path)
+        if is_blob:
+            with self._lock:
+                row = self._db().execute(
+                    "SELECT encodings, precompressed FROM blobs WHERE kind = ? AND digest = ?",
+                    (kind, os.path.basename(record.path)),
+                ).fetchone()
+            if row is None:
+                return ()
+            if row[1]:
+                encodings = [e for e in row[0].split(",") if e]
+                self._set_encodings(kind, record.path, encodings, is_blob)
+                return tuple(encodings)
+
+        path = self.local_path(record)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return ()
+
+        encodings = []
+        for encoding, suffix, compress in _available_encoders():
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            tmp_path = f"{path}{suffix}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(compressed)
+            os.chmod(tmp_path, 0o666)
+            os.replace(tmp_path, path + suffix)
+            encodings.append(encoding)
+
+        if not self._set_encodings(kind, record.path, encodings, is_blob):
+            # 压缩期间 blob 已被回收：清理刚写出的变体
+            for encoding in encodings:
+                try:
+                    os.remove(path + ENCODING_SUFFIXES[encoding])
+                except OSError:
+                    pass
+            return ()
+        return tuple(encodings)
+
+    def _set_encodings(self, kind: str, path: str, encodings: list[str], is_blob: bool) -> bool:
+        value = ",".join(encodings)
+        with self._lock:
+            db = self._db()
+            if is_blob:
+                updated = db.execute(
+                    "UPDATE blobs SET encodings = ?, precompressed = 1 WHERE kind = ? AND digest = ?",
+                    (value, kind, os.path.basename(path)),
+                ).rowcount
+                if not updated:
+                    return False
+            db.execute("UPDATE artifacts SET encodings = ? WHERE kind = ? AND path = ?", (value, kind, path))
+        return True
+
+    def has_execution(self, execution_id: str) -> bool:
+        """索引中是否已有该执行的产物（索引尚未创建时不落盘，直接返回 False）"""
+        with self._lock:
+            if self._conn is None and not os.path.exists(self.index_path):
+                return False
+            row = self._db().execute(
+                "SELECT 1 FROM artifacts WHERE execution_id = ? LIMIT 1", (execution_id,)
+            ).fetchone()
+        return row is not None
+
+    def list_execution(self, execution_id: str) -> list[ArtifactRecord]:
+        return self._select("WHERE execution_id = ? ORDER BY kind, name", (execution_id,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._db()
+            return {
+                kind: {"bytes": totals[0], "objects": totals[1], "blobs": totals[2]}
+                for kind, totals in self._totals.items()
+            }
+
+    # ---- 远端发布 ----
+
+    def object_key(self, kind: str, name: str) -> str:
+        # 对外文件名本身已包含执行 ID，任一网关节点都能据此算出对象 key
+        return "/".join(part for part in (self.key_prefix, kind, name) if part)
+
+    def url(self, kind: str, name: str) -> Optional[str]:
+        """远端后端的访问 URL（预签名或直链）；本地后端返回 None，由网关回传"""
+        if not self.backend.remote:
+            return None
+        return self.backend.url(self.object_key(kind, name), self.url_expires_seconds)
+
+    def _upload_one(self, kind: str, name: str, prepare: Callable[[str, str, str], None] = None) -> bool:
+        record = self.get(kind, name)
+        if record is None or not record.path:
+            return False
+        start = time.time()
+        try:
+            if prepare is not None:
+                prepare(kind, name, self.local_path(record))
+                record = self.get(kind, name) or record
+            content_type, _ = mimetypes.guess_type(name)
+            self.backend.upload(
+                self.object_key(kind, name),
+                self.local_path(record),
+                content_type or "application/octet-stream",
+            )
+        except Exception:
+            self.metrics.inc("artifact_uploads_total", kind=kind, status="error")
+            return False
+        self.metrics.inc("artifact_uploads_total", kind=kind, status="ok")
+        self.metrics.observe("artifact_upload_seconds", time.time() - start, kind=kind)
+
+        with self._lock:
+            db = self._db()
+            if self.keep_local:
+                db.execute("UPDATE artifacts SET uploaded = 1 WHERE kind = ? AND name = ?", (kind, name))
+            else:
+                # 释放本机引用：记录保留（用于 TTL 回收远端对象），本机文件在最后一个引用释放时删除
+                db.execute(
+                    "UPDATE artifacts SET uploaded = 1, path = '', encodings = '' WHERE kind = ? AND name = ?",
+                    (kind, name),
+                )
+                self._release_locked(kind, record.path, record.size_bytes, record.encodings)
+        return True
+
+    async def publish(
+        self,
+        items: list[tuple[str, str]],
+        prepare: Callable[[str, str, str], None] = None,
+    ) -> dict[tuple[str, str], bool]:
+        """
+        把 (kind, name) 列表并行上传到远端后端，返回每个产物是否上传成功。
+        prepare(kind, name, path) 在上传线程里先执行（不能改动文件内容：产物 URL 按不可变缓存）。
+        """
+        if not self.backend.remote or not items:
+            return {item: False for item in items}
+        if self._upload_executor is None:
+            self._upload_executor = ThreadPoolExecutor(
+                max_workers=self.upload_concurrency,
+                thread_name_prefix="artifact-upload",
+            )
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *[
+                loop.run_in_executor(self._upload_executor, self._upload_one, kind, name, prepare)
+                for kind, name in items
+            ]
+        )
+        return dict(zip(items, results))
+
+    # ---- 回收 ----
+
+    def _delete(self, records: list[ArtifactRecord], reason: str):
+        if not records:
+            return
+        with self._lock:
+            db = self._db()
+            for record in records:
+                deleted = db.execute(
+                    "DELETE FROM artifacts WHERE kind = ? AND name = ?", (record.kind, record.name)
+                ).rowcount
+                if not deleted:
+                    continue
+                self._totals[record.kind][1] -= 1
+                self._release_locked(record.kind, record.path, record.size_bytes, record.encodings)
+
+        for record in records:
+            if record.uploaded:
+                try:
+                    self.backend.delete(self.object_key(record.kind, record.name))
+                except Exception:
+                    pass
+            self.metrics.inc("artifact_evictions_total", kind=record.kind, reason=reason)
+
+    def _select(self, sql: str, params: tuple) -> list[ArtifactRecord]:
+        with self._lock:
+            rows = self._db().execute(f"{_SELECT} {sql}", params).fetchall()
+        return [
+            ArtifactRecord(
+                kind,
+                name,
+                execution_id,
+                path,
+                size_bytes,
+                created_at,
+                bool(uploaded),
+                sha256,
+                tuple(e for e in encodings.split(",") if e),
+                tenant,
+            )
+            for kind, name, execution_id, path, size_bytes, created_at, uploaded, sha256, encodings, tenant in rows
+        ]
+
+    def evict_expired(self, now: float = None, batch_size: int = 1000) -> int:
+        if not self.ttl_seconds:
+            return 0
+        cutoff = (time.time() if now is None else now) - self.ttl_seconds
+        evicted = 0
+        while True:
+            batch = self._select("WHERE created_at < ? ORDER BY created_at LIMIT ?", (cutoff, batch_size))
+            if not batch:
+                return evicted
+            self._delete(batch, "ttl")
+            evicted += len(batch)
+
+    def evict_over_quota(self, batch_size: int = 1000) -> int:
+        """本机磁盘占用超过上限时从最旧的产物开始淘汰；共享 blob 在最后一个引用淘汰时才真正释放空间"""
+        if not self.max_bytes:
+            return 0
+        evicted = 0
+        while True:
+            with self._lock:
+                self._db()
+                excess = sum(totals[0] for totals in self._totals.values()) - self.max_bytes
+            if excess <= 0:
+                return evicted
+            batch = self._select("WHERE path != '' ORDER BY created_at LIMIT ?", (batch_size,))
+            if not batch:
+                return evicted
+            victims = []
+            for record in batch:
+                victims.append(record)
+                excess -= record.size_bytes
+                if excess <= 0:
+                    break
+            self._delete(victims, "quota")
+            evicted += len(victims)
+
+    def adopt_legacy_files(self) -> int:
+        """把迁移前平铺在根目录下的文件登记进索引，使其也参与回收"""
+        adopted = 0
+        for kind, root in self.roots.items():
+            try:
+                entries = list(os.scandir(root))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                if self.get(kind, entry.name) is not None:
+                    continue
+                stat = entry.stat()
+                self._insert(
+                    ArtifactRecord(
+                        kind=kind,
+                        name=entry.name,
+                        execution_id="",
+                        path=entry.name,
+                        size_bytes=int(stat.st_size),
+                        created_at=float(stat.st_mtime),
+                    )
+                )
+                adopted += 1
+        return adopted
+
+    def run_gc(self) -> dict:
+        return {
+            "ttl": self.evict_expired(),
+            "quota": self.evict_over_quota(),
+        }
+
+    async def start(self):
+        if self._gc_task is None or self._gc_task.done():
+            self._gc_stop_event.clear()
+            self._gc_task = asyncio.create_task(self._gc_loop())
+
+    async def stop(self):
+        self._gc_stop_event.set()
+        if self._gc_task:
+            self._gc_task.cancel()
+            try:
+                await self._gc_task
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                pass
+        self.close()
+
+    async def _gc_loop(self):
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(None, self.adopt_legacy_files)
+        except Exception:
+            pass
+        while not self._gc_stop_event.is_set():
+            try:
+                await loop.run_in_executor(None, self.run_gc)
+            except Exception:
+                pass
+            try:
+                await asyncio.wait_for(self._gc_stop_event.wait(), timeout=self.gc_interval_seconds)
+            except asyncio.TimeoutError:
+                continue
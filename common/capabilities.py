@@ -5,6 +5,7 @@ import time
 from dataclasses import dataclass
 from typing import Optional
 
+from common.resources import get_default_profile
 from common.settings import Settings
 
 
@@ -74,14 +75,14 @@ def _inspect_executor_image(settings: Settings) -> ExecutorRuntimeInfo:
         "print(json.dumps({'pythonVersion': platform.python_version(), 'installedPackages': items}, ensure_ascii=False))\n"
     )
 
+    profile = get_default_profile(settings)
     cmd = [
         "docker",
         "run",
         "--rm",
         "--network",
         settings.docker_network_mode,
-        "--memory=1g",
-        "--cpus=1",
+        *profile.docker_args(),
         "--pids-limit",
         str(settings.docker_pids_limit),
         settings.docker_image,
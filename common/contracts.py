@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import re
+import uuid
 from dataclasses import dataclass, field
-from typing import Optional, Protocol
+from typing import Any, Optional, Protocol
 
 
 def _join_public_url(public_base_url: str, path: str) -> str:
@@ -13,20 +15,56 @@ def _join_public_url(public_base_url: str, path: str) -> str:
     return f"{base.rstrip('/')}/{path.lstrip('/')}"
 
 
-@dataclass(frozen=True)
+IMAGE_FORMATS = ("png", "webp", "svg")
+# 性能分析模式：确定性的 cProfile 与低开销的调用栈采样
+PROFILER_MODES = ("cprofile", "sampling")
+# 结构化展示输出的类型（见 executors/runtime/display.py）
+DISPLAY_OUTPUT_TYPES = ("dataframe", "array", "json", "text")
+
+# 执行 ID 会用于临时目录名和容器名，只接受这类字符
+EXECUTION_ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+_EXECUTION_ID_RE = re.compile(EXECUTION_ID_PATTERN)
+
+
+def new_execution_id() -> str:
+    return str(uuid.uuid4())
+
+
+def is_valid_execution_id(execution_id: str) -> bool:
+    return bool(_EXECUTION_ID_RE.match(execution_id or ""))
+
+
+@dataclass(frozen=True, slots=True)
+class FigureOptions:
+    format: str = "png"
+    dpi: int = 150
+    max_dimension: int = 2000
+
+
+@dataclass(frozen=True, slots=True)
 class ExecuteRequest:
     code: str
     files: list[str] = field(default_factory=list)
+    resource_profile: str = ""
+    figure_options: Optional[FigureOptions] = None
+    # 多租户公平调度所属租户（网关从 API Key / 请求头识别），空串归入 default
+    tenant: str = ""
+    # 调用方指定的执行 ID（用于取消），为空时自动生成
+    execution_id: str = ""
+    # 非空时在性能分析器下运行（取值见 PROFILER_MODES）
+    profiler: str = ""
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class OutputFile:
     filename: str
     original_name: str
     size_bytes: int
+    # 远端对象存储的预签名/直链 URL；为空时使用网关 URL
+    url: str = ""
 
     def to_dict(self, file_url_prefix: str = "/files", public_base_url: str = "") -> dict:
-        url = _join_public_url(
+        url = self.url or _join_public_url(
             public_base_url,
             f"{file_url_prefix.rstrip('/')}/{self.filename}",
         )
@@ -38,7 +76,27 @@ class OutputFile:
         }
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
+class OutputImage:
+    filename: str
+    format: str
+    size_bytes: int
+    url: str = ""
+
+    def to_dict(self, image_url_prefix: str = "/images", public_base_url: str = "") -> dict:
+        url = self.url or _join_public_url(
+            public_base_url,
+            f"{image_url_prefix.rstrip('/')}/{self.filename}",
+        )
+        return {
+            "filename": self.filename,
+            "format": self.format,
+            "size_bytes": self.size_bytes,
+            "url": url,
+        }
+
+
+@dataclass(frozen=True, slots=True)
 class InputFile:
     url: str
     original_name: str
@@ -55,7 +113,155 @@ class InputFile:
         }
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
+class ResourceUsage:
+    cpu_user_seconds: float = 0.0
+    cpu_system_seconds: float = 0.0
+    peak_memory_bytes: int = 0
+    read_bytes: int = 0
+    write_bytes: int = 0
+    process_count: int = 0
+    memory_limit_hit: bool = False
+    timeout_hit: bool = False
+    code_hash: str = ""
+    cpu_limit_hit: bool = False
+
+    @classmethod
+    def from_dict(cls, payload: dict, code_hash: str = "") -> "ResourceUsage":
+        return cls(
+            cpu_user_seconds=float(payload.get("cpu_user_seconds") or 0.0),
+            cpu_system_seconds=float(payload.get("cpu_system_seconds") or 0.0),
+            peak_memory_bytes=int(payload.get("peak_memory_bytes") or 0),
+            read_bytes=int(payload.get("read_bytes") or 0),
+            write_bytes=int(payload.get("write_bytes") or 0),
+            process_count=int(payload.get("process_count") or 0),
+            memory_limit_hit=bool(payload.get("memory_limit_hit")),
+            timeout_hit=bool(payload.get("timeout_hit")),
+            code_hash=code_hash,
+            cpu_limit_hit=bool(payload.get("cpu_limit_hit")),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "cpu_user_seconds": self.cpu_user_seconds,
+            "cpu_system_seconds": self.cpu_system_seconds,
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "read_bytes": self.read_bytes,
+            "write_bytes": self.write_bytes,
+            "process_count": self.process_count,
+            "memory_limit_hit": self.memory_limit_hit,
+            "timeout_hit": self.timeout_hit,
+            "cpu_limit_hit": self.cpu_limit_hit,
+            "code_hash": self.code_hash,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileEntry:
+    function: str
+    file: str
+    line: int
+    # cprofile 模式为调用次数，sampling 模式为出现该函数的样本数
+    calls: int
+    self_seconds: float
+    cumulative_seconds: float
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "ProfileEntry":
+        return cls(
+            function=str(payload.get("function") or ""),
+            file=str(payload.get("file") or ""),
+            line=int(payload.get("line") or 0),
+            calls=int(payload.get("calls") or 0),
+            self_seconds=float(payload.get("self_seconds") or 0.0),
+            cumulative_seconds=float(payload.get("cumulative_seconds") or 0.0),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "function": self.function,
+            "file": self.file,
+            "line": self.line,
+            "calls": self.calls,
+            "self_seconds": self.self_seconds,
+            "cumulative_seconds": self.cumulative_seconds,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileReport:
+    mode: str
+    wall_seconds: float = 0.0
+    # 按自身耗时排序的前 N 个函数
+    top: list[ProfileEntry] = field(default_factory=list)
+    # pstats 与 collapsed 调用栈（火焰图）两个产物
+    files: list[OutputFile] = field(default_factory=list)
+    samples: int = 0
+
+    @classmethod
+    def from_dict(cls, payload: dict, files: list[OutputFile] = None) -> "ProfileReport":
+        return cls(
+            mode=str(payload.get("mode") or ""),
+            wall_seconds=float(payload.get("wall_seconds") or 0.0),
+            top=[ProfileEntry.from_dict(item) for item in payload.get("top") or [] if isinstance(item, dict)],
+            files=list(files or []),
+            samples=int(payload.get("samples") or 0),
+        )
+
+    def to_dict(self, file_url_prefix: str = "/files", public_base_url: str = "") -> dict:
+        payload = {
+            "mode": self.mode,
+            "wall_seconds": self.wall_seconds,
+            "top": [entry.to_dict() for entry in self.top],
+            "files": [f.to_dict(file_url_prefix, public_base_url) for f in self.files],
+        }
+        if self.mode == "sampling":
+            payload["samples"] = self.samples
+        return payload
+
+
+@dataclass(frozen=True, slots=True)
+class DisplayOutput:
+    type: str
+    # result：脚本最后一个表达式的值；display：脚本中 display() 的对象
+    source: str = "display"
+    # 按 type 的结构化数据：dataframe 为 columns/dtypes/index/rows，array 为 shape/dtype/values
+    data: Any = None
+    text: str = ""
+    # 对象自带的其他表示（text/html、text/markdown 等）
+    mime: dict = field(default_factory=dict)
+    truncated: bool = False
+    # 表格被截断时的完整数据（Arrow IPC 文件）
+    file: Optional[OutputFile] = None
+
+    @classmethod
+    def from_dict(cls, payload: dict, file: OutputFile = None) -> "DisplayOutput":
+        output_type = str(payload.get("type") or "text")
+        return cls(
+            type=output_type if output_type in DISPLAY_OUTPUT_TYPES else "text",
+            source=str(payload.get("source") or "display"),
+            data=payload.get("data"),
+            text=str(payload.get("text") or ""),
+            mime=payload.get("mime") if isinstance(payload.get("mime"), dict) else {},
+            truncated=bool(payload.get("truncated")),
+            file=file,
+        )
+
+    def to_dict(self, file_url_prefix: str = "/files", public_base_url: str = "") -> dict:
+        payload = {
+            "type": self.type,
+            "source": self.source,
+            "data": self.data,
+            "text": self.text,
+            "mime": self.mime,
+            "truncated": self.truncated,
+        }
+        if self.file is not None:
+            payload["file"] = self.file.to_dict(file_url_prefix, public_base_url)
+        return payload
+
+
+@dataclass(frozen=True, slots=True)
 class ExecuteResult:
     stdout: str
     stderr: Optional[str]
@@ -63,6 +269,14 @@ class ExecuteResult:
     image_filename: Optional[str] = None
     files: list[OutputFile] = field(default_factory=list)
     inputs: list[InputFile] = field(default_factory=list)
+    resource_usage: Optional[ResourceUsage] = None
+    images: list[OutputImage] = field(default_factory=list)
+    # 非空表示暂时不可用（如 docker daemon 熔断），调用方可在该秒数后重试；不出现在返回体中
+    retry_after: Optional[float] = None
+    # 请求开启性能分析时的结果
+    profile: Optional[ProfileReport] = None
+    # 结构化展示输出（最后一个表达式的值与 display() 的对象）
+    outputs: list[DisplayOutput] = field(default_factory=list)
 
     def to_legacy_dict(
         self,
@@ -71,19 +285,30 @@ class ExecuteResult:
         public_base_url: str = "",
     ) -> dict:
         image_url = None
-        if self.image_filename:
+        primary = next((i for i in self.images if i.filename == self.image_filename), None)
+        if primary is not None and primary.url:
+            image_url = primary.url
+        elif self.image_filename:
             image_url = _join_public_url(
                 public_base_url,
                 f"{image_url_prefix.rstrip('/')}/{self.image_filename}",
             )
-        return {
+        payload = {
             "result": self.stdout,
             "error": self.stderr,
             "execution_time": self.execution_time,
             "image_url": image_url,
+            "images": [i.to_dict(image_url_prefix, public_base_url) for i in self.images],
             "files": [f.to_dict(file_url_prefix, public_base_url) for f in self.files],
             "inputs": [i.to_dict() for i in self.inputs],
+            "resource_usage": self.resource_usage.to_dict() if self.resource_usage else None,
         }
+        # 只在请求了性能分析时出现，其余请求的返回体保持不变
+        if self.profile is not None:
+            payload["profile"] = self.profile.to_dict(file_url_prefix, public_base_url)
+        if self.outputs:
+            payload["outputs"] = [o.to_dict(file_url_prefix, public_base_url) for o in self.outputs]
+        return payload
 
 
 class ExecutionService(Protocol):
@@ -92,3 +317,5 @@ class ExecutionService(Protocol):
     async def shutdown(self) -> None: ...
 
     async def execute(self, request: ExecuteRequest) -> ExecuteResult: ...
+
+    def cancel(self, execution_id: str, tenant: Optional[str] = None, reason: str = "request") -> bool: ...
@@ -0,0 +1,131 @@
+"""In-process metrics registry with Prometheus text exposition."""
+from __future__ import annotations
+
+import threading
+from typing import Callable, Iterable, Optional
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: tuple) -> str:
+    if not key:
+        return ""
+    parts = []
+    for name, value in key:
+        escaped = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class TopK:
+    """按累计值保留前 k 个 key（容量有界，超出时淘汰累计值最小的）"""
+
+    def __init__(self, k: int = 10, capacity: int = 1000):
+        self.k = k
+        self.capacity = max(k, capacity)
+        self._values: dict[str, float] = {}
+
+    def add(self, key: str, value: float):
+        self._values[key] = self._values.get(key, 0.0) + value
+        if len(self._values) > self.capacity:
+            keep = sorted(self._values.items(), key=lambda item: item[1], reverse=True)
+            self._values = dict(keep[: self.capacity // 2])
+
+    def top(self) -> list[tuple[str, float]]:
+        return sorted(self._values.items(), key=lambda item: item[1], reverse=True)[: self.k]
+
+
+class MetricsRegistry:
+    """
+    线程安全的指标注册表：counter / gauge / summary（count、sum、max）。
+    gauge 也可以注册回调，在导出时实时取值。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta: dict[str, tuple[str, str]] = {}
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._gauges: dict[str, dict[tuple, float]] = {}
+        self._summaries: dict[str, dict[tuple, list[float]]] = {}
+        self._gauge_callbacks: dict[str, Callable[[], Iterable[tuple[dict, float]]]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str = ""):
+        with self._lock:
+            self._meta.setdefault(name, (kind, help_text))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._meta.setdefault(name, ("counter", ""))
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._meta.setdefault(name, ("gauge", ""))
+            self._gauges.setdefault(name, {})[key] = float(value)
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._meta.setdefault(name, ("summary", ""))
+            series = self._summaries.setdefault(name, {})
+            stats = series.setdefault(key, [0.0, 0.0, float(value)])
+            stats[0] += 1
+            stats[1] += value
+            stats[2] = max(stats[2], float(value))
+
+    def gauge_callback(self, name: str, callback: Callable[[], Iterable[tuple[dict, float]]], help_text: str = ""):
+        """callback 返回 [(labels, value), ...]"""
+        with self._lock:
+            self._meta.setdefault(name, ("gauge", help_text))
+            self._gauge_callbacks[name] = callback
+
+    def value(self, name: str, **labels) -> Optional[float]:
+        key = _label_key(labels)
+        with self._lock:
+            for store in (self._counters, self._gauges):
+                if key in store.get(name, {}):
+                    return store[name][key]
+            stats = self._summaries.get(name, {}).get(key)
+            return stats[1] if stats else None
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            meta = dict(self._meta)
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+            summaries = {name: {k: list(v) for k, v in series.items()} for name, series in self._summaries.items()}
+            callbacks = dict(self._gauge_callbacks)
+
+        for name, callback in callbacks.items():
+            try:
+                gauges[name] = {_label_key(labels): float(value) for labels, value in callback()}
+            except Exception:
+                continue
+
+        lines = []
+        for name in sorted(meta):
+            kind, help_text = meta[name]
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "summary":
+                for key, (count, total, peak) in sorted(summaries.get(name, {}).items()):
+                    lines.append(f"{name}_count{_format_labels(key)} {_format_value(count)}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                    lines.append(f"{name}_max{_format_labels(key)} {_format_value(peak)}")
+                continue
+            series = counters.get(name) if kind == "counter" else gauges.get(name)
+            for key, value in sorted((series or {}).items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
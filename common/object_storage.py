@@ -0,0 +1,379 @@
+"""Artifact backends: local disk and S3-compatible object storage (plus an in-process fake)."""
+from __future__ import annotations
+
+import datetime
+import hashlib
+import hmac
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Protocol
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+
+import requests
+
+from common.settings import Settings
+
+ARTIFACT_BACKENDS = ("local", "s3")
+
+_ALGORITHM = "AWS4-HMAC-SHA256"
+_UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+_EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+# 产物文件名唯一且内容不可变，可以被浏览器 / CDN 永久缓存
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class ArtifactBackend(Protocol):
+    # remote 为 False 时产物只保存在本机磁盘，由网关直接回传
+    remote: bool
+
+    def upload(self, key: str, path: str, content_type: str) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def url(self, key: str, expires_seconds: int) -> Optional[str]: ...
+
+
+class LocalArtifactBackend:
+    """本地磁盘：文件已经由 ArtifactStore 落盘，这里不需要做任何事"""
+
+    remote = False
+
+    def upload(self, key: str, path: str, content_type: str) -> None:
+        return None
+
+    def delete(self, key: str) -> None:
+        return None
+
+    def url(self, key: str, expires_seconds: int) -> Optional[str]:
+        return None
+
+
+# ---- AWS Signature V4 ----
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _signing_key(secret_key: str, date_stamp: str, region: str) -> bytes:
+    key = _hmac(("AWS4" + secret_key).encode("utf-8"), date_stamp)
+    key = _hmac(key, region)
+    key = _hmac(key, "s3")
+    return _hmac(key, "aws4_request")
+
+
+def _canonical_query(params: list[tuple[str, str]]) -> str:
+    encoded = sorted((quote(k, safe="-_.~"), quote(v, safe="-_.~")) for k, v in params)
+    return "&".join(f"{k}={v}" for k, v in encoded)
+
+
+def sign_v4(
+    method: str,
+    path: str,
+    query: list[tuple[str, str]],
+    headers: dict[str, str],
+    payload_hash: str,
+    amz_date: str,
+    region: str,
+    secret_key: str,
+) -> str:
+    """返回 SigV4 签名（hex）；headers 为参与签名的请求头（小写名）"""
+    signed_headers = ";".join(sorted(headers))
+    canonical_headers = "".join(f"{name}:{str(headers[name]).strip()}\n" for name in sorted(headers))
+    canonical_request = "\n".join(
+        [method, path, _canonical_query(query), canonical_headers, signed_headers, payload_hash]
+    )
+    date_stamp = amz_date[:8]
+    scope = f"{date_stamp}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join(
+        [_ALGORITHM, amz_date, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()]
+    )
+    return hmac.new(
+        _signing_key(secret_key, date_stamp, region),
+        string_to_sign.encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+
+
+def _amz_date(now: float = None) -> str:
+    moment = datetime.datetime.fromtimestamp(time.time() if now is None else now, datetime.timezone.utc)
+    return moment.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class S3ArtifactBackend:
+    """
+    S3 兼容对象存储（AWS S3 / MinIO / OSS 等），path-style 访问，自带 SigV4 签名，不依赖 boto3。
+    配置了 public_url（公开桶或 CDN）时返回直链，否则返回预签名 GET 链接。
+    """
+
+    remote = True
+
+    def __init__(
+        self,
+        endpoint: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        public_url: str = "",
+        timeout: float = 30.0,
+        session: requests.Session = None,
+    ):
+        if not endpoint or not bucket:
+            raise ValueError("S3 artifact backend requires ARTIFACT_S3_ENDPOINT and ARTIFACT_S3_BUCKET")
+        parts = urlsplit(endpoint if "://" in endpoint else f"https://{endpoint}")
+        self.scheme = parts.scheme
+        self.host = parts.netloc
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region or "us-east-1"
+        self.public_url = public_url.rstrip("/")
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def _path(self, key: str) -> str:
+        return quote(f"/{self.bucket}/{key}", safe="/-_.~")
+
+    def _request(self, method: str, key: str, payload_hash: str, extra_headers: dict = None, data=None):
+        amz_date = _amz_date()
+        headers = {
+            "host": self.host,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date,
+        }
+        headers.update(extra_headers or {})
+        path = self._path(key)
+        signature = sign_v4(method, path, [], headers, payload_hash, amz_date, self.region, self.secret_key)
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        headers["authorization"] = (
+            f"{_ALGORITHM} Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={';'.join(sorted(h for h in headers if h != 'authorization'))}, "
+            f"Signature={signature}"
+        )
+        headers.pop("host")
+        response = self.session.request(
+            method,
+            f"{self.scheme}://{self.host}{path}",
+            headers=headers,
+            data=data,
+            timeout=self.timeout,
+        )
+        if response.status_code >= 300 and not (method == "DELETE" and response.status_code == 404):
+            raise RuntimeError(f"S3 {method} {key} failed: HTTP {response.status_code} {response.text[:200]}")
+        return response
+
+    def upload(self, key: str, path: str, content_type: str) -> None:
+        payload_hash = _file_sha256(path)
+        with open(path, "rb") as f:
+            self._request(
+                "PUT",
+                key,
+                payload_hash,
+                {"content-type": content_type, "cache-control": IMMUTABLE_CACHE_CONTROL},
+                data=f,
+            )
+
+    def delete(self, key: str) -> None:
+        self._request("DELETE", key, _EMPTY_SHA256)
+
+    def url(self, key: str, expires_seconds: int) -> Optional[str]:
+        if self.public_url:
+            return f"{self.public_url}/{quote(key, safe='/-_.~')}"
+        return self.presign(key, expires_seconds)
+
+    def presign(self, key: str, expires_seconds: int, now: float = None) -> str:
+        amz_date = _amz_date(now)
+        path = self._path(key)
+        query = [
+            ("X-Amz-Algorithm", _ALGORITHM),
+            ("X-Amz-Credential", f"{self.access_key}/{amz_date[:8]}/{self.region}/s3/aws4_request"),
+            ("X-Amz-Date", amz_date),
+            ("X-Amz-Expires", str(max(1, min(int(expires_seconds), 7 * 24 * 3600)))),
+            ("X-Amz-SignedHeaders", "host"),
+        ]
+        signature = sign_v4(
+            "GET", path, query, {"host": self.host}, _UNSIGNED_PAYLOAD, amz_date, self.region, self.secret_key
+        )
+        query.append(("X-Amz-Signature", signature))
+        return f"{self.scheme}://{self.host}{path}?{_canonical_query(query)}"
+
+
+def create_artifact_backend(settings: Settings) -> ArtifactBackend:
+    backend = (settings.artifact_backend or "local").lower()
+    if backend == "local":
+        return LocalArtifactBackend()
+    if backend == "s3":
+        return S3ArtifactBackend(
+            endpoint=settings.artifact_s3_endpoint,
+            bucket=settings.artifact_s3_bucket,
+            access_key=settings.artifact_s3_access_key,
+            secret_key=settings.artifact_s3_secret_key,
+            region=settings.artifact_s3_region,
+            public_url=settings.artifact_s3_public_url,
+        )
+    raise ValueError(f"Unknown ARTIFACT_BACKEND: {settings.artifact_backend}")
+
+
+# ---- 本地 S3 兼容替身（测试 / 本地开发用） ----
+
+
+class FakeS3Server:
+    """
+    进程内的最小 S3 兼容服务：支持 PUT / GET / HEAD / DELETE 对象，校验 SigV4 签名与预签名过期时间。
+    用法：with FakeS3Server(access_key, secret_key) as server: server.endpoint ...
+    """
+
+    def __init__(self, access_key: str = "test", secret_key: str = "test-secret", region: str = "us-east-1"):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        # (bucket, key) -> (内容, 回传时带上的响应头)
+        self.objects: dict[tuple[str, str], tuple[bytes, dict[str, str]]] = {}
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeS3Server":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeS3Server":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def get_object(self, bucket: str, key: str) -> Optional[bytes]:
+        with self.lock:
+            item = self.objects.get((bucket, key))
+        return item[0] if item else None
+
+    def _verify(self, method: str, raw_path: str, query: list[tuple[str, str]], headers) -> bool:
+        params = dict(query)
+        if "X-Amz-Signature" in params:
+            amz_date = params.get("X-Amz-Date", "")
+            try:
+                issued = datetime.datetime.strptime(amz_date, "%Y%m%dT%H%M%SZ").replace(
+                    tzinfo=datetime.timezone.utc
+                )
+                expires = int(params.get("X-Amz-Expires", "0"))
+            except ValueError:
+                return False
+            if time.time() > issued.timestamp() + expires:
+                return False
+            if not params.get("X-Amz-Credential", "").startswith(f"{self.access_key}/"):
+                return False
+            unsigned = [(k, v) for k, v in query if k != "X-Amz-Signature"]
+            expected = sign_v4(
+                method,
+                raw_path,
+                unsigned,
+                {"host": headers.get("Host", "")},
+                _UNSIGNED_PAYLOAD,
+                amz_date,
+                self.region,
+                self.secret_key,
+            )
+            return hmac.compare_digest(expected, params["X-Amz-Signature"])
+
+        authorization = headers.get("Authorization", "")
+        if not authorization.startswith(f"{_ALGORITHM} Credential={self.access_key}/"):
+            return False
+        fields = dict(
+            part.strip().split("=", 1) for part in authorization[len(_ALGORITHM):].split(",") if "=" in part
+        )
+        signed = {name: headers.get(name, "") for name in fields.get("SignedHeaders", "").split(";") if name}
+        expected = sign_v4(
+            method,
+            raw_path,
+            query,
+            signed,
+            headers.get("x-amz-content-sha256", ""),
+            headers.get("x-amz-date", ""),
+            self.region,
+            self.secret_key,
+        )
+        return hmac.compare_digest(expected, fields.get("Signature", ""))
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                return
+
+            def _target(self):
+                parts = urlsplit(self.path)
+                query = parse_qsl(parts.query, keep_blank_values=True)
+                if not server._verify(self.command, parts.path, query, self.headers):
+                    self._reply(403, b"SignatureDoesNotMatch")
+                    return None
+                bucket, _, key = parts.path.lstrip("/").partition("/")
+                return bucket, unquote(key)
+
+            def _reply(self, status: int, body: bytes = b"", headers: dict = None):
+                self.send_response(status)
+                for name, value in (headers or {"Content-Type": "application/xml"}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def do_PUT(self):
+                target = self._target()
+                if target is None:
+                    return
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if hashlib.sha256(body).hexdigest() != self.headers.get("x-amz-content-sha256"):
+                    self._reply(400, b"XAmzContentSHA256Mismatch")
+                    return
+                stored_headers = {"Content-Type": self.headers.get("Content-Type", "application/octet-stream")}
+                if self.headers.get("Cache-Control"):
+                    stored_headers["Cache-Control"] = self.headers["Cache-Control"]
+                with server.lock:
+                    server.objects[target] = (body, stored_headers)
+                self._reply(200)
+
+            def do_GET(self):
+                target = self._target()
+                if target is None:
+                    return
+                with server.lock:
+                    item = server.objects.get(target)
+                if item is None:
+                    self._reply(404, b"NoSuchKey")
+                    return
+                self._reply(200, item[0], item[1])
+
+            do_HEAD = do_GET
+
+            def do_DELETE(self):
+                target = self._target()
+                if target is None:
+                    return
+                with server.lock:
+                    server.objects.pop(target, None)
+                self._reply(204)
+
+        return Handler
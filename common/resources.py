@@ -0,0 +1,115 @@
+"""Named container resource profiles."""
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+
+from common.settings import Settings
+
+
+_MEMORY_UNITS = {
+    "": 1,
+    "b": 1,
+    "k": 1024,
+    "m": 1024 ** 2,
+    "g": 1024 ** 3,
+}
+
+
+def parse_memory(value: str) -> int:
+    """解析 docker 风格的内存大小（如 512m / 1g / 1073741824）"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([bkmg]?)b?\s*", str(value or "").lower())
+    if not match:
+        raise ValueError(f"Invalid memory size: {value!r}")
+    return int(float(match.group(1)) * _MEMORY_UNITS[match.group(2)])
+
+
+def format_memory(size_bytes: int) -> str:
+    for unit in ("g", "m", "k"):
+        factor = _MEMORY_UNITS[unit]
+        if size_bytes >= factor and size_bytes % factor == 0:
+            return f"{size_bytes // factor}{unit}"
+    return f"{size_bytes}b"
+
+
+@dataclass(frozen=True)
+class ResourceProfile:
+    name: str
+    memory_bytes: int
+    cpus: float
+    warm_size: int = 1
+
+    @property
+    def memory(self) -> str:
+        return format_memory(self.memory_bytes)
+
+    def docker_args(self) -> list[str]:
+        return [f"--memory={self.memory}", f"--cpus={self.cpus:g}"]
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "memory": self.memory,
+            "memoryBytes": self.memory_bytes,
+            "cpus": self.cpus,
+            "warmPoolSize": self.warm_size,
+        }
+
+
+def parse_resource_profiles(value: str) -> dict[str, ResourceProfile]:
+    """解析 `name:memory:cpus[:warm]` 逗号分隔的配置，如 `small:512m:0.5:1,large:4g:2:1`"""
+    profiles: dict[str, ResourceProfile] = {}
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        parts = [part.strip() for part in item.split(":")]
+        if len(parts) not in (3, 4):
+            raise ValueError(f"Invalid resource profile: {item!r}")
+        name = parts[0].lower()
+        if not re.fullmatch(r"[a-z0-9][a-z0-9-]*", name):
+            raise ValueError(f"Invalid resource profile name: {parts[0]!r}")
+        cpus = float(parts[2])
+        if cpus <= 0:
+            raise ValueError(f"Invalid cpus for resource profile {name!r}: {parts[2]!r}")
+        warm_size = int(parts[3]) if len(parts) == 4 else 1
+        profiles[name] = ResourceProfile(
+            name=name,
+            memory_bytes=parse_memory(parts[1]),
+            cpus=cpus,
+            warm_size=max(0, warm_size),
+        )
+    return profiles
+
+
+def load_resource_profiles(settings: Settings) -> dict[str, ResourceProfile]:
+    profiles = parse_resource_profiles(settings.resource_profiles)
+    if not profiles:
+        profiles = parse_resource_profiles(Settings.resource_profiles)
+    return profiles
+
+
+def get_default_profile(settings: Settings, profiles: dict[str, ResourceProfile] = None) -> ResourceProfile:
+    profiles = profiles or load_resource_profiles(settings)
+    name = (settings.default_resource_profile or "").strip().lower()
+    if name in profiles:
+        return profiles[name]
+    return next(iter(profiles.values()))
+
+
+def detect_host_capacity(settings: Settings) -> tuple[float, int]:
+    """返回 (可用 CPU 数, 可用内存字节数)，未配置时从宿主机探测"""
+    cpus = float(settings.host_cpus or 0) or float(os.cpu_count() or 1)
+
+    memory_bytes = int(settings.host_memory_bytes or 0)
+    if memory_bytes <= 0:
+        try:
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    if line.startswith("MemTotal:"):
+                        memory_bytes = int(line.split()[1]) * 1024
+                        break
+        except (OSError, ValueError, IndexError):
+            memory_bytes = 0
+    return cpus, memory_bytes
@@ -19,6 +19,16 @@ def _env_int(key: str, default: int) -> int:
         return default
 
 
+def _env_float(key: str, default: float) -> float:
+    value = os.environ.get(key)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
 def _env_csv_set(key: str, default: str) -> set:
     value = os.environ.get(key, default)
     items = [item.strip().lower() for item in value.split(",") if item.strip()]
@@ -31,6 +41,7 @@ class Settings:
     port: int = 14564
     max_workers: int = 4
     execution_timeout: int = 30
+    execution_cpu_seconds: float = 0.0
     docker_image: str = "registry.cn-hangzhou.aliyuncs.com/ripper/python-executor:latest"
     docker_network_mode: str = "bridge"
     docker_pids_limit: int = 256
@@ -43,10 +54,91 @@ class Settings:
     input_max_files: int = 10
     input_file_max_bytes: int = 20 * 1024 * 1024
     input_total_max_bytes: int = 50 * 1024 * 1024
+    input_columnar_cache: bool = False
+    input_columnar_min_bytes: int = 1024 * 1024
+    input_columnar_cache_max_bytes: int = 2 * 1024 * 1024 * 1024
+    input_columnar_cache_dir: str = ""
+    input_columnar_max_input_bytes: int = 64 * 1024 * 1024
+    input_columnar_memory_bytes: int = 2 * 1024 * 1024 * 1024
+    input_columnar_cpu_seconds: int = 60
+    input_columnar_timeout_seconds: float = 120.0
     output_max_files: int = 20
     output_file_max_bytes: int = 5 * 1024 * 1024
     output_total_max_bytes: int = 20 * 1024 * 1024
     output_allowed_extensions: set = None
+    pool_max_uses: int = 100
+    pool_max_age_seconds: int = 3600
+    pool_max_memory_bytes: int = 768 * 1024 * 1024
+    pool_max_disk_bytes: int = 1024 * 1024 * 1024
+    pool_recycle_on_leftover_processes: bool = True
+    pool_bootstrap_concurrency: int = 4
+    pool_ready_min: int = -1
+    pool_ready_timeout_seconds: float = 120.0
+    shutdown_drain_seconds: float = 30.0
+    client_disconnect_poll_seconds: float = 1.0
+    docker_call_timeout_seconds: float = 60.0
+    docker_breaker_failure_ratio: float = 0.5
+    docker_breaker_min_calls: int = 5
+    docker_breaker_window_seconds: float = 30.0
+    docker_breaker_slow_call_seconds: float = 10.0
+    docker_breaker_open_seconds: float = 15.0
+    adaptive_concurrency: bool = True
+    concurrency_min: int = 1
+    concurrency_max: int = 0
+    concurrency_max_load: float = 1.0
+    concurrency_max_pressure: float = 10.0
+    concurrency_adjust_interval_seconds: float = 5.0
+    tenant_header: str = "X-Tenant-ID"
+    tenant_api_keys: str = ""
+    tenant_weights: str = ""
+    tenant_max_concurrency: int = 0
+    tenant_rate_per_second: float = 0.0
+    tenant_burst: int = 10
+    resource_profiles: str = "small:512m:0.5:1,standard:1g:1:2,large:4g:2:1"
+    default_resource_profile: str = "standard"
+    host_cpus: float = 0
+    host_memory_bytes: int = 0
+    figure_format: str = "png"
+    figure_dpi: int = 150
+    figure_max_dimension: int = 2000
+    figure_optimize_png: bool = True
+    artifact_index_path: str = ""
+    artifact_ttl_seconds: int = 7 * 24 * 3600
+    artifact_max_bytes: int = 10 * 1024 * 1024 * 1024
+    artifact_gc_interval_seconds: int = 300
+    artifact_backend: str = "local"
+    artifact_s3_endpoint: str = ""
+    artifact_s3_bucket: str = ""
+    artifact_s3_region: str = "us-east-1"
+    artifact_s3_access_key: str = ""
+    artifact_s3_secret_key: str = ""
+    artifact_s3_prefix: str = ""
+    artifact_s3_public_url: str = ""
+    artifact_url_expires_seconds: int = 3600
+    artifact_upload_concurrency: int = 8
+    artifact_upload_wait: bool = True
+    artifact_keep_local: bool = False
+    artifact_precompress_extensions: set = None
+    artifact_precompress_min_bytes: int = 1024
+    bundle_inline_max_bytes: int = 65536
+    bundle_inline_total_max_bytes: int = 1024 * 1024
+    response_compression: bool = True
+    response_compress_min_bytes: int = 16384
+    scratch_dir: str = ""
+    scratch_min_free_bytes: int = 256 * 1024 * 1024
+    scratch_stale_seconds: int = 3600
+    container_scratch_bytes: int = 256 * 1024 * 1024
+    reaper_interval_seconds: float = 300.0
+    reaper_orphan_grace_seconds: float = 300.0
+    profile_sample_interval_seconds: float = 0.005
+    profile_top_n: int = 20
+    display_outputs: bool = True
+    display_max_outputs: int = 20
+    display_max_rows: int = 100
+    display_output_max_bytes: int = 262144
+    code_forbidden_modules: set = None
+    code_forbidden_calls: set = None
+    code_analysis_cache_size: int = 512
 
     @classmethod
     def from_env(cls) -> "Settings":
@@ -55,6 +147,7 @@ class Settings:
             port=_env_int("PORT", 14564),
             max_workers=_env_int("MAX_WORKERS", 4),
             execution_timeout=_env_int("EXECUTION_TIMEOUT", 30),
+            execution_cpu_seconds=_env_float("EXECUTION_CPU_SECONDS", 0.0),
             docker_image=os.environ.get(
                 "DOCKER_IMAGE",
                 "registry.cn-hangzhou.aliyuncs.com/ripper/python-executor:latest",
@@ -73,6 +166,14 @@ class Settings:
             input_max_files=_env_int("INPUT_MAX_FILES", 10),
             input_file_max_bytes=_env_int("INPUT_FILE_MAX_BYTES", 20 * 1024 * 1024),
             input_total_max_bytes=_env_int("INPUT_TOTAL_MAX_BYTES", 50 * 1024 * 1024),
+            input_columnar_cache=_env_bool("INPUT_COLUMNAR_CACHE", False),
+            input_columnar_min_bytes=_env_int("INPUT_COLUMNAR_MIN_BYTES", 1024 * 1024),
+            input_columnar_cache_max_bytes=_env_int("INPUT_COLUMNAR_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024),
+            input_columnar_cache_dir=os.environ.get("INPUT_COLUMNAR_CACHE_DIR", "").strip(),
+            input_columnar_max_input_bytes=_env_int("INPUT_COLUMNAR_MAX_INPUT_BYTES", 64 * 1024 * 1024),
+            input_columnar_memory_bytes=_env_int("INPUT_COLUMNAR_MEMORY_BYTES", 2 * 1024 * 1024 * 1024),
+            input_columnar_cpu_seconds=_env_int("INPUT_COLUMNAR_CPU_SECONDS", 60),
+            input_columnar_timeout_seconds=_env_float("INPUT_COLUMNAR_TIMEOUT_SECONDS", 120.0),
             output_max_files=_env_int("OUTPUT_MAX_FILES", 20),
             output_file_max_bytes=_env_int("OUTPUT_FILE_MAX_BYTES", 5 * 1024 * 1024),
             output_total_max_bytes=_env_int("OUTPUT_TOTAL_MAX_BYTES", 20 * 1024 * 1024),
@@ -80,4 +181,83 @@ class Settings:
                 "OUTPUT_ALLOWED_EXTENSIONS",
                 "md,csv,txt,json,log",
             ),
+            pool_max_uses=_env_int("POOL_MAX_USES", 100),
+            pool_max_age_seconds=_env_int("POOL_MAX_AGE_SECONDS", 3600),
+            pool_max_memory_bytes=_env_int("POOL_MAX_MEMORY_BYTES", 768 * 1024 * 1024),
+            pool_max_disk_bytes=_env_int("POOL_MAX_DISK_BYTES", 1024 * 1024 * 1024),
+            pool_recycle_on_leftover_processes=_env_bool("POOL_RECYCLE_ON_LEFTOVER_PROCESSES", True),
+            pool_bootstrap_concurrency=_env_int("POOL_BOOTSTRAP_CONCURRENCY", 4),
+            pool_ready_min=_env_int("POOL_READY_MIN", -1),
+            pool_ready_timeout_seconds=_env_float("POOL_READY_TIMEOUT_SECONDS", 120.0),
+            shutdown_drain_seconds=_env_float("SHUTDOWN_DRAIN_SECONDS", 30.0),
+            client_disconnect_poll_seconds=_env_float("CLIENT_DISCONNECT_POLL_SECONDS", 1.0),
+            docker_call_timeout_seconds=_env_float("DOCKER_CALL_TIMEOUT_SECONDS", 60.0),
+            docker_breaker_failure_ratio=_env_float("DOCKER_BREAKER_FAILURE_RATIO", 0.5),
+            docker_breaker_min_calls=_env_int("DOCKER_BREAKER_MIN_CALLS", 5),
+            docker_breaker_window_seconds=_env_float("DOCKER_BREAKER_WINDOW_SECONDS", 30.0),
+            docker_breaker_slow_call_seconds=_env_float("DOCKER_BREAKER_SLOW_CALL_SECONDS", 10.0),
+            docker_breaker_open_seconds=_env_float("DOCKER_BREAKER_OPEN_SECONDS", 15.0),
+            adaptive_concurrency=_env_bool("ADAPTIVE_CONCURRENCY", True),
+            concurrency_min=_env_int("CONCURRENCY_MIN", 1),
+            concurrency_max=_env_int("CONCURRENCY_MAX", 0),
+            concurrency_max_load=_env_float("CONCURRENCY_MAX_LOAD", 1.0),
+            concurrency_max_pressure=_env_float("CONCURRENCY_MAX_PRESSURE", 10.0),
+            concurrency_adjust_interval_seconds=_env_float("CONCURRENCY_ADJUST_INTERVAL_SECONDS", 5.0),
+            tenant_header=os.environ.get("TENANT_HEADER", "X-Tenant-ID").strip(),
+            tenant_api_keys=os.environ.get("TENANT_API_KEYS", "").strip(),
+            tenant_weights=os.environ.get("TENANT_WEIGHTS", "").strip(),
+            tenant_max_concurrency=_env_int("TENANT_MAX_CONCURRENCY", 0),
+            tenant_rate_per_second=_env_float("TENANT_RATE_PER_SECOND", 0.0),
+            tenant_burst=_env_int("TENANT_BURST", 10),
+            resource_profiles=os.environ.get(
+                "RESOURCE_PROFILES",
+                "small:512m:0.5:1,standard:1g:1:2,large:4g:2:1",
+            ),
+            default_resource_profile=os.environ.get("DEFAULT_RESOURCE_PROFILE", "standard").strip().lower(),
+            host_cpus=_env_float("HOST_CPUS", 0),
+            host_memory_bytes=_env_int("HOST_MEMORY_BYTES", 0),
+            figure_format=os.environ.get("FIGURE_FORMAT", "png").strip().lower(),
+            figure_dpi=_env_int("FIGURE_DPI", 150),
+            figure_max_dimension=_env_int("FIGURE_MAX_DIMENSION", 2000),
+            figure_optimize_png=_env_bool("FIGURE_OPTIMIZE_PNG", True),
+            artifact_index_path=os.environ.get("ARTIFACT_INDEX_PATH", "").strip(),
+            artifact_ttl_seconds=_env_int("ARTIFACT_TTL_SECONDS", 7 * 24 * 3600),
+            artifact_max_bytes=_env_int("ARTIFACT_MAX_BYTES", 10 * 1024 * 1024 * 1024),
+            artifact_gc_interval_seconds=_env_int("ARTIFACT_GC_INTERVAL_SECONDS", 300),
+            artifact_backend=os.environ.get("ARTIFACT_BACKEND", "local").strip().lower(),
+            artifact_s3_endpoint=os.environ.get("ARTIFACT_S3_ENDPOINT", "").strip(),
+            artifact_s3_bucket=os.environ.get("ARTIFACT_S3_BUCKET", "").strip(),
+            artifact_s3_region=os.environ.get("ARTIFACT_S3_REGION", "us-east-1").strip(),
+            artifact_s3_access_key=os.environ.get("ARTIFACT_S3_ACCESS_KEY", "").strip(),
+            artifact_s3_secret_key=os.environ.get("ARTIFACT_S3_SECRET_KEY", "").strip(),
+            artifact_s3_prefix=os.environ.get("ARTIFACT_S3_PREFIX", "").strip(),
+            artifact_s3_public_url=os.environ.get("ARTIFACT_S3_PUBLIC_URL", "").strip(),
+            artifact_url_expires_seconds=_env_int("ARTIFACT_URL_EXPIRES_SECONDS", 3600),
+            artifact_upload_concurrency=_env_int("ARTIFACT_UPLOAD_CONCURRENCY", 8),
+            artifact_upload_wait=_env_bool("ARTIFACT_UPLOAD_WAIT", True),
+            artifact_keep_local=_env_bool("ARTIFACT_KEEP_LOCAL", False),
+            artifact_precompress_extensions=_env_csv_set(
+                "ARTIFACT_PRECOMPRESS_EXTENSIONS",
+                "csv,json,md,log,txt,svg",
+            ),
+            artifact_precompress_min_bytes=_env_int("ARTIFACT_PRECOMPRESS_MIN_BYTES", 1024),
+            bundle_inline_max_bytes=_env_int("BUNDLE_INLINE_MAX_BYTES", 65536),
+            bundle_inline_total_max_bytes=_env_int("BUNDLE_INLINE_TOTAL_MAX_BYTES", 1024 * 1024),
+            response_compression=_env_bool("RESPONSE_COMPRESSION", True),
+            response_compress_min_bytes=_env_int("RESPONSE_COMPRESS_MIN_BYTES", 16384),
+            scratch_dir=os.environ.get("SCRATCH_DIR", "").strip(),
+            scratch_min_free_bytes=_env_int("SCRATCH_MIN_FREE_BYTES", 256 * 1024 * 1024),
+            scratch_stale_seconds=_env_int("SCRATCH_STALE_SECONDS", 3600),
+            container_scratch_bytes=_env_int("CONTAINER_SCRATCH_BYTES", 256 * 1024 * 1024),
+            reaper_interval_seconds=_env_float("REAPER_INTERVAL_SECONDS", 300.0),
+            reaper_orphan_grace_seconds=_env_float("REAPER_ORPHAN_GRACE_SECONDS", 300.0),
+            profile_sample_interval_seconds=_env_float("PROFILE_SAMPLE_INTERVAL_SECONDS", 0.005),
+            profile_top_n=_env_int("PROFILE_TOP_N", 20),
+            display_outputs=_env_bool("DISPLAY_OUTPUTS", True),
+            display_max_outputs=_env_int("DISPLAY_MAX_OUTPUTS", 20),
+            display_max_rows=_env_int("DISPLAY_MAX_ROWS", 100),
+            display_output_max_bytes=_env_int("DISPLAY_OUTPUT_MAX_BYTES", 262144),
+            code_forbidden_modules=_env_csv_set("CODE_FORBIDDEN_MODULES", ""),
+            code_forbidden_calls=_env_csv_set("CODE_FORBIDDEN_CALLS", ""),
+            code_analysis_cache_size=_env_int("CODE_ANALYSIS_CACHE_SIZE", 512),
         )
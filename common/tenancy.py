@@ -0,0 +1,158 @@
+"""Tenant identification, weights and token-bucket rate limits."""
+from __future__ import annotations
+
+import hmac
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Mapping, Optional
+
+from common.settings import Settings
+
+DEFAULT_TENANT = "default"
+_TENANT_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+# 令牌桶数量超过该值时清理已回满的桶（等价于新建），避免按请求头伪造大量租户撑爆内存
+_MAX_IDLE_BUCKETS = 10000
+
+
+def normalize_tenant(name: str) -> str:
+    name = _TENANT_NAME_RE.sub("_", (name or "").strip())[:64].strip("._-")
+    return name or DEFAULT_TENANT
+
+
+def parse_api_keys(value: str) -> dict[str, str]:
+    """`key:tenant,key2:tenant2` -> {key: tenant}（key 区分大小写）"""
+    keys: dict[str, str] = {}
+    for item in (value or "").split(","):
+        key, sep, tenant = item.strip().rpartition(":")
+        if not sep or not key.strip():
+            if item.strip():
+                raise ValueError(f"Invalid TENANT_API_KEYS entry (expected key:tenant): {item.strip()}")
+            continue
+        keys[key.strip()] = normalize_tenant(tenant)
+    return keys
+
+
+def parse_weights(value: str) -> dict[str, float]:
+    """`tenant:weight,...` -> {tenant: weight}"""
+    weights: dict[str, float] = {}
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        tenant, sep, weight = item.rpartition(":")
+        try:
+            parsed = float(weight)
+        except ValueError:
+            parsed = 0.0
+        if not sep or parsed <= 0:
+            raise ValueError(f"Invalid TENANT_WEIGHTS entry (expected tenant:weight): {item}")
+        weights[normalize_tenant(tenant)] = parsed
+    return weights
+
+
+@dataclass(frozen=True)
+class Tenant:
+    name: str = DEFAULT_TENANT
+    weight: float = 1.0
+    # 同时运行的任务数上限，0 表示不限制
+    max_concurrency: int = 0
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def take(self, now: float) -> float:
+        """取一个令牌；成功返回 0，否则返回需要等待的秒数"""
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class TenantRegistry:
+    """
+    从请求头识别租户：配置了 TENANT_API_KEYS 时必须携带有效的 API Key（`Authorization: Bearer` 或 `X-API-Key`），
+    否则按 TENANT_HEADER 请求头区分（未携带时归入 default）。每个租户一个令牌桶限速。
+    """
+
+    def __init__(
+        self,
+        api_keys: Mapping[str, str] = None,
+        weights: Mapping[str, float] = None,
+        header: str = "X-Tenant-ID",
+        max_concurrency: int = 0,
+        rate_per_second: float = 0.0,
+        burst: int = 10,
+    ):
+        self.api_keys = dict(api_keys or {})
+        self.weights = dict(weights or {})
+        self.header = (header or "").strip()
+        self.max_concurrency = max(0, int(max_concurrency))
+        self.rate_per_second = max(0.0, float(rate_per_second))
+        self.burst = max(1, int(burst))
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "TenantRegistry":
+        return cls(
+            api_keys=parse_api_keys(settings.tenant_api_keys),
+            weights=parse_weights(settings.tenant_weights),
+            header=settings.tenant_header,
+            max_concurrency=settings.tenant_max_concurrency,
+            rate_per_second=settings.tenant_rate_per_second,
+            burst=settings.tenant_burst,
+        )
+
+    def get(self, name: str = "") -> Tenant:
+        name = normalize_tenant(name)
+        return Tenant(name=name, weight=self.weights.get(name, 1.0), max_concurrency=self.max_concurrency)
+
+    def _match_api_key(self, presented: str) -> Optional[str]:
+        # 逐个常量时间比较，避免通过响应耗时猜测 key
+        matched = None
+        for key, tenant in self.api_keys.items():
+            if hmac.compare_digest(key.encode(), presented.encode()):
+                matched = tenant
+        return matched
+
+    def identify(self, headers: Mapping[str, str]) -> Optional[Tenant]:
+        """返回请求所属租户；配置了 API Key 但未携带或无效时返回 None"""
+        if self.api_keys:
+            authorization = headers.get("authorization") or ""
+            presented = headers.get("x-api-key") or ""
+            if not presented and authorization.lower().startswith("bearer "):
+                presented = authorization[7:].strip()
+            tenant = self._match_api_key(presented) if presented else None
+            return self.get(tenant) if tenant else None
+        return self.get(headers.get(self.header, "") if self.header else "")
+
+    def try_acquire(self, tenant: Tenant, now: float = None) -> float:
+        """限速：允许时返回 0，否则返回建议的重试等待秒数"""
+        if self.rate_per_second <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(tenant.name)
+            if bucket is None:
+                if len(self._buckets) >= _MAX_IDLE_BUCKETS:
+                    self._buckets = {k: b for k, b in self._buckets.items() if not b.is_full(now)}
+                bucket = self._buckets[tenant.name] = TokenBucket(self.rate_per_second, self.burst, now)
+            return bucket.take(now)
+
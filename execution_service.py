@@ -1,9 +1,21 @@
-from common.contracts import ExecuteRequest, ExecuteResult, ExecutionService, InputFile, OutputFile
+from common.contracts import (
+    ExecuteRequest,
+    ExecuteResult,
+    ExecutionService,
+    FigureOptions,
+    InputFile,
+    OutputFile,
+    OutputImage,
+    ResourceUsage,
+)
 
 __all__ = [
     "ExecuteRequest",
     "ExecuteResult",
     "ExecutionService",
+    "FigureOptions",
     "InputFile",
     "OutputFile",
+    "OutputImage",
+    "ResourceUsage",
 ]
@@ -0,0 +1,182 @@
+"""Circuit breaker around Docker daemon calls."""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from common.settings import Settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# docker CLI 连不上/等不到 daemon 时的报错；其他非零退出码（如容器不存在、用户脚本出错）不算 daemon 故障
+_DAEMON_ERROR_MARKERS = (
+    "cannot connect to the docker daemon",
+    "is the docker daemon running",
+    "error during connect",
+    "context deadline exceeded",
+    "i/o timeout",
+    "connection refused",
+    "connection reset by peer",
+    "daemon is not running",
+)
+
+
+def is_daemon_error(stderr: str) -> bool:
+    text = (stderr or "").lower()
+    return any(marker in text for marker in _DAEMON_ERROR_MARKERS)
+
+
+class CircuitOpenError(RuntimeError):
+    """daemon 熔断中：调用方应在 retry_after 秒后重试"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = max(0.0, float(retry_after))
+        super().__init__(f"Docker daemon unavailable, retry after {max(1, round(self.retry_after))}s")
+
+
+class CircuitBreaker:
+    """
+    滑动窗口熔断：window_seconds 内至少 min_calls 次调用，且失败比例或慢调用（超过 slow_call_seconds）比例
+    达到 failure_ratio 时打开；打开 open_seconds 后进入半开，只放行 half_open_calls 个探测调用，
+    探测成功即关闭，失败则重新打开。线程安全（请求路径上的 docker 调用在线程池中执行）。
+    """
+
+    def __init__(
+        self,
+        failure_ratio: float = 0.5,
+        min_calls: int = 5,
+        window_seconds: float = 30.0,
+        slow_call_seconds: float = 10.0,
+        open_seconds: float = 15.0,
+        half_open_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        on_state_change: Callable[[str, str], None] = None,
+    ):
+        self.failure_ratio = min(1.0, max(0.01, float(failure_ratio)))
+        self.min_calls = max(1, int(min_calls))
+        self.window_seconds = max(0.1, float(window_seconds))
+        self.slow_call_seconds = max(0.0, float(slow_call_seconds))
+        self.open_seconds = max(0.0, float(open_seconds))
+        self.half_open_calls = max(1, int(half_open_calls))
+        self.clock = clock
+        self.on_state_change = on_state_change
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        # 每次进入半开加一：归还探测名额时据此忽略上一轮半开发出的调用
+        self._half_open_round = 0
+        # (时间, 是否失败)
+        self._calls: deque[tuple[float, bool]] = deque()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Settings, on_state_change: Callable[[str, str], None] = None) -> "CircuitBreaker":
+        return cls(
+            failure_ratio=settings.docker_breaker_failure_ratio,
+            min_calls=settings.docker_breaker_min_calls,
+            window_seconds=settings.docker_breaker_window_seconds,
+            slow_call_seconds=settings.docker_breaker_slow_call_seconds,
+            open_seconds=settings.docker_breaker_open_seconds,
+            on_state_change=on_state_change,
+        )
+
+    def _transition(self, state: str):
+        """调用方需持有 _lock"""
+        previous, self._state = self._state, state
+        if state == OPEN:
+            self._opened_at = self.clock()
+        if state == HALF_OPEN:
+            self._half_open_round += 1
+        else:
+            self._half_open_in_flight = 0
+        self._calls.clear()
+        if previous != state and self.on_state_change:
+            self.on_state_change(previous, state)
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def retry_after(self) -> float:
+        """距离可以重试还有多少秒；关闭时为 0"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return 0.0
+            if state == OPEN:
+                return max(0.0, self.open_seconds - (self.clock() - self._opened_at))
+            # 半开：探测结果很快就会出来
+            return 1.0
+
+    def before_call(self) -> Optional[int]:
+        """不允许调用时抛出 CircuitOpenError；占用了半开探测名额时返回该轮半开的编号（交给 release）"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return None
+            if state == HALF_OPEN and self._half_open_in_flight < self.half_open_calls:
+                self._half_open_in_flight += 1
+                return self._half_open_round
+            retry_after = self.open_seconds - (self.clock() - self._opened_at) if state == OPEN else 1.0
+        raise CircuitOpenError(retry_after)
+
+    def release(self, probe: Optional[int]):
+        """探测调用没有结果（被取消或中途出错）时归还半开名额，不改变状态"""
+        if probe is None:
+            return
+        with self._lock:
+            if self._current_state() == HALF_OPEN and self._half_open_round == probe:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    @contextmanager
+    def attempt(self) -> Iterator[Callable[..., None]]:
+        """
+        before_call 与 record 配对：块内用 yield 出的函数记录结果；
+        没有记录就离开（取消、异常）时只归还半开探测名额，避免名额泄漏后熔断器一直拒绝调用。
+        """
+        probe = self.before_call()
+        recorded = False
+
+        def _record(ok: bool, latency_seconds: Optional[float] = None):
+            nonlocal recorded
+            recorded = True
+            self.record(ok, latency_seconds)
+
+        try:
+            yield _record
+        finally:
+            if not recorded:
+                self.release(probe)
+
+    def record(self, ok: bool, latency_seconds: Optional[float] = None):
+        failed = (not ok) or bool(
+            self.slow_call_seconds and latency_seconds is not None and latency_seconds > self.slow_call_seconds
+        )
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                self._transition(OPEN if failed else CLOSED)
+                return
+            if state == OPEN:
+                # 打开前已发出的调用陆续返回，不影响状态
+                return
+            now = self.clock()
+            self._calls.append((now, failed))
+            while self._calls and now - self._calls[0][0] > self.window_seconds:
+                self._calls.popleft()
+            if len(self._calls) >= self.min_calls:
+                failures = sum(1 for _t, f in self._calls if f)
+                if failures / len(self._calls) >= self.failure_ratio:
+                    self._transition(OPEN)
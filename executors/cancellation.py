@@ -0,0 +1,69 @@
+"""In-flight execution tracking, so executions can be cancelled by id or when the client goes away."""
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class RunningExecution:
+    execution_id: str
+    tenant: str
+    task: Optional[asyncio.Task]
+    # 已签出的池容器；冷启动路径为空
+    container_id: Optional[str] = None
+    # 冷启动容器名（服务端生成，不含调用方给的执行 ID）；池容器路径为空
+    container_name: str = ""
+    # 当前在线程池中执行的步骤：取消后等它结束再清理工作目录、归还容器
+    pending: Optional[Future] = None
+    # 在容器中运行代码的步骤（未结束时取消需要结束容器内的作业）
+    job: Optional[Future] = None
+    # 非空表示经 cancel() 取消（request/disconnect/shutdown），调用方得到 "Execution cancelled" 结果
+    cancel_reason: str = ""
+
+
+class ExecutionRegistry:
+    """按执行 ID 登记进行中（含排队中）的执行；取消即取消执行所在的 asyncio task"""
+
+    def __init__(self):
+        self._running: dict[str, RunningExecution] = {}
+
+    def __len__(self) -> int:
+        return len(self._running)
+
+    def __contains__(self, execution_id: str) -> bool:
+        return execution_id in self._running
+
+    def register(self, execution_id: str, tenant: str = "", task: asyncio.Task = None) -> RunningExecution:
+        if execution_id in self._running:
+            raise ValueError(f"Execution id already in use: {execution_id}")
+        running = RunningExecution(execution_id=execution_id, tenant=tenant, task=task)
+        self._running[execution_id] = running
+        return running
+
+    def unregister(self, execution_id: str):
+        self._running.pop(execution_id, None)
+
+    def get(self, execution_id: str) -> Optional[RunningExecution]:
+        return self._running.get(execution_id)
+
+    def container_names(self) -> set[str]:
+        """进行中的执行所用的冷启动容器名"""
+        return {running.container_name for running in self._running.values() if running.container_name}
+
+    def cancel(self, execution_id: str, tenant: Optional[str] = None, reason: str = "request") -> bool:
+        """取消执行；tenant 不为 None 时只能取消本租户的执行（否则视为不存在）"""
+        running = self._running.get(execution_id)
+        if running is None or running.task is None or running.task.done():
+            return False
+        if tenant is not None and running.tenant != tenant:
+            return False
+        if not running.cancel_reason:
+            running.cancel_reason = reason or "request"
+            running.task.cancel()
+        return True
+
+    def cancel_all(self, reason: str) -> int:
+        return sum(self.cancel(execution_id, reason=reason) for execution_id in list(self._running))
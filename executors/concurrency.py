@@ -0,0 +1,126 @@
+"""Adaptive concurrency limit (AIMD) driven by run latency, host load and PSI."""
+from __future__ import annotations
+
+import os
+import statistics
+from dataclasses import dataclass
+from typing import Optional
+
+from common.settings import Settings
+
+PRESSURE_RESOURCES = ("cpu", "memory", "io")
+
+
+def read_pressure(resource: str, root: str = "/proc/pressure") -> Optional[float]:
+    """PSI：返回 `some avg10`（过去 10 秒内至少一个任务因该资源阻塞的时间占比，百分数）"""
+    try:
+        with open(os.path.join(root, resource)) as f:
+            for line in f:
+                if not line.startswith("some "):
+                    continue
+                for field in line.split()[1:]:
+                    key, _, value = field.partition("=")
+                    if key == "avg10":
+                        return float(value)
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+@dataclass(frozen=True)
+class HostSignals:
+    # 1 分钟平均负载 / 可用 CPU 数
+    load_per_cpu: Optional[float] = None
+    # 各资源的 PSI some avg10，内核不支持时为空
+    pressure: tuple[tuple[str, float], ...] = ()
+
+    @property
+    def max_pressure(self) -> float:
+        return max((value for _name, value in self.pressure), default=0.0)
+
+
+def sample_host_signals(cpus: float, pressure_root: str = "/proc/pressure") -> HostSignals:
+    try:
+        load_per_cpu = os.getloadavg()[0] / max(cpus, 1e-9)
+    except OSError:
+        load_per_cpu = None
+    pressure = []
+    for resource in PRESSURE_RESOURCES:
+        value = read_pressure(resource, pressure_root)
+        if value is not None:
+            pressure.append((resource, value))
+    return HostSignals(load_per_cpu=load_per_cpu, pressure=tuple(pressure))
+
+
+class AdaptiveLimiter:
+    """
+    AIMD 调整有效并发：宿主机过载（负载、PSI 超阈值，或本窗口执行耗时中位数明显高于基线）时乘性下降，
+    否则在有排队/满载时加一。上下限为 [min_limit, max_limit]。
+    耗时基线只在未过载的窗口中更新，避免拥塞时被一起抬高。
+    """
+
+    def __init__(
+        self,
+        min_limit: int,
+        max_limit: int,
+        initial: int = 0,
+        max_load: float = 1.0,
+        max_pressure: float = 10.0,
+        latency_tolerance: float = 2.0,
+        backoff: float = 0.75,
+        min_samples: int = 3,
+        baseline_alpha: float = 0.1,
+    ):
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.limit = min(self.max_limit, max(self.min_limit, int(initial or self.max_limit)))
+        self.max_load = float(max_load)
+        self.max_pressure = float(max_pressure)
+        self.latency_tolerance = float(latency_tolerance)
+        self.backoff = float(backoff)
+        self.min_samples = max(1, int(min_samples))
+        self.baseline_alpha = float(baseline_alpha)
+        self.baseline: Optional[float] = None
+        self._window: list[float] = []
+
+    @classmethod
+    def from_settings(cls, settings: Settings, max_workers: int) -> "AdaptiveLimiter":
+        max_limit = int(settings.concurrency_max or 0) or max_workers
+        return cls(
+            min_limit=settings.concurrency_min,
+            max_limit=max_limit,
+            initial=max_workers,
+            max_load=settings.concurrency_max_load,
+            max_pressure=settings.concurrency_max_pressure,
+        )
+
+    def observe(self, latency_seconds: float):
+        if latency_seconds > 0:
+            self._window.append(float(latency_seconds))
+
+    def overload_reason(self, signals: HostSignals) -> str:
+        if signals.load_per_cpu is not None and signals.load_per_cpu > self.max_load:
+            return "load"
+        if signals.max_pressure > self.max_pressure:
+            return "pressure"
+        if self.baseline and len(self._window) >= self.min_samples:
+            if statistics.median(self._window) > self.baseline * self.latency_tolerance:
+                return "latency"
+        return ""
+
+    def update(self, signals: HostSignals, queued: int, active: int) -> tuple[int, str]:
+        """每个调整周期调用一次，返回 (新的并发上限, 调整原因)；原因为空表示未调整"""
+        reason = self.overload_reason(signals)
+        if reason:
+            self.limit = max(self.min_limit, min(self.limit - 1, int(self.limit * self.backoff)))
+        else:
+            if len(self._window) >= self.min_samples:
+                median = statistics.median(self._window)
+                self.baseline = median if self.baseline is None else (
+                    self.baseline + self.baseline_alpha * (median - self.baseline)
+                )
+            if (queued > 0 or active >= self.limit) and self.limit < self.max_limit:
+                self.limit += 1
+                reason = "demand"
+        self._window.clear()
+        return self.limit, reason
@@ -1,84 +1,417 @@
+import ast
 import subprocess
+import logging
 import uuid
 import time
 import os
-import ast
 import re
 import shutil
 import json
+import hashlib
 from urllib.parse import urlparse, unquote, parse_qs
 from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Optional
 import asyncio
 
-from common.contracts import ExecuteRequest, ExecuteResult, InputFile, OutputFile
+from common.analysis import (
+    PACKAGE_MAPPING,
+    CodeAnalysis,
+    CodeAnalyzer,
+    future_imports_end,
+    wrap_last_expression,
+)
+from common.analysis import code_hash as compute_code_hash
+from common.artifacts import ArtifactStore
+from common.contracts import (
+    IMAGE_FORMATS,
+    PROFILER_MODES,
+    DisplayOutput,
+    ExecuteRequest,
+    ExecuteResult,
+    FigureOptions,
+    InputFile,
+    OutputFile,
+    OutputImage,
+    ProfileReport,
+    ResourceUsage,
+    is_valid_execution_id,
+    new_execution_id,
+)
+from common.metrics import MetricsRegistry, TopK
+from common.resources import ResourceProfile, detect_host_capacity, get_default_profile, load_resource_profiles
 from common.settings import Settings
+from common.tenancy import Tenant, TenantRegistry
+from executors.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, is_daemon_error
+from executors.cancellation import ExecutionRegistry, RunningExecution
+from executors.concurrency import AdaptiveLimiter, sample_host_signals
+from executors.ingest import ColumnarCache
+from executors.reaper import (
+    COLD_LABEL,
+    COLD_NAME_PREFIX,
+    INSTANCE_LABEL,
+    ReapReport,
+    find_orphans,
+    parse_container_listing,
+)
+from executors.reaper import list_command as list_executor_containers_command
+from executors.recycling import (
+    CONTAINER_PROBE_SCRIPT,
+    CONTAINER_READY_SCRIPT,
+    ContainerProbe,
+    PooledContainer,
+    RecyclePolicy,
+)
+from executors.runtime.display import OUTPUTS_NAME as DISPLAY_OUTPUTS_NAME
+from executors.runtime.profiler import COLLAPSED_NAME as PROFILE_COLLAPSED_NAME
+from executors.runtime.profiler import PSTATS_NAME as PROFILE_PSTATS_NAME
+from executors.runtime.profiler import SUMMARY_NAME as PROFILE_SUMMARY_NAME
+from executors.runtime.runner import USAGE_MARKER
+from executors.runtime.tabular import SIDECAR_SUFFIX as COLUMNAR_SIDECAR_SUFFIX
+from executors.runtime.zygote import SOCKET_PATH as ZYGOTE_SOCKET_PATH
+from executors.scheduler import ResourceScheduler
+from executors.workspace import WorkspaceManager
+
+# 容器内运行时（executors/runtime）：宿主机暂存目录与容器内挂载位置
+RUNTIME_SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runtime")
+
+
+def _runtime_fingerprint() -> str:
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(RUNTIME_SOURCE_DIR)):
+        if name.endswith(".py"):
+            digest.update(name.encode("utf-8"))
+            with open(os.path.join(RUNTIME_SOURCE_DIR, name), "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+# 暂存目录按运行时内容区分版本：升级网关后不会沿用旧版本暂存的运行时（如缺少新增模块）
+RUNTIME_STAGING_DIR = f"/tmp/python_executor/.runtime-{_runtime_fingerprint()}"
+RUNTIME_CONTAINER_DIR = "/opt/pyexec"
+# `zygote.py --detach` 输出的 `<pid>:<启动时间>`
+ZYGOTE_IDENTITY_RE = re.compile(r"^\d+:\d+$")
+# runtime 把所有图表保存在 /code/output 下的该子目录
+FIGURE_DIR_NAME = ".figures"
+# 性能分析模式下 runtime 把分析结果写到 /code/output 下的该子目录
+PROFILE_DIR_NAME = ".profile"
+# 结构化展示输出（display() 与最后一个表达式的值）写到 /code/output 下的该子目录
+DISPLAY_DIR_NAME = ".display"
+# 时限由容器内的作业监督进程执行；宿主机只在其失灵（如 docker 卡住）时兜底
+JOB_LIMIT_GRACE_SECONDS = 5
 
 
 class CodeExecutor:
     """
     代码执行器
     """
-    def __init__(self, settings: Settings = None):
+    def __init__(
+        self,
+        settings: Settings = None,
+        metrics: MetricsRegistry = None,
+        artifact_store: ArtifactStore = None,
+        code_analyzer: CodeAnalyzer = None,
+        tenants: TenantRegistry = None,
+    ):
         self.settings = settings or Settings.from_env()
+        self.metrics = metrics or MetricsRegistry()
+        self.artifact_store = artifact_store or ArtifactStore(self.settings, self.metrics)
+        self.workspaces = WorkspaceManager(self.settings, self.metrics)
+        # 表格类输入的列式（Arrow）副本缓存
+        self.columnar_cache = ColumnarCache(self.settings, self.metrics)
+        self.code_analyzer = code_analyzer or CodeAnalyzer(self.settings, self.metrics)
+        self.tenants = tenants or TenantRegistry.from_settings(self.settings)
+        # 进行中的执行，按执行 ID 取消
+        self.executions = ExecutionRegistry()
+        # docker daemon 熔断：故障/过慢时快速拒绝请求，由后台探测恢复
+        self.docker_breaker = CircuitBreaker.from_settings(self.settings, self._on_docker_breaker_change)
+        self.docker_recovery_task = None
+        # 按累计 CPU 时间统计最重的代码片段（按代码哈希）
+        self.top_snippets = TopK(k=20)
+        self._describe_metrics()
         self.max_workers = max(1, int(self.settings.max_workers))
-        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        # 自适应并发：在 [CONCURRENCY_MIN, CONCURRENCY_MAX] 内按宿主机饱和度调整调度器的并发上限
+        self.concurrency_limiter = (
+            AdaptiveLimiter.from_settings(self.settings, self.max_workers)
+            if self.settings.adaptive_concurrency else None
+        )
+        thread_count = max(self.max_workers, self.concurrency_limiter.max_limit if self.concurrency_limiter else 0)
+        self.executor = ThreadPoolExecutor(max_workers=thread_count)
+        # 不影响请求耗时的后台工作（如图片压缩）
+        self.background_executor = ThreadPoolExecutor(max_workers=1)
         self.timeout = self.settings.execution_timeout
         self.docker_image = self.settings.docker_image
-        # 用于限制同时运行的容器数量
-        self.container_semaphore = asyncio.Semaphore(self.max_workers)
-        self.pool_warm_size = max(1, min(self.max_workers, 2))
+        self.resource_profiles = load_resource_profiles(self.settings)
+        self.default_profile = get_default_profile(self.settings, self.resource_profiles)
+        # 限制同时运行的容器数量，并按资源档位在宿主机容量内装箱
+        host_cpus, host_memory_bytes = detect_host_capacity(self.settings)
+        self.scheduler = ResourceScheduler(
+            self.concurrency_limiter.limit if self.concurrency_limiter else self.max_workers,
+            host_cpus,
+            host_memory_bytes,
+        )
+        self.concurrency_task = None
         instance_id = re.sub(r"[^a-zA-Z0-9_.-]+", "_", str(self.settings.executor_instance_id or "local"))
         instance_id = instance_id.strip("._-") or "local"
         self.pool_container_prefix = f"python_exec_pool_{instance_id}_"
         # 常用包及其对应的pip包名（有些包的import名和pip安装名不一致）
-        self.package_mapping = {
-            'pd': 'pandas',
-            'pandas': 'pandas',
-            'np': 'numpy',
-            'numpy': 'numpy',
-            'plt': 'matplotlib',
-            'matplotlib': 'matplotlib',
-            'sklearn': 'scikit-learn',
-            'tensorflow': 'tensorflow',
-            'torch': 'torch',
-            'cv2': 'opencv-python',
-            'requests': 'requests',
-            'bs4': 'beautifulsoup4',
-            'seaborn': 'seaborn',
-            # 可以继续添加更多包的映射
-        }
-        # 容器池 - 预先创建并保持一些容器运行
-        self.container_pool = []
+        self.package_mapping = dict(PACKAGE_MAPPING)
+        # 容器池 - 每个资源档位一个子池，预先创建并保持一些容器运行
+        self.container_pool: dict[str, list[str]] = {name: [] for name in self.resource_profiles}
         self.container_pool_lock = asyncio.Lock()
         self.in_use_pool_containers = set()
+        # 每个档位下各槽位当前对应的容器名（回收替换后会换成新容器名）
+        self.pool_slots: dict[str, list[str]] = {
+            name: [f"{self.pool_container_prefix}{name}_{i}" for i in range(self._pool_warm_size(profile))]
+            for name, profile in self.resource_profiles.items()
+        }
+        self.pool_containers: dict[str, PooledContainer] = {}
+        # 各池容器内 zygote 的 `<pid>:<启动时间>`，由网关启动时记录；清理探测只豁免这个进程（容器内的 pid 文件用户代码可写）
+        self.zygotes: dict[str, str] = {}
+        self.recycle_policy = RecyclePolicy.from_settings(self.settings)
+        self.replacing_slots = set()
+        self.background_tasks = set()
         self.keepalive_interval_seconds = 60
+        # 孤儿容器/工作目录回收：启动时执行一次，之后随保活循环按间隔执行
+        self.reap_interval_seconds = max(
+            float(self.keepalive_interval_seconds), float(self.settings.reaper_interval_seconds)
+        )
+        self.last_reap_at = None
         self.keepalive_task = None
         self.keepalive_stop_event = asyncio.Event()
+        # 并行创建/销毁池容器的上限
+        self.bootstrap_semaphore = asyncio.Semaphore(max(1, int(self.settings.pool_bootstrap_concurrency)))
+        self.bootstrapping = set()
+        self.pool_ready_event = asyncio.Event()
+        # 关闭时不再接新任务，等待进行中的任务结束
+        self.draining = False
         # 容器池初始化标志
         self.pool_initialized = False
         
     async def initialize(self):
-        """异步初始化方法，用于初始化容器池"""
+        """
+        异步初始化方法，用于初始化容器池。
+        各槽位并行预热；POOL_READY_MIN 个容器就绪（或超时）即开始服务，其余在后台继续预热。
+        """
         if self.pool_initialized:
             return
 
-        await self._ensure_warm_pool()
+        # 回收上次进程异常退出遗留的容器与临时目录
+        await self.reap_orphans()
+        if self._pool_ready_target() <= 0:
+            self.pool_ready_event.set()
+        warm_task = self._spawn_background(self._ensure_warm_pool())
+        ready_task = asyncio.ensure_future(self.pool_ready_event.wait())
+        try:
+            await asyncio.wait(
+                {warm_task, ready_task},
+                timeout=max(0.0, float(self.settings.pool_ready_timeout_seconds)),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            ready_task.cancel()
         self.pool_initialized = True
 
         if self.keepalive_task is None or self.keepalive_task.done():
             self.keepalive_stop_event.clear()
             self.keepalive_task = asyncio.create_task(self._keepalive_loop())
+        if self.concurrency_limiter and (self.concurrency_task is None or self.concurrency_task.done()):
+            self.concurrency_task = asyncio.create_task(self._concurrency_loop())
         
+    def _describe_metrics(self):
+        m = self.metrics
+        m.describe("executor_executions_total", "counter", "Executions by resource profile and status")
+        m.describe("executor_execution_seconds", "summary", "Wall-clock execution time")
+        m.describe("executor_cpu_seconds_total", "counter", "CPU time consumed by user code")
+        m.describe("executor_io_bytes_total", "counter", "Bytes read/written by user code")
+        m.describe("executor_peak_memory_bytes", "summary", "Peak RSS of user code")
+        m.describe("executor_process_count", "summary", "Peak number of processes per execution")
+        m.describe("executor_limit_hits_total", "counter", "Executions killed by a memory, time or CPU limit")
+        m.describe("executor_leftover_processes_killed_total", "counter", "Stray processes killed in pool containers after a run")
+        m.describe("executor_orphans_reaped_total", "counter", "Orphaned executor containers removed by the reaper")
+        m.describe("executor_reap_seconds", "summary", "Time taken by one orphan reaper pass")
+        m.describe("executor_pool_bootstrap_seconds", "summary", "Time to create or adopt a pool container until ready")
+        m.describe("executor_pool_ready_probe_failures_total", "counter", "Pool containers whose warm interpreter did not come up")
+        m.describe("executor_concurrency_adjustments_total", "counter", "Adaptive concurrency limit changes by reason")
+        m.describe("executor_host_load_per_cpu", "gauge", "1-minute load average divided by host CPUs")
+        m.describe("executor_host_pressure", "gauge", "PSI some avg10 by resource (percent)")
+        m.gauge_callback("executor_concurrency_limit", lambda: [({}, self.scheduler.max_jobs)], "Current effective concurrency limit")
+        m.gauge_callback("executor_queue_size", lambda: [({}, self.scheduler.queued)], "Executions waiting for admission")
+        m.gauge_callback("executor_active_jobs", lambda: [({}, self.scheduler.active)], "Executions currently admitted")
+        m.describe("executor_cancellations_total", "counter", "Executions cancelled by reason")
+        m.describe("executor_rejections_total", "counter", "Executions rejected before admission by reason")
+        m.describe("executor_docker_breaker_transitions_total", "counter", "Docker daemon circuit breaker state changes")
+        m.gauge_callback(
+            "executor_docker_breaker_state",
+            lambda: [({"state": state}, int(self.docker_breaker.state == state)) for state in (CLOSED, OPEN, HALF_OPEN)],
+            "Docker daemon circuit breaker state (1 for the current state)",
+        )
+        m.describe("tenant_executions_total", "counter", "Executions by tenant and status")
+        m.describe("tenant_execution_seconds", "summary", "Wall-clock execution time by tenant")
+        m.describe("tenant_queue_wait_seconds", "summary", "Time spent waiting for admission by tenant")
+        m.gauge_callback(
+            "tenant_active_jobs",
+            lambda: [({"tenant": t}, n) for t, n in self.scheduler.tenant_active.items()],
+            "Executions currently admitted by tenant",
+        )
+        m.gauge_callback(
+            "tenant_queued_jobs",
+            lambda: [({"tenant": t}, n) for t, n in self.scheduler.queued_by_tenant().items()],
+            "Executions waiting for admission by tenant",
+        )
+        self.metrics.gauge_callback(
+            "executor_top_snippet_cpu_seconds",
+            lambda: [({"code_hash": key}, value) for key, value in self.top_snippets.top()],
+            "Cumulative CPU seconds of the heaviest code snippets",
+        )
+
+    def _record_execution_metrics(self, profile: ResourceProfile, result: ExecuteResult, tenant: str = ""):
+        status = "error" if result.stderr else "ok"
+        self.metrics.inc("executor_executions_total", profile=profile.name, status=status)
+        self.metrics.observe("executor_execution_seconds", result.execution_time, profile=profile.name)
+        if tenant:
+            self.metrics.inc("tenant_executions_total", tenant=tenant, status=status)
+            self.metrics.observe("tenant_execution_seconds", result.execution_time, tenant=tenant)
+        if self.concurrency_limiter:
+            self.concurrency_limiter.observe(result.execution_time)
+        usage = result.resource_usage
+        if usage is None:
+            return
+        self.metrics.inc("executor_cpu_seconds_total", usage.cpu_user_seconds, profile=profile.name, mode="user")
+        self.metrics.inc("executor_cpu_seconds_total", usage.cpu_system_seconds, profile=profile.name, mode="system")
+        self.metrics.inc("executor_io_bytes_total", usage.read_bytes, profile=profile.name, direction="read")
+        self.metrics.inc("executor_io_bytes_total", usage.write_bytes, profile=profile.name, direction="write")
+        self.metrics.observe("executor_peak_memory_bytes", usage.peak_memory_bytes, profile=profile.name)
+        self.metrics.observe("executor_process_count", usage.process_count, profile=profile.name)
+        if usage.memory_limit_hit:
+            self.metrics.inc("executor_limit_hits_total", profile=profile.name, limit="memory")
+        if usage.timeout_hit:
+            self.metrics.inc("executor_limit_hits_total", profile=profile.name, limit="time")
+        if usage.cpu_limit_hit:
+            self.metrics.inc("executor_limit_hits_total", profile=profile.name, limit="cpu")
+        if usage.code_hash:
+            self.top_snippets.add(usage.code_hash, usage.cpu_user_seconds + usage.cpu_system_seconds)
+
+    def _stage_runtime(self) -> str:
+        """把容器内运行时复制到宿主机暂存目录（供 docker cp / 冷容器挂载）"""
+        if not os.path.isfile(os.path.join(RUNTIME_STAGING_DIR, "runner.py")):
+            tmp_dir = f"{RUNTIME_STAGING_DIR}.{uuid.uuid4().hex}"
+            shutil.copytree(
+                RUNTIME_SOURCE_DIR,
+                tmp_dir,
+                ignore=shutil.ignore_patterns("__pycache__", "*.pyc"),
+            )
+            os.chmod(tmp_dir, 0o755)
+            try:
+                os.rename(tmp_dir, RUNTIME_STAGING_DIR)
+            except OSError:
+                # 并发暂存时以先完成者为准
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        return RUNTIME_STAGING_DIR
+
+    async def _install_runtime(self, container_id: str):
+        staging_dir = self._stage_runtime()
+        await self._run_docker("docker", "cp", f"{staging_dir}/.", f"{container_id}:{RUNTIME_CONTAINER_DIR}")
+        # 镜像设置了 PYTHONDONTWRITEBYTECODE，运行时模块在这里一次性编译成 .pyc，之后导入不再重新编译
+        await self._run_docker("docker", "exec", container_id, "python", "-m", "compileall", "-q", RUNTIME_CONTAINER_DIR)
+
+    async def _start_zygote(self, container_id: str):
+        """在池容器内启动预热解释器并记录其身份（可重复调用：之前的 zygote 不再豁免，由清理探测结束）"""
+        returncode, stdout, _ = await self._run_docker(
+            "docker", "exec", "-w", "/code", container_id,
+            "python", f"{RUNTIME_CONTAINER_DIR}/zygote.py", "--detach",
+        )
+        lines = stdout.split()
+        identity = lines[-1] if returncode == 0 and lines else ""
+        self.zygotes[container_id] = identity if ZYGOTE_IDENTITY_RE.match(identity) else ""
+
     async def _initialize_container_pool(self):
         """初始化容器池，预先创建一些容器"""
         await self._ensure_warm_pool()
 
-    async def _run_docker(self, *cmd: str):
-        process = await asyncio.create_subprocess_exec(
-            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await process.communicate()
-        return process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+    def _on_docker_breaker_change(self, previous: str, state: str):
+        self.metrics.inc("executor_docker_breaker_transitions_total", to=state)
+        if state == OPEN:
+            logging.warning("Docker daemon circuit breaker opened (was %s)", previous)
+        elif state == CLOSED:
+            logging.info("Docker daemon circuit breaker closed")
+
+    def _docker_call_timeout(self, timeout: Optional[float]) -> Optional[float]:
+        """None 表示使用 DOCKER_CALL_TIMEOUT_SECONDS，0 表示不限时"""
+        if timeout is None:
+            timeout = float(self.settings.docker_call_timeout_seconds or 0)
+        return timeout if timeout and timeout > 0 else None
+
+    async def _run_docker(self, *cmd: str, timeout: float = None, track_latency: bool = True):
+        """异步调用 docker CLI（经过熔断器）；超时时结束 CLI 进程并返回 rc=-1"""
+        timeout = self._docker_call_timeout(timeout)
+        with self.docker_breaker.attempt() as record:
+            started = time.monotonic()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+                )
+            except OSError:
+                record(False)
+                raise
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                record(False)
+                return -1, "", f"docker {cmd[1] if len(cmd) > 1 else ''} timed out after {timeout:g}s"
+            except asyncio.CancelledError:
+                # 调用方被取消：结束 CLI 进程，结果未知，不计入熔断统计
+                process.kill()
+                await process.wait()
+                raise
+            stderr_text = stderr.decode(errors="replace")
+            record(not is_daemon_error(stderr_text), time.monotonic() - started if track_latency else None)
+        return process.returncode, stdout.decode(errors="replace"), stderr_text
+
+    def _docker(self, cmd: list[str], *, check: bool = False, text: bool = False, timeout: float = None, user_output: bool = False):
+        """
+        同步调用 docker CLI（在线程池中，经过熔断器）。
+        user_output=True 表示 stderr 是用户代码的输出：出现 runner 的资源回报行说明 daemon 正常，且不计慢调用。
+        """
+        with self.docker_breaker.attempt() as record:
+            started = time.monotonic()
+            try:
+                process = subprocess.run(cmd, capture_output=True, text=text, timeout=self._docker_call_timeout(timeout))
+            except (OSError, subprocess.TimeoutExpired):
+                record(False)
+                raise
+            stderr = process.stderr if text else (process.stderr or b"").decode(errors="replace")
+            ok = not is_daemon_error(stderr) or (user_output and USAGE_MARKER in stderr)
+            record(ok, None if user_output else time.monotonic() - started)
+        if check and process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, process.stdout, process.stderr)
+        return process
+
+    def _docker_best_effort(self, cmd: list[str]):
+        """清理类调用：失败或熔断中直接忽略（遗留容器由后续清理兜底）"""
+        try:
+            self._docker(cmd)
+        except (CircuitOpenError, OSError, subprocess.SubprocessError):
+            pass
+
+    def _ensure_docker_recovery(self):
+        if self.docker_recovery_task is None or self.docker_recovery_task.done():
+            self.docker_recovery_task = self._spawn_background(self._docker_recovery_loop())
+
+    async def _docker_recovery_loop(self):
+        """熔断打开后等到半开，用一次 `docker version` 探测 daemon：成功即关闭，失败则重新打开并继续等待"""
+        while not self.draining and self.docker_breaker.state != CLOSED:
+            await asyncio.sleep(max(0.05, self.docker_breaker.retry_after()))
+            if self.docker_breaker.state != HALF_OPEN:
+                continue
+            try:
+                await self._run_docker("docker", "version", "--format", "{{.Server.Version}}")
+            except CircuitOpenError:
+                pass
+            except Exception:
+                self.docker_breaker.record(False)
 
     def _sanitize_filename(self, name: str) -> str:
         name = os.path.basename(name or "")
@@ -130,16 +463,14 @@ class CodeExecutor:
         return path_name
 
     def _is_allowed_output_file(self, name: str) -> bool:
-        if not name or name == "result.png":
+        if not name or name.startswith("."):
             return False
         _, ext = os.path.splitext(name)
         ext = ext.lower().lstrip(".")
         allowed = self.settings.output_allowed_extensions or set()
         return ext in allowed
 
-    def _persist_output_files(self, execution_id: str, output_dir: str) -> list[OutputFile]:
-        os.makedirs(self.settings.file_store_path, exist_ok=True)
-
+    def _persist_output_files(self, execution_id: str, output_dir: str, tenant: str = "") -> list[OutputFile]:
         try:
             names = sorted(os.listdir(output_dir))
         except FileNotFoundError:
@@ -171,9 +502,9 @@ class CodeExecutor:
 
             index += 1
             stored_name = f"out_{execution_id}_{index}_{safe_name}"
-            dst_path = os.path.join(self.settings.file_store_path, stored_name)
-            shutil.move(src_path, dst_path)
-            os.chmod(dst_path, 0o666)
+            self.artifact_store.put("files", execution_id, stored_name, src_path, tenant)
+            if not self.artifact_store.backend.remote:
+                self.background_executor.submit(self.artifact_store.precompress, "files", stored_name)
 
             results.append(
                 OutputFile(
@@ -186,6 +517,168 @@ class CodeExecutor:
 
         return results
 
+    def _default_figure_options(self) -> FigureOptions:
+        return FigureOptions(
+            format=self.settings.figure_format if self.settings.figure_format in IMAGE_FORMATS else "png",
+            dpi=self.settings.figure_dpi,
+            max_dimension=self.settings.figure_max_dimension,
+        )
+
+    def _persist_figures(self, execution_id: str, output_dir: str, tenant: str = "") -> list[OutputImage]:
+        """把 runtime 保存的图表移入图片目录；PNG 在入库前无损压缩（入库后 URL 按不可变缓存，内容不能再变）"""
+        figures_dir = os.path.join(output_dir, FIGURE_DIR_NAME)
+        try:
+            names = os.listdir(figures_dir)
+        except FileNotFoundError:
+            return []
+
+        def _figure_index(name: str) -> int:
+            match = re.match(r"figure_(\d+)\.", name)
+            return int(match.group(1)) if match else 0
+
+        images: list[OutputImage] = []
+        for name in sorted(names, key=_figure_index):
+            if len(images) >= self.settings.output_max_files:
+                break
+            ext = os.path.splitext(name)[1].lower().lstrip(".")
+            src_path = os.path.join(figures_dir, name)
+            if ext not in IMAGE_FORMATS or not os.path.isfile(src_path):
+                continue
+
+            if ext == "png" and self.settings.figure_optimize_png:
+                src_path = self._optimized_png(src_path)
+            stored_name = f"plot_{execution_id}_{len(images) + 1}.{ext}"
+            record = self.artifact_store.put("images", execution_id, stored_name, src_path, tenant)
+            images.append(OutputImage(filename=stored_name, format=ext, size_bytes=record.size_bytes))
+
+            if ext == "svg" and not self.artifact_store.backend.remote:
+                self.background_executor.submit(self.artifact_store.precompress, "images", stored_name)
+        return images
+
+    def _persist_profile(self, execution_id: str, output_dir: str, tenant: str = "") -> Optional[ProfileReport]:
+        """把 runtime 写出的 pstats / collapsed 调用栈存为文件产物，摘要放进结果"""
+        profile_dir = os.path.join(output_dir, PROFILE_DIR_NAME)
+        try:
+            with open(os.path.join(profile_dir, PROFILE_SUMMARY_NAME)) as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(summary, dict):
+            return None
+
+        files: list[OutputFile] = []
+        for name in (PROFILE_PSTATS_NAME, PROFILE_COLLAPSED_NAME):
+            src_path = os.path.join(profile_dir, name)
+            try:
+                size_bytes = os.path.getsize(src_path)
+            except OSError:
+                continue
+            if size_bytes <= 0 or size_bytes > self.settings.output_file_max_bytes:
+                continue
+            stored_name = f"profile_{execution_id}_{name}"
+            self.artifact_store.put("files", execution_id, stored_name, src_path, tenant)
+            if name == PROFILE_COLLAPSED_NAME and not self.artifact_store.backend.remote:
+                self.background_executor.submit(self.artifact_store.precompress, "files", stored_name)
+            files.append(OutputFile(filename=stored_name, original_name=name, size_bytes=int(size_bytes)))
+        return ProfileReport.from_dict(summary, files)
+
+    def _persist_display_outputs(self, execution_id: str, output_dir: str, tenant: str = "") -> list[DisplayOutput]:
+        """读取 runtime 逐行写出的展示输出；截断表格的完整数据（Arrow IPC）存为文件产物"""
+        display_dir = os.path.join(output_dir, DISPLAY_DIR_NAME)
+        outputs: list[DisplayOutput] = []
+        try:
+            f = open(os.path.join(display_dir, DISPLAY_OUTPUTS_NAME), encoding="utf-8", errors="replace")
+        except OSError:
+            return outputs
+        # 行长上限由 runtime 保证，这里再兜底一次（写出途中被杀可能留下半行）
+        max_line = max(1024, int(self.settings.display_output_max_bytes)) + 1
+        with f:
+            for line in iter(lambda: f.readline(max_line), ""):
+                if len(outputs) >= self.settings.display_max_outputs:
+                    break
+                try:
+                    payload = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(payload, dict):
+                    continue
+                outputs.append(DisplayOutput.from_dict(payload, self._persist_display_file(
+                    execution_id, display_dir, payload.get("file"), len(outputs) + 1, tenant
+                )))
+        return outputs
+
+    def _persist_display_file(
+        self, execution_id: str, display_dir: str, name, index: int, tenant: str = ""
+    ) -> Optional[OutputFile]:
+        if not isinstance(name, str) or self._sanitize_filename(name) != name or name.startswith("."):
+            return None
+        src_path = os.path.join(display_dir, name)
+        try:
+            size_bytes = os.path.getsize(src_path)
+        except OSError:
+            return None
+        if size_bytes <= 0 or size_bytes > self.settings.output_file_max_bytes:
+            return None
+        stored_name = f"display_{execution_id}_{index}.arrow"
+        self.artifact_store.put("files", execution_id, stored_name, src_path, tenant)
+        return OutputFile(filename=stored_name, original_name=name, size_bytes=int(size_bytes))
+
+    async def _publish_artifacts(self, exec_result: ExecuteResult) -> ExecuteResult:
+        """把图片/文件并行上传到远端后端，并把响应中的 URL 换成预签名/直链"""
+        store = self.artifact_store
+        items = [("images", i.filename) for i in exec_result.images]
+        items += [("files", f.filename) for f in exec_result.files]
+        if exec_result.profile is not None:
+            items += [("files", f.filename) for f in exec_result.profile.files]
+        items += [("files", o.file.filename) for o in exec_result.outputs if o.file is not None]
+        if not store.backend.remote or not items:
+            return exec_result
+
+        if not self.settings.artifact_upload_wait:
+            # 不等待上传：响应仍返回网关 URL，上传完成前由本机回传，完成后网关重定向到对象存储
+            self._spawn_background(store.publish(items))
+            return exec_result
+
+        uploaded = await store.publish(items)
+        images = [
+            replace(i, url=store.url("images", i.filename) or "") if uploaded.get(("images", i.filename)) else i
+            for i in exec_result.images
+        ]
+        def _with_url(f: OutputFile) -> OutputFile:
+            return replace(f, url=store.url("files", f.filename) or "") if uploaded.get(("files", f.filename)) else f
+
+        files = [_with_url(f) for f in exec_result.files]
+        profile_report = exec_result.profile
+        if profile_report is not None:
+            profile_report = replace(profile_report, files=[_with_url(f) for f in profile_report.files])
+        outputs = [replace(o, file=_with_url(o.file)) if o.file is not None else o for o in exec_result.outputs]
+        return replace(exec_result, images=images, files=files, profile=profile_report, outputs=outputs)
+
+    def _optimized_png(self, src_path: str) -> str:
+        """返回要入库的 PNG：无损压缩后变小则用压缩结果，否则用原文件"""
+        dst_path = f"{src_path}.optimized"
+        if self._optimize_png(src_path, dst_path):
+            return dst_path
+        try:
+            os.remove(dst_path)
+        except OSError:
+            pass
+        return src_path
+
+    @staticmethod
+    def _optimize_png(src_path: str, dst_path: str) -> bool:
+        """无损重新压缩 PNG 到 dst_path，变小时返回 True（Pillow 可选依赖，不可用时跳过）"""
+        try:
+            from PIL import Image
+        except ImportError:
+            return False
+        try:
+            with Image.open(src_path) as image:
+                image.save(dst_path, format="PNG", optimize=True)
+            return os.path.getsize(dst_path) < os.path.getsize(src_path)
+        except Exception:
+            return False
+
     def _download_input_files(self, execution_id: str, urls: list[str]):
         if not urls:
             return "", {}, []
@@ -197,10 +690,8 @@ class CodeExecutor:
         if len(safe_urls) > self.settings.input_max_files:
             raise RuntimeError(f"Too many input files, max={self.settings.input_max_files}")
 
-        work_dir = f"/tmp/python_executor/{execution_id}"
-        input_dir = os.path.join(work_dir, "input")
+        input_dir = os.path.join(self.workspaces.work_dir(execution_id), "input")
         os.makedirs(input_dir, exist_ok=True)
-        os.chmod(input_dir, 0o777)
 
         # 延迟 import：避免在未使用该功能时引入额外开销
         import requests
@@ -232,11 +723,13 @@ class CodeExecutor:
                 dst_path = os.path.join(input_dir, dst_name)
 
                 size_bytes = 0
+                digest = hashlib.sha256()
                 with open(dst_path, "wb") as f:
                     for chunk in resp.iter_content(chunk_size=1024 * 1024):
                         if not chunk:
                             continue
                         size_bytes += len(chunk)
+                        digest.update(chunk)
                         if size_bytes > self.settings.input_file_max_bytes:
                             raise RuntimeError(
                                 f"Input file too large: {dst_name} > {self.settings.input_file_max_bytes} bytes"
@@ -251,6 +744,8 @@ class CodeExecutor:
 
             os.chmod(dst_path, 0o666)
             total_bytes += size_bytes
+            # 相同内容之前已转换过时，把列式副本放到原文件旁，容器内读取时跳过解析
+            self.columnar_cache.attach(dst_path, digest.hexdigest())
             url_to_container_path[url] = f"/code/input/{dst_name}"
             inputs.append(
                 InputFile(
@@ -269,8 +764,29 @@ class CodeExecutor:
             rewritten = rewritten.replace(url, container_path)
         return rewritten
 
+    def _pool_warm_size(self, profile: ResourceProfile) -> int:
+        return max(0, min(self.max_workers, profile.warm_size))
+
     def _pool_container_names(self):
-        return [f"{self.pool_container_prefix}{i}" for i in range(self.pool_warm_size)]
+        return [name for names in self.pool_slots.values() for name in names]
+
+    def _resolve_profile(self, name: str = "") -> ResourceProfile:
+        name = (name or "").strip().lower()
+        if not name:
+            return self.default_profile
+        profile = self.resource_profiles.get(name)
+        if profile is None:
+            raise ValueError(
+                f"Unknown resource profile: {name} (available: {', '.join(self.resource_profiles)})"
+            )
+        return profile
+
+    def _spawn_background(self, coro):
+        """后台执行（不阻塞请求路径），并持有 task 引用避免被 GC"""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
 
     async def _is_container_running(self, container_id: str):
         rc, stdout, _stderr = await self._run_docker(
@@ -283,72 +799,351 @@ class CodeExecutor:
     async def _remove_container(self, container_id: str):
         await self._run_docker("docker", "rm", "-f", container_id)
 
-    def _docker_run_base_args(self):
+    def _orphan_max_age_seconds(self) -> float:
+        """冷启动容器/工作目录存在超过该时长，说明所属执行早已结束"""
+        return self.timeout + JOB_LIMIT_GRACE_SECONDS + max(0.0, float(self.settings.reaper_orphan_grace_seconds))
+
+    async def _list_orphan_containers(self):
+        if self.docker_breaker.state != CLOSED:
+            return [], []
+        rc, stdout, _stderr = await self._run_docker(*list_executor_containers_command())
+        if rc != 0:
+            return [], []
+        containers = parse_container_listing(stdout)
+        # 先列容器再取存活状态：列出之后才开始创建的容器不在列表里，列表里正在创建的一定已登记
+        async with self.container_pool_lock:
+            live = set(self.pool_containers) | set(self.in_use_pool_containers) | set(self.bootstrapping)
+            for names in self.pool_slots.values():
+                live.update(names)
+        live.update(self.executions.container_names())
+        orphans = find_orphans(
+            containers,
+            instance=self.pool_container_prefix,
+            live_containers=live,
+            max_cold_age_seconds=self._orphan_max_age_seconds(),
+        )
+        return orphans.pool_containers, orphans.cold_containers
+
+    async def _reap_container(self, container_id: str) -> bool:
+        async with self.bootstrap_semaphore:
+            rc, _stdout, stderr = await self._run_docker("docker", "rm", "-f", container_id)
+        return rc == 0 or "no such container" in (stderr or "").lower()
+
+    async def reap_orphans(self) -> ReapReport:
+        """
+        回收网关崩溃/OOM 后遗留的资源：按标签与名字前缀列出执行器容器，与当前池槽位、进行中的执行对账，
+        并行删除孤儿容器（与池容器创建共用并发上限），同时在线程池中清理遗留工作目录。
+        """
+        started = time.monotonic()
+        self.last_reap_at = started
+        loop = asyncio.get_event_loop()
+        sweep = loop.run_in_executor(None, self.workspaces.sweep, None, self._orphan_max_age_seconds())
+        try:
+            pool_orphans, cold_orphans = await self._list_orphan_containers()
+        except CircuitOpenError:
+            pool_orphans, cold_orphans = [], []
+        results = await asyncio.gather(
+            *(self._reap_container(name) for name in pool_orphans + cold_orphans),
+            return_exceptions=True,
+        )
+        removed = {
+            name for name, result in zip(pool_orphans + cold_orphans, results) if result is True
+        }
+        try:
+            workspaces = await sweep
+        except Exception:
+            workspaces = 0
+
+        report = ReapReport(
+            pool_containers=tuple(name for name in pool_orphans if name in removed),
+            cold_containers=tuple(name for name in cold_orphans if name in removed),
+            workspaces=workspaces,
+            failed=tuple(name for name in pool_orphans + cold_orphans if name not in removed),
+            seconds=time.monotonic() - started,
+        )
+        if report.pool_containers:
+            self.metrics.inc("executor_orphans_reaped_total", len(report.pool_containers), kind="pool")
+        if report.cold_containers:
+            self.metrics.inc("executor_orphans_reaped_total", len(report.cold_containers), kind="cold")
+        self.metrics.observe("executor_reap_seconds", report.seconds)
+        if report.total or report.failed:
+            logging.info("Reaped orphaned executor resources: %s", report.to_dict())
+        return report
+
+    def _docker_run_base_args(self, profile: ResourceProfile = None):
+        profile = profile or self.default_profile
         args = [
             "--init",
             "--network", self.settings.docker_network_mode,
-            "--memory=1g",
-            "--cpus=1",
+            *profile.docker_args(),
             "--pids-limit", str(self.settings.docker_pids_limit),
             "--cap-drop=ALL",
             "--security-opt=no-new-privileges",
         ]
         return args
 
-    async def _create_pool_container(self, container_id: str):
+    async def _create_pool_container(self, container_id: str, profile: ResourceProfile, slot: int):
+        created = await self._start_pool_container(container_id, profile)
+        if created:
+            async with self.container_pool_lock:
+                self.pool_containers[container_id] = PooledContainer(
+                    name=container_id, slot=slot, profile=profile.name
+                )
+        return created
+
+    async def _start_pool_container(self, container_id: str, profile: ResourceProfile):
         cmd = [
             "docker", "run",
             "-d",  # 后台运行
             "--name", container_id,
             "--label", "python_executor_pool=true",
-            "--label", f"python_executor_instance={self.pool_container_prefix}",
+            "--label", f"{INSTANCE_LABEL}={self.pool_container_prefix}",
+            "--label", f"python_executor_profile={profile.name}",
             "--restart", "unless-stopped",
-            *self._docker_run_base_args(),
+            *self._docker_run_base_args(profile),
+            *self._scratch_tmpfs_args(),
             self.docker_image,
             "tail", "-f", "/dev/null"  # 保持容器运行
         ]
         rc, _stdout, stderr = await self._run_docker(*cmd)
         if rc == 0:
-            await self._preinstall_common_packages(container_id)
+            await self._bootstrap_container(container_id)
             return True
 
         # 容器名冲突：复用已有容器（若存在/可用），否则删除后重建
         if "is already in use" in stderr or "Conflict" in stderr:
             running = await self._is_container_running(container_id)
             if running is True:
+                await self._install_runtime(container_id)
+                await self._start_zygote(container_id)
+                await self._wait_container_ready(container_id)
                 return True
             await self._remove_container(container_id)
             rc, _stdout, _stderr = await self._run_docker(*cmd)
             if rc == 0:
-                await self._preinstall_common_packages(container_id)
+                await self._bootstrap_container(container_id)
                 return True
         return False
 
+    async def _bootstrap_container(self, container_id: str):
+        await self._install_runtime(container_id)
+        await self._preinstall_common_packages(container_id)
+        await self._start_zygote(container_id)
+        await self._wait_container_ready(container_id)
+
+    def _scratch_tmpfs_args(self) -> list[str]:
+        """池容器的输入/输出目录放在限额 tmpfs 上（计入容器内存限额，重启即清空）"""
+        size = max(1, int(self.settings.container_scratch_bytes))
+        options = f"rw,nosuid,nodev,size={size},mode=1777"
+        return ["--tmpfs", f"/code/input:{options}", "--tmpfs", f"/code/output:{options}"]
+
     async def _ensure_warm_pool(self):
-        """确保至少有 pool_warm_size 个池容器在线（自愈 + 复用已有容器）"""
-        desired = self._pool_container_names()
+        """确保每个档位都有足量池容器在线（自愈 + 复用已有容器），各槽位并行处理"""
+        if self.docker_breaker.state != CLOSED:
+            # daemon 熔断中不逐个槽位重试，交给恢复探测
+            self._ensure_docker_recovery()
+            return
+        tasks = [
+            self._ensure_pool_slot(profile_name, slot, container_id)
+            for profile_name, slots in self.pool_slots.items()
+            for slot, container_id in enumerate(list(slots))
+        ]
+        if tasks:
+            await asyncio.gather(*tasks)
 
-        for container_id in desired:
-            try:
-                running = await self._is_container_running(container_id)
+        async with self.container_pool_lock:
+            self.container_pool = {
+                profile_name: [
+                    cid for cid in slots
+                    if cid in self.pool_containers
+                    and cid not in self.in_use_pool_containers
+                    and not self.pool_containers[cid].draining
+                ]
+                for profile_name, slots in self.pool_slots.items()
+            }
+
+    async def _ensure_pool_slot(self, profile_name: str, slot: int, container_id: str):
+        # 同一容器正在由另一轮保活/请求处理时跳过
+        if container_id in self.bootstrapping:
+            return
+        self.bootstrapping.add(container_id)
+        try:
+            running = await self._is_container_running(container_id)
+            if running is True and container_id in self.pool_containers:
+                return
+            # 只有创建/接管需要占用并发名额，状态检查不排队
+            async with self.bootstrap_semaphore:
+                started = time.monotonic()
                 if running is True:
-                    continue
-                if running is False:
-                    await self._remove_container(container_id)
-                await self._create_pool_container(container_id)
-            except Exception:
-                # Docker 不可用或临时异常时，避免阻塞服务
-                continue
+                    # 复用已有容器（例如服务重启前创建的），从现在开始计龄；运行时可能是旧版本，重新安装
+                    await self._install_runtime(container_id)
+                    await self._start_zygote(container_id)
+                    await self._wait_container_ready(container_id)
+                    async with self.container_pool_lock:
+                        self.pool_containers.setdefault(
+                            container_id,
+                            PooledContainer(name=container_id, slot=slot, profile=profile_name),
+                        )
+                else:
+                    if running is False:
+                        await self._remove_container(container_id)
+                    if not await self._create_pool_container(container_id, self.resource_profiles[profile_name], slot):
+                        return
+                self.metrics.observe("executor_pool_bootstrap_seconds", time.monotonic() - started)
+            await self._mark_pool_container_ready(container_id)
+        except Exception:
+            # Docker 不可用或临时异常时，避免阻塞服务
+            return
+        finally:
+            self.bootstrapping.discard(container_id)
 
+    async def _mark_pool_container_ready(self, container_id: str):
+        """容器就绪后立即进入空闲队列，不必等整轮预热结束"""
         async with self.container_pool_lock:
-            self.container_pool = [
-                cid for cid in desired if cid not in self.in_use_pool_containers
-            ]
+            record = self.pool_containers.get(container_id)
+            if record is None or record.draining or container_id in self.in_use_pool_containers:
+                return
+            idle = self.container_pool.setdefault(record.profile, [])
+            if container_id not in idle:
+                idle.append(container_id)
+            ready = sum(1 for r in self.pool_containers.values() if not r.draining)
+        if ready >= self._pool_ready_target():
+            self.pool_ready_event.set()
+
+    def _pool_ready_target(self) -> int:
+        """启动时需要就绪的池容器数：POOL_READY_MIN < 0 表示全部"""
+        total = len(self._pool_container_names())
+        target = int(self.settings.pool_ready_min)
+        return total if target < 0 else min(target, total)
+
+    async def _wait_container_ready(self, container_id: str) -> bool:
+        """就绪探测：等到容器内预热解释器完成预导入并开始监听"""
+        timeout = max(1.0, float(self.settings.pool_ready_timeout_seconds))
+        rc, _stdout, _stderr = await self._run_docker(
+            "docker", "exec", container_id,
+            "python", "-c", CONTAINER_READY_SCRIPT, ZYGOTE_SOCKET_PATH, str(timeout),
+            timeout=timeout + 10,
+            track_latency=False,
+        )
+        if rc != 0:
+            # 未就绪的容器仍可使用（client 会退回普通 runner），只是首个请求较慢
+            self.metrics.inc("executor_pool_ready_probe_failures_total")
+            return False
+        return True
+
+    async def _checkout_pool_container(self, profile: ResourceProfile):
+        async with self.container_pool_lock:
+            idle = self.container_pool.get(profile.name) or []
+            if not idle:
+                return None
+            container_id = idle.pop(0)
+            self.in_use_pool_containers.add(container_id)
+            return container_id
+
+    async def _release_pool_container(self, container_id: str, probe: ContainerProbe = None, probe_failed: bool = False):
+        """归还池容器：按回收策略决定放回池中、后台替换或直接下线"""
+        remove_now = False
+        if probe is not None and probe.killed_processes:
+            self.metrics.inc("executor_leftover_processes_killed_total", probe.killed_processes)
+        async with self.container_pool_lock:
+            self.in_use_pool_containers.discard(container_id)
+            record = self.pool_containers.get(container_id)
+            if record is None:
+                return
+            record.uses += 1
+            if record.draining:
+                remove_now = True
+            elif probe_failed:
+                # 执行后的清理/探测失败：容器内可能残留上一次的输入输出，不再复用
+                record.draining = True
+                self._schedule_replacement(record)
+            else:
+                if self.recycle_policy.is_tainted(probe):
+                    # 残留进程的容器不再复用，替换容器就绪前池中少一个容器
+                    record.draining = True
+                else:
+                    idle = self.container_pool.setdefault(record.profile, [])
+                    if container_id not in idle:
+                        idle.append(container_id)
+                reason = self.recycle_policy.retire_reason(record, probe)
+                if reason:
+                    self._schedule_replacement(record)
+                elif probe is not None and not probe.zygote_alive and not record.draining:
+                    # 预热解释器意外退出（如被 OOM），后台重新拉起
+                    self._spawn_background(self._start_zygote(container_id))
+
+        if remove_now:
+            self._spawn_background(self._drop_pool_container(container_id))
+
+    def _schedule_replacement(self, record: PooledContainer):
+        """调用方需持有 container_pool_lock"""
+        key = (record.profile, record.slot)
+        if record.retiring or key in self.replacing_slots:
+            return
+        record.retiring = True
+        self.replacing_slots.add(key)
+        self._spawn_background(self._replace_pool_container(record))
+
+    async def _replace_pool_container(self, old: PooledContainer):
+        """先预热替换容器，再摘除旧容器，避免回收出现在请求路径上"""
+        new_name = f"{self.pool_container_prefix}{old.profile}_{old.slot}_{uuid.uuid4().hex[:8]}"
+        # 创建期间登记为创建中，避免被孤儿回收误删
+        self.bootstrapping.add(new_name)
+        try:
+            profile = self.resource_profiles[old.profile]
+            created = await self._create_pool_container(new_name, profile, old.slot)
+        except Exception:
+            created = False
+        finally:
+            self.bootstrapping.discard(new_name)
+
+        remove_old = False
+        async with self.container_pool_lock:
+            self.replacing_slots.discard((old.profile, old.slot))
+            if not created:
+                old.retiring = False
+                # 替换失败：被污染的容器直接删除，由保活循环按原名重建
+                remove_old = old.draining and old.name not in self.in_use_pool_containers
+            else:
+                slots = self.pool_slots.get(old.profile, [])
+                if 0 <= old.slot < len(slots) and slots[old.slot] == old.name:
+                    slots[old.slot] = new_name
+                old.draining = True
+                idle = self.container_pool.setdefault(old.profile, [])
+                if old.name in idle:
+                    idle.remove(old.name)
+                remove_old = old.name not in self.in_use_pool_containers
+                if new_name not in idle:
+                    idle.append(new_name)
+
+        if remove_old:
+            await self._drop_pool_container(old.name)
+
+    async def _drop_pool_container(self, container_id: str):
+        async with self.container_pool_lock:
+            self.pool_containers.pop(container_id, None)
+        self.zygotes.pop(container_id, None)
+        try:
+            await self._remove_container(container_id)
+        except Exception:
+            pass
+
+    async def _recycle_idle_containers(self):
+        """空闲容器也要按存活时长回收"""
+        async with self.container_pool_lock:
+            idle = [cid for names in self.container_pool.values() for cid in names]
+            for container_id in idle:
+                record = self.pool_containers.get(container_id)
+                if record and self.recycle_policy.retire_reason(record):
+                    self._schedule_replacement(record)
 
     async def _keepalive_loop(self):
         while not self.keepalive_stop_event.is_set():
             try:
                 await self._ensure_warm_pool()
+                await self._recycle_idle_containers()
+                if self.last_reap_at is None or time.monotonic() - self.last_reap_at >= self.reap_interval_seconds:
+                    await self.reap_orphans()
             except Exception:
                 pass
             try:
@@ -359,153 +1154,316 @@ class CodeExecutor:
             except asyncio.TimeoutError:
                 continue
 
-    async def _preinstall_common_packages(self, container_id):
-        """在容器中预安装常用包"""
-        common_packages = ['numpy', 'pandas', 'matplotlib']
-        for package in common_packages:
-            cmd = [
-                "docker", "exec",
-                container_id,
-                "pip", "install", "--user", package
-            ]
+    async def _concurrency_loop(self):
+        interval = max(0.5, float(self.settings.concurrency_adjust_interval_seconds))
+        while not self.keepalive_stop_event.is_set():
             try:
-                process = await asyncio.create_subprocess_exec(
-                    *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-                )
-                await process.communicate()
+                await asyncio.wait_for(self.keepalive_stop_event.wait(), timeout=interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                self._adjust_concurrency()
             except Exception:
                 pass
 
-    def _detect_imports(self, code):
-        """检测代码中的import语句并返回需要安装的包列表"""
-        required_packages = set()
+    def _adjust_concurrency(self):
+        signals = sample_host_signals(self.scheduler.cpus)
+        if signals.load_per_cpu is not None:
+            self.metrics.set("executor_host_load_per_cpu", signals.load_per_cpu)
+        for resource, value in signals.pressure:
+            self.metrics.set("executor_host_pressure", value, resource=resource)
+
+        previous = self.scheduler.max_jobs
+        limit, reason = self.concurrency_limiter.update(signals, self.scheduler.queued, self.scheduler.active)
+        if limit != previous:
+            self.metrics.inc(
+                "executor_concurrency_adjustments_total",
+                direction="up" if limit > previous else "down",
+                reason=reason,
+            )
+            self.scheduler.set_max_jobs(limit)
 
-        # 解析Python代码
+    async def _preinstall_common_packages(self, container_id):
+        """在容器中预安装常用包（一次 pip 调用，已安装时很快返回）"""
+        common_packages = ['numpy', 'pandas', 'matplotlib']
+        cmd = [
+            "docker", "exec",
+            container_id,
+            "pip", "install", "--user", "--no-input", *common_packages
+        ]
         try:
-            tree = ast.parse(code)
-        except SyntaxError:
-            return list(required_packages)
-
-        # 遍历AST找到所有import语句
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Import):
-                for name in node.names:
-                    base_package = name.name.split('.')[0]
-                    if base_package in self.package_mapping:
-                        required_packages.add(self.package_mapping[base_package])
-
-            elif isinstance(node, ast.ImportFrom):
-                base_package = node.module.split('.')[0] if node.module else ''
-                if base_package in self.package_mapping:
-                    required_packages.add(self.package_mapping[base_package])
-
-        # 检查代码中的直接使用（如 pd.DataFrame）
-        for package_name in self.package_mapping:
-            pattern = r'\b' + re.escape(package_name) + r'\.'
-            if re.search(pattern, code):
-                required_packages.add(self.package_mapping[package_name])
-
-        return list(required_packages)
+            # pip 安装耗时不代表 daemon 变慢，不计入熔断的慢调用
+            await self._run_docker(*cmd, timeout=0, track_latency=False)
+        except Exception:
+            pass
+
+    def _detect_imports(self, code, analysis: CodeAnalysis = None):
+        """检测代码中的import语句及 `别名.` 用法并返回需要安装的包列表"""
+        # 复用预检阶段按代码哈希缓存的特征（一次 AST 遍历 + 一次正则扫描）
+        if analysis is None:
+            analysis = self.code_analyzer.analyze(code)
+        if analysis.error:
+            return []
+        return analysis.features.packages(self.package_mapping)
 
     async def execute(self, request: ExecuteRequest) -> ExecuteResult:
         """执行代码（与 HTTP / FastAPI 解耦的领域接口）"""
+        # 语法错误/策略违规在占用调度名额和容器之前直接返回
+        analysis = self.code_analyzer.analyze(request.code)
+        if not analysis.ok:
+            return ExecuteResult(stdout="", stderr=analysis.error_message(), execution_time=0.0)
+
+        if self.draining:
+            return ExecuteResult(stdout="", stderr="Executor is shutting down", execution_time=0.0)
+
+        # docker daemon 熔断中：不排队、不占容器，直接返回可重试的错误
+        retry_after = self.docker_breaker.retry_after()
+        if retry_after > 0:
+            self._ensure_docker_recovery()
+            self.metrics.inc("executor_rejections_total", reason="docker_unavailable")
+            error = CircuitOpenError(retry_after)
+            return ExecuteResult(stdout="", stderr=str(error), execution_time=0.0, retry_after=error.retry_after)
+
+        execution_id = request.execution_id or new_execution_id()
+        if not is_valid_execution_id(execution_id):
+            return ExecuteResult(stdout="", stderr=f"Invalid execution id: {execution_id}", execution_time=0.0)
+        if request.profiler and request.profiler not in PROFILER_MODES:
+            return ExecuteResult(
+                stdout="",
+                stderr=f"Unsupported profiler: {request.profiler} (supported: {', '.join(PROFILER_MODES)})",
+                execution_time=0.0,
+            )
+
+        try:
+            profile = self._resolve_profile(request.resource_profile)
+        except ValueError as e:
+            return ExecuteResult(stdout="", stderr=str(e), execution_time=0.0)
+
+        tenant = self.tenants.get(request.tenant)
+        # 登记后可通过 cancel() 按执行 ID 取消（排队中同样生效）
+        try:
+            running = self.executions.register(execution_id, tenant.name, asyncio.current_task())
+        except ValueError as e:
+            return ExecuteResult(stdout="", stderr=str(e), execution_time=0.0)
+        start_time = time.time()
+        try:
+            # 产物名由执行 ID 决定：已有产物的 ID 不能复用，否则会覆盖之前的产物（登记后再查，并发请求不会同时通过）
+            loop = asyncio.get_running_loop()
+            if await loop.run_in_executor(None, self.artifact_store.has_execution, execution_id):
+                return ExecuteResult(
+                    stdout="", stderr=f"Execution id already in use: {execution_id}", execution_time=0.0
+                )
+            return await self._execute_registered(request, analysis, profile, tenant, running)
+        except asyncio.CancelledError:
+            self.metrics.inc("executor_cancellations_total", reason=running.cancel_reason or "caller")
+            # 调度名额已随 reserve 退出释放；容器内作业的结束、容器归还与目录清理在后台完成
+            self._spawn_background(self._abandon_execution(running))
+            if not running.cancel_reason:
+                raise
+            asyncio.current_task().uncancel()
+            exec_result = ExecuteResult(
+                stdout="",
+                stderr="Execution cancelled",
+                execution_time=time.time() - start_time,
+            )
+            self._record_execution_metrics(profile, exec_result, tenant.name)
+            return exec_result
+        finally:
+            self.executions.unregister(execution_id)
+
+    def cancel(self, execution_id: str, tenant: Optional[str] = None, reason: str = "request") -> bool:
+        """取消进行中/排队中的执行；tenant 不为 None 时只能取消本租户的执行"""
+        return self.executions.cancel(execution_id, tenant, reason)
+
+    async def _in_thread(self, running: RunningExecution, fn, *args):
+        """在线程池中执行一个步骤，并记录下来供取消时等待"""
+        running.pending = self.executor.submit(fn, *args)
+        return await asyncio.wrap_future(running.pending)
+
+    async def _execute_registered(
+        self,
+        request: ExecuteRequest,
+        analysis: CodeAnalysis,
+        profile: ResourceProfile,
+        tenant: Tenant,
+        running: RunningExecution,
+    ) -> ExecuteResult:
         # 确保容器池已初始化
         if not self.pool_initialized:
             await self.initialize()
 
-        async with self.container_semaphore:  # 限制并发容器数量
-            execution_id = str(uuid.uuid4())
+        execution_id = running.execution_id
+        queued_at = time.monotonic()
+        # 按资源档位限制并发并装箱，租户间按权重公平排队
+        async with self.scheduler.reserve(profile, tenant.name, tenant.weight, tenant.max_concurrency):
+            self.metrics.observe("tenant_queue_wait_seconds", time.monotonic() - queued_at, tenant=tenant.name)
             start_time = time.time()
             container_id = None
+            code_hash = analysis.short_hash
 
             try:
                 # 尝试从容器池获取容器
                 await self._ensure_warm_pool()
-                async with self.container_pool_lock:
-                    if self.container_pool:
-                        container_id = self.container_pool.pop(0)
-                        self.in_use_pool_containers.add(container_id)
+                container_id = running.container_id = await self._checkout_pool_container(profile)
+                if not container_id:
+                    running.container_name = self._cold_container_name()
 
                 # 在线程池中准备代码文件
-                input_dir, url_to_container_path, inputs = await asyncio.get_event_loop().run_in_executor(
-                    self.executor,
+                input_dir, url_to_container_path, inputs = await self._in_thread(
+                    running,
                     self._download_input_files,
                     execution_id,
                     request.files
                 )
                 rewritten_code = self._rewrite_code_for_input_files(request.code, url_to_container_path)
 
-                code_file = await asyncio.get_event_loop().run_in_executor(
-                    self.executor,
+                code_file = await self._in_thread(
+                    running,
                     self._prepare_code_file,
                     execution_id,
-                    rewritten_code
+                    rewritten_code,
+                    request.figure_options,
+                    analysis,
+                    input_dir
                 )
 
                 # 在线程池中运行代码
-                run_result = await asyncio.get_event_loop().run_in_executor(
-                    self.executor,
+                running.job = self.executor.submit(
                     self._run_code,
                     execution_id,
                     code_file,
                     container_id,
-                    input_dir
+                    input_dir,
+                    profile,
+                    profiler=request.profiler,
+                    container_name=running.container_name,
                 )
+                running.pending = running.job
+                run_result = await asyncio.wrap_future(running.job)
 
                 execution_time = time.time() - start_time
 
-                output_dir = f"/tmp/python_executor/{execution_id}/output"
-                files = await asyncio.get_event_loop().run_in_executor(
-                    self.executor,
+                output_dir = os.path.join(self.workspaces.work_dir(execution_id), "output")
+                files = await self._in_thread(
+                    running,
                     self._persist_output_files,
                     execution_id,
-                    output_dir
+                    output_dir,
+                    tenant.name,
                 )
-
-                # 在线程池中清理临时文件
-                await asyncio.get_event_loop().run_in_executor(
-                    self.executor,
-                    self._cleanup,
-                    execution_id
+                images = await self._in_thread(
+                    running,
+                    self._persist_figures,
+                    execution_id,
+                    output_dir,
+                    tenant.name,
                 )
-
-                # 如果使用了池中的容器，将其放回池中
+                profile_report = None
+                if request.profiler:
+                    profile_report = await self._in_thread(
+                        running,
+                        self._persist_profile,
+                        execution_id,
+                        output_dir,
+                        tenant.name,
+                    )
+                outputs = []
+                if self.settings.display_outputs:
+                    outputs = await self._in_thread(
+                        running,
+                        self._persist_display_outputs,
+                        execution_id,
+                        output_dir,
+                        tenant.name,
+                    )
+
+                # 产物已移入存储，临时目录交给后台线程删除，不占请求耗时
+                self.background_executor.submit(self._cleanup, execution_id)
+
+                # 如果使用了池中的容器，按回收策略归还
                 if container_id and container_id.startswith(self.pool_container_prefix):
-                    async with self.container_pool_lock:
-                        self.in_use_pool_containers.discard(container_id)
-                        if container_id not in self.container_pool:
-                            self.container_pool.append(container_id)
-
-                return ExecuteResult(
+                    probe = run_result.get("container_probe")
+                    probe_failed = "container_probe" in run_result and probe is None
+                    # container_id 已清空，取消时 _abandon_execution 不会再归还：归还本身不能被取消打断
+                    running.container_id = None
+                    await asyncio.shield(self._release_pool_container(container_id, probe, probe_failed=probe_failed))
+
+                usage = run_result.get("resource_usage")
+                exec_result = ExecuteResult(
                     stdout=run_result.get("output", "") or "",
                     stderr=run_result.get("error", None),
                     execution_time=execution_time,
-                    image_filename=run_result.get("image_filename"),
+                    image_filename=images[0].filename if images else None,
+                    images=images,
                     files=files,
                     inputs=inputs,
+                    resource_usage=ResourceUsage.from_dict(usage, code_hash) if usage else None,
+                    profile=profile_report,
+                    outputs=outputs,
                 )
+                self._record_execution_metrics(profile, exec_result, tenant.name)
 
             except Exception as e:
-                # 如果使用了池中的容器，将其放回池中
+                # 如果使用了池中的容器，将其放回池中；daemon 熔断时无法确认容器已清理，按探测失败处理
                 if container_id and container_id.startswith(self.pool_container_prefix):
-                    async with self.container_pool_lock:
-                        self.in_use_pool_containers.discard(container_id)
-                        if container_id not in self.container_pool:
-                            self.container_pool.append(container_id)
+                    running.container_id = None
+                    await asyncio.shield(
+                        self._release_pool_container(container_id, probe_failed=isinstance(e, CircuitOpenError))
+                    )
 
                 await asyncio.get_event_loop().run_in_executor(
                     self.executor,
                     self._cleanup,
                     execution_id
                 )
-                return ExecuteResult(
+                exec_result = ExecuteResult(
                     stdout="",
                     stderr=str(e),
                     execution_time=time.time() - start_time,
                     image_filename=None,
                     files=[],
                     inputs=[],
+                    retry_after=e.retry_after if isinstance(e, CircuitOpenError) else None,
                 )
+                self._record_execution_metrics(profile, exec_result, tenant.name)
+                return exec_result
+
+        # 上传放在释放执行资源之后，不占用调度容量
+        return await self._publish_artifacts(exec_result)
+
+    async def _kill_running_job(self, running: RunningExecution):
+        """结束容器内仍在运行的作业：client/runner 收到 SIGTERM 后结束作业所在的整个进程组"""
+        if running.container_id:
+            await self._run_docker("docker", "exec", running.container_id, "pkill", "-TERM", "-f", "/code/script.py")
+        elif running.container_name:
+            await self._run_docker("docker", "kill", running.container_name)
+
+    async def _abandon_execution(self, running: RunningExecution):
+        """被取消的执行：结束容器内作业，等线程中的步骤返回后归还容器并清理工作目录"""
+        job = running.job
+        if job is not None and not job.done():
+            try:
+                await self._kill_running_job(running)
+            except Exception:
+                pass
+        pending = running.pending
+        if pending is not None and not pending.cancelled():
+            try:
+                await asyncio.wrap_future(pending)
+            except Exception:
+                pass
+
+        loop = asyncio.get_event_loop()
+        container_id = running.container_id
+        if container_id and container_id.startswith(self.pool_container_prefix):
+            probe, probe_failed = None, False
+            if job is not None:
+                # 代码已进入容器：重新清理并探测一次，无法确认干净的容器不再复用
+                probe = await loop.run_in_executor(self.executor, self._probe_and_clean_container, container_id)
+                probe_failed = probe is None
+            await asyncio.shield(self._release_pool_container(container_id, probe, probe_failed=probe_failed))
+        await loop.run_in_executor(self.background_executor, self._cleanup, running.execution_id)
 
     async def execute_code(self, code):
         """异步执行代码（兼容旧接口：返回 dict）"""
@@ -516,171 +1474,149 @@ class CodeExecutor:
             public_base_url=self.settings.public_base_url,
         )
 
-    def _prepare_code_file(self, execution_id, code):
+    def _prepare_code_file(
+        self,
+        execution_id,
+        code,
+        figure_options: FigureOptions = None,
+        analysis: CodeAnalysis = None,
+        input_dir: str = "",
+    ):
         """准备代码文件"""
-        work_dir = f"/tmp/python_executor/{execution_id}"
-        os.makedirs(work_dir, exist_ok=True)
-        os.chmod(work_dir, 0o777)
+        work_dir = self.workspaces.work_dir(execution_id)
 
         # 检测需要的包
-        required_packages = self._detect_imports(code)
+        # 输入文件改写只替换字符串常量，import 集合与原始代码一致
+        if analysis is None:
+            analysis = self.code_analyzer.analyze(code)
+        required_packages = self._detect_imports(code, analysis)
+        uses_matplotlib = analysis.features.uses_matplotlib
+        columnar_inputs = self._has_columnar_inputs(input_dir)
+        display_outputs = self.settings.display_outputs
+        tree = self._code_tree(code, analysis)
+        # 前置代码在预编译的运行时模块 pyexec.preamble 中，这里只生成几行调用
         setup_code = ""
-        
+        if required_packages or uses_matplotlib or columnar_inputs or display_outputs:
+            setup_code = (
+                "import sys as _pyexec_sys\n"
+                f"_pyexec_sys.path.append('{os.path.dirname(RUNTIME_CONTAINER_DIR)}')\n"
+                "import pyexec.preamble as _pyexec_preamble\n"
+            )
+        if display_outputs:
+            # 提供内置 display()，并输出最后一个表达式的值
+            setup_code += (
+                "import pyexec.display as _pyexec_display\n"
+                f"_pyexec_display.configure('/code/output/{DISPLAY_DIR_NAME}', "
+                f"{int(self.settings.display_max_rows)}, {int(self.settings.display_output_max_bytes)}, "
+                f"{int(self.settings.display_max_outputs)})\n"
+            )
+            code = wrap_last_expression(code, tree, "_pyexec_display.display_result")
         if required_packages:
-            # 准备安装脚本 - 只安装尚未安装的包
-            setup_code = """
-import sys
-import subprocess
-from importlib import metadata
-
-def install_package(package):
-    try:
-        metadata.version(package)
-        return
-    except metadata.PackageNotFoundError:
-        pass
-
-    process = subprocess.run(
-        [sys.executable, '-m', 'pip', 'install', '--user', '--no-input', package],
-        capture_output=True,
-        text=True,
-    )
-    if process.returncode != 0:
-        raise RuntimeError(
-            (process.stderr or process.stdout or f"pip install failed: {package}").strip()
-        )
-
-"""
-            # 添加包安装代码
-            for package in required_packages:
-                setup_code += f"install_package('{package}')\n"
+            # 只安装尚未安装的包
+            setup_code += f"_pyexec_preamble.install_packages({list(required_packages)!r})\n"
+        if columnar_inputs:
+            # pandas.read_csv/read_excel 读取有列式副本的输入时直接内存映射副本
+            setup_code += "_pyexec_preamble.enable_columnar_inputs()\n"
 
         # 只有当代码中包含 matplotlib 时才添加设置代码
-        if 'plt' in code or 'matplotlib' in code:
-            setup_code += """
-import matplotlib.pyplot as plt
-import matplotlib as mpl
-
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['WenQuanYi Micro Hei']
-plt.rcParams['axes.unicode_minus'] = False
-"""
-            
-            # 在代码末尾添加图表检测和保存代码
-            code += """
+        if uses_matplotlib:
+            setup_code += (
+                "import matplotlib.pyplot as plt\n"
+                "import matplotlib as mpl\n"
+                "_pyexec_preamble.configure_matplotlib()\n"
+            )
+
+            # 在代码末尾保存所有未关闭的图表
+            options = figure_options or self._default_figure_options()
+            code += f"""
 
-# 检查是否有图表生成
-if 'plt' in globals() and plt.get_fignums():
-    plt.savefig('/code/output/result.png', dpi=300, bbox_inches='tight')
-    plt.close('all')
+# 保存所有未关闭的图表
+from pyexec.figures import save_all_figures as _pyexec_save_all_figures
+_pyexec_save_all_figures('/code/output/{FIGURE_DIR_NAME}', {options.format!r}, {int(options.dpi)}, {int(options.max_dimension)})
 """
 
-        # 组合完整代码
-        full_code = setup_code + "\n" + code
+        # 组合完整代码：前置代码放在模块文档字符串和 __future__ 导入之后（只改写了它们后面的部分，下标仍有效）
+        header_end = future_imports_end(code, tree)
+        header, code = code[:header_end], code[header_end:]
+        if header and not header.endswith(("\n", "\r")):
+            header += "\n"
+        full_code = header + setup_code + "\n" + code
         code_file = os.path.join(work_dir, "code.py")
         with open(code_file, 'w') as f:
             f.write(full_code)
-
-        os.chmod(code_file, 0o666)
-        # 创建输出目录
-        output_dir = os.path.join(work_dir, "output")
-        os.makedirs(output_dir, exist_ok=True)
-        os.chmod(output_dir, 0o777)
         return code_file
 
-    def _run_code(self, execution_id, code_file, container_id=None, input_dir: str = ""):
+    @staticmethod
+    def _code_tree(code: str, analysis: CodeAnalysis) -> Optional[ast.Module]:
+        """复用预检解析出的 AST；代码被改写过（如输入文件路径）时重新解析"""
+        if analysis.tree is not None and analysis.code_hash == compute_code_hash(code):
+            return analysis.tree
+        try:
+            return ast.parse(code)
+        except (SyntaxError, ValueError):
+            return None
+
+    @staticmethod
+    def _has_columnar_inputs(input_dir: str) -> bool:
+        if not input_dir:
+            return False
+        try:
+            return any(name.endswith(COLUMNAR_SIDECAR_SUFFIX) for name in os.listdir(input_dir))
+        except OSError:
+            return False
+
+    def _run_code(
+        self,
+        execution_id,
+        code_file,
+        container_id=None,
+        input_dir: str = "",
+        profile: ResourceProfile = None,
+        profiler: str = "",
+        container_name: str = "",
+    ):
         """在Docker容器中运行代码"""
-        work_dir = f"/tmp/python_executor/{execution_id}"
-        output_dir = os.path.join(work_dir, "output")
-        
-        # 确保输出目录有正确的权限
-        os.chmod(output_dir, 0o777)
-        
+        output_dir = os.path.join(self.workspaces.work_dir(execution_id), "output")
+
         if container_id:
             # 使用已存在的容器
             return self._run_in_existing_container(
-                execution_id, code_file, output_dir, container_id, input_dir
+                execution_id, code_file, output_dir, container_id, input_dir, profiler
             )
         else:
             # 创建新容器
-            return self._run_in_container(execution_id, code_file, input_dir)
+            return self._run_in_container(execution_id, code_file, input_dir, profile, profiler, container_name)
 
-    def _run_in_existing_container(self, execution_id, code_file, output_dir, container_id, input_dir: str = ""):
+    def _run_in_existing_container(
+        self, execution_id, code_file, output_dir, container_id, input_dir: str = "", profiler: str = ""
+    ):
         """在已存在的容器中运行代码"""
         try:
             # 复制代码文件到容器
             copy_cmd = ["docker", "cp", code_file, f"{container_id}:/code/script.py"]
-            subprocess.run(copy_cmd, check=True, capture_output=True)
+            self._docker(copy_cmd, check=True)
             
-            # 准备输入目录并拷贝文件
+            # 拷贝输入文件；/code/input 与 /code/output 已由上一次执行后的探测脚本清空，
+            # 探测失败的容器不会再回到池中，这里无需额外的 docker exec 清理
             has_input = bool(input_dir) and os.path.isdir(input_dir) and os.listdir(input_dir)
             if has_input:
-                prepare_input_cmd = [
-                    "docker", "exec", container_id,
-                    "bash", "-c",
-                    "mkdir -p /code/input && rm -rf /code/input/*"
-                ]
-                subprocess.run(prepare_input_cmd, check=True, capture_output=True)
                 copy_input_cmd = ["docker", "cp", f"{input_dir}/.", f"{container_id}:/code/input"]
-                subprocess.run(copy_input_cmd, check=True, capture_output=True)
+                self._docker(copy_input_cmd, check=True)
 
-            # 准备输出目录（清空旧产物）
-            prepare_output_cmd = [
-                "docker", "exec", container_id,
-                "bash", "-c",
-                "mkdir -p /code/output && rm -rf /code/output/*"
-            ]
-            subprocess.run(prepare_output_cmd, check=True, capture_output=True)
-            
-            # 执行代码
+            # 执行代码：墙钟/CPU 时限由 client 在容器内执行，超限时整会话杀掉
             exec_workdir_args = ["-w", "/code/input"] if has_input else []
             exec_cmd = [
-                "docker", "exec", *exec_workdir_args, container_id,
-                "bash", "-c",
-                (
-                    f"if command -v timeout >/dev/null 2>&1; then "
-                    f"timeout -k 2s {self.timeout}s python /code/script.py; "
-                    f"else python /code/script.py; fi"
-                )
+                "docker", "exec", *exec_workdir_args, *self._job_limit_env_args(profiler), container_id,
+                "python", f"{RUNTIME_CONTAINER_DIR}/client.py", "/code/script.py",
             ]
-            process = subprocess.run(
+            process = self._docker(
                 exec_cmd,
-                capture_output=True,
                 text=True,
-                timeout=self.timeout + 5
+                timeout=self.timeout + JOB_LIMIT_GRACE_SECONDS,
+                user_output=True,
             )
             
-            result = {
-                'output': process.stdout.strip(),
-                'error': process.stderr if process.returncode != 0 else None,
-            }
-            
-            # 处理图片输出
-            image_path = os.path.join(output_dir, "result.png")
-            has_image_cmd = [
-                "docker", "exec", container_id,
-                "bash", "-c",
-                "test -f /code/output/result.png"
-            ]
-            has_image = subprocess.run(has_image_cmd, capture_output=True).returncode == 0
-            if has_image:
-                copy_image_cmd = [
-                    "docker", "cp",
-                    f"{container_id}:/code/output/result.png",
-                    image_path,
-                ]
-                subprocess.run(copy_image_cmd, check=True, capture_output=True)
-
-                timestamp = int(time.time())
-                image_filename = f"plot_{execution_id}_{timestamp}.png"
-                permanent_path = os.path.join(
-                    self.settings.image_store_path,
-                    image_filename
-                )
-                os.makedirs(os.path.dirname(permanent_path), exist_ok=True)
-                shutil.move(image_path, permanent_path)
-                os.chmod(permanent_path, 0o666)
-                result["image_filename"] = image_filename
+            result = self._process_result(process)
 
             container_list_cmd = [
                 "docker", "exec", container_id,
@@ -693,68 +1629,157 @@ if 'plt' in globals() and plt.get_fignums():
                     "    fp=os.path.join(p,n)\n"
                     "    if os.path.isfile(fp):\n"
                     "        items.append({'name': n, 'size': os.path.getsize(fp)})\n"
-                    "print(json.dumps(items, ensure_ascii=False))\n"
+                    f"fd=os.path.join(p,'{FIGURE_DIR_NAME}')\n"
+                    "figures=os.path.isdir(fd) and bool(os.listdir(fd))\n"
+                    f"profile=os.path.isdir(os.path.join(p,'{PROFILE_DIR_NAME}'))\n"
+                    f"display=os.path.isdir(os.path.join(p,'{DISPLAY_DIR_NAME}'))\n"
+                    "print(json.dumps({'files': items, 'figures': figures, 'profile': profile, 'display': display},"
+                    " ensure_ascii=False))\n"
                 ),
             ]
-            listed = subprocess.run(container_list_cmd, capture_output=True, text=True)
+            listed = self._docker(container_list_cmd, text=True)
             if listed.returncode == 0 and listed.stdout.strip():
                 try:
-                    items = json.loads(listed.stdout.strip())
+                    listing = json.loads(listed.stdout.strip())
                 except Exception:
-                    items = []
-
-                for item in items:
+                    listing = {}
+
+                # 图表目录整体一次拷出
+                if listing.get("figures"):
+                    copy_figures_cmd = [
+                        "docker", "cp",
+                        f"{container_id}:/code/output/{FIGURE_DIR_NAME}",
+                        os.path.join(output_dir, FIGURE_DIR_NAME),
+                    ]
+                    self._docker(copy_figures_cmd)
+                if listing.get("profile"):
+                    copy_profile_cmd = [
+                        "docker", "cp",
+                        f"{container_id}:/code/output/{PROFILE_DIR_NAME}",
+                        os.path.join(output_dir, PROFILE_DIR_NAME),
+                    ]
+                    self._docker(copy_profile_cmd)
+                if listing.get("display"):
+                    copy_display_cmd = [
+                        "docker", "cp",
+                        f"{container_id}:/code/output/{DISPLAY_DIR_NAME}",
+                        os.path.join(output_dir, DISPLAY_DIR_NAME),
+                    ]
+                    self._docker(copy_display_cmd)
+
+                for item in listing.get("files") or []:
                     name = self._sanitize_filename(str(item.get("name", "")))
                     if not self._is_allowed_output_file(name):
                         continue
                     dst_path = os.path.join(output_dir, name)
                     copy_cmd = ["docker", "cp", f"{container_id}:/code/output/{name}", dst_path]
-                    subprocess.run(copy_cmd, check=False, capture_output=True)
+                    self._docker(copy_cmd)
                 
-            # 清理容器中的临时文件
-            cleanup_cmd = ["docker", "exec", container_id, "rm", "-f", "/code/script.py"]
-            subprocess.run(cleanup_cmd, capture_output=True)
-            cleanup_output_cmd = [
-                "docker", "exec", container_id,
-                "bash", "-c",
-                "rm -rf /code/output/*"
-            ]
-            subprocess.run(cleanup_output_cmd, capture_output=True)
-            if has_input:
-                subprocess.run(
-                    ["docker", "exec", container_id, "bash", "-c", "rm -rf /code/input/*"],
-                    capture_output=True
-                )
-            
+            # 清理容器中的临时文件，同时采集回收策略所需的容器状态
+            result["container_probe"] = self._probe_and_clean_container(container_id)
+
             return result
             
         except subprocess.TimeoutExpired:
-            # 超时兜底：尽力清理本次脚本与输出
-            subprocess.run(
-                ["docker", "exec", container_id, "pkill", "-f", "/code/script.py"],
-                capture_output=True
-            )
-            subprocess.run(
-                ["docker", "exec", container_id, "bash", "-c", "rm -rf /code/output/* /code/script.py"],
-                capture_output=True
-            )
-            return {'error': 'Execution timeout'}
+            # 监督进程失灵时的兜底：探测脚本会杀掉容器内所有残留进程（含 client 本身）并清理产物
+            return {
+                'error': 'Execution timeout',
+                'resource_usage': {'timeout_hit': True},
+                'container_probe': self._probe_and_clean_container(container_id),
+            }
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            return {'error': str(e)}
+            return {'error': str(e), 'container_probe': self._probe_and_clean_container(container_id)}
 
-    def _run_in_container(self, execution_id, code_file, input_dir: str = ""):
-        """在新Docker容器中运行代码"""
-        work_dir = f"/tmp/python_executor/{execution_id}"
-        output_dir = os.path.join(work_dir, "output")
-        container_name = f"python_exec_{execution_id}"
+    def _job_limit_env_args(self, profiler: str = "") -> list[str]:
+        """传给容器内作业监督进程（client.py / runner.py）的时限，以及性能分析选项"""
+        args = [
+            "-e", f"PYEXEC_TIMEOUT={self.timeout}",
+            "-e", f"PYEXEC_CPU_SECONDS={max(0.0, float(self.settings.execution_cpu_seconds or 0))}",
+        ]
+        if profiler:
+            args += [
+                "-e", f"PYEXEC_PROFILE={profiler}",
+                "-e", f"PYEXEC_PROFILE_INTERVAL={max(0.001, float(self.settings.profile_sample_interval_seconds))}",
+                "-e", f"PYEXEC_PROFILE_TOP={max(1, int(self.settings.profile_top_n))}",
+                "-e", f"PYEXEC_PROFILE_DIR=/code/output/{PROFILE_DIR_NAME}",
+            ]
+        return args
 
-        # 确保输出目录有正确的权限
-        os.chmod(output_dir, 0o777)
+    def _split_usage(self, stderr: str):
+        """从 stderr 中摘出 runner 回报的资源使用行"""
+        stderr = stderr or ""
+        idx = stderr.rfind(USAGE_MARKER)
+        if idx < 0:
+            return stderr, None
+        line_end = stderr.find("\n", idx)
+        payload = stderr[idx + len(USAGE_MARKER):] if line_end < 0 else stderr[idx + len(USAGE_MARKER):line_end]
+        try:
+            usage = json.loads(payload)
+        except ValueError:
+            return stderr, None
+        # runner 在回报行前额外写了一个换行
+        head = stderr[:idx]
+        if head.endswith("\n"):
+            head = head[:-1]
+        tail = "" if line_end < 0 else stderr[line_end + 1:]
+        return head + tail, usage if isinstance(usage, dict) else None
+
+    def _process_result(self, process) -> dict:
+        stderr, usage = self._split_usage(process.stderr)
+        error = stderr if process.returncode != 0 else None
+        if usage:
+            if usage.get("timeout_hit") and not (error or "").strip():
+                error = "Execution timeout"
+            elif usage.get("cpu_limit_hit") and not (error or "").strip():
+                error = "CPU time limit exceeded"
+            elif usage.get("memory_limit_hit") and not (error or "").strip():
+                error = "Memory limit exceeded"
+        return {
+            'output': process.stdout.strip(),
+            'error': error,
+            'resource_usage': usage,
+        }
+
+    def _probe_and_clean_container(self, container_id):
+        """清理池容器内的本次产物，并返回内存/磁盘/残留进程情况"""
+        try:
+            process = self._docker(
+                ["docker", "exec", container_id, "python", "-c", CONTAINER_PROBE_SCRIPT, self.zygotes.get(container_id, "")],
+                text=True,
+                timeout=30,
+            )
+        except (CircuitOpenError, OSError, subprocess.SubprocessError):
+            # 无法确认容器已清理干净：按探测失败处理，不再复用
+            return None
+        if process.returncode != 0:
+            return None
+        return ContainerProbe.from_json(process.stdout)
+
+    @staticmethod
+    def _cold_container_name() -> str:
+        """冷启动容器名由服务端生成：执行 ID 由调用方指定，拼进容器名可能与池容器等同名"""
+        return f"{COLD_NAME_PREFIX}{uuid.uuid4().hex}"
+
+    def _run_in_container(
+        self,
+        execution_id,
+        code_file,
+        input_dir: str = "",
+        profile: ResourceProfile = None,
+        profiler: str = "",
+        container_name: str = "",
+    ):
+        """在新Docker容器中运行代码"""
+        output_dir = os.path.join(self.workspaces.work_dir(execution_id), "output")
+        container_name = container_name or self._cold_container_name()
 
         has_input = bool(input_dir) and os.path.isdir(input_dir) and os.listdir(input_dir)
         mounts = [
             "-v", f"{code_file}:/code/script.py:ro",
             "-v", f"{output_dir}:/code/output",
+            "-v", f"{self._stage_runtime()}:{RUNTIME_CONTAINER_DIR}:ro",
         ]
         if has_input:
             mounts.extend(["-v", f"{input_dir}:/code/input:ro"])
@@ -763,87 +1788,99 @@ if 'plt' in globals() and plt.get_fignums():
             "docker", "run",
             "--rm",
             "--name", container_name,  # 为容器指定唯一名称
-            *self._docker_run_base_args(),
+            "--label", f"{COLD_LABEL}=true",
+            "--label", f"{INSTANCE_LABEL}={self.pool_container_prefix}",
+            *self._docker_run_base_args(profile),
+            *self._job_limit_env_args(profiler),
             *mounts,
             "-w", "/code/input" if has_input else "/code",
             self.docker_image,
-            "python", "/code/script.py"
+            "python", f"{RUNTIME_CONTAINER_DIR}/runner.py", "/code/script.py"
         ]
 
         try:
-            process = subprocess.run(
+            process = self._docker(
                 cmd,
-                capture_output=True,
                 text=True,
-                timeout=self.timeout
+                timeout=self.timeout + JOB_LIMIT_GRACE_SECONDS,
+                user_output=True,
             )
 
-            result = {
-                'output': process.stdout.strip(),
-                'error': process.stderr if process.returncode != 0 else None,
-            }
-
-            # 处理图片输出
-            image_path = os.path.join(output_dir, "result.png")
-            if os.path.exists(image_path):
-                timestamp = int(time.time())
-                image_filename = f"plot_{execution_id}_{timestamp}.png"
-                permanent_path = os.path.join(
-                    self.settings.image_store_path,
-                    image_filename
-                )
-                os.makedirs(os.path.dirname(permanent_path), exist_ok=True)
-                shutil.move(image_path, permanent_path)
-                os.chmod(permanent_path, 0o666)
-                result["image_filename"] = image_filename
-
-            return result
+            return self._process_result(process)
 
         except subprocess.TimeoutExpired:
-            # 超时时强制停止并删除容器
-            subprocess.run(["docker", "stop", container_name], capture_output=True)
-            subprocess.run(["docker", "rm", container_name], capture_output=True)
-            return {'error': 'Execution timeout'}
+            # 超时时强制删除容器
+            self._docker_best_effort(["docker", "rm", "-f", container_name])
+            return {'error': 'Execution timeout', 'resource_usage': {'timeout_hit': True}}
+        except CircuitOpenError:
+            raise
         except Exception as e:
             # 确保清理容器
-            subprocess.run(["docker", "stop", container_name], capture_output=True)
-            subprocess.run(["docker", "rm", container_name], capture_output=True)
+            self._docker_best_effort(["docker", "rm", "-f", container_name])
             return {'error': str(e)}
 
     def _cleanup(self, execution_id):
-        """清理临时文件"""
-        work_dir = f"/tmp/python_executor/{execution_id}"
-        if os.path.exists(work_dir):
-            subprocess.run(["rm", "-rf", work_dir])
+        """清理临时文件（进程内删除，不再 fork rm -rf）"""
+        self.workspaces.release(execution_id)
             
     async def shutdown(self):
-        """关闭执行器，清理所有资源"""
+        """关闭执行器：停止接单并在期限内等待进行中的任务，然后并行删除所有池容器"""
+        self.draining = True
         self.keepalive_stop_event.set()
-        if self.keepalive_task:
-            self.keepalive_task.cancel()
+        for task in (self.keepalive_task, self.concurrency_task):
+            if not task:
+                continue
+            task.cancel()
             try:
-                await self.keepalive_task
+                await task
             except asyncio.CancelledError:
                 pass
             except Exception:
                 pass
 
-        # 关闭线程池
-        self.executor.shutdown(wait=True)
-        
-        # 停止并删除所有容器池中的容器
+        drained = await self._drain(max(0.0, float(self.settings.shutdown_drain_seconds)))
+        if not drained:
+            # 期限内未结束的执行直接取消，容器内作业随之结束
+            self.executions.cancel_all("shutdown")
+            await asyncio.sleep(0)
+
+        for task in list(self.background_tasks):
+            task.cancel()
+
         container_ids = set(self._pool_container_names())
         async with self.container_pool_lock:
-            container_ids.update(self.container_pool)
+            container_ids.update(self.pool_containers)
             container_ids.update(self.in_use_pool_containers)
-            self.container_pool = []
+            self.container_pool = {}
             self.in_use_pool_containers = set()
+            self.pool_containers = {}
+            self.zygotes = {}
 
-        for container_id in container_ids:
-            if not container_id.startswith(self.pool_container_prefix):
-                continue
-            try:
-                subprocess.run(["docker", "stop", container_id], capture_output=True)
-                subprocess.run(["docker", "rm", container_id], capture_output=True)
-            except Exception:
-                pass
+        # 池容器没有需要优雅退出的状态，直接 rm -f，不等 docker stop 的 10 秒宽限期
+        async def _remove(container_id: str):
+            async with self.bootstrap_semaphore:
+                try:
+                    await self._remove_container(container_id)
+                except Exception:
+                    pass
+
+        await asyncio.gather(*(
+            _remove(container_id)
+            for container_id in container_ids
+            if container_id.startswith(self.pool_container_prefix)
+        ))
+
+        # 容器删除后仍在线程池中等待 docker 的任务会立即返回；未排干时不再等待排队中的任务
+        self.executor.shutdown(wait=drained, cancel_futures=not drained)
+        self.background_executor.shutdown(wait=drained, cancel_futures=not drained)
+        self.columnar_cache.close()
+
+    async def _drain(self, deadline_seconds: float) -> bool:
+        """等待进行中/排队中的任务结束，超过期限返回 False"""
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + deadline_seconds
+        while self.scheduler.active or self.scheduler.queued:
+            if loop.time() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
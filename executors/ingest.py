@@ -0,0 +1,244 @@
+"""Host-side cache of tabular inputs converted to Arrow (Feather v2), keyed by content hash."""
+from __future__ import annotations
+
+import importlib.metadata
+import importlib.util
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from common.metrics import MetricsRegistry
+from common.settings import Settings
+from executors.runtime.tabular import SIDECAR_SUFFIX
+from executors.workspace import DISK_SCRATCH_ROOT
+
+# 可转换的输入扩展名 -> pandas 读取函数名
+TABULAR_EXTENSIONS = {"csv": "read_csv", "xlsx": "read_excel", "xls": "read_excel"}
+DEFAULT_CACHE_DIR = os.path.join(DISK_SCRATCH_ROOT, ".columnar")
+
+
+def _dependencies_available() -> bool:
+    return all(importlib.util.find_spec(name) is not None for name in ("pandas", "pyarrow"))
+
+
+def _pandas_version() -> str:
+    try:
+        return importlib.metadata.version("pandas")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+# 在子进程中解析：输入来自用户，先设置内存/CPU/输出大小上限再导入 pandas，解析炸弹只会拖垮这个子进程
+CONVERT_SCRIPT = """
+import resource, sys
+src_path, dst_path, reader, memory_bytes, cpu_seconds = sys.argv[1:6]
+for limit, value in ((resource.RLIMIT_AS, int(memory_bytes)), (resource.RLIMIT_FSIZE, int(memory_bytes)),
+                     (resource.RLIMIT_CPU, int(cpu_seconds))):
+    if value > 0:
+        resource.setrlimit(limit, (value, value))
+import pandas as pd
+getattr(pd, reader)(src_path).to_feather(dst_path, compression='uncompressed')
+"""
+
+
+def convert_to_feather(
+    src_path: str,
+    dst_path: str,
+    reader: str,
+    memory_bytes: int = 0,
+    cpu_seconds: int = 0,
+    timeout: Optional[float] = None,
+):
+    """
+    用 pandas 默认参数解析后写成不压缩的 Feather（容器内可直接内存映射）。
+    解析在受限的子进程中进行（0 表示不限）；失败、超限或超时抛出 subprocess.SubprocessError。
+    """
+    env = dict(os.environ, OMP_NUM_THREADS="1", OPENBLAS_NUM_THREADS="1", MKL_NUM_THREADS="1")
+    process = subprocess.run(
+        [sys.executable, "-c", CONVERT_SCRIPT, src_path, dst_path, reader, str(int(memory_bytes)), str(int(cpu_seconds))],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        env=env,
+        timeout=timeout or None,
+    )
+    if process.returncode != 0:
+        error = process.stderr.decode(errors="replace").strip().splitlines()
+        raise subprocess.CalledProcessError(process.returncode, reader, stderr=error[-1] if error else "")
+
+
+class ColumnarCache:
+    """
+    输入文件的列式副本：按内容哈希缓存在宿主机磁盘上，命中时放到原文件旁（<name>.feather）。
+    未命中时不阻塞本次执行，在后台线程转换（解析在受限子进程中，见 convert_to_feather），之后相同内容的输入直接命中。
+    缓存键包含 pandas 版本：升级后按新版本的解析结果重新转换。
+    需要网关安装 pandas 与 pyarrow（Excel 还需要 openpyxl/xlrd），不可用时整个功能跳过。
+    """
+
+    def __init__(self, settings: Settings, metrics: MetricsRegistry = None):
+        self.root = settings.input_columnar_cache_dir or DEFAULT_CACHE_DIR
+        self.min_bytes = max(0, int(settings.input_columnar_min_bytes))
+        self.max_bytes = max(0, int(settings.input_columnar_cache_max_bytes))
+        self.max_input_bytes = max(0, int(settings.input_columnar_max_input_bytes))
+        self.memory_bytes = max(0, int(settings.input_columnar_memory_bytes))
+        self.cpu_seconds = max(0, int(settings.input_columnar_cpu_seconds))
+        self.timeout_seconds = max(0.0, float(settings.input_columnar_timeout_seconds))
+        self.pandas_version = ""
+        self.metrics = metrics or MetricsRegistry()
+        self._enabled = bool(settings.input_columnar_cache)
+        self._checked = False
+        self._lock = threading.Lock()
+        self._converting: set[str] = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.metrics.describe("executor_columnar_inputs_total", "counter", "Tabular inputs by columnar cache result")
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled and not self._checked:
+            self._checked = True
+            if not _dependencies_available():
+                logging.warning("INPUT_COLUMNAR_CACHE is on but pandas/pyarrow are not installed; skipping")
+                self._enabled = False
+            else:
+                self.pandas_version = _pandas_version()
+        return self._enabled
+
+    def _cache_path(self, digest: str) -> str:
+        return os.path.join(self.root, f"{digest}.pandas-{self.pandas_version}{SIDECAR_SUFFIX}")
+
+    def attach(self, src_path: str, digest: str) -> bool:
+        """命中时把列式副本放到 src_path 旁并返回 True；未命中时安排后台转换"""
+        ext = os.path.splitext(src_path)[1].lower().lstrip(".")
+        reader = TABULAR_EXTENSIONS.get(ext)
+        if reader is None or not self.enabled:
+            return False
+        try:
+            size = os.path.getsize(src_path)
+            if size < self.min_bytes or (self.max_input_bytes and size > self.max_input_bytes):
+                return False
+        except OSError:
+            return False
+
+        cached = self._cache_path(digest)
+        try:
+            _link_or_copy(cached, src_path + SIDECAR_SUFFIX)
+            # 按最近使用时间淘汰
+            os.utime(cached)
+            self.metrics.inc("executor_columnar_inputs_total", result="hit")
+            return True
+        except FileNotFoundError:
+            pass
+        except OSError:
+            self.metrics.inc("executor_columnar_inputs_total", result="failed")
+            return False
+
+        if os.path.exists(cached + ".failed"):
+            # 解析失败过的内容不再重试
+            return False
+        self.metrics.inc("executor_columnar_inputs_total", result="miss")
+        self._schedule_conversion(src_path, digest, reader)
+        return False
+
+    def _schedule_conversion(self, src_path: str, digest: str, reader: str):
+        with self._lock:
+            if digest in self._converting:
+                return
+            self._converting.add(digest)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            # 工作目录随执行结束删除，先在缓存目录里留一份源文件
+            os.makedirs(self.root, exist_ok=True)
+            source = os.path.join(self.root, f"{digest}.{uuid.uuid4().hex}.src")
+            _link_or_copy(src_path, source)
+            self._executor.submit(self._convert, source, digest, reader)
+        except (OSError, RuntimeError):
+            with self._lock:
+                self._converting.discard(digest)
+
+    def _convert(self, source: str, digest: str, reader: str):
+        cached = self._cache_path(digest)
+        tmp_path = f"{cached}.{uuid.uuid4().hex}.tmp"
+        try:
+            convert_to_feather(
+                source,
+                tmp_path,
+                reader,
+                memory_bytes=self.memory_bytes,
+                cpu_seconds=self.cpu_seconds,
+                timeout=self.timeout_seconds,
+            )
+            os.replace(tmp_path, cached)
+            self.prune()
+        except Exception:
+            logging.info("Columnar conversion failed for %s", digest, exc_info=True)
+            self.metrics.inc("executor_columnar_inputs_total", result="failed")
+            try:
+                open(cached + ".failed", "w").close()
+            except OSError:
+                pass
+        finally:
+            for path in (source, tmp_path):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            with self._lock:
+                self._converting.discard(digest)
+
+    def prune(self) -> int:
+        """缓存总大小超过 max_bytes 时按最近使用时间淘汰"""
+        try:
+            entries = [e for e in os.scandir(self.root) if e.name.endswith(SIDECAR_SUFFIX)]
+        except OSError:
+            return 0
+        stats = []
+        for entry in entries:
+            try:
+                stats.append((entry.stat().st_mtime, entry.stat().st_size, entry.path))
+            except OSError:
+                continue
+        total = sum(size for _mtime, size, _path in stats)
+        removed = 0
+        for _mtime, size, path in sorted(stats):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def wait(self):
+        """等待进行中的转换（测试与关闭时使用）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _link_or_copy(src: str, dst: str):
+    """同一文件系统上硬链接，否则复制；src 不存在时抛 FileNotFoundError"""
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        os.unlink(dst)
+        os.link(src, dst)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(src, dst)
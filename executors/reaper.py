@@ -0,0 +1,132 @@
+"""Reconcile executor containers against live state and pick out the orphans left by a crashed gateway."""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Container, Iterable, Optional
+
+# 池容器与冷启动容器共同的名字前缀：python_exec_pool_<instance>_...、python_exec_run_<随机串>
+# （旧版本的冷启动容器为 python_exec_<execution_id>）
+CONTAINER_NAME_PREFIX = "python_exec_"
+POOL_NAME_PREFIX = "python_exec_pool_"
+COLD_NAME_PREFIX = "python_exec_run_"
+INSTANCE_LABEL = "python_executor_instance"
+POOL_LABEL = "python_executor_pool"
+COLD_LABEL = "python_executor_cold"
+
+_LIST_FORMAT = "\t".join([
+    "{{.Names}}",
+    "{{.CreatedAt}}",
+    '{{.Label "%s"}}' % INSTANCE_LABEL,
+    '{{.Label "%s"}}' % POOL_LABEL,
+])
+
+
+@dataclass(frozen=True)
+class ContainerInfo:
+    name: str
+    # 创建时间（epoch 秒）；解析失败为 None，此时不按年龄判定
+    created_at: Optional[float] = None
+    instance: str = ""
+    pool: bool = False
+
+
+@dataclass(frozen=True)
+class ReapReport:
+    """一次回收的结果"""
+
+    pool_containers: tuple[str, ...] = ()
+    cold_containers: tuple[str, ...] = ()
+    workspaces: int = 0
+    # 删除失败的容器（下一轮重试）
+    failed: tuple[str, ...] = ()
+    seconds: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return len(self.pool_containers) + len(self.cold_containers) + self.workspaces
+
+    def to_dict(self) -> dict:
+        return {
+            "pool_containers": list(self.pool_containers),
+            "cold_containers": list(self.cold_containers),
+            "workspaces": self.workspaces,
+            "failed": list(self.failed),
+            "seconds": round(self.seconds, 3),
+        }
+
+
+@dataclass(frozen=True)
+class Orphans:
+    pool_containers: list[str] = field(default_factory=list)
+    cold_containers: list[str] = field(default_factory=list)
+
+
+def list_command() -> list[str]:
+    """列出（含已退出的）所有执行器容器"""
+    return [
+        "docker", "ps", "-a", "--no-trunc",
+        "--filter", f"name={CONTAINER_NAME_PREFIX}",
+        "--format", _LIST_FORMAT,
+    ]
+
+
+def parse_created_at(value: str) -> Optional[float]:
+    """`docker ps` 的 CreatedAt，形如 `2024-01-02 03:04:05 +0000 UTC`"""
+    parts = (value or "").split()
+    if len(parts) < 3:
+        return None
+    try:
+        return datetime.strptime(" ".join(parts[:3]), "%Y-%m-%d %H:%M:%S %z").timestamp()
+    except ValueError:
+        return None
+
+
+def parse_container_listing(stdout: str) -> list[ContainerInfo]:
+    containers = []
+    for line in (stdout or "").splitlines():
+        fields = line.split("\t")
+        name = fields[0].strip().lstrip("/")
+        # name 过滤是子串匹配，这里再按前缀确认
+        if not name.startswith(CONTAINER_NAME_PREFIX):
+            continue
+        fields += [""] * (4 - len(fields))
+        containers.append(
+            ContainerInfo(
+                name=name,
+                created_at=parse_created_at(fields[1]),
+                instance=fields[2].strip(),
+                pool=fields[3].strip().lower() == "true",
+            )
+        )
+    return containers
+
+
+def find_orphans(
+    containers: Iterable[ContainerInfo],
+    instance: str,
+    live_containers: Container[str],
+    max_cold_age_seconds: float,
+    now: Optional[float] = None,
+) -> Orphans:
+    """
+    - 本实例（instance 标签或名字前缀匹配）的池容器：不在槽位/池记录/创建中的即为孤儿；
+      其他实例的池容器归它们自己回收。
+    - 本实例的冷启动容器：不是进行中的执行所用的容器（live_containers）即为孤儿。
+    - 其他实例或旧版本（无标签）的冷启动容器：存在超过 max_cold_age_seconds（执行不可能持续这么久）即为孤儿。
+    """
+    now = time.time() if now is None else now
+    orphans = Orphans()
+    for info in containers:
+        if info.pool or info.name.startswith(POOL_NAME_PREFIX):
+            ours = info.instance == instance or (not info.instance and info.name.startswith(instance))
+            if ours and info.name not in live_containers:
+                orphans.pool_containers.append(info.name)
+            continue
+        if info.instance == instance:
+            if info.name not in live_containers:
+                orphans.cold_containers.append(info.name)
+        elif info.created_at is not None and now - info.created_at > max_cold_age_seconds:
+            orphans.cold_containers.append(info.name)
+    return orphans
@@ -0,0 +1,244 @@
+"""Pool container recycling policy."""
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from common.settings import Settings
+
+
+# 就绪探测：等到预热解释器的 socket 出现（zygote 完成预导入后才监听）。
+# 参数：socket 路径、最长等待秒数；在容器内轮询，只占一次 docker exec。
+CONTAINER_READY_SCRIPT = """
+import os, sys, time
+deadline = time.time() + float(sys.argv[2])
+while not os.path.exists(sys.argv[1]):
+    if time.time() > deadline:
+        sys.exit(1)
+    time.sleep(0.05)
+"""
+
+# 在池容器内执行：清理本次执行的残留（脚本/输入/输出，以及逃出作业会话的残留进程），并采集回收判断所需的指标。
+# 与清理合并为一次 docker exec，避免在请求路径上额外增加 fork。
+# 参数：网关启动 zygote 时记录的 `<pid>:<启动时间>`（容器内的 pid 文件用户代码可写，不可信）。
+CONTAINER_PROBE_SCRIPT = """
+import json, os, shutil, signal, sys, time
+
+def _clear(path):
+    try:
+        names = os.listdir(path)
+    except OSError:
+        return
+    for name in names:
+        target = os.path.join(path, name)
+        try:
+            if os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target, ignore_errors=True)
+            else:
+                os.remove(target)
+        except OSError:
+            pass
+
+def _memory_bytes():
+    # cgroup v2 的 anon / v1 的 total_rss 更接近常驻内存（不含 page cache）
+    for path, key in (
+        ('/sys/fs/cgroup/memory.stat', 'anon'),
+        ('/sys/fs/cgroup/memory/memory.stat', 'total_rss'),
+    ):
+        try:
+            with open(path) as f:
+                for line in f:
+                    k, _, v = line.partition(' ')
+                    if k == key:
+                        return int(v)
+        except (OSError, ValueError):
+            continue
+    return 0
+
+def _disk_bytes(roots):
+    total = 0
+    for root in roots:
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for name in filenames:
+                try:
+                    total += os.lstat(os.path.join(dirpath, name)).st_size
+                except OSError:
+                    pass
+    return total
+
+def _stat(pid):
+    # (父进程, 会话 ID, 启动时间)
+    try:
+        with open('/proc/%s/stat' % pid) as f:
+            stat = f.read()
+        fields = stat[stat.rfind(')') + 2:].split()
+        return fields[1], fields[3], fields[19]
+    except (OSError, IndexError):
+        return None
+
+def _cmdline(pid):
+    try:
+        with open('/proc/%s/cmdline' % pid, 'rb') as f:
+            return f.read().replace(b'\\0', b' ').strip()
+    except OSError:
+        return b''
+
+def _zygote_processes(identity):
+    # 只豁免网关记录的 zygote 本身（pid、启动时间、命令行、父进程为 init 都要对上）与它当前空闲的 spare；
+    # spare 接单后立即 setsid，仍在 zygote 会话中、父进程为 zygote 的只有空闲 spare
+    pid, _, started = identity.partition(':')
+    if not pid.isdigit():
+        return set()
+    stat = _stat(pid)
+    if stat is None or stat[2] != started or stat[0] != '1' or b'zygote.py' not in _cmdline(pid):
+        return set()
+    exempt = {int(pid)}
+    for child in os.listdir('/proc'):
+        if not child.isdigit():
+            continue
+        child_stat = _stat(child)
+        if child_stat and child_stat[0] == pid and child_stat[1] == stat[1] and b'zygote.py' in _cmdline(child):
+            exempt.add(int(child))
+    return exempt
+
+def _leftover_processes(exempt):
+    me = os.getpid()
+    pids = []
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit() or int(pid) in (1, me) or int(pid) in exempt:
+            continue
+        cmdline = _cmdline(pid)
+        if not cmdline or cmdline == b'tail -f /dev/null':
+            continue
+        pids.append(int(pid))
+    return pids
+
+def _kill_leftovers(exempt):
+    # 先全部 SIGSTOP（不能再 fork），再 SIGKILL，最多等 0.5 秒让内核回收
+    leftovers = _leftover_processes(exempt)
+    for signum in (signal.SIGSTOP, signal.SIGKILL):
+        for pid in leftovers:
+            try:
+                os.kill(pid, signum)
+            except OSError:
+                pass
+    deadline = time.time() + 0.5
+    remaining = _leftover_processes(exempt) if leftovers else []
+    while remaining and time.time() < deadline:
+        for pid in remaining:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+        time.sleep(0.02)
+        remaining = _leftover_processes(exempt)
+    return len(leftovers), len(remaining)
+
+try:
+    os.remove('/code/script.py')
+except OSError:
+    pass
+_clear('/code/output')
+_clear('/code/input')
+# 编译缓存只在 zygote 内存中；旧版本运行时的磁盘缓存（用户代码可写）一并删除
+shutil.rmtree('/tmp/pyexec/code-cache', ignore_errors=True)
+zygote = _zygote_processes(sys.argv[1] if len(sys.argv) > 1 else '')
+killed, remaining = _kill_leftovers(zygote)
+print(json.dumps({
+    'memory_bytes': _memory_bytes(),
+    'disk_bytes': _disk_bytes(['/tmp', '/root/.local', '/code']),
+    'leftover_processes': remaining,
+    'killed_processes': killed,
+    'zygote_alive': bool(zygote),
+}))
+"""
+
+
+@dataclass
+class PooledContainer:
+    """池容器的运行时状态（回收决策依据）"""
+    name: str
+    slot: int
+    profile: str = ""
+    created_at: float = field(default_factory=time.time)
+    uses: int = 0
+    # 已触发替换：新容器预热完成前仍可继续服务
+    retiring: bool = False
+    # 不再接收新任务，空闲后即删除
+    draining: bool = False
+
+
+@dataclass(frozen=True)
+class ContainerProbe:
+    memory_bytes: int = 0
+    disk_bytes: int = 0
+    # 清理后仍然存在的残留进程（杀不掉，如处于 D 状态）
+    leftover_processes: int = 0
+    zygote_alive: bool = True
+    # 本次清理杀掉的残留进程数
+    killed_processes: int = 0
+
+    @classmethod
+    def from_json(cls, text: str) -> Optional["ContainerProbe"]:
+        try:
+            payload = json.loads((text or "").strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            return None
+        if not isinstance(payload, dict):
+            return None
+        return cls(
+            memory_bytes=int(payload.get("memory_bytes") or 0),
+            disk_bytes=int(payload.get("disk_bytes") or 0),
+            leftover_processes=int(payload.get("leftover_processes") or 0),
+            zygote_alive=bool(payload.get("zygote_alive", True)),
+            killed_processes=int(payload.get("killed_processes") or 0),
+        )
+
+
+@dataclass(frozen=True)
+class RecyclePolicy:
+    """池容器回收策略；各阈值为 0 表示不启用"""
+    max_uses: int = 100
+    max_age_seconds: int = 3600
+    max_memory_bytes: int = 0
+    max_disk_bytes: int = 0
+    recycle_on_leftover_processes: bool = True
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "RecyclePolicy":
+        return cls(
+            max_uses=max(0, int(settings.pool_max_uses)),
+            max_age_seconds=max(0, int(settings.pool_max_age_seconds)),
+            max_memory_bytes=max(0, int(settings.pool_max_memory_bytes)),
+            max_disk_bytes=max(0, int(settings.pool_max_disk_bytes)),
+            recycle_on_leftover_processes=bool(settings.pool_recycle_on_leftover_processes),
+        )
+
+    def is_tainted(self, probe: Optional[ContainerProbe]) -> bool:
+        """容器内残留用户进程：不能再复用，需要立即下线"""
+        if probe is None or not self.recycle_on_leftover_processes:
+            return False
+        return probe.leftover_processes > 0
+
+    def retire_reason(
+        self,
+        container: PooledContainer,
+        probe: Optional[ContainerProbe] = None,
+        now: Optional[float] = None,
+    ) -> Optional[str]:
+        """返回需要回收的原因；无需回收时返回 None"""
+        now = time.time() if now is None else now
+        if self.is_tainted(probe):
+            return "leftover_processes"
+        if self.max_uses and container.uses >= self.max_uses:
+            return "max_uses"
+        if self.max_age_seconds and now - container.created_at >= self.max_age_seconds:
+            return "max_age"
+        if probe is not None:
+            if self.max_memory_bytes and probe.memory_bytes >= self.max_memory_bytes:
+                return "memory"
+            if self.max_disk_bytes and probe.disk_bytes >= self.max_disk_bytes:
+                return "disk"
+        return None
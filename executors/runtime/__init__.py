@@ -0,0 +1,5 @@
+"""In-container runtime (copied into executor containers as /opt/pyexec).
+
+Modules here run on the executor image's interpreter (Python 3.9) and must only
+depend on the standard library.
+"""
@@ -0,0 +1,93 @@
+"""Hand a script over to the warm zygote spare and wait for it.
+
+Usage: python /opt/pyexec/client.py /code/script.py
+
+Falls back to runner.py when no zygote is listening. Like runner.py it ends
+with a USAGE_MARKER line on stderr and exits with the script's exit code, and
+enforces the same PYEXEC_TIMEOUT / PYEXEC_CPU_SECONDS limits on the job session.
+PYEXEC_PROFILE* options are forwarded to the spare (see profiler.py).
+"""
+import json
+import os
+import signal
+import socket
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from runner import ProcessSampler, kill_session, read_limits, read_oom_kills, report_usage  # noqa: E402
+from zygote import SOCKET_PATH  # noqa: E402
+
+
+def fallback(argv):
+    runner = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runner.py")
+    os.execv(sys.executable, [sys.executable, runner] + argv[1:])
+
+
+def main(argv):
+    if len(argv) < 2:
+        sys.stderr.write("usage: client.py SCRIPT\n")
+        return 2
+
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(SOCKET_PATH)
+    except OSError:
+        conn.close()
+        return fallback(argv)
+
+    wall_limit, cpu_limit = read_limits()
+    oom_before = read_oom_kills()
+    # spare 不继承本进程的环境变量，性能分析选项随请求传过去
+    profile_env = {key: value for key, value in os.environ.items() if key.startswith("PYEXEC_PROFILE")}
+    payload = json.dumps(
+        {"script": os.path.abspath(argv[1]), "cwd": os.getcwd(), "profile_env": profile_env}
+    ).encode("utf-8")
+    socket.send_fds(conn, [payload], [0, 1, 2])
+    reader = conn.makefile("rb")
+
+    started = reader.readline()
+    if not started:
+        # spare 在开始执行前就失败了：脚本尚未运行，退回普通 runner
+        conn.close()
+        return fallback(argv)
+    job_pid = int(json.loads(started.decode("utf-8"))["pid"])
+
+    sampler = ProcessSampler(job_pid, wall_seconds=wall_limit, cpu_seconds=cpu_limit)
+    sampler.start()
+    terminated = []
+
+    def _on_terminate(signum, _frame):
+        # 被取消：整会话杀掉作业
+        terminated.append(signum)
+        kill_session(job_pid)
+
+    signal.signal(signal.SIGTERM, _on_terminate)
+    signal.signal(signal.SIGINT, _on_terminate)
+
+    finished = reader.readline()
+    sampler.stop()
+    # 作业会话里残留的后台进程一并清理
+    kill_session(job_pid)
+
+    result = json.loads(finished.decode("utf-8")) if finished else {}
+    usage = result.get("usage") or {}
+    exit_code = result.get("exit_code", -signal.SIGKILL)
+
+    oom_after = read_oom_kills()
+    oom_killed = oom_before is not None and oom_after is not None and oom_after > oom_before
+    usage["process_count"] = sampler.peak
+    usage["exit_code"] = exit_code
+    usage["timeout_hit"] = sampler.limit_hit == "timeout"
+    usage["cpu_limit_hit"] = sampler.limit_hit == "cpu"
+    # spare 没有回报结果且不是被我们杀掉的：多半是被 OOM killer 杀掉
+    usage["memory_limit_hit"] = bool(oom_killed) or (not finished and not sampler.limit_hit and not terminated)
+    report_usage(usage)
+
+    if terminated:
+        return 128 + terminated[0]
+    return sampler.exit_code(exit_code)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,230 @@
+"""Typed display outputs, in the spirit of IPython's rich display.
+
+The generated script calls configure() first, which also makes display()
+available as a builtin, and wraps its last top-level expression in
+display_result(). Every displayed object becomes one JSON line in
+OUTPUTS_NAME under the output directory:
+
+    {"type": "dataframe" | "array" | "json" | "text", "source": "result" | "display",
+     "data": ..., "text": "<repr>", "mime": {...}, "truncated": false, "file": "output_1.arrow"}
+
+- dataframe: pandas DataFrame/Series as {"columns", "dtypes", "index", "rows",
+  "total_rows", "total_columns"}, cut to max_rows rows. When rows were cut and
+  pyarrow is available, the full frame is also written as an Arrow IPC file.
+- array: numpy arrays as {"shape", "dtype", "values"}, cut to max_rows along the
+  first axis (and a fixed number of items along the others).
+- json: JSON-compatible builtins (dict, list, str, numbers, ...).
+- text: anything else; only the repr.
+
+"mime" carries the object's own _repr_html_/_repr_markdown_/... results. Each
+line is kept under max_bytes by dropping rows, then data, then mime.
+"""
+import builtins
+import json
+import math
+import os
+import sys
+
+OUTPUT_DIR = "/code/output/.display"
+OUTPUTS_NAME = "outputs.jsonl"
+TYPES = ("dataframe", "array", "json", "text")
+# 非首个维度上保留的元素个数
+MAX_COLUMNS = 100
+_MIME_METHODS = (
+    ("text/html", "_repr_html_"),
+    ("text/markdown", "_repr_markdown_"),
+    ("text/latex", "_repr_latex_"),
+    ("image/svg+xml", "_repr_svg_"),
+    ("application/json", "_repr_json_"),
+)
+
+_state = {"dir": OUTPUT_DIR, "max_rows": 100, "max_bytes": 262144, "max_outputs": 20, "count": 0}
+
+
+def configure(output_dir=OUTPUT_DIR, max_rows=100, max_bytes=262144, max_outputs=20):
+    """设置输出目录与上限，并提供内置函数 display()（脚本自己定义的 display 优先）"""
+    _state.update(
+        dir=output_dir,
+        max_rows=max(1, int(max_rows)),
+        max_bytes=max(1024, int(max_bytes)),
+        max_outputs=max(0, int(max_outputs)),
+        count=0,
+    )
+    if not hasattr(builtins, "display"):
+        builtins.display = display
+
+
+def display(*objs):
+    for obj in objs:
+        _emit(obj, "display")
+
+
+def display_result(value):
+    """脚本最后一个表达式的值；None 不输出（与交互式解释器一致）"""
+    if value is not None:
+        _emit(value, "result")
+
+
+def _clean(value):
+    """NaN/Infinity 不是合法 JSON，统一换成 null"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {str(k): _clean(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(v) for v in value]
+    return value
+
+
+def _truncate_text(text, limit):
+    if len(text) <= limit:
+        return text, False
+    return text[:limit] + "...", True
+
+
+def _instance_of(obj, module, names):
+    mod = sys.modules.get(module)
+    if mod is None:
+        return False
+    return isinstance(obj, tuple(getattr(mod, name) for name in names if hasattr(mod, name)))
+
+
+def _frame_data(frame, rows):
+    total_rows, total_columns = frame.shape
+    head = frame.iloc[:rows, :MAX_COLUMNS]
+    split = json.loads(head.to_json(orient="split", date_format="iso", default_handler=str))
+    data = {
+        "columns": [str(c) for c in split.get("columns", [])],
+        "dtypes": [str(t) for t in head.dtypes],
+        "index": _clean(split.get("index", [])),
+        "rows": _clean(split.get("data", [])),
+        "total_rows": int(total_rows),
+        "total_columns": int(total_columns),
+    }
+    return data, total_rows > rows or total_columns > MAX_COLUMNS
+
+
+def _array_data(array, rows):
+    if array.ndim == 0:
+        return {"shape": [], "dtype": str(array.dtype), "values": _clean(array.tolist())}, False
+    limits = (rows,) + (MAX_COLUMNS,) * (array.ndim - 1)
+    head = array[tuple(slice(0, limit) for limit in limits)]
+    data = {"shape": list(array.shape), "dtype": str(array.dtype), "values": _clean(head.tolist())}
+    return data, head.shape != array.shape
+
+
+def _write_arrow(frame, path):
+    """完整表格写成 Arrow IPC 文件；容器内没有 pyarrow 或类型不支持时跳过"""
+    try:
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(frame)
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        return True
+    except Exception:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        return False
+
+
+def _mime_bundle(obj, limit):
+    bundle = {}
+    for mime, method in _MIME_METHODS:
+        fn = getattr(type(obj), method, None)
+        if fn is None:
+            continue
+        try:
+            value = fn(obj)
+        except Exception:
+            continue
+        if value is None:
+            continue
+        if mime == "application/json":
+            try:
+                value = json.loads(json.dumps(_clean(value), allow_nan=False))
+            except (TypeError, ValueError):
+                continue
+        elif not isinstance(value, str) or len(value) > limit:
+            continue
+        bundle[mime] = value
+    return bundle
+
+
+def build_output(obj, source, max_rows, max_bytes):
+    """对象 -> 输出记录（dict）；完整表格另由 _emit 写出"""
+    try:
+        text = repr(obj)
+    except Exception as e:
+        text = "<unrepresentable %s: %s>" % (type(obj).__name__, e)
+    text, text_truncated = _truncate_text(text, max(256, max_bytes // 4))
+    record = {"type": "text", "source": source, "data": None, "text": text, "mime": {}, "truncated": text_truncated}
+
+    if _instance_of(obj, "pandas", ("DataFrame", "Series")):
+        frame = obj.to_frame() if _instance_of(obj, "pandas", ("Series",)) else obj
+        record["data"], record["truncated"] = _frame_data(frame, max_rows)
+        record["type"] = "dataframe"
+        return record
+    if _instance_of(obj, "numpy", ("ndarray",)):
+        record["data"], record["truncated"] = _array_data(obj, max_rows)
+        record["type"] = "array"
+        return record
+    if _instance_of(obj, "numpy", ("generic",)):
+        # numpy 标量按对应的 Python 值输出
+        obj = obj.item()
+    if isinstance(obj, (dict, list, tuple, str, int, float, bool)):
+        try:
+            record["data"] = json.loads(json.dumps(_clean(obj), allow_nan=False))
+            record["type"] = "json"
+        except (TypeError, ValueError):
+            pass
+    record["mime"] = _mime_bundle(obj, max(256, max_bytes // 2))
+    return record
+
+
+def _fit(record, max_bytes):
+    """依次减少行数、去掉 data、去掉 mime，直到序列化后不超过 max_bytes"""
+    line = json.dumps(record, ensure_ascii=False, allow_nan=False)
+    data = record.get("data")
+    while len(line.encode("utf-8")) > max_bytes:
+        if record["type"] == "dataframe" and data is not None and len(data["rows"]) > 1:
+            keep = len(data["rows"]) // 2
+            data["rows"], data["index"] = data["rows"][:keep], data["index"][:keep]
+            record["truncated"] = True
+        elif record.get("data") is not None:
+            record["data"] = data = None
+            record["type"] = "text" if record["type"] == "json" else record["type"]
+            record["truncated"] = True
+        elif record.get("mime"):
+            record["mime"] = {}
+        else:
+            record["text"] = record["text"][: max(0, max_bytes // 8)] + "..."
+            record["truncated"] = True
+            line = json.dumps(record, ensure_ascii=False, allow_nan=False)
+            break
+        line = json.dumps(record, ensure_ascii=False, allow_nan=False)
+    return line
+
+
+def _emit(obj, source):
+    if _state["count"] >= _state["max_outputs"]:
+        return
+    _state["count"] += 1
+    index = _state["count"]
+    try:
+        record = build_output(obj, source, _state["max_rows"], _state["max_bytes"])
+        os.makedirs(_state["dir"], exist_ok=True)
+        if record["type"] == "dataframe" and record["truncated"]:
+            name = "output_%d.arrow" % index
+            frame = obj.to_frame() if _instance_of(obj, "pandas", ("Series",)) else obj
+            if _write_arrow(frame, os.path.join(_state["dir"], name)):
+                record["file"] = name
+        line = _fit(record, _state["max_bytes"])
+        with open(os.path.join(_state["dir"], OUTPUTS_NAME), "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except Exception as e:
+        # 展示失败不影响脚本本身
+        sys.stderr.write("display() failed: %s: %s\n" % (type(e).__name__, e))
@@ -0,0 +1,65 @@
+"""Save every open matplotlib figure after the user script has run."""
+import io
+import os
+import sys
+
+FIGURE_DIR = "/code/output/.figures"
+FORMATS = ("png", "webp", "svg")
+
+
+def _effective_dpi(fig, dpi, max_dimension):
+    """按最长边像素上限压低 dpi，避免生成超大图片"""
+    if not max_dimension:
+        return dpi
+    width, height = fig.get_size_inches()
+    longest = max(width, height)
+    if longest <= 0:
+        return dpi
+    return max(10, min(dpi, int(max_dimension / longest)))
+
+
+def _save_webp(fig, path, dpi):
+    try:
+        fig.savefig(path, format="webp", dpi=dpi, bbox_inches="tight")
+        return path
+    except ValueError:
+        pass
+    # 旧版 matplotlib 不支持 webp：先渲染 PNG 再用 Pillow 转码，仍不可用时退回 PNG
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+    try:
+        from PIL import Image
+    except ImportError:
+        path = os.path.splitext(path)[0] + ".png"
+        with open(path, "wb") as f:
+            f.write(buffer.getvalue())
+        return path
+    buffer.seek(0)
+    Image.open(buffer).save(path, format="WEBP", quality=90, method=4)
+    return path
+
+
+def save_all_figures(output_dir=FIGURE_DIR, fmt="png", dpi=150, max_dimension=2000):
+    """保存所有未关闭的图表为 figure_<n>.<fmt>，返回文件路径列表"""
+    if "matplotlib.pyplot" not in sys.modules:
+        return []
+    plt = sys.modules["matplotlib.pyplot"]
+    fignums = plt.get_fignums()
+    if not fignums:
+        return []
+
+    fmt = fmt if fmt in FORMATS else "png"
+    os.makedirs(output_dir, exist_ok=True)
+    saved = []
+    for index, num in enumerate(fignums, start=1):
+        fig = plt.figure(num)
+        path = os.path.join(output_dir, "figure_%d.%s" % (index, fmt))
+        if fmt == "webp":
+            path = _save_webp(fig, path, _effective_dpi(fig, dpi, max_dimension))
+        elif fmt == "svg":
+            fig.savefig(path, format="svg", bbox_inches="tight")
+        else:
+            fig.savefig(path, format="png", dpi=_effective_dpi(fig, dpi, max_dimension), bbox_inches="tight")
+        saved.append(path)
+    plt.close("all")
+    return saved
@@ -0,0 +1,273 @@
+"""Profile a user script with cProfile or a low-overhead stack sampler.
+
+Usage: python /opt/pyexec/profiler.py /code/script.py   (runner.py switches to
+this when PYEXEC_PROFILE is set; the zygote calls profile_call() directly)
+
+Options come from the environment: PYEXEC_PROFILE ("cprofile" or "sampling"),
+PYEXEC_PROFILE_INTERVAL (sampling interval in seconds), PYEXEC_PROFILE_TOP
+(functions kept in the summary) and PYEXEC_PROFILE_DIR. Three files are written
+there once the script ends, even when it raised:
+
+- profile.pstats: loadable with pstats.Stats / snakeviz;
+- profile.collapsed.txt: `frame;frame;frame count` lines for flamegraph.pl or
+  speedscope (microseconds for cProfile, samples for the sampler);
+- summary.json: the top functions by self time.
+
+cProfile only sees the thread the script runs in; the sampler sees all threads.
+"""
+import cProfile
+import json
+import marshal
+import os
+import sys
+import threading
+import time
+
+MODES = ("cprofile", "sampling")
+DEFAULT_PROFILE_DIR = "/code/output/.profile"
+PSTATS_NAME = "profile.pstats"
+COLLAPSED_NAME = "profile.collapsed.txt"
+SUMMARY_NAME = "summary.json"
+
+RUNTIME_DIR = os.path.dirname(os.path.abspath(__file__))
+# 由 cProfile 推导调用栈时最多展开的路径数，避免调用图路径数爆炸
+_MAX_COLLAPSED_PATHS = 20000
+_MAX_STACK_DEPTH = 128
+
+
+def read_options(environ=None):
+    """PYEXEC_PROFILE* 环境变量 -> 选项 dict；未开启性能分析时返回 None"""
+    environ = os.environ if environ is None else environ
+    mode = (environ.get("PYEXEC_PROFILE") or "").strip().lower()
+    if mode not in MODES:
+        return None
+    try:
+        interval = float(environ.get("PYEXEC_PROFILE_INTERVAL") or 0.005)
+    except ValueError:
+        interval = 0.005
+    try:
+        top_n = int(environ.get("PYEXEC_PROFILE_TOP") or 20)
+    except ValueError:
+        top_n = 20
+    return {
+        "mode": mode,
+        "interval": max(0.001, interval),
+        "top_n": max(1, top_n),
+        "dir": environ.get("PYEXEC_PROFILE_DIR") or DEFAULT_PROFILE_DIR,
+    }
+
+
+def _is_runtime_frame(key):
+    filename = key[0]
+    return filename.startswith(RUNTIME_DIR) or os.path.basename(filename) == "runpy.py" or "_lsprof" in key[2]
+
+
+def frame_label(key):
+    filename, lineno, name = key
+    if filename == "~":
+        # 内置函数：cProfile 记为 ('~', 0, "<built-in method ...>")
+        label = name
+    else:
+        label = "%s (%s:%d)" % (name, filename, lineno)
+    # ';' 是 collapsed 格式的分隔符
+    return label.replace(";", ":")
+
+
+class DeterministicProfiler:
+    """cProfile；collapsed 调用栈按调用图的边耗时比例从脚本模块自顶向下推导（共享被调函数时是近似值）"""
+
+    unit = 1e6
+
+    def __init__(self, script):
+        self.script = script
+        self.profiler = cProfile.Profile()
+        self._stats = {}
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.profiler.create_stats()
+        self._stats = self.profiler.stats
+
+    def stats(self):
+        return self._stats
+
+    def stacks(self):
+        stats = self._stats
+        children = {}
+        for callee, (_cc, _nc, _tt, _ct, callers) in stats.items():
+            for caller, edge in callers.items():
+                children.setdefault(caller, []).append((callee, edge[3]))
+
+        roots = [key for key in stats if key[0] == self.script and key[2] == "<module>"]
+        if not roots:
+            roots = [key for key, value in stats.items() if not value[4] and not _is_runtime_frame(key)]
+
+        stacks = {}
+        budget = [_MAX_COLLAPSED_PATHS]
+
+        def walk(key, seconds, path):
+            budget[0] -= 1
+            path = path + (key,)
+            total = stats[key][3]
+            scale = seconds / total if total > 0 else 0.0
+            own = stats[key][2] * scale
+            if budget[0] > 0 and len(path) < _MAX_STACK_DEPTH:
+                for child, edge_seconds in children.get(key, ()):
+                    share = edge_seconds * scale
+                    # 递归调用已计入当前路径的累计耗时；过小的分支并入自身耗时
+                    if child in path or share * self.unit < 1 or budget[0] <= 0:
+                        continue
+                    walk(child, share, path)
+            else:
+                own = seconds
+            if own > 0:
+                stacks[path] = stacks.get(path, 0.0) + own
+
+        for root in roots:
+            walk(root, stats[root][3], ())
+        return {path: int(round(seconds * self.unit)) for path, seconds in stacks.items() if seconds * self.unit >= 1}
+
+    def summary_extra(self):
+        return {}
+
+
+class StackSampler(threading.Thread):
+    """每隔 interval 秒抓取所有线程的调用栈；每个样本按距上次采样的实际间隔计时"""
+
+    unit = 1
+
+    def __init__(self, script, interval=0.005):
+        super().__init__(daemon=True)
+        self.script = script
+        self.interval = interval
+        # 调用栈（自顶向下）-> [样本数, 秒数]
+        self.samples = {}
+        self.sample_count = 0
+        self.stopped = threading.Event()
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        stack.reverse()
+        # 脚本之下的 runpy/运行时栈帧不是用户代码
+        for index, key in enumerate(stack):
+            if key[0] == self.script:
+                return tuple(stack[index:])
+        return tuple(key for key in stack if not _is_runtime_frame(key))
+
+    def run(self):
+        me = threading.get_ident()
+        last = time.perf_counter()
+        while not self.stopped.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = self._stack(frame)
+                if not stack:
+                    continue
+                entry = self.samples.setdefault(stack, [0, 0.0])
+                entry[0] += 1
+                entry[1] += elapsed
+                self.sample_count += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join(1)
+
+    def stats(self):
+        """按样本构造与 cProfile 同格式的 pstats 数据；调用次数一栏为样本数"""
+        stats = {}
+        for stack, (count, seconds) in self.samples.items():
+            leaf = stack[-1]
+            for key in set(stack):
+                cc, nc, tt, ct, callers = stats.get(key) or (0, 0, 0.0, 0.0, {})
+                if key == leaf:
+                    tt += seconds
+                stats[key] = (cc + count, nc + count, tt, ct + seconds, callers)
+            for caller, callee in set(zip(stack, stack[1:])):
+                callers = stats[callee][4]
+                ncalls, ccalls, tt, ct = callers.get(caller) or (0, 0, 0.0, 0.0)
+                callers[caller] = (ncalls + count, ccalls + count, tt + (seconds if callee == leaf else 0.0), ct + seconds)
+        return stats
+
+    def stacks(self):
+        return {stack: count for stack, (count, _seconds) in self.samples.items()}
+
+    def summary_extra(self):
+        return {"samples": self.sample_count, "interval_seconds": self.interval}
+
+
+def summarize(stats, top_n):
+    rows = [(key, value) for key, value in stats.items() if not _is_runtime_frame(key)]
+    rows.sort(key=lambda item: (item[1][2], item[1][3]), reverse=True)
+    return [
+        {
+            "function": key[2],
+            "file": key[0],
+            "line": key[1],
+            "calls": value[1],
+            "self_seconds": round(value[2], 6),
+            "cumulative_seconds": round(value[3], 6),
+        }
+        for key, value in rows[:top_n]
+    ]
+
+
+def write_profile(collector, options, wall_seconds):
+    os.makedirs(options["dir"], exist_ok=True)
+    stats = collector.stats()
+    with open(os.path.join(options["dir"], PSTATS_NAME), "wb") as f:
+        marshal.dump(stats, f)
+    with open(os.path.join(options["dir"], COLLAPSED_NAME), "w") as f:
+        for stack, weight in sorted(collector.stacks().items()):
+            f.write("%s %d\n" % (";".join(frame_label(key) for key in stack), weight))
+    summary = {
+        "mode": options["mode"],
+        "wall_seconds": round(wall_seconds, 6),
+        "top": summarize(stats, options["top_n"]),
+    }
+    summary.update(collector.summary_extra())
+    with open(os.path.join(options["dir"], SUMMARY_NAME), "w") as f:
+        json.dump(summary, f)
+
+
+def profile_call(fn, script, options):
+    """在性能分析下调用 fn()；无论 fn 是否抛异常都写出分析结果"""
+    if options["mode"] == "sampling":
+        collector = StackSampler(script, options["interval"])
+    else:
+        collector = DeterministicProfiler(script)
+    started = time.perf_counter()
+    collector.start()
+    try:
+        return fn()
+    finally:
+        collector.stop()
+        try:
+            write_profile(collector, options, time.perf_counter() - started)
+        except Exception:
+            # 分析结果写不出来（如输出目录已满）不影响脚本本身的结果
+            pass
+
+
+def main(argv):
+    if len(argv) < 2:
+        sys.stderr.write("usage: profiler.py SCRIPT\n")
+        return 2
+    from zygote import finish_interpreter, run_script
+
+    exit_code = run_script(os.path.abspath(argv[1]), read_options())
+    finish_interpreter()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
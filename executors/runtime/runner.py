@@ -0,0 +1,276 @@
+"""Run a user script as a child process and report its resource usage.
+
+Usage: python /opt/pyexec/runner.py /code/script.py
+
+The child inherits stdin/stdout/stderr. After it exits, one line prefixed with
+USAGE_MARKER and a JSON payload is written to stderr; the gateway strips it.
+
+Limits come from the environment: PYEXEC_TIMEOUT (wall-clock seconds) and
+PYEXEC_CPU_SECONDS (CPU seconds summed over every process of the job). The job
+runs in its own session; on a limit hit, and again after it exits, the whole
+session is stopped and SIGKILLed. With PYEXEC_PROFILE set the script runs
+under profiler.py.
+"""
+import json
+import os
+import resource
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+USAGE_MARKER = "__PYEXEC_USAGE__"
+# 超时退出码与 coreutils timeout 一致
+TIMEOUT_EXIT_CODE = 124
+CPU_LIMIT_EXIT_CODE = 152  # 128 + SIGXCPU
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+_OOM_EVENT_FILES = (
+    "/sys/fs/cgroup/memory.events",
+    "/sys/fs/cgroup/memory/memory.oom_control",
+)
+
+
+def read_oom_kills():
+    for path in _OOM_EVENT_FILES:
+        try:
+            with open(path) as f:
+                for line in f:
+                    key, _, value = line.partition(" ")
+                    if key == "oom_kill":
+                        return int(value)
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def read_self_io():
+    """/proc/self/io 会累计已回收子进程的 I/O"""
+    values = {}
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                values[key.strip()] = int(value)
+    except (OSError, ValueError):
+        return None
+    return values
+
+
+def read_limits(environ=None):
+    """(墙钟秒数, CPU 秒数)，0 表示不限制"""
+    environ = os.environ if environ is None else environ
+    limits = []
+    for key in ("PYEXEC_TIMEOUT", "PYEXEC_CPU_SECONDS"):
+        try:
+            limits.append(max(0.0, float(environ.get(key) or 0)))
+        except ValueError:
+            limits.append(0.0)
+    return tuple(limits)
+
+
+def session_processes(sid):
+    """会话内未退出的进程：[(pid, 累计 CPU 秒数)]；CPU 含已回收子进程的用时，各秒只计一次"""
+    members = []
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open("/proc/%s/stat" % pid) as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # comm 字段可能包含空格，从最后一个 ')' 之后解析：state ppid pgrp session ... utime stime cutime cstime
+        fields = stat[stat.rfind(")") + 2:].split()
+        if len(fields) < 15 or fields[3] != str(sid) or fields[0] == "Z":
+            continue
+        try:
+            ticks = sum(int(v) for v in fields[11:15])
+        except ValueError:
+            ticks = 0
+        members.append((int(pid), ticks / float(_CLOCK_TICKS)))
+    return members
+
+
+def count_session_processes(sid):
+    return len(session_processes(sid))
+
+
+def kill_session(sid, rounds=20):
+    """先 SIGSTOP 整组冻结（不能再 fork），再逐个 SIGKILL 会话内所有进程，直到会话清空"""
+    for signum in (signal.SIGSTOP, signal.SIGKILL):
+        try:
+            os.killpg(sid, signum)
+        except OSError:
+            pass
+    for _ in range(rounds):
+        pids = [pid for pid, _cpu in session_processes(sid)]
+        if not pids:
+            return True
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+        time.sleep(0.01)
+    return not session_processes(sid)
+
+
+class ProcessSampler(threading.Thread):
+    """
+    作业监督：周期性统计作业会话内的进程数（记录峰值）与 CPU 用时，
+    超过墙钟/CPU 限制时整会话杀掉，limit_hit 记为 "timeout" / "cpu"。
+    """
+
+    def __init__(self, sid, interval=0.05, wall_seconds=0.0, cpu_seconds=0.0, started=None):
+        super().__init__(daemon=True)
+        self.sid = sid
+        self.interval = interval
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+        self.started = time.monotonic() if started is None else started
+        self.peak = 1
+        self.limit_hit = ""
+        self.stopped = threading.Event()
+
+    def check(self):
+        members = session_processes(self.sid)
+        self.peak = max(self.peak, len(members))
+        if self.wall_seconds and time.monotonic() - self.started > self.wall_seconds:
+            return "timeout"
+        if self.cpu_seconds and sum(cpu for _pid, cpu in members) > self.cpu_seconds:
+            return "cpu"
+        return ""
+
+    def run(self):
+        while not self.stopped.is_set():
+            reason = self.check()
+            if reason:
+                self.limit_hit = reason
+                kill_session(self.sid)
+                return
+            # 临近墙钟期限时缩短等待，按期限准时结束
+            wait = self.interval
+            if self.wall_seconds:
+                wait = min(wait, max(0.0, self.started + self.wall_seconds - time.monotonic()) + 0.001)
+            self.stopped.wait(wait)
+
+    def stop(self):
+        self.stopped.set()
+        self.join(1)
+
+    def exit_code(self, returncode):
+        if self.limit_hit == "timeout":
+            return TIMEOUT_EXIT_CODE
+        if self.limit_hit == "cpu":
+            return CPU_LIMIT_EXIT_CODE
+        return returncode if returncode >= 0 else 128 - returncode
+
+
+class CombinedUsage:
+    """把多份 rusage（如 RUSAGE_SELF + RUSAGE_CHILDREN）合并为一份"""
+
+    def __init__(self, *usages):
+        self.ru_utime = sum(u.ru_utime for u in usages)
+        self.ru_stime = sum(u.ru_stime for u in usages)
+        self.ru_maxrss = max([u.ru_maxrss for u in usages] or [0])
+        self.ru_inblock = sum(u.ru_inblock for u in usages)
+        self.ru_oublock = sum(u.ru_oublock for u in usages)
+
+
+def build_usage(
+    rusage, io_before, io_after, wall_seconds, process_count, returncode, timed_out, oom_kills,
+    cpu_limit_hit=False, cancelled=False,
+):
+    read_bytes = write_bytes = None
+    if io_before is not None and io_after is not None:
+        read_bytes = max(0, io_after.get("read_bytes", 0) - io_before.get("read_bytes", 0))
+        write_bytes = max(0, io_after.get("write_bytes", 0) - io_before.get("write_bytes", 0))
+    if read_bytes is None:
+        read_bytes = rusage.ru_inblock * 512
+        write_bytes = rusage.ru_oublock * 512
+
+    # 被监督进程主动杀掉（超时、CPU 超限、取消）的 SIGKILL 不算内存超限
+    killed_by_us = timed_out or cpu_limit_hit or cancelled
+    memory_limit_hit = bool(oom_kills) or (returncode == -signal.SIGKILL and not killed_by_us)
+    return {
+        "cpu_user_seconds": round(rusage.ru_utime, 6),
+        "cpu_system_seconds": round(rusage.ru_stime, 6),
+        "peak_memory_bytes": int(rusage.ru_maxrss) * 1024,
+        "read_bytes": int(read_bytes),
+        "write_bytes": int(write_bytes),
+        "process_count": int(process_count),
+        "wall_seconds": round(wall_seconds, 6),
+        "exit_code": returncode,
+        "memory_limit_hit": memory_limit_hit,
+        "timeout_hit": bool(timed_out),
+        "cpu_limit_hit": bool(cpu_limit_hit),
+    }
+
+
+def report_usage(usage):
+    sys.stderr.flush()
+    sys.stderr.write("\n%s%s\n" % (USAGE_MARKER, json.dumps(usage)))
+    sys.stderr.flush()
+
+
+def main(argv):
+    if len(argv) < 2:
+        sys.stderr.write("usage: runner.py SCRIPT [ARGS...]\n")
+        return 2
+
+    wall_limit, cpu_limit = read_limits()
+    io_before = read_self_io()
+    oom_before = read_oom_kills()
+    started = time.time()
+    command = [sys.executable] + argv[1:]
+    if os.environ.get("PYEXEC_PROFILE"):
+        # 性能分析模式：由 profiler.py 在分析器下运行脚本
+        command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiler.py")] + argv[1:]
+    child = subprocess.Popen(command, start_new_session=True)
+    sampler = ProcessSampler(child.pid, wall_seconds=wall_limit, cpu_seconds=cpu_limit)
+    sampler.start()
+
+    terminated = []
+
+    def _on_terminate(signum, _frame):
+        # 被取消（SIGTERM/SIGINT）：整会话杀掉作业，仍然回报资源使用
+        terminated.append(signum)
+        kill_session(child.pid)
+
+    signal.signal(signal.SIGTERM, _on_terminate)
+    signal.signal(signal.SIGINT, _on_terminate)
+
+    returncode = child.wait()
+    wall_seconds = time.time() - started
+    sampler.stop()
+    # 作业会话里残留的后台进程一并清理
+    kill_session(child.pid)
+
+    oom_after = read_oom_kills()
+    oom_kills = None
+    if oom_before is not None and oom_after is not None:
+        oom_kills = oom_after - oom_before
+
+    report_usage(
+        build_usage(
+            resource.getrusage(resource.RUSAGE_CHILDREN),
+            io_before,
+            read_self_io(),
+            wall_seconds,
+            sampler.peak,
+            returncode,
+            sampler.limit_hit == "timeout",
+            oom_kills,
+            sampler.limit_hit == "cpu",
+            bool(terminated),
+        )
+    )
+    if terminated:
+        return 128 + terminated[0]
+    return sampler.exit_code(returncode)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,392 @@
+"""Pre-forking interpreter server for pool containers.
+
+Usage: python /opt/pyexec/zygote.py --detach   (run by the gateway via docker exec)
+
+With --detach the zygote daemonizes and prints `<pid>:<start time>`. The
+gateway keeps that identity for the cleanup probe; the pid file under
+STATE_DIR is writable by user code and is not trusted for cleanup.
+
+The zygote imports the common data libraries once, applies the matplotlib font
+config, then keeps exactly one forked spare interpreter blocked in accept() on
+SOCKET_PATH. A client (client.py) hands over its stdio fds and the script path;
+the spare runs the script in its own session and reports exit code and
+resource usage back. As soon as a spare is taken the zygote forks the next one,
+so warm-up never sits on the request path.
+
+Compiled scripts are cached by content hash in the zygote's memory, so a script
+that was run before in this container is unmarshalled instead of recompiled.
+A spare reports what it compiled back to the zygote before user code starts;
+user code only ever sees (and can only change) its own forked copy.
+"""
+import atexit
+import builtins
+import collections
+import hashlib
+import json
+import marshal
+import os
+import resource
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+import types
+
+RUNTIME_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, RUNTIME_DIR)
+
+from profiler import profile_call, read_options as read_profile_options  # noqa: E402
+from runner import CombinedUsage, build_usage, read_self_io  # noqa: E402
+
+STATE_DIR = os.environ.get("PYEXEC_STATE_DIR", "/tmp/pyexec")
+SOCKET_PATH = os.path.join(STATE_DIR, "zygote.sock")
+PID_PATH = os.path.join(STATE_DIR, "zygote.pid")
+CODE_CACHE_MAX_ENTRIES = 256
+CODE_CACHE_MAX_ENTRY_BYTES = 1024 * 1024
+# 等 spare 交回编译结果的最长时间，超时则不缓存这一次
+CODE_CACHE_REPORT_SECONDS = 5.0
+# 代码哈希 -> marshal 后的代码对象；只在 zygote 进程内维护，spare 通过 fork 继承只读副本
+CODE_CACHE = collections.OrderedDict()
+# 生成的脚本以 pyexec 包的形式导入这些运行时模块
+RUNTIME_PACKAGE_MODULES = ("pyexec.preamble", "pyexec.figures", "pyexec.tabular", "pyexec.display")
+PRELOAD_MODULES = tuple(
+    name.strip()
+    for name in os.environ.get("PYEXEC_PRELOAD", "numpy,pandas,matplotlib,matplotlib.pyplot,seaborn").split(",")
+    if name.strip()
+)
+
+
+def preload():
+    for name in PRELOAD_MODULES:
+        try:
+            __import__(name)
+        except Exception:
+            pass
+    sys.path.append(os.path.dirname(RUNTIME_DIR))
+    for name in RUNTIME_PACKAGE_MODULES:
+        try:
+            __import__(name)
+        except Exception:
+            pass
+    try:
+        import matplotlib.pyplot as plt
+        # 与执行前置代码一致的中文字体设置
+        plt.rcParams['font.sans-serif'] = ['WenQuanYi Micro Hei']
+        plt.rcParams['axes.unicode_minus'] = False
+    except Exception:
+        pass
+
+
+def process_start_time(pid):
+    """进程启动时间（/proc/<pid>/stat 第 22 项，开机后的时钟滴答数），与 pid 一起唯一标识一个进程"""
+    try:
+        with open("/proc/%d/stat" % pid) as f:
+            stat = f.read()
+        return stat[stat.rfind(")") + 2:].split()[19]
+    except (OSError, IndexError):
+        return ""
+
+
+def read_zygote_pid():
+    try:
+        with open(PID_PATH) as f:
+            pid = int(f.read().strip())
+        with open("/proc/%d/cmdline" % pid, "rb") as f:
+            if b"zygote.py" not in f.read():
+                return None
+        return pid
+    except (OSError, ValueError):
+        return None
+
+
+def _strip_runtime_frames(tb, script):
+    """去掉 runpy/zygote 自身的栈帧，让 traceback 与直接 `python script.py` 一致"""
+    while tb is not None and tb.tb_frame.f_code.co_filename != script:
+        tb = tb.tb_next
+    return tb
+
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def load_code(script, cache_fd=None):
+    """
+    编译脚本；同一内容（含路径与解释器版本）只编译一次。
+    缓存不落盘（容器内的目录用户代码可写）：命中查 fork 时继承的 CODE_CACHE，
+    新编译的结果在用户代码开始之前经 cache_fd 交回 zygote，之后的 spare 才能看到。
+    """
+    with open(script, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha256(source)
+    digest.update(("\0%s\0%s" % (script, sys.implementation.cache_tag)).encode("utf-8"))
+    key = digest.hexdigest().encode("ascii")
+    code = None
+    data = CODE_CACHE.get(key)
+    if data is not None:
+        try:
+            code = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            code = None
+    report = key + b"\n"
+    if code is None:
+        code = compile(source, script, "exec", dont_inherit=True)
+        data = marshal.dumps(code)
+        if len(data) <= CODE_CACHE_MAX_ENTRY_BYTES:
+            report += data
+    if cache_fd is not None:
+        # 只有哈希没有内容表示命中，zygote 据此更新 LRU 顺序
+        try:
+            _write_all(cache_fd, report)
+        except OSError:
+            pass
+    return code
+
+
+def remember_code(report):
+    """zygote 侧：登记 spare 交回的编译结果（`<哈希>\\n<marshal 数据>`），按 LRU 保留 CODE_CACHE_MAX_ENTRIES 条"""
+    key, sep, data = report.partition(b"\n")
+    if not sep or len(key) != 64:
+        return
+    if data:
+        CODE_CACHE[key] = data
+    elif key not in CODE_CACHE:
+        return
+    CODE_CACHE.move_to_end(key)
+    while len(CODE_CACHE) > CODE_CACHE_MAX_ENTRIES:
+        CODE_CACHE.popitem(last=False)
+
+
+def read_code_report(fd, timeout=CODE_CACHE_REPORT_SECONDS):
+    """读取 spare 交回的编译结果，直到对端关闭；超时或超长时返回空（不缓存）"""
+    chunks, size = [], 0
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return b""
+        ready, _, _ = select.select([fd], [], [], remaining)
+        if not ready:
+            return b""
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            return b"".join(chunks)
+        size += len(chunk)
+        if size > CODE_CACHE_MAX_ENTRY_BYTES + 128:
+            return b""
+        chunks.append(chunk)
+
+
+def exec_as_main(code, script):
+    """与 runpy.run_path(run_name="__main__") 一致：在新的 __main__ 模块中执行"""
+    module = types.ModuleType("__main__")
+    module.__dict__.update(
+        __file__=script,
+        __cached__=None,
+        __loader__=None,
+        __package__=None,
+        __spec__=None,
+        __builtins__=builtins,
+    )
+    # pickle / multiprocessing 通过 sys.modules["__main__"] 找到脚本中定义的对象
+    sys.modules["__main__"] = module
+    exec(code, module.__dict__)
+
+
+def run_script(script, profile_options=None, cache_fd=None):
+    sys.argv = [script]
+    # 与 `python script.py` 一致：sys.path[0] 为脚本目录，且不暴露运行时目录
+    sys.path[:] = [os.path.dirname(script)] + [p for p in sys.path[1:] if p != RUNTIME_DIR]
+    try:
+        code = load_code(script, cache_fd)
+    except BaseException as e:
+        # 与解释器一致：语法错误只输出出错位置，不带编译调用的栈帧
+        traceback.print_exception(type(e), e, None)
+        return 1
+    finally:
+        # 用户代码开始前关闭与 zygote 的通道，并丢掉继承来的其他执行的代码
+        if cache_fd is not None:
+            os.close(cache_fd)
+        CODE_CACHE.clear()
+    try:
+        if profile_options:
+            profile_call(lambda: exec_as_main(code, script), script, profile_options)
+        else:
+            exec_as_main(code, script)
+        return 0
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        sys.stderr.write("%s\n" % (e.code,))
+        return 1
+    except BaseException as e:
+        traceback.print_exception(type(e), e, _strip_runtime_frames(e.__traceback__, script) or e.__traceback__)
+        return 1
+
+
+def finish_interpreter():
+    """模拟解释器正常退出：等待非守护线程、执行 atexit、刷新输出"""
+    current = threading.current_thread()
+    for thread in threading.enumerate():
+        if thread is not current and not thread.daemon:
+            thread.join()
+    try:
+        atexit._run_exitfuncs()
+    except Exception:
+        traceback.print_exc()
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            pass
+
+
+def serve_one(listener, taken_fd):
+    """spare 进程：阻塞等待一个任务，执行完即退出"""
+    conn, _addr = listener.accept()
+    os.write(taken_fd, b"1")
+    listener.close()
+
+    message, fds, _flags, _addr = socket.recv_fds(conn, 65536, 3)
+    request = json.loads(message.decode("utf-8"))
+    os.setsid()
+    conn.sendall(json.dumps({"pid": os.getpid()}).encode("utf-8") + b"\n")
+
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+        signal.signal(signum, signal.SIG_DFL)
+    os.chdir(request.get("cwd") or "/code")
+
+    io_before = read_self_io()
+    started = time.time()
+    # taken_fd 继续用来把编译结果交回 zygote，在用户代码开始前关闭
+    exit_code = run_script(request["script"], read_profile_options(request.get("profile_env") or {}), taken_fd)
+    finish_interpreter()
+    usage = build_usage(
+        CombinedUsage(resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)),
+        io_before,
+        read_self_io(),
+        time.time() - started,
+        1,
+        exit_code,
+        False,
+        None,
+    )
+    try:
+        conn.sendall(json.dumps({"exit_code": exit_code, "usage": usage}).encode("utf-8") + b"\n")
+    finally:
+        os._exit(exit_code & 0xFF)
+
+
+def reap_children():
+    while True:
+        try:
+            pid, _status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+
+
+def detach():
+    """
+    后台启动一个新的 zygote，输出 `<pid>:<启动时间>` 后退出。
+    不看 pid 文件（用户代码可写）：之前的 zygote 即使还活着也不再被认作 zygote，由清理探测结束。
+    """
+    pid = os.fork()
+    if pid:
+        sys.stdout.write("%d:%s\n" % (pid, process_start_time(pid)))
+        sys.stdout.flush()
+        return 0
+    os.setsid()
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+    code = 1
+    try:
+        code = main(check_existing=False)
+    finally:
+        os._exit(code)
+
+
+def main(check_existing=True):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    if check_existing and read_zygote_pid() is not None:
+        return 0
+
+    preload()
+
+    try:
+        os.unlink(SOCKET_PATH)
+    except OSError:
+        pass
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(SOCKET_PATH)
+    listener.listen(16)
+    with open(PID_PATH, "w") as f:
+        f.write(str(os.getpid()))
+
+    spare = {"pid": None}
+
+    def _shutdown(_signum, _frame):
+        try:
+            os.unlink(SOCKET_PATH)
+        except OSError:
+            pass
+        # 空闲 spare 一并结束；已接单的任务进程在各自会话中，由客户端负责
+        if spare["pid"]:
+            try:
+                os.kill(spare["pid"], signal.SIGKILL)
+            except OSError:
+                pass
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    while True:
+        taken_r, taken_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(taken_r)
+            exit_code = 1
+            try:
+                serve_one(listener, taken_w)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(exit_code)
+        os.close(taken_w)
+        spare["pid"] = pid
+
+        # 等 spare 被取走（或意外退出），期间顺带回收已结束的任务进程
+        while True:
+            ready, _, _ = select.select([taken_r], [], [], 1.0)
+            reap_children()
+            if ready:
+                break
+        taken = os.read(taken_r, 1)
+        if taken:
+            # 先收下这次的编译结果，下一个 spare 才能继承到
+            try:
+                remember_code(read_code_report(taken_r))
+            except OSError:
+                pass
+        os.close(taken_r)
+        spare["pid"] = None
+        if not taken:
+            # spare 未接单就退出了，稍作退避避免空转
+            time.sleep(0.5)
+
+
+if __name__ == "__main__":
+    sys.exit(detach() if "--detach" in sys.argv[1:] else main())
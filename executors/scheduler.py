@@ -0,0 +1,149 @@
+"""Resource-aware admission scheduler."""
+from __future__ import annotations
+
+import asyncio
+import bisect
+from contextlib import asynccontextmanager
+
+from common.resources import ResourceProfile
+
+
+class _Waiter:
+    __slots__ = ("profile", "future", "skipped", "tenant", "max_active", "tag", "seq")
+
+    def __init__(self, profile: ResourceProfile, future: asyncio.Future, tenant: str = "", max_active: int = 0):
+        self.profile = profile
+        self.future = future
+        self.skipped = 0
+        self.tenant = tenant
+        self.max_active = max_active
+        self.tag = 0.0
+        self.seq = 0
+
+
+class ResourceScheduler:
+    """
+    按任务声明的 CPU/内存在宿主机容量内装箱调度。
+    小任务可以越过排队中放不下的大任务先执行；大任务被越过 max_skips 次后，
+    后续任务不再插队，直到它拿到资源（防饿死）。
+    多租户时按开始时间公平排队（SFQ）：每个任务的虚拟开始时间 = max(系统虚拟时间, 该租户上一个任务的虚拟结束时间)，
+    结束时间再加上 CPU 份额 / 租户权重；按开始时间出队，单租户时等同 FIFO。租户可设同时运行的任务数上限。
+    """
+
+    def __init__(self, max_jobs: int, cpus: float, memory_bytes: int = 0, max_skips: int = 8):
+        self.max_jobs = max(1, int(max_jobs))
+        self.cpus = float(cpus)
+        self.memory_bytes = int(memory_bytes or 0)
+        self.max_skips = max(0, int(max_skips))
+        self.active = 0
+        self.used_cpus = 0.0
+        self.used_memory_bytes = 0
+        self._waiters: list[_Waiter] = []
+        self.virtual_time = 0.0
+        self._tenant_finish: dict[str, float] = {}
+        self.tenant_active: dict[str, int] = {}
+        self._seq = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def queued_by_tenant(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for waiter in self._waiters:
+            counts[waiter.tenant] = counts.get(waiter.tenant, 0) + 1
+        return counts
+
+    def _fits(self, profile: ResourceProfile) -> bool:
+        if self.active >= self.max_jobs:
+            return False
+        # 单个任务超过整机容量时，只要求宿主机空闲即可运行，避免永远排不上
+        if self.active == 0:
+            return True
+        if self.used_cpus + profile.cpus > self.cpus + 1e-9:
+            return False
+        if self.memory_bytes and self.used_memory_bytes + profile.memory_bytes > self.memory_bytes:
+            return False
+        return True
+
+    def _tenant_allows(self, tenant: str, max_active: int) -> bool:
+        return max_active <= 0 or self.tenant_active.get(tenant, 0) < max_active
+
+    def _take(self, profile: ResourceProfile, tenant: str = "", tag: float = 0.0):
+        self.active += 1
+        self.used_cpus += profile.cpus
+        self.used_memory_bytes += profile.memory_bytes
+        self.tenant_active[tenant] = self.tenant_active.get(tenant, 0) + 1
+        self.virtual_time = max(self.virtual_time, tag)
+
+    def _dispatch(self):
+        for waiter in list(self._waiters):
+            if waiter.future.done():
+                self._waiters.remove(waiter)
+                continue
+            if not self._tenant_allows(waiter.tenant, waiter.max_active):
+                # 受租户自身上限限制，不算被其他任务越过
+                continue
+            if self._fits(waiter.profile):
+                self._waiters.remove(waiter)
+                self._take(waiter.profile, waiter.tenant, waiter.tag)
+                waiter.future.set_result(None)
+                continue
+            waiter.skipped += 1
+            if waiter.skipped > self.max_skips:
+                break
+
+    def _start_tag(self, profile: ResourceProfile, tenant: str, weight: float) -> float:
+        start = max(self.virtual_time, self._tenant_finish.get(tenant, 0.0))
+        self._tenant_finish[tenant] = start + max(profile.cpus, 0.1) / max(float(weight), 1e-3)
+        if len(self._tenant_finish) > 1024:
+            # 结束时间不晚于系统虚拟时间的租户与从未出现过等价
+            self._tenant_finish = {t: f for t, f in self._tenant_finish.items() if f > self.virtual_time}
+        return start
+
+    async def acquire(self, profile: ResourceProfile, tenant: str = "", weight: float = 1.0, max_active: int = 0):
+        tag = self._start_tag(profile, tenant, weight)
+        # 只被自身租户上限挡住的排队任务不占先机
+        contended = any(self._tenant_allows(w.tenant, w.max_active) for w in self._waiters)
+        if not contended and self._fits(profile) and self._tenant_allows(tenant, max_active):
+            self._take(profile, tenant, tag)
+            return
+
+        waiter = _Waiter(profile, asyncio.get_running_loop().create_future(), tenant, max_active)
+        waiter.tag = tag
+        self._seq += 1
+        waiter.seq = self._seq
+        bisect.insort(self._waiters, waiter, key=lambda w: (w.tag, w.seq))
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled():
+                # 已分配到资源但调用方被取消：归还
+                self.release(profile, tenant)
+            raise
+
+    def set_max_jobs(self, max_jobs: int):
+        """调整并发上限：调大时立即放行排队任务，调小时等运行中的任务自然结束"""
+        self.max_jobs = max(1, int(max_jobs))
+        self._dispatch()
+
+    def release(self, profile: ResourceProfile, tenant: str = ""):
+        self.active = max(0, self.active - 1)
+        remaining = self.tenant_active.get(tenant, 0) - 1
+        if remaining > 0:
+            self.tenant_active[tenant] = remaining
+        else:
+            self.tenant_active.pop(tenant, None)
+        self.used_cpus = max(0.0, self.used_cpus - profile.cpus)
+        self.used_memory_bytes = max(0, self.used_memory_bytes - profile.memory_bytes)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def reserve(self, profile: ResourceProfile, tenant: str = "", weight: float = 1.0, max_active: int = 0):
+        await self.acquire(profile, tenant, weight, max_active)
+        try:
+            yield
+        finally:
+            self.release(profile, tenant)
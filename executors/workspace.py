@@ -0,0 +1,106 @@
+"""Per-execution scratch workspaces on the host (tmpfs first, disk as fallback)."""
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+from typing import Optional
+
+from common.metrics import MetricsRegistry
+from common.settings import Settings
+
+# 磁盘上的兜底目录（也是历史位置）
+DISK_SCRATCH_ROOT = "/tmp/python_executor"
+# Linux 上 /dev/shm 是 tmpfs，容量由挂载参数限制
+TMPFS_SCRATCH_ROOT = "/dev/shm/python_executor"
+
+
+def default_scratch_root() -> str:
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return TMPFS_SCRATCH_ROOT
+    return DISK_SCRATCH_ROOT
+
+
+class WorkspaceManager:
+    """
+    每次执行的临时目录：<root>/<execution_id>/{code.py,input,output}。
+    优先放在 tmpfs 上（剩余空间不足 min_free_bytes 时退回磁盘目录），进程内删除不 fork `rm -rf`；
+    异常退出遗留的目录由 sweep 按修改时间回收。
+    """
+
+    def __init__(self, settings: Settings, metrics: MetricsRegistry = None):
+        self.primary_root = settings.scratch_dir or default_scratch_root()
+        self.fallback_root = DISK_SCRATCH_ROOT
+        self.min_free_bytes = max(0, int(settings.scratch_min_free_bytes))
+        self.stale_seconds = max(1, int(settings.scratch_stale_seconds))
+        self.metrics = metrics or MetricsRegistry()
+        self._lock = threading.Lock()
+        self._active: dict[str, str] = {}
+        self.metrics.describe("executor_workspace_fallbacks_total", "counter", "Workspaces placed on disk because tmpfs was full")
+        self.metrics.describe("executor_workspaces_swept_total", "counter", "Stale workspaces removed by the sweeper")
+        self.metrics.gauge_callback(
+            "executor_workspaces_active",
+            lambda: [({}, len(self._active))],
+            "Scratch workspaces currently in use",
+        )
+
+    def _pick_root(self) -> str:
+        if self.primary_root == self.fallback_root:
+            return self.primary_root
+        try:
+            os.makedirs(self.primary_root, exist_ok=True)
+            if shutil.disk_usage(self.primary_root).free >= self.min_free_bytes:
+                return self.primary_root
+        except OSError:
+            pass
+        self.metrics.inc("executor_workspace_fallbacks_total")
+        return self.fallback_root
+
+    def work_dir(self, execution_id: str) -> str:
+        """返回本次执行的工作目录，首次调用时创建（含 output 子目录）"""
+        with self._lock:
+            work_dir = self._active.get(execution_id)
+        if work_dir is not None:
+            return work_dir
+
+        work_dir = os.path.join(self._pick_root(), execution_id)
+        output_dir = os.path.join(work_dir, "output")
+        os.makedirs(output_dir, exist_ok=True)
+        # 冷启动容器以 root 身份（无 CAP_DAC_OVERRIDE）写绑定挂载的 output，只有它需要放开权限
+        os.chmod(output_dir, 0o777)
+        with self._lock:
+            return self._active.setdefault(execution_id, work_dir)
+
+    def release(self, execution_id: str):
+        with self._lock:
+            work_dir = self._active.pop(execution_id, None)
+        if work_dir is not None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def sweep(self, now: Optional[float] = None, max_age: Optional[float] = None) -> int:
+        """删除超过 stale_seconds（或更短的 max_age）未修改、且不属于进行中执行的工作目录"""
+        stale_seconds = self.stale_seconds if max_age is None else min(self.stale_seconds, max(0.0, max_age))
+        cutoff = (time.time() if now is None else now) - stale_seconds
+        with self._lock:
+            active = set(self._active.values())
+        removed = 0
+        for root in {self.primary_root, self.fallback_root}:
+            try:
+                entries = list(os.scandir(root))
+            except OSError:
+                continue
+            for entry in entries:
+                # 以 . 开头的是运行时暂存等共享目录
+                if entry.name.startswith(".") or entry.path in active:
+                    continue
+                try:
+                    if not entry.is_dir(follow_symlinks=False) or entry.stat().st_mtime >= cutoff:
+                        continue
+                except OSError:
+                    continue
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        if removed:
+            self.metrics.inc("executor_workspaces_swept_total", removed)
+        return removed
@@ -3,7 +3,11 @@ from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 
+from common.analysis import CodeAnalyzer
+from common.artifacts import ArtifactStore
+from common.metrics import MetricsRegistry
 from common.settings import Settings
+from common.tenancy import TenantRegistry
 from common.utils import UtilsClass
 from executors.docker_executor import CodeExecutor
 from gateway.routes import router
@@ -15,16 +19,34 @@ load_dotenv()
 def create_app(settings: Settings = None) -> FastAPI:
     resolved_settings = settings or Settings.from_env()
     utils = UtilsClass(image_dir=resolved_settings.image_store_path)
-    execution_service = CodeExecutor(settings=resolved_settings)
+    metrics = MetricsRegistry()
+    artifact_store = ArtifactStore(resolved_settings, metrics)
+    code_analyzer = CodeAnalyzer(resolved_settings, metrics)
+    tenants = TenantRegistry.from_settings(resolved_settings)
+    metrics.describe("tenant_requests_total", "counter", "Execute requests by tenant and admission result")
+    metrics.describe("artifact_bundles_total", "counter", "Execution artifact bundles served by format")
+    execution_service = CodeExecutor(
+        settings=resolved_settings,
+        metrics=metrics,
+        artifact_store=artifact_store,
+        code_analyzer=code_analyzer,
+        tenants=tenants,
+    )
 
     @asynccontextmanager
     async def lifespan(app: FastAPI):
         app.state.settings = resolved_settings
         app.state.utils = utils
+        app.state.metrics = metrics
+        app.state.artifact_store = artifact_store
+        app.state.code_analyzer = code_analyzer
+        app.state.tenants = tenants
         app.state.execution_service = execution_service
+        await artifact_store.start()
         await execution_service.initialize()
         yield
         await execution_service.shutdown()
+        await artifact_store.stop()
 
     app = FastAPI(lifespan=lifespan)
     app.include_router(router)
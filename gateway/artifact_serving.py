@@ -0,0 +1,118 @@
+"""HTTP caching for immutable artifacts: strong ETags, conditional GET, Range and precompressed variants."""
+from __future__ import annotations
+
+import mimetypes
+import os
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, RedirectResponse, Response
+
+from common.artifacts import ArtifactStore
+from common.object_storage import IMMUTABLE_CACHE_CONTROL
+
+# 同等 q 值时服务端的偏好顺序
+ENCODING_PREFERENCE = ("br", "zstd", "gzip")
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Accept-Encoding -> {编码: q}"""
+    weights: dict[str, float] = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[token] = q
+    return weights
+
+
+def choose_encoding(accept_encoding: str, available: tuple[str, ...]) -> str:
+    """从已预压缩的编码中选出客户端接受度最高的一个；返回空串表示原文件"""
+    if not available or not accept_encoding:
+        return ""
+    weights = parse_accept_encoding(accept_encoding)
+    wildcard = weights.get("*", 0.0)
+    best, best_q = "", 0.0
+    for encoding in ENCODING_PREFERENCE:
+        if encoding not in available:
+            continue
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 使用弱比较（RFC 9110 13.1.2）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def artifact_response(
+    store: ArtifactStore,
+    kind: str,
+    name: str,
+    request_headers: Headers,
+    default_media_type: str,
+) -> Optional[Response]:
+    """
+    产物文件名唯一且不可变：返回 immutable 缓存头、基于内容哈希的强 ETag，支持 304 与 Range
+    （Range 由 FileResponse 处理），并按 Accept-Encoding 直接回传预压缩变体。本机没有该产物时返回 None。
+    """
+    path = store.resolve(kind, name)
+    if path is None:
+        return None
+
+    media_type = mimetypes.guess_type(name)[0] or default_media_type
+    headers = {"cache-control": IMMUTABLE_CACHE_CONTROL}
+    record = store.get(kind, name)
+    if record is None:
+        # 尚未登记索引的旧文件：沿用 FileResponse 基于 mtime 的 ETag
+        return FileResponse(path, media_type=media_type, headers=headers)
+
+    encoding = ""
+    if record.encodings:
+        headers["vary"] = "Accept-Encoding"
+        # Range 只针对原始字节，分段请求一律回传未压缩的原文件
+        if "range" not in request_headers:
+            encoding = choose_encoding(request_headers.get("accept-encoding", ""), record.encodings)
+    if encoding and not os.path.isfile(store.local_path(record, encoding)):
+        encoding = ""
+
+    digest = store.content_hash(record)[:32]
+    etag = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+    headers["etag"] = etag
+    if etag_matches(request_headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["content-encoding"] = encoding
+    return FileResponse(store.local_path(record, encoding), media_type=media_type, headers=headers)
+
+
+def remote_redirect(store: ArtifactStore, kind: str, name: str) -> Optional[Response]:
+    remote_url = store.url(kind, name)
+    if not remote_url:
+        return None
+    # 预签名 URL 会过期：重定向只允许缓存有效期的一半
+    max_age = max(0, store.url_expires_seconds // 2)
+    return RedirectResponse(remote_url, status_code=307, headers={"cache-control": f"public, max-age={max_age}"})
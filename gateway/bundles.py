@@ -0,0 +1,155 @@
+"""All artifacts of one execution in a single response: a streamed zip/tar, or a JSON manifest with small files inline."""
+from __future__ import annotations
+
+import base64
+import os
+import tarfile
+import time
+import zipfile
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from common.artifacts import ArtifactRecord, ArtifactStore
+from common.contracts import OutputFile
+
+BUNDLE_FORMATS = ("zip", "tar", "json")
+MEDIA_TYPES = {"zip": "application/zip", "tar": "application/x-tar"}
+CHUNK_SIZE = 256 * 1024
+# 已压缩的格式在 zip 中直接存储，不再 deflate
+_STORED_EXTENSIONS = frozenset({"png", "webp", "jpg", "jpeg", "gif", "zip", "gz", "bz2", "xz", "zst", "xlsx", "docx"})
+# zip 只能表示 1980 年之后的时间
+_ZIP_EPOCH = 315532800
+
+
+@dataclass(frozen=True)
+class BundleEntry:
+    record: ArtifactRecord
+    # 本机文件路径；为空表示只在远端对象存储中，打包时跳过
+    path: str
+
+    @property
+    def arcname(self) -> str:
+        return f"{self.record.kind}/{self.record.name}"
+
+
+def bundle_entries(store: ArtifactStore, execution_id: str, tenant: Optional[str] = None) -> list[BundleEntry]:
+    """tenant 不为 None 时只包含该租户的产物（其他租户的执行视为不存在）"""
+    entries = []
+    for record in store.list_execution(execution_id):
+        if tenant is not None and record.tenant != tenant:
+            continue
+        path = store.local_path(record) if record.path else ""
+        if path and not os.path.isfile(path):
+            path = ""
+        entries.append(BundleEntry(record=record, path=path))
+    return entries
+
+
+class _ChunkBuffer:
+    """只追加的输出流：归档写入这里，生成器每写完一块就取走，内存占用与单块大小相当"""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        if data:
+            self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def iter_zip(entries: list[BundleEntry]) -> Iterator[bytes]:
+    """边读边输出 zip（大小未知的条目用 data descriptor），不需要可 seek 的输出"""
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, mode="w", allowZip64=True) as archive:
+        for entry in entries:
+            if not entry.path:
+                continue
+            try:
+                src = open(entry.path, "rb")
+            except OSError:
+                continue
+            info = zipfile.ZipInfo(entry.arcname, time.localtime(max(_ZIP_EPOCH, entry.record.created_at))[:6])
+            ext = os.path.splitext(entry.record.name)[1].lower().lstrip(".")
+            info.compress_type = zipfile.ZIP_STORED if ext in _STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            info.file_size = os.fstat(src.fileno()).st_size
+            with src, archive.open(info, mode="w", force_zip64=info.file_size >= zipfile.ZIP64_LIMIT) as dest:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    dest.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def iter_tar(entries: list[BundleEntry]) -> Iterator[bytes]:
+    """逐条写 tar 头和内容块；大小以打开文件时的实际大小为准"""
+    for entry in entries:
+        if not entry.path:
+            continue
+        try:
+            f = open(entry.path, "rb")
+        except OSError:
+            continue
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            info = tarfile.TarInfo(entry.arcname)
+            info.size = size
+            info.mtime = int(entry.record.created_at)
+            info.mode = 0o644
+            yield info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+            remaining = size
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    # 文件在读取途中被截短：补零保持头部声明的大小
+                    chunk = b"\0" * min(CHUNK_SIZE, remaining)
+                remaining -= len(chunk)
+                yield chunk
+            padding = -size % tarfile.BLOCKSIZE
+            if padding:
+                yield b"\0" * padding
+    # 结束标记两个空块，整体补齐到 tarfile 默认的记录大小
+    yield b"\0" * tarfile.RECORDSIZE
+
+
+def bundle_manifest(
+    entries: list[BundleEntry],
+    store: ArtifactStore,
+    url_prefixes: dict[str, str],
+    public_base_url: str = "",
+    inline_max_bytes: int = 0,
+    inline_total_max_bytes: int = 0,
+) -> dict:
+    """JSON 清单：每个产物的 URL；不超过 inline_max_bytes 的小产物以 base64 内嵌（总量受 inline_total_max_bytes 限制）"""
+    artifacts = []
+    inline_total = 0
+    for entry in entries:
+        record = entry.record
+        output = OutputFile(
+            filename=record.name,
+            original_name=record.name,
+            size_bytes=record.size_bytes,
+            url=store.url(record.kind, record.name) or "",
+        )
+        item = {"kind": record.kind}
+        item.update(output.to_dict(url_prefixes.get(record.kind, f"/{record.kind}"), public_base_url))
+        size = record.size_bytes
+        if entry.path and size <= inline_max_bytes and inline_total + size <= inline_total_max_bytes:
+            try:
+                with open(entry.path, "rb") as f:
+                    content = f.read(inline_max_bytes + 1)
+            except OSError:
+                content = None
+            if content is not None and len(content) <= inline_max_bytes:
+                item["content_base64"] = base64.b64encode(content).decode("ascii")
+                inline_total += len(content)
+        artifacts.append(item)
+    return {"artifacts": artifacts}
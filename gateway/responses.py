@@ -0,0 +1,101 @@
+"""Fast JSON responses: orjson serialization (stdlib fallback) and gzip/zstd/br negotiated per request."""
+from __future__ import annotations
+
+import asyncio
+import functools
+import gzip
+import json
+from typing import Callable, Optional
+
+from starlette.responses import Response
+
+from common.contracts import ExecuteResult
+from common.settings import Settings
+from gateway.artifact_serving import choose_encoding
+
+try:
+    import orjson
+except ImportError:  # 可选依赖：没有时退回标准库
+    orjson = None
+
+# 动态压缩在请求路径上，用快速档（预压缩产物用的是最高级别）；gzip 6 级在大 stdout 上慢约 6 倍，体积只小 15%
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 3
+BROTLI_QUALITY = 4
+# 返回体超过该字节数时在线程池中序列化/压缩，不占用事件循环
+OFFLOAD_MIN_BYTES = 256 * 1024
+
+
+def dumps(payload) -> bytes:
+    """与 JSONResponse 输出等价的紧凑 UTF-8 JSON；orjson 不支持的值（超 64 位整数、孤立代理字符）退回标准库"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload)
+        except (orjson.JSONEncodeError, TypeError):
+            pass
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode(
+        "utf-8", errors="surrogatepass"
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def response_encoders() -> dict[str, Callable[[bytes], bytes]]:
+    """Content-Encoding -> 压缩函数；brotli / zstandard 为可选依赖，不可用时只有 gzip"""
+    encoders: dict[str, Callable[[bytes], bytes]] = {}
+    try:
+        import brotli
+
+        encoders["br"] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+
+        encoders["zstd"] = lambda data: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    except ImportError:
+        pass
+    encoders["gzip"] = lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    return encoders
+
+
+def encode_body(payload, accept_encoding: str = "", compress_min_bytes: int = 0) -> tuple[bytes, str]:
+    """(返回体字节, Content-Encoding)；compress_min_bytes <= 0 或返回体较小时不压缩"""
+    body = dumps(payload)
+    if compress_min_bytes <= 0 or len(body) < compress_min_bytes:
+        return body, ""
+    encoders = response_encoders()
+    encoding = choose_encoding(accept_encoding, tuple(encoders))
+    if not encoding:
+        return body, ""
+    return encoders[encoding](body), encoding
+
+
+async def result_response(
+    exec_result: ExecuteResult,
+    settings: Settings,
+    accept_encoding: str = "",
+    status_code: int = 200,
+    headers: Optional[dict] = None,
+) -> Response:
+    """把执行结果直接写成（按需压缩的）JSON 字节；大结果的序列化与压缩放到线程池，不阻塞事件循环"""
+    payload = exec_result.to_legacy_dict(
+        image_url_prefix=settings.image_url_prefix,
+        file_url_prefix=settings.file_url_prefix,
+        public_base_url=settings.public_base_url,
+    )
+    compress_min_bytes = max(0, int(settings.response_compress_min_bytes)) if settings.response_compression else 0
+    # 返回体大小以 stdout/stderr 为主
+    size_hint = len(exec_result.stdout or "") + len(exec_result.stderr or "")
+    if size_hint >= OFFLOAD_MIN_BYTES:
+        loop = asyncio.get_running_loop()
+        body, encoding = await loop.run_in_executor(None, encode_body, payload, accept_encoding, compress_min_bytes)
+    else:
+        body, encoding = encode_body(payload, accept_encoding, compress_min_bytes)
+
+    response_headers = dict(headers or {})
+    if compress_min_bytes:
+        # 是否压缩取决于 Accept-Encoding，缓存需要按它区分
+        response_headers["vary"] = "Accept-Encoding"
+    if encoding:
+        response_headers["content-encoding"] = encoding
+    return Response(content=body, status_code=status_code, headers=response_headers, media_type="application/json")
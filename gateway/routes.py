@@ -1,24 +1,58 @@
 import os
+import math
+import asyncio
 import logging
 import mimetypes
 import traceback
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel, Field
-from starlette.responses import FileResponse, JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
+from common.analysis import CodeAnalyzer
+from common.artifacts import ArtifactStore
 from common.capabilities import get_executor_runtime_info
-from common.contracts import ExecuteRequest, ExecutionService
+from common.contracts import (
+    EXECUTION_ID_PATTERN,
+    IMAGE_FORMATS,
+    PROFILER_MODES,
+    ExecuteRequest,
+    ExecuteResult,
+    ExecutionService,
+    FigureOptions,
+    is_valid_execution_id,
+    new_execution_id,
+)
+from common.metrics import MetricsRegistry
+from common.resources import get_default_profile, load_resource_profiles
 from common.settings import Settings
+from common.tenancy import TenantRegistry
 from common.utils import UtilsClass
+from gateway.artifact_serving import artifact_response, remote_redirect
+from gateway.bundles import BUNDLE_FORMATS, MEDIA_TYPES, bundle_entries, bundle_manifest, iter_tar, iter_zip
+from gateway.responses import result_response
 
 router = APIRouter()
 
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("image/svg+xml", ".svg")
+
+PROFILER_PATTERN = "^(%s)$" % "|".join(PROFILER_MODES)
+BUNDLE_FORMAT_PATTERN = "^(%s)$" % "|".join(BUNDLE_FORMATS)
+
 
 class CodeRequest(BaseModel):
     code: str
     files: list[str] = Field(default_factory=list)
+    resource_profile: Optional[str] = None
+    image_format: Optional[str] = None
+    image_dpi: Optional[int] = Field(default=None, ge=10, le=600)
+    image_max_dimension: Optional[int] = Field(default=None, ge=100, le=10000)
+    # 调用方指定执行 ID 后可在执行中通过 /api/v1/executions/{execution_id}/cancel 取消
+    execution_id: Optional[str] = Field(default=None, pattern=EXECUTION_ID_PATTERN)
+    # 在性能分析器下运行：cprofile（确定性）或 sampling（低开销采样）
+    profiler: Optional[str] = Field(default=None, pattern=PROFILER_PATTERN)
 
 
 class InstalledPackage(BaseModel):
@@ -45,18 +79,92 @@ def get_execution_service(request: Request) -> ExecutionService:
     return request.app.state.execution_service
 
 
+def get_metrics(request: Request) -> MetricsRegistry:
+    return request.app.state.metrics
+
+
+def get_artifact_store(request: Request) -> ArtifactStore:
+    return request.app.state.artifact_store
+
+
+def get_code_analyzer(request: Request) -> CodeAnalyzer:
+    return request.app.state.code_analyzer
+
+
+def get_tenants(request: Request) -> TenantRegistry:
+    return request.app.state.tenants
+
+
+def _error_payload(error: str) -> dict:
+    return {
+        "result": "",
+        "error": error,
+        "execution_time": 0,
+        "image_url": None,
+        "images": [],
+        "files": [],
+        "inputs": [],
+        "resource_usage": None,
+    }
+
+
+async def _execute_until_disconnected(
+    http_request: Request,
+    service: ExecutionService,
+    exec_request: ExecuteRequest,
+    poll_seconds: float,
+) -> ExecuteResult:
+    """执行期间定期检查客户端是否已断开，断开则取消执行，释放调度名额与容器"""
+    task = asyncio.ensure_future(service.execute(exec_request))
+    try:
+        while poll_seconds > 0:
+            done, _pending = await asyncio.wait({task}, timeout=poll_seconds)
+            if done:
+                break
+            if await http_request.is_disconnected():
+                if not service.cancel(exec_request.execution_id, reason="disconnect"):
+                    task.cancel()
+                break
+        return await task
+    except asyncio.CancelledError:
+        if not task.cancelled() or asyncio.current_task().cancelling():
+            raise
+        return ExecuteResult(stdout="", stderr="Execution cancelled", execution_time=0.0)
+    finally:
+        # 请求处理本身被取消（如服务关闭）时一并取消执行
+        if not task.done():
+            task.cancel()
+
+
+def _figure_options(request: CodeRequest, settings: Settings) -> Optional[FigureOptions]:
+    if request.image_format is None and request.image_dpi is None and request.image_max_dimension is None:
+        return None
+    image_format = (request.image_format or settings.figure_format or "png").strip().lower()
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image_format: {image_format} (supported: {', '.join(IMAGE_FORMATS)})")
+    return FigureOptions(
+        format=image_format,
+        dpi=request.image_dpi or settings.figure_dpi,
+        max_dimension=request.image_max_dimension or settings.figure_max_dimension,
+    )
+
+
 @router.get("/capabilities", response_model=CapabilitiesResponse)
 def capabilities(settings: Settings = Depends(get_settings)):
     runtime = get_executor_runtime_info(settings)
+    profiles = load_resource_profiles(settings)
+    default_profile = get_default_profile(settings, profiles)
 
     limits = {
         "maxConcurrency": settings.max_workers,
         "executionTimeoutSeconds": settings.execution_timeout,
         "container": {
-            "memory": "1g",
-            "cpus": 1,
+            "memory": default_profile.memory,
+            "cpus": default_profile.cpus,
             "pidsLimit": settings.docker_pids_limit,
         },
+        "defaultResourceProfile": default_profile.name,
+        "resourceProfiles": [profile.to_dict() for profile in profiles.values()],
         "input": {
             "maxFiles": settings.input_max_files,
             "maxFileBytes": settings.input_file_max_bytes,
@@ -103,61 +211,162 @@ def capabilities(settings: Settings = Depends(get_settings)):
 @router.post("/api/v1/execute")
 async def execute(
     request: CodeRequest,
+    http_request: Request,
     service: ExecutionService = Depends(get_execution_service),
     utils: UtilsClass = Depends(get_utils),
     settings: Settings = Depends(get_settings),
+    analyzer: CodeAnalyzer = Depends(get_code_analyzer),
+    tenants: TenantRegistry = Depends(get_tenants),
+    registry: MetricsRegistry = Depends(get_metrics),
 ):
+    # 鉴权与限速失败不是执行结果，用 401/429 区分，便于调用方退避重试
+    tenant = tenants.identify(http_request.headers)
+    if tenant is None:
+        registry.inc("tenant_requests_total", tenant="", status="unauthorized")
+        return JSONResponse(content=_error_payload("Unauthorized: missing or invalid API key"), status_code=401)
+    retry_after = tenants.try_acquire(tenant)
+    if retry_after > 0:
+        registry.inc("tenant_requests_total", tenant=tenant.name, status="rate_limited")
+        return JSONResponse(
+            content=_error_payload(f"Rate limit exceeded for tenant '{tenant.name}'"),
+            status_code=429,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+    registry.inc("tenant_requests_total", tenant=tenant.name, status="accepted")
+    execution_id = request.execution_id or new_execution_id()
+    headers = {"X-Execution-ID": execution_id}
+
     try:
         code = utils.format_python_code(request.code)
-        exec_result = await service.execute(ExecuteRequest(code=code, files=request.files))
-        payload = exec_result.to_legacy_dict(
-            image_url_prefix=settings.image_url_prefix,
-            file_url_prefix=settings.file_url_prefix,
-            public_base_url=settings.public_base_url,
-        )
+        # 预检：编译错误与策略违规不进入调度/容器，按同样的响应结构立即返回
+        analysis = analyzer.cached(code)
+        if analysis is None:
+            # 解析大段代码会占用 CPU，未命中缓存时放到线程池，不阻塞事件循环
+            analysis = await asyncio.get_running_loop().run_in_executor(None, analyzer.analyze, code)
+        if not analysis.ok:
+            exec_result = ExecuteResult(stdout="", stderr=analysis.error_message(), execution_time=0.0)
+        else:
+            exec_request = ExecuteRequest(
+                code=code,
+                files=request.files,
+                resource_profile=request.resource_profile or "",
+                figure_options=_figure_options(request, settings),
+                tenant=tenant.name,
+                execution_id=execution_id,
+                profiler=request.profiler or "",
+            )
+            exec_result = await _execute_until_disconnected(
+                http_request, service, exec_request, settings.client_disconnect_poll_seconds
+            )
+        accept_encoding = http_request.headers.get("accept-encoding", "")
+        if exec_result.retry_after is not None:
+            # 暂时不可用（docker daemon 熔断）：与限速一样返回可重试的状态码，返回体结构不变
+            headers["Retry-After"] = str(max(1, math.ceil(exec_result.retry_after)))
+            return await result_response(exec_result, settings, accept_encoding, 503, headers)
         # 下游仅通过 `error` 字段判断成功/失败，因此统一返回 200。
-        return JSONResponse(content=payload, status_code=200)
+        return await result_response(exec_result, settings, accept_encoding, 200, headers)
     except Exception as e:
         logging.exception("Error executing code")
-        payload = {
-            "result": "",
-            "error": traceback.format_exc(),
-            "execution_time": 0,
-            "image_url": None,
-            "files": [],
-            "inputs": [],
-        }
-        return JSONResponse(content=payload, status_code=200)
+        return JSONResponse(content=_error_payload(traceback.format_exc()), status_code=200, headers=headers)
 
 
-@router.get("/images/{filename}")
-def get_image(
-    filename: str,
+@router.post("/api/v1/executions/{execution_id}/cancel")
+async def cancel_execution(
+    execution_id: str,
+    http_request: Request,
+    service: ExecutionService = Depends(get_execution_service),
+    tenants: TenantRegistry = Depends(get_tenants),
+):
+    tenant = tenants.identify(http_request.headers)
+    if tenant is None:
+        raise HTTPException(status_code=401, detail={"error": "Unauthorized: missing or invalid API key"})
+    # 在事件循环中取消（Task.cancel 不是线程安全的，不能放到线程池执行）；
+    # 只能取消本租户的执行，其他租户的执行与不存在的执行同样返回 404
+    if not service.cancel(execution_id, tenant=tenant.name, reason="request"):
+        raise HTTPException(status_code=404, detail={"error": "Execution not found"})
+    return {"execution_id": execution_id, "cancelled": True}
+
+
+@router.get("/api/v1/executions/{execution_id}/artifacts")
+def get_execution_artifacts(
+    execution_id: str,
+    http_request: Request,
+    format: str = Query(default="zip", pattern=BUNDLE_FORMAT_PATTERN),
+    inline_max_bytes: Optional[int] = Query(default=None, ge=0),
     settings: Settings = Depends(get_settings),
+    store: ArtifactStore = Depends(get_artifact_store),
+    tenants: TenantRegistry = Depends(get_tenants),
+    registry: MetricsRegistry = Depends(get_metrics),
 ):
+    """
+    一次取回某次执行的全部产物：zip/tar 边读边流式输出（内存占用与单块大小相当），
+    json 返回清单，小产物以 base64 内嵌。只在远端对象存储中的产物不进归档，清单中给出 URL。
+    只能取回本租户的执行，其他租户的执行返回 404。
+    """
+    tenant = tenants.identify(http_request.headers)
+    if tenant is None:
+        raise HTTPException(status_code=401, detail={"error": "Unauthorized: missing or invalid API key"})
+    if not is_valid_execution_id(execution_id):
+        raise HTTPException(status_code=400, detail={"error": "Invalid execution id"})
+    entries = bundle_entries(store, execution_id, tenant.name)
+    if not entries:
+        raise HTTPException(status_code=404, detail={"error": "Execution not found"})
+    registry.inc("artifact_bundles_total", format=format)
+
+    if format == "json":
+        limit = settings.bundle_inline_max_bytes
+        if inline_max_bytes is not None:
+            limit = min(limit, inline_max_bytes)
+        return bundle_manifest(
+            entries,
+            store,
+            {"images": settings.image_url_prefix, "files": settings.file_url_prefix},
+            settings.public_base_url,
+            inline_max_bytes=limit,
+            inline_total_max_bytes=settings.bundle_inline_total_max_bytes,
+        )
+
+    headers = {
+        "content-disposition": f'attachment; filename="{execution_id}.{format}"',
+        # 只在远端的产物数量，调用方可改用 format=json 拿到它们的 URL
+        "x-artifacts-skipped": str(sum(1 for entry in entries if not entry.path)),
+    }
+    body = iter_zip(entries) if format == "zip" else iter_tar(entries)
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers=headers)
+
+
+@router.get("/metrics")
+async def metrics(registry: MetricsRegistry = Depends(get_metrics)):
+    return PlainTextResponse(registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def _serve_artifact(request: Request, store: ArtifactStore, kind: str, filename: str, default_media_type: str):
     safe_name = os.path.basename(filename)
-    if safe_name != filename:
+    if safe_name != filename or safe_name.startswith("."):
         raise HTTPException(status_code=400, detail={"error": "Invalid filename"})
 
-    try:
-        path_or_file = os.path.join(settings.image_store_path, safe_name)
-        return FileResponse(path_or_file, media_type="image/png")
-    except FileNotFoundError:
+    response = artifact_response(store, kind, safe_name, request.headers, default_media_type)
+    if response is None:
+        # 本机没有（已上传后删除或由其他节点产生）：远端后端时重定向到对象存储
+        response = remote_redirect(store, kind, safe_name)
+    if response is None:
         raise HTTPException(status_code=404, detail={"error": "File not found"})
+    return response
+
+
+@router.get("/images/{filename}")
+def get_image(
+    filename: str,
+    request: Request,
+    store: ArtifactStore = Depends(get_artifact_store),
+):
+    return _serve_artifact(request, store, "images", filename, "image/png")
 
 
 @router.get("/files/{filename}")
 def get_file(
     filename: str,
-    settings: Settings = Depends(get_settings),
+    request: Request,
+    store: ArtifactStore = Depends(get_artifact_store),
 ):
-    safe_name = os.path.basename(filename)
-    if safe_name != filename:
-        raise HTTPException(status_code=400, detail={"error": "Invalid filename"})
-
-    try:
-        path_or_file = os.path.join(settings.file_store_path, safe_name)
-        media_type, _ = mimetypes.guess_type(path_or_file)
-        return FileResponse(path_or_file, media_type=media_type or "application/octet-stream")
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail={"error": "File not found"})
+    return _serve_artifact(request, store, "files", filename, "application/octet-stream")
@@ -0,0 +1,134 @@
+import asyncio
+import shutil
+import tempfile
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common.analysis import CodeAnalyzer, NameScanner
+from common.contracts import ExecuteRequest
+from common.metrics import MetricsRegistry
+from common.settings import Settings
+from common.tenancy import TenantRegistry
+from common.utils import UtilsClass
+from executors.docker_executor import CodeExecutor
+from gateway.routes import router
+
+
+class CodeAnalyzerTests(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+        self.analyzer = CodeAnalyzer(
+            Settings(code_forbidden_modules={"socket"}, code_forbidden_calls={"eval", "os.system"}),
+            self.metrics,
+        )
+
+    def test_syntax_and_compile_errors(self):
+        analysis = self.analyzer.analyze("x = 1\nprint(x\n")
+        self.assertFalse(analysis.ok)
+        self.assertIn('File "/code/script.py", line 2', analysis.error)
+        self.assertIn("SyntaxError", analysis.error)
+
+        # 只有编译阶段才会报出的错误
+        self.assertIn("'return' outside function", self.analyzer.analyze("return 1\n").error)
+        self.assertEqual(self.metrics.value("code_analysis_total", result="syntax_error"), 2)
+
+    def test_imports_and_policy_violations(self):
+        ok = self.analyzer.analyze("import numpy as np\nfrom pandas.io import json\nfrom . import x\n")
+        self.assertTrue(ok.ok)
+        self.assertEqual(ok.imports, frozenset({"numpy", "pandas"}))
+
+        bad = self.analyzer.analyze("import socket.x\nimport os\nos.system('ls')\neval('1')\n")
+        self.assertFalse(bad.ok)
+        self.assertEqual(len(bad.violations), 3)
+        self.assertIn("line 3: call to 'os.system' is not allowed", bad.error_message())
+
+    def test_bare_call_names_do_not_match_methods(self):
+        ok = self.analyzer.analyze("model.eval()\nself.eval('1')\nsystem('ls')\nimport posix\nposix.system('x')\n")
+        self.assertTrue(ok.ok, ok.error_message())
+
+    def test_single_pass_features(self):
+        code = (
+            "import seaborn as sns\n"
+            "df = pd.read_csv('/code/input/data.csv')\n"
+            "x = np .array([1])\n"
+            "label = 'version 1.5'\n"
+            "df.to_excel('out/report.xlsx')\n"
+            "plt.title('a')\n"
+        )
+        features = self.analyzer.analyze(code).features
+
+        self.assertEqual(features.imports, frozenset({"seaborn"}))
+        self.assertEqual(features.attribute_names, frozenset({"pd", "plt"}))
+        self.assertTrue(features.uses_matplotlib)
+        self.assertEqual(features.file_paths, ("/code/input/data.csv", "out/report.xlsx"))
+        self.assertEqual(
+            features.packages({"pd": "pandas", "np": "numpy", "plt": "matplotlib", "seaborn": "seaborn"}),
+            ["matplotlib", "pandas", "seaborn"],
+        )
+        self.assertFalse(self.analyzer.analyze("print('plotting')\n").features.uses_matplotlib)
+
+    def test_name_scanner_strategies_agree(self):
+        code = "x = pd.DataFrame()\ny = mypd.z + pd_2.a + np\nv.pd.w\n"
+        small = NameScanner(["pd", "np", "pd_2"])
+        large = NameScanner(["pd", "np", "pd_2"] + [f"pkg{i}" for i in range(100)])
+
+        self.assertIsNot(small.pattern, large.pattern)
+        self.assertEqual(small.scan(code), large.scan(code))
+        self.assertEqual(small.scan(code), (frozenset({"pd", "np", "pd_2"}), frozenset({"pd", "pd_2"})))
+
+    def test_results_are_cached_by_code_hash(self):
+        first = self.analyzer.analyze("import numpy\n")
+        self.assertIs(self.analyzer.analyze("import numpy\n"), first)
+        self.assertEqual(self.metrics.value("code_analysis_cache_hits_total"), 1)
+
+        small = CodeAnalyzer(Settings(code_analysis_cache_size=1))
+        small.analyze("a = 1")
+        small.analyze("b = 2")
+        self.assertEqual(len(small._cache), 1)
+
+
+class _RecordingService:
+    def __init__(self):
+        self.calls = 0
+
+    async def execute(self, request):
+        self.calls += 1
+        raise AssertionError("pre-flight should reject before execution")
+
+
+class PreflightTests(unittest.TestCase):
+    def test_executor_rejects_without_touching_pool(self):
+        executor = CodeExecutor(Settings())
+        result = asyncio.run(executor.execute(ExecuteRequest(code="def f(:\n")))
+
+        self.assertIn("SyntaxError", result.stderr)
+        self.assertFalse(executor.pool_initialized)
+
+    def test_gateway_returns_error_in_execute_shape(self):
+        settings = Settings()
+        service = _RecordingService()
+        app = FastAPI()
+        app.include_router(router)
+        app.state.settings = settings
+        image_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, image_dir, True)
+        app.state.utils = UtilsClass(image_dir=image_dir)
+        app.state.execution_service = service
+        app.state.code_analyzer = CodeAnalyzer(settings)
+        app.state.metrics = MetricsRegistry()
+        app.state.tenants = TenantRegistry()
+
+        response = TestClient(app).post("/api/v1/execute", json={"code": "print('a'"})
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertIn("SyntaxError", payload["error"])
+        self.assertEqual(payload["files"], [])
+        self.assertIsNone(payload["image_url"])
+        self.assertEqual(service.calls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
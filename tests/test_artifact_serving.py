@@ -0,0 +1,105 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common.artifacts import ArtifactStore
+from common.settings import Settings
+from gateway.artifact_serving import choose_encoding, etag_matches
+from gateway.routes import router
+
+
+class NegotiationTests(unittest.TestCase):
+    def test_choose_encoding_honours_q_values_and_preference(self):
+        self.assertEqual(choose_encoding("gzip, br", ("gzip", "br")), "br")
+        self.assertEqual(choose_encoding("gzip;q=1, br;q=0.5", ("gzip", "br")), "gzip")
+        self.assertEqual(choose_encoding("br;q=0, *", ("br", "gzip")), "gzip")
+        self.assertEqual(choose_encoding("identity", ("gzip",)), "")
+        self.assertEqual(choose_encoding("", ("gzip",)), "")
+
+    def test_etag_matches_uses_weak_comparison(self):
+        self.assertTrue(etag_matches('W/"abc", "def"', '"abc"'))
+        self.assertTrue(etag_matches("*", '"abc"'))
+        self.assertFalse(etag_matches('"abcd"', '"abc"'))
+        self.assertFalse(etag_matches(None, '"abc"'))
+
+
+class ArtifactServingTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        settings = Settings(
+            image_store_path=os.path.join(self.tmp_dir, "images"),
+            file_store_path=os.path.join(self.tmp_dir, "files"),
+            artifact_precompress_extensions={"csv"},
+        )
+        self.store = ArtifactStore(settings)
+        app = FastAPI()
+        app.include_router(router)
+        app.state.artifact_store = self.store
+        self.client = TestClient(app)
+
+        self.content = ("id,value\n" + "".join(f"{i},{i * i}\n" for i in range(2000))).encode()
+        src = os.path.join(self.tmp_dir, "src.csv")
+        with open(src, "wb") as f:
+            f.write(self.content)
+        self.store.put("files", "e1", "out_e1_1_data.csv", src)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_immutable_headers_and_conditional_get(self):
+        response = self.client.get("/files/out_e1_1_data.csv", headers={"Accept-Encoding": "identity"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.content)
+        self.assertIn("immutable", response.headers["cache-control"])
+        etag = response.headers["etag"]
+        self.assertEqual(etag, f'"{self.store.get("files", "out_e1_1_data.csv").sha256[:32]}"')
+
+        cached = self.client.get(
+            "/files/out_e1_1_data.csv",
+            headers={"Accept-Encoding": "identity", "If-None-Match": etag},
+        )
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b"")
+        self.assertEqual(cached.headers["etag"], etag)
+
+    def test_range_request_returns_partial_content(self):
+        response = self.client.get("/files/out_e1_1_data.csv", headers={"Range": "bytes=0-7"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, b"id,value")
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertTrue(response.headers["content-range"].startswith("bytes 0-7/"))
+
+    def test_precompressed_variant_is_served(self):
+        self.assertIn("gzip", self.store.precompress("files", "out_e1_1_data.csv"))
+
+        response = self.client.get(
+            "/files/out_e1_1_data.csv",
+            headers={"Accept-Encoding": "gzip"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        self.assertTrue(response.headers["etag"].endswith('-gzip"'))
+        self.assertEqual(response.content, self.content)  # httpx 透明解压
+        record = self.store.get("files", "out_e1_1_data.csv")
+        with open(self.store.local_path(record, "gzip"), "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()), self.content)
+
+    def test_eviction_removes_variants(self):
+        self.store.precompress("files", "out_e1_1_data.csv")
+        record = self.store.get("files", "out_e1_1_data.csv")
+
+        self.store.evict_expired(now=record.created_at + 8 * 24 * 3600)
+
+        self.assertFalse(os.path.exists(self.store.local_path(record, "gzip")))
+        self.assertEqual(self.client.get("/files/out_e1_1_data.csv").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
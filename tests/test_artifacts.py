@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from common.artifacts import ArtifactStore
+from common.metrics import MetricsRegistry
+from common.settings import Settings
+
+
+class ArtifactStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.metrics = MetricsRegistry()
+        self.store = self._store()
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _store(self, **overrides):
+        settings = Settings(
+            image_store_path=os.path.join(self.tmp_dir, "images"),
+            file_store_path=os.path.join(self.tmp_dir, "files"),
+            **overrides,
+        )
+        return ArtifactStore(settings, self.metrics)
+
+    def _source(self, content: bytes = b"data") -> str:
+        fd, path = tempfile.mkstemp(dir=self.tmp_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_put_stores_content_addressed_blob_and_resolves_flat_name(self):
+        record = self.store.put("files", "ab12cd-ef", "out_ab12cd-ef_1_a.csv", self._source(), tenant="alpha")
+
+        self.assertEqual(record.path, os.path.join(".blobs", record.sha256[:2], record.sha256))
+        path = self.store.resolve("files", "out_ab12cd-ef_1_a.csv")
+        self.assertEqual(path, os.path.join(self.tmp_dir, "files", record.path))
+        self.assertIsNone(self.store.resolve("images", "out_ab12cd-ef_1_a.csv"))
+        self.assertEqual(
+            [(r.name, r.tenant) for r in self.store.list_execution("ab12cd-ef")], [("out_ab12cd-ef_1_a.csv", "alpha")]
+        )
+        self.assertEqual(self.store.stats()["files"], {"bytes": 4, "objects": 1, "blobs": 1})
+
+    def test_identical_content_is_stored_once_and_refcounted(self):
+        first = self.store.put("images", "e1", "plot_e1_1.png", self._source(b"same"))
+        second = self.store.put("images", "e2", "plot_e2_1.png", self._source(b"same"))
+
+        self.assertEqual(first.path, second.path)
+        self.assertEqual(self.store.blob_refcount(second), 2)
+        self.assertEqual(self.store.stats()["images"], {"bytes": 4, "objects": 2, "blobs": 1})
+        self.assertEqual(self.metrics.value("artifact_dedup_bytes_total", kind="images"), 4)
+
+        self.store._delete([first], "ttl")
+        self.assertEqual(self.store.resolve("images", "plot_e2_1.png"), self.store.local_path(second))
+        self.store._delete([second], "ttl")
+        self.assertFalse(os.path.exists(self.store.local_path(second)))
+        self.assertEqual(self.store.stats()["images"], {"bytes": 0, "objects": 0, "blobs": 0})
+
+    def test_names_of_another_execution_are_never_replaced(self):
+        self.assertFalse(self.store.has_execution("e1"))
+        first = self.store.put("files", "e1", "out_e1_1_a.csv", self._source(b"first"))
+
+        with self.assertRaises(ValueError):
+            self.store.put("files", "e2", "out_e1_1_a.csv", self._source(b"second"))
+
+        self.assertTrue(self.store.has_execution("e1"))
+        self.assertFalse(self.store.has_execution("e2"))
+        self.assertEqual(self.store.get("files", "out_e1_1_a.csv").sha256, first.sha256)
+        with open(self.store.resolve("files", "out_e1_1_a.csv"), "rb") as f:
+            self.assertEqual(f.read(), b"first")
+        self.assertEqual(self.store.stats()["files"], {"bytes": 5, "objects": 1, "blobs": 1})
+
+    def test_ttl_eviction_removes_files_and_empty_dirs(self):
+        self.store.put("images", "e1", "plot_e1_1.png", self._source())
+
+        self.assertEqual(self.store.evict_expired(now=time.time() + 8 * 24 * 3600), 1)
+
+        self.assertIsNone(self.store.resolve("images", "plot_e1_1.png"))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, "images", "e1")))
+        self.assertEqual(self.metrics.value("artifact_evictions_total", kind="images", reason="ttl"), 1)
+
+    def test_quota_evicts_oldest_first(self):
+        self.store.close()
+        self.store = self._store(artifact_max_bytes=10)
+        self.store.put("files", "e1", "old.txt", self._source(b"x" * 6))
+        self.store.put("files", "e2", "new.txt", self._source(b"y" * 6))
+
+        self.assertEqual(self.store.evict_over_quota(), 1)
+
+        self.assertIsNone(self.store.resolve("files", "old.txt"))
+        self.assertIsNotNone(self.store.resolve("files", "new.txt"))
+
+    def test_legacy_flat_files_are_served_and_adopted(self):
+        legacy_dir = os.path.join(self.tmp_dir, "images")
+        os.makedirs(legacy_dir)
+        with open(os.path.join(legacy_dir, "plot_old.png"), "wb") as f:
+            f.write(b"png")
+
+        self.assertIsNotNone(self.store.resolve("images", "plot_old.png"))
+        self.assertEqual(self.store.adopt_legacy_files(), 1)
+        self.assertEqual(self.store.stats()["images"]["objects"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,206 @@
+import asyncio
+import shutil
+import tempfile
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common.analysis import CodeAnalyzer
+from common.contracts import ExecuteRequest, ExecuteResult
+from common.metrics import MetricsRegistry
+from common.settings import Settings
+from common.tenancy import TenantRegistry
+from common.utils import UtilsClass
+from executors.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, is_daemon_error
+from executors.docker_executor import CodeExecutor
+from gateway.routes import router
+
+DAEMON_DOWN = "echo 'Cannot connect to the Docker daemon at unix:///var/run/docker.sock' >&2; exit 1"
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.transitions = []
+        self.breaker = CircuitBreaker(
+            failure_ratio=0.5,
+            min_calls=4,
+            window_seconds=10,
+            slow_call_seconds=2,
+            open_seconds=5,
+            clock=self.clock,
+            on_state_change=lambda previous, state: self.transitions.append(state),
+        )
+
+    def test_opens_on_error_ratio_and_rejects_fast(self):
+        for ok in (True, False, True, False):
+            self.breaker.before_call()
+            self.breaker.record(ok)
+
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError) as ctx:
+            self.breaker.before_call()
+        self.assertAlmostEqual(ctx.exception.retry_after, 5)
+
+    def test_slow_calls_count_as_failures(self):
+        for latency in (0.1, 3, 3, 0.1):
+            self.breaker.record(True, latency)
+
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_old_calls_leave_the_window(self):
+        self.breaker.record(False)
+        self.breaker.record(False)
+        self.clock.now = 11
+        for _ in range(3):
+            self.breaker.record(True)
+
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_admits_one_probe(self):
+        for _ in range(4):
+            self.breaker.record(False)
+        self.clock.now = 5
+
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.clock.now = 10
+        self.breaker.before_call()
+        self.breaker.record(True)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.transitions, [OPEN, HALF_OPEN, OPEN, HALF_OPEN, CLOSED])
+
+    def test_probe_without_result_returns_its_slot(self):
+        for _ in range(4):
+            self.breaker.record(False)
+        self.clock.now = 5
+
+        with self.assertRaises(ValueError):
+            with self.breaker.attempt():
+                raise ValueError("boom")
+        with self.breaker.attempt() as record:
+            with self.assertRaises(CircuitOpenError):
+                self.breaker.before_call()
+            record(True)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_stale_probe_does_not_return_a_newer_slot(self):
+        for _ in range(4):
+            self.breaker.record(False)
+        self.clock.now = 5
+        stale = self.breaker.before_call()
+        self.breaker.record(False)
+        self.clock.now = 10
+
+        self.breaker.before_call()
+        self.breaker.release(stale)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_daemon_error_detection(self):
+        self.assertTrue(is_daemon_error("Cannot connect to the Docker daemon at unix:///var/run/docker.sock."))
+        self.assertFalse(is_daemon_error("Error: No such container: abc"))
+
+
+class ExecutorBreakerTests(unittest.TestCase):
+    def test_rejects_fast_while_open_and_recovers(self):
+        async def scenario():
+            executor = CodeExecutor(Settings(docker_breaker_min_calls=2, docker_breaker_open_seconds=0.1))
+            for _ in range(2):
+                rc, _stdout, _stderr = await executor._run_docker("sh", "-c", DAEMON_DOWN)
+                self.assertEqual(rc, 1)
+            self.assertEqual(executor.docker_breaker.state, OPEN)
+
+            result = await executor.execute(ExecuteRequest(code="print(1)"))
+            self.assertIn("Docker daemon unavailable", result.stderr)
+            self.assertGreater(result.retry_after, 0)
+            self.assertFalse(executor.pool_initialized)
+            self.assertEqual(executor.scheduler.active + executor.scheduler.queued, 0)
+
+            # 恢复探测：daemon 恢复后半开探测成功即关闭
+            real_run_docker = executor._run_docker
+
+            async def healthy_daemon(*cmd, **kwargs):
+                return await real_run_docker("true", **kwargs)
+
+            executor._run_docker = healthy_daemon
+            await asyncio.wait_for(executor.docker_recovery_task, 2)
+            self.assertEqual(executor.docker_breaker.state, CLOSED)
+            self.assertEqual(executor.metrics.value("executor_rejections_total", reason="docker_unavailable"), 1)
+
+        asyncio.run(scenario())
+
+    def test_call_timeout_counts_as_failure(self):
+        async def scenario():
+            executor = CodeExecutor(Settings(docker_breaker_min_calls=1, docker_call_timeout_seconds=0.1))
+            rc, _stdout, stderr = await executor._run_docker("sleep", "5")
+            self.assertEqual(rc, -1)
+            self.assertIn("timed out", stderr)
+            self.assertEqual(executor.docker_breaker.state, OPEN)
+
+        asyncio.run(scenario())
+
+    def test_cancelled_half_open_probe_releases_its_slot(self):
+        async def scenario():
+            executor = CodeExecutor(Settings(docker_breaker_min_calls=1, docker_breaker_open_seconds=0))
+            executor.docker_breaker.record(False)
+            self.assertEqual(executor.docker_breaker.state, HALF_OPEN)
+
+            probe = asyncio.create_task(executor._run_docker("sleep", "5"))
+            await asyncio.sleep(0.2)
+            with self.assertRaises(CircuitOpenError):
+                executor.docker_breaker.before_call()
+            probe.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await probe
+
+            rc, stdout, _stderr = await executor._run_docker("echo", "ok")
+            self.assertEqual((rc, stdout.strip()), (0, "ok"))
+            self.assertEqual(executor.docker_breaker.state, CLOSED)
+
+        asyncio.run(scenario())
+
+
+class _UnavailableService:
+    async def execute(self, request):
+        return ExecuteResult(stdout="", stderr=str(CircuitOpenError(7.2)), execution_time=0.0, retry_after=7.2)
+
+
+class GatewayBreakerTests(unittest.TestCase):
+    def test_unavailable_returns_503_with_retry_after(self):
+        settings = Settings()
+        app = FastAPI()
+        app.include_router(router)
+        image_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, image_dir, True)
+        app.state.settings = settings
+        app.state.utils = UtilsClass(image_dir=image_dir)
+        app.state.execution_service = _UnavailableService()
+        app.state.code_analyzer = CodeAnalyzer(settings)
+        app.state.metrics = MetricsRegistry()
+        app.state.tenants = TenantRegistry()
+
+        response = TestClient(app).post("/api/v1/execute", json={"code": "print(1)"})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "8")
+        self.assertIn("Docker daemon unavailable", response.json()["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import base64
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common.artifacts import ArtifactStore
+from common.metrics import MetricsRegistry
+from common.settings import Settings
+from common.tenancy import TenantRegistry
+from gateway import bundles
+from gateway.routes import router
+
+
+class ExecutionBundleTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+        self.settings = Settings(
+            image_store_path=os.path.join(self.tmp_dir, "images"),
+            file_store_path=os.path.join(self.tmp_dir, "files"),
+            bundle_inline_max_bytes=1024,
+        )
+        self.store = ArtifactStore(self.settings)
+        self.addCleanup(self.store.close)
+        self.metrics = MetricsRegistry()
+        app = FastAPI()
+        app.include_router(router)
+        app.state.settings = self.settings
+        app.state.artifact_store = self.store
+        app.state.metrics = self.metrics
+        app.state.tenants = TenantRegistry()
+        self.client = TestClient(app)
+
+        self.contents = {
+            ("images", "plot_e1_1.png"): b"\x89PNG" + os.urandom(3000),
+            ("files", "out_e1_1_data.csv"): b"id,value\n" + b"1,2\n" * 100000,
+            ("files", "out_e1_2_note.txt"): "小文件".encode("utf-8"),
+        }
+        for (kind, name), content in self.contents.items():
+            src = os.path.join(self.tmp_dir, name)
+            with open(src, "wb") as f:
+                f.write(content)
+            self.store.put(kind, "e1", name, src, tenant="default")
+        # 其他执行的产物不在包内
+        src = os.path.join(self.tmp_dir, "other.txt")
+        with open(src, "wb") as f:
+            f.write(b"other")
+        self.store.put("files", "e2", "out_e2_1_note.txt", src, tenant="default")
+
+    def _expected(self):
+        return {f"{kind}/{name}": content for (kind, name), content in self.contents.items()}
+
+    def test_zip_bundle_streams_every_artifact(self):
+        # 小块输出也能正确拼出整个归档
+        original = bundles.CHUNK_SIZE
+        bundles.CHUNK_SIZE = 4096
+        self.addCleanup(setattr, bundles, "CHUNK_SIZE", original)
+
+        response = self.client.get("/api/v1/executions/e1/artifacts")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/zip")
+        self.assertIn('filename="e1.zip"', response.headers["content-disposition"])
+        self.assertEqual(response.headers["x-artifacts-skipped"], "0")
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual({name: archive.read(name) for name in archive.namelist()}, self._expected())
+            self.assertEqual(archive.getinfo("images/plot_e1_1.png").compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(archive.getinfo("files/out_e1_1_data.csv").compress_type, zipfile.ZIP_DEFLATED)
+        self.assertIn('artifact_bundles_total{format="zip"} 1', self.metrics.render_prometheus())
+
+    def test_tar_bundle(self):
+        response = self.client.get("/api/v1/executions/e1/artifacts", params={"format": "tar"})
+
+        self.assertEqual(response.status_code, 200)
+        with tarfile.open(fileobj=io.BytesIO(response.content), mode="r:") as archive:
+            extracted = {member.name: archive.extractfile(member).read() for member in archive.getmembers()}
+        self.assertEqual(extracted, self._expected())
+
+    def test_json_manifest_inlines_small_artifacts(self):
+        response = self.client.get(
+            "/api/v1/executions/e1/artifacts", params={"format": "json", "inline_max_bytes": 100000}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        artifacts = {item["filename"]: item for item in response.json()["artifacts"]}
+        self.assertEqual(set(artifacts), {name for _kind, name in self.contents})
+        note = artifacts["out_e1_2_note.txt"]
+        self.assertEqual(base64.b64decode(note["content_base64"]), self.contents[("files", "out_e1_2_note.txt")])
+        self.assertEqual(note["url"], "/files/out_e1_2_note.txt")
+        # 超过 BUNDLE_INLINE_MAX_BYTES 的只给 URL（请求参数不能放宽上限）
+        self.assertNotIn("content_base64", artifacts["plot_e1_1.png"])
+        self.assertEqual(artifacts["plot_e1_1.png"]["url"], "/images/plot_e1_1.png")
+
+    def test_other_tenants_executions_are_not_found(self):
+        response = self.client.get("/api/v1/executions/e1/artifacts", headers={"X-Tenant-ID": "beta"})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get("/api/v1/executions/e1/artifacts").status_code, 200)
+
+    def test_unknown_execution_and_bad_format(self):
+        self.assertEqual(self.client.get("/api/v1/executions/missing/artifacts").status_code, 404)
+        self.assertEqual(self.client.get("/api/v1/executions/e1/artifacts?format=rar").status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,248 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common.contracts import ExecuteRequest
+from common.settings import Settings
+from common.tenancy import TenantRegistry
+from executors.cancellation import ExecutionRegistry, RunningExecution
+from executors.docker_executor import CodeExecutor
+from executors.recycling import ContainerProbe
+from gateway.routes import router
+
+
+class ExecutionRegistryTests(unittest.TestCase):
+    def test_cancel_is_scoped_to_tenant(self):
+        async def scenario():
+            registry = ExecutionRegistry()
+            task = asyncio.create_task(asyncio.sleep(10))
+            running = registry.register("job-1", "alpha", task)
+            with self.assertRaises(ValueError):
+                registry.register("job-1", "alpha", task)
+
+            self.assertFalse(registry.cancel("job-1", tenant="beta"))
+            self.assertFalse(registry.cancel("missing"))
+            self.assertTrue(registry.cancel("job-1", tenant="alpha", reason="request"))
+            self.assertEqual(running.cancel_reason, "request")
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(scenario())
+
+
+class _Docker:
+    def __init__(self):
+        self.calls = []
+        self.killed = threading.Event()
+
+    async def __call__(self, *cmd, **_kwargs):
+        self.calls.append(cmd)
+        if cmd[1] == "inspect":
+            return 0, "true", ""
+        if cmd[1] == "exec" and "pkill" in cmd:
+            self.killed.set()
+        return 0, "", ""
+
+
+class ExecutorCancellationTests(unittest.TestCase):
+    def setUp(self):
+        self.scratch = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.scratch, True)
+
+    def _executor(self):
+        settings = Settings(max_workers=2, resource_profiles="standard:1g:1:1", scratch_dir=self.scratch)
+        executor = CodeExecutor(settings)
+        self.docker = executor._run_docker = _Docker()
+        self.run_started = threading.Event()
+
+        def run_code(
+            execution_id, code_file, container_id=None, input_dir="", profile=None, profiler="", container_name=""
+        ):
+            self.run_started.set()
+            # 模拟容器内作业：直到被 pkill 才返回
+            self.docker.killed.wait(5)
+            return {"error": "Execution timeout", "container_probe": ContainerProbe()}
+
+        executor._run_code = run_code
+        executor._probe_and_clean_container = lambda container_id: ContainerProbe()
+        return executor
+
+    def test_cancel_frees_slot_kills_job_and_returns_container(self):
+        async def scenario():
+            executor = self._executor()
+            await executor.initialize()
+            container_id = executor.container_pool["standard"][0]
+
+            task = asyncio.create_task(executor.execute(ExecuteRequest(code="print(1)", execution_id="job-1")))
+            await asyncio.get_running_loop().run_in_executor(None, self.run_started.wait, 5)
+            self.assertEqual(executor.scheduler.active, 1)
+
+            self.assertTrue(executor.cancel("job-1"))
+            result = await task
+            # 调度名额立即释放，无需等容器内作业结束
+            self.assertEqual(result.stderr, "Execution cancelled")
+            self.assertEqual(executor.scheduler.active, 0)
+            self.assertIsNone(executor.executions.get("job-1"))
+
+            await asyncio.gather(*executor.background_tasks)
+            pool = list(executor.container_pool["standard"])
+            await executor.shutdown()
+            return container_id, pool
+
+        container_id, pool = asyncio.run(scenario())
+
+        self.assertIn(("docker", "exec", container_id, "pkill", "-TERM", "-f", "/code/script.py"), self.docker.calls)
+        self.assertEqual(pool, [container_id])
+
+    def test_cancel_endpoint_cancels_a_running_execution(self):
+        async def scenario():
+            executor = self._executor()
+            await executor.initialize()
+            app = FastAPI()
+            app.include_router(router)
+            app.state.execution_service = executor
+            app.state.tenants = TenantRegistry()
+
+            task = asyncio.create_task(executor.execute(ExecuteRequest(code="print(1)", execution_id="job-1")))
+            await asyncio.get_running_loop().run_in_executor(None, self.run_started.wait, 5)
+            transport = httpx.ASGITransport(app=app)
+            try:
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    response = await client.post("/api/v1/executions/job-1/cancel")
+                result = await asyncio.wait_for(task, 5)
+            finally:
+                # 失败时也让模拟作业结束，避免测试挂起
+                self.docker.killed.set()
+            await asyncio.gather(*executor.background_tasks)
+            await executor.shutdown()
+            return response, result
+
+        # debug 模式下从其他线程操作事件循环会直接报错；不用 asyncio.run，失败时不会卡在取消残留任务上
+        loop = asyncio.new_event_loop()
+        loop.set_debug(True)
+        self.addCleanup(loop.close)
+        response, result = loop.run_until_complete(asyncio.wait_for(scenario(), 10))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(result.stderr, "Execution cancelled")
+
+    def test_caller_cancellation_propagates(self):
+        async def scenario():
+            executor = self._executor()
+            await executor.initialize()
+            task = asyncio.create_task(executor.execute(ExecuteRequest(code="print(1)")))
+            await asyncio.get_running_loop().run_in_executor(None, self.run_started.wait, 5)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            await asyncio.gather(*executor.background_tasks)
+            self.assertTrue(self.docker.killed.is_set())
+            self.assertEqual(executor.metrics.value("executor_cancellations_total", reason="caller"), 1)
+            await executor.shutdown()
+
+        asyncio.run(scenario())
+
+    def test_cancel_during_release_still_returns_the_container(self):
+        async def scenario():
+            executor = self._executor()
+            proceed = threading.Event()
+
+            def run_code(*_args, **_kwargs):
+                self.run_started.set()
+                proceed.wait(5)
+                return {"output": "1\n", "container_probe": ContainerProbe()}
+
+            executor._run_code = run_code
+            await executor.initialize()
+            container_id = executor.container_pool["standard"][0]
+
+            task = asyncio.create_task(executor.execute(ExecuteRequest(code="print(1)", execution_id="job-1")))
+            await asyncio.get_running_loop().run_in_executor(None, self.run_started.wait, 5)
+            # 归还容器需要池锁：先占住，让执行停在归还处
+            await executor.container_pool_lock.acquire()
+            proceed.set()
+            running = executor.executions.get("job-1")
+            for _ in range(500):
+                if running.container_id is None:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertTrue(executor.cancel("job-1"))
+            executor.container_pool_lock.release()
+            result = await task
+            await asyncio.gather(*executor.background_tasks)
+
+            self.assertEqual(result.stderr, "Execution cancelled")
+            self.assertNotIn(container_id, executor.in_use_pool_containers)
+            self.assertEqual(executor.container_pool["standard"], [container_id])
+            await executor.shutdown()
+
+        asyncio.run(scenario())
+
+    def test_execution_id_with_stored_artifacts_is_rejected(self):
+        settings = Settings(
+            scratch_dir=self.scratch,
+            file_store_path=os.path.join(self.scratch, "files"),
+            image_store_path=os.path.join(self.scratch, "images"),
+        )
+        executor = CodeExecutor(settings)
+        self.addCleanup(executor.artifact_store.close)
+        src = os.path.join(self.scratch, "a.csv")
+        with open(src, "w") as f:
+            f.write("a\n")
+        executor.artifact_store.put("files", "job-1", "out_job-1_1_a.csv", src)
+
+        result = asyncio.run(executor.execute(ExecuteRequest(code="print(1)", execution_id="job-1")))
+
+        self.assertEqual(result.stderr, "Execution id already in use: job-1")
+        self.assertIsNone(executor.executions.get("job-1"))
+
+    def test_cold_container_kill_never_uses_the_caller_execution_id(self):
+        executor = self._executor()
+        self.addCleanup(executor.executor.shutdown)
+        self.addCleanup(executor.background_executor.shutdown)
+        name = executor._cold_container_name()
+        running = RunningExecution("pool_local_standard_0", "", None, container_name=name)
+
+        asyncio.run(executor._kill_running_job(running))
+        asyncio.run(executor._kill_running_job(RunningExecution("pool_local_standard_0", "", None)))
+
+        self.assertTrue(name.startswith("python_exec_run_"))
+        self.assertEqual(self.docker.calls, [("docker", "kill", name)])
+        self.assertEqual(executor.executions.container_names(), set())
+
+
+class _CancellableService:
+    def __init__(self):
+        self.cancelled = []
+
+    def cancel(self, execution_id, tenant=None, reason="request"):
+        self.cancelled.append((execution_id, tenant, reason))
+        return execution_id == "job-1"
+
+
+class CancelEndpointTests(unittest.TestCase):
+    def test_cancel_endpoint(self):
+        app = FastAPI()
+        app.include_router(router)
+        service = _CancellableService()
+        app.state.execution_service = service
+        app.state.tenants = TenantRegistry()
+        client = TestClient(app)
+
+        response = client.post("/api/v1/executions/job-1/cancel", headers={"X-Tenant-ID": "alpha"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"execution_id": "job-1", "cancelled": True})
+        self.assertEqual(service.cancelled, [("job-1", "alpha", "request")])
+
+        self.assertEqual(client.post("/api/v1/executions/other/cancel").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+from common.resources import ResourceProfile
+from executors.concurrency import AdaptiveLimiter, HostSignals, read_pressure, sample_host_signals
+from executors.scheduler import ResourceScheduler
+
+IDLE = HostSignals(load_per_cpu=0.2, pressure=(("cpu", 0.5),))
+
+
+class PressureTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        with open(os.path.join(self.root, "cpu"), "w") as f:
+            f.write("some avg10=12.50 avg60=3.00 avg300=1.00 total=123\nfull avg10=0.00 avg60=0.00 avg300=0.00 total=0\n")
+        with open(os.path.join(self.root, "memory"), "w") as f:
+            f.write("some avg10=1.25 avg60=0.00 avg300=0.00 total=5\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_reads_some_avg10_and_skips_missing_resources(self):
+        self.assertEqual(read_pressure("cpu", self.root), 12.5)
+        self.assertIsNone(read_pressure("io", self.root))
+
+        signals = sample_host_signals(4, self.root)
+        self.assertEqual(dict(signals.pressure), {"cpu": 12.5, "memory": 1.25})
+        self.assertEqual(signals.max_pressure, 12.5)
+
+
+class AdaptiveLimiterTests(unittest.TestCase):
+    def test_additive_increase_only_with_demand(self):
+        limiter = AdaptiveLimiter(min_limit=1, max_limit=4, initial=2)
+
+        self.assertEqual(limiter.update(IDLE, queued=0, active=1), (2, ""))
+        self.assertEqual(limiter.update(IDLE, queued=3, active=2), (3, "demand"))
+        limiter.update(IDLE, queued=3, active=3)
+        self.assertEqual(limiter.update(IDLE, queued=3, active=4), (4, ""))
+
+    def test_multiplicative_decrease_on_saturation(self):
+        limiter = AdaptiveLimiter(min_limit=2, max_limit=16, initial=16, max_load=1.0, max_pressure=10.0)
+
+        self.assertEqual(limiter.update(HostSignals(load_per_cpu=1.5), 5, 16), (12, "load"))
+        self.assertEqual(limiter.update(HostSignals(pressure=(("memory", 40.0),)), 5, 12), (9, "pressure"))
+        for _ in range(10):
+            limiter.update(HostSignals(load_per_cpu=3.0), 5, 9)
+        self.assertEqual(limiter.limit, 2)
+
+    def test_latency_gradient_against_baseline(self):
+        limiter = AdaptiveLimiter(min_limit=1, max_limit=8, initial=8)
+        for latency in (1.0, 1.1, 0.9):
+            limiter.observe(latency)
+        limiter.update(IDLE, 0, 1)
+        self.assertAlmostEqual(limiter.baseline, 1.0)
+
+        for latency in (3.0, 2.5, 4.0):
+            limiter.observe(latency)
+        self.assertEqual(limiter.update(IDLE, 0, 8), (6, "latency"))
+        # 过载窗口不更新基线
+        self.assertAlmostEqual(limiter.baseline, 1.0)
+
+
+class SchedulerLimitTests(unittest.TestCase):
+    def test_raising_limit_admits_queued_jobs(self):
+        profile = ResourceProfile("small", 0, 0.5)
+
+        async def scenario():
+            scheduler = ResourceScheduler(max_jobs=1, cpus=8)
+            await scheduler.acquire(profile)
+            waiting = asyncio.ensure_future(scheduler.acquire(profile))
+            await asyncio.sleep(0)
+            self.assertFalse(waiting.done())
+
+            scheduler.set_max_jobs(2)
+            await asyncio.wait_for(waiting, 1)
+            return scheduler.active
+
+        self.assertEqual(asyncio.run(scenario()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
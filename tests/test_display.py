@@ -0,0 +1,147 @@
+import ast
+import builtins
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from common.analysis import wrap_last_expression
+from common.contracts import ExecuteResult
+from common.settings import Settings
+from executors.docker_executor import DISPLAY_DIR_NAME, CodeExecutor
+from executors.runtime import display
+
+
+def _wrap(code):
+    return wrap_last_expression(code, ast.parse(code), "show")
+
+
+class WrapLastExpressionTests(unittest.TestCase):
+    def test_wraps_only_the_last_top_level_expression(self):
+        self.assertEqual(_wrap("x = 1\nx\n"), "x = 1\nshow(x)\n")
+        self.assertEqual(_wrap("a = '中文'; a  # 注释\n"), "a = '中文'; show(a)  # 注释\n")
+        self.assertEqual(_wrap("total = (1 +\n    2)\ntotal + \\\n  1"), "total = (1 +\n    2)\nshow(total + \\\n  1)")
+
+    def test_leaves_statements_and_semicolon_suppressed_expressions(self):
+        for code in ("x = 1\n", "if True:\n    1\n", "df.head();\n", "df.head() ; # 不显示\n", ""):
+            self.assertEqual(_wrap(code), code)
+
+
+class DisplayRuntimeTests(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp(prefix="pyexec_display_")
+        self.addCleanup(shutil.rmtree, self.output_dir, True)
+        self.had_display = hasattr(builtins, "display")
+        display.configure(self.output_dir, max_rows=3, max_bytes=4096, max_outputs=4)
+        if not self.had_display:
+            self.addCleanup(delattr, builtins, "display")
+
+    def _records(self):
+        with open(os.path.join(self.output_dir, display.OUTPUTS_NAME)) as f:
+            return [json.loads(line) for line in f]
+
+    def test_dataframe_is_returned_as_rows_with_row_limit(self):
+        frame = pd.DataFrame({"name": list("abcde"), "value": [1.5, float("nan"), 3.0, 4.0, 5.0]})
+
+        display.display_result(frame)
+
+        [record] = self._records()
+        self.assertEqual((record["type"], record["source"]), ("dataframe", "result"))
+        self.assertTrue(record["truncated"])
+        self.assertEqual(record["data"]["columns"], ["name", "value"])
+        self.assertEqual(record["data"]["dtypes"][1], "float64")
+        self.assertEqual(record["data"]["rows"], [["a", 1.5], ["b", None], ["c", 3.0]])
+        self.assertEqual(record["data"]["total_rows"], 5)
+
+    def test_arrays_json_and_other_objects(self):
+        class Rich:
+            def _repr_html_(self):
+                return "<b>rich</b>"
+
+        builtins.display(np.arange(12).reshape(6, 2), {"k": [1, 2.5]}, np.float64(0.5), Rich())
+        display.display_result(None)
+        builtins.display("over the limit")
+
+        array, mapping, scalar, rich = self._records()
+        self.assertEqual(array["data"], {"shape": [6, 2], "dtype": "int64", "values": [[0, 1], [2, 3], [4, 5]]})
+        self.assertTrue(array["truncated"])
+        self.assertEqual((mapping["type"], mapping["data"]), ("json", {"k": [1, 2.5]}))
+        self.assertEqual((scalar["type"], scalar["data"]), ("json", 0.5))
+        self.assertEqual(rich["type"], "text")
+        self.assertEqual(rich["mime"], {"text/html": "<b>rich</b>"})
+
+    def test_output_is_kept_under_the_byte_limit(self):
+        display.display_result(pd.DataFrame({"text": ["x" * 1500] * 3}))
+
+        with open(os.path.join(self.output_dir, display.OUTPUTS_NAME), "rb") as f:
+            line = f.readline()
+        record = json.loads(line)
+        self.assertLessEqual(len(line), 4096 + 1)
+        self.assertEqual(record["type"], "dataframe")
+        self.assertLess(len(record["data"]["rows"]), 3)
+
+
+class DisplayExecutorTests(unittest.TestCase):
+    def setUp(self):
+        scratch = tempfile.mkdtemp(prefix="pyexec_display_exec_")
+        self.addCleanup(shutil.rmtree, scratch, True)
+        settings = Settings(
+            scratch_dir=scratch,
+            file_store_path=os.path.join(scratch, "files"),
+            image_store_path=os.path.join(scratch, "images"),
+            display_max_outputs=2,
+        )
+        self.executor = CodeExecutor(settings)
+        self.addCleanup(self.executor.artifact_store.close)
+        self.output_dir = os.path.join(scratch, "output")
+
+    def test_generated_script_displays_the_last_expression(self):
+        code_file = self.executor._prepare_code_file("exec", "x = 1\nx * 2\n")
+
+        with open(code_file) as f:
+            source = f.read()
+        compile(source, code_file, "exec")
+        self.assertIn("_pyexec_display.configure('/code/output/.display', 100, 262144, 2)", source)
+        self.assertTrue(source.endswith("x = 1\n_pyexec_display.display_result(x * 2)\n"))
+
+    def test_setup_code_follows_docstring_and_future_imports(self):
+        code = '"""模块说明"""\nfrom __future__ import annotations\nfrom __future__ import division; x: int = 3\nx / 2\n'
+        code_file = self.executor._prepare_code_file("exec", code)
+
+        with open(code_file) as f:
+            source = f.read()
+        compile(source, code_file, "exec")
+        self.assertTrue(source.startswith(code[: code.index("x / 2")]))
+        self.assertTrue(source.endswith("\n_pyexec_display.display_result(x / 2)\n"))
+
+    def test_persisted_outputs_appear_in_the_response(self):
+        display_dir = os.path.join(self.output_dir, DISPLAY_DIR_NAME)
+        os.makedirs(display_dir)
+        with open(os.path.join(display_dir, "output_1.arrow"), "wb") as f:
+            f.write(b"ARROW1")
+        lines = [
+            {"type": "dataframe", "source": "result", "data": {"rows": []}, "truncated": True, "file": "output_1.arrow"},
+            "not json",
+            {"type": "json", "data": [1], "file": "../escape"},
+            {"type": "text", "text": "dropped: over DISPLAY_MAX_OUTPUTS"},
+        ]
+        with open(os.path.join(display_dir, "outputs.jsonl"), "w") as f:
+            for line in lines:
+                f.write((line if isinstance(line, str) else json.dumps(line)) + "\n")
+
+        outputs = self.executor._persist_display_outputs("exec1", self.output_dir)
+
+        self.assertEqual([o.type for o in outputs], ["dataframe", "json"])
+        self.assertEqual(outputs[0].file.filename, "display_exec1_1.arrow")
+        self.assertIsNone(outputs[1].file)
+        payload = ExecuteResult(stdout="", stderr=None, execution_time=0.1, outputs=outputs).to_legacy_dict()
+        self.assertEqual(payload["outputs"][0]["file"]["url"], "/files/display_exec1_1.arrow")
+        self.assertNotIn("outputs", ExecuteResult(stdout="", stderr=None, execution_time=0.1).to_legacy_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from dataclasses import replace
+from unittest import mock
+
+from common.settings import Settings
+from executors.docker_executor import FIGURE_DIR_NAME, CodeExecutor
+from executors.runtime.figures import save_all_figures
+
+try:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+except ImportError:  # pragma: no cover
+    plt = None
+
+
+@unittest.skipIf(plt is None, "matplotlib not installed")
+class SaveAllFiguresTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        plt.close("all")
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_saves_every_open_figure(self):
+        for _ in range(3):
+            plt.figure(figsize=(4, 3))
+            plt.plot([1, 2, 3])
+
+        saved = save_all_figures(self.tmp_dir, "svg")
+
+        self.assertEqual([os.path.basename(p) for p in saved], ["figure_1.svg", "figure_2.svg", "figure_3.svg"])
+        self.assertEqual(plt.get_fignums(), [])
+
+    def test_max_dimension_caps_dpi(self):
+        from PIL import Image
+
+        plt.figure(figsize=(10, 5))
+        plt.plot([1, 2, 3])
+
+        saved = save_all_figures(self.tmp_dir, "png", dpi=300, max_dimension=500)
+
+        with Image.open(saved[0]) as image:
+            self.assertLessEqual(max(image.size), 500)
+
+
+class PersistFiguresTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.executor = CodeExecutor(
+            Settings(
+                image_store_path=os.path.join(self.tmp_dir, "images"),
+                file_store_path=os.path.join(self.tmp_dir, "files"),
+                figure_optimize_png=False,
+            )
+        )
+
+    def tearDown(self):
+        self.executor.artifact_store.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_figures_are_moved_in_order(self):
+        figures_dir = os.path.join(self.tmp_dir, "output", FIGURE_DIR_NAME)
+        os.makedirs(figures_dir)
+        for name in ("figure_10.webp", "figure_2.webp", "figure_1.webp", "notes.txt"):
+            with open(os.path.join(figures_dir, name), "wb") as f:
+                f.write(b"x")
+
+        images = self.executor._persist_figures("exec", os.path.join(self.tmp_dir, "output"))
+
+        self.assertEqual([i.filename for i in images], ["plot_exec_1.webp", "plot_exec_2.webp", "plot_exec_3.webp"])
+        self.assertTrue(os.path.isfile(self.executor.artifact_store.resolve("images", "plot_exec_3.webp")))
+
+    def test_png_is_optimized_before_it_is_stored(self):
+        figures_dir = os.path.join(self.tmp_dir, "output", FIGURE_DIR_NAME)
+        os.makedirs(figures_dir)
+        with open(os.path.join(figures_dir, "figure_1.png"), "wb") as f:
+            f.write(b"raw-png")
+
+        def shrink(src_path, dst_path):
+            with open(dst_path, "wb") as f:
+                f.write(b"png")
+            return True
+
+        self.executor.settings = replace(self.executor.settings, figure_optimize_png=True)
+        with mock.patch.object(CodeExecutor, "_optimize_png", side_effect=shrink):
+            images = self.executor._persist_figures("exec", os.path.join(self.tmp_dir, "output"))
+        self.executor.background_executor.shutdown(wait=True)
+
+        # 返回给调用方的大小、ETag 与之后回传的内容一致，入库后不再改写
+        record = self.executor.artifact_store.get("images", "plot_exec_1.png")
+        self.assertEqual((images[0].size_bytes, record.size_bytes), (3, 3))
+        with open(self.executor.artifact_store.resolve("images", "plot_exec_1.png"), "rb") as f:
+            self.assertEqual(f.read(), b"png")
+        self.assertEqual(record.sha256, hashlib.sha256(b"png").hexdigest())
+
+
+if __name__ == "__main__":
+    unittest.main()
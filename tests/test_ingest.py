@@ -0,0 +1,178 @@
+import importlib.util
+import os
+import shutil
+import subprocess
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+from common.metrics import MetricsRegistry
+from common.settings import Settings
+from executors import ingest
+from executors.ingest import ColumnarCache
+from executors.runtime import tabular
+
+HAS_PANDAS = importlib.util.find_spec("pandas") is not None
+HAS_ARROW = HAS_PANDAS and importlib.util.find_spec("pyarrow") is not None
+
+
+def _fake_convert(src_path, dst_path, reader, **limits):
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        dst.write(b"ARROW:" + reader.encode() + b":" + src.read())
+
+
+class ColumnarCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+        self.metrics = MetricsRegistry()
+        self.cache = ColumnarCache(
+            Settings(
+                input_columnar_cache=True,
+                input_columnar_min_bytes=4,
+                input_columnar_cache_dir=os.path.join(self.tmp_dir, "cache"),
+            ),
+            self.metrics,
+        )
+        self.addCleanup(self.cache.close)
+        patcher = mock.patch.object(ingest, "_dependencies_available", return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _input(self, name, content=b"a,b\n1,2\n"):
+        work_dir = tempfile.mkdtemp(dir=self.tmp_dir)
+        path = os.path.join(work_dir, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_converts_once_then_attaches_by_content_hash(self):
+        with mock.patch.object(ingest, "convert_to_feather", side_effect=_fake_convert) as convert:
+            first = self._input("data.csv")
+            self.assertFalse(self.cache.attach(first, "d1"))
+            # 工作目录先于后台转换被删除也不影响转换
+            shutil.rmtree(os.path.dirname(first))
+            self.cache.wait()
+
+            second = self._input("other_name.csv")
+            self.assertTrue(self.cache.attach(second, "d1"))
+
+        self.assertEqual(convert.call_count, 1)
+        with open(second + ".feather", "rb") as f:
+            self.assertEqual(f.read(), b"ARROW:read_csv:a,b\n1,2\n")
+        rendered = self.metrics.render_prometheus()
+        self.assertIn('executor_columnar_inputs_total{result="miss"} 1', rendered)
+        self.assertIn('executor_columnar_inputs_total{result="hit"} 1', rendered)
+
+    def test_skips_small_and_non_tabular_inputs(self):
+        with mock.patch.object(ingest, "convert_to_feather") as convert:
+            self.assertFalse(self.cache.attach(self._input("tiny.csv", b"a"), "d2"))
+            self.assertFalse(self.cache.attach(self._input("notes.txt"), "d3"))
+            self.cache.wait()
+        convert.assert_not_called()
+
+    def test_failed_conversion_is_not_retried(self):
+        with mock.patch.object(ingest, "convert_to_feather", side_effect=ValueError("bad")) as convert:
+            self.cache.attach(self._input("broken.xlsx"), "d4")
+            self.cache.wait()
+            self.assertFalse(self.cache.attach(self._input("broken.xlsx"), "d4"))
+            self.cache.wait()
+        self.assertEqual(convert.call_count, 1)
+
+    def test_oversized_inputs_are_not_converted(self):
+        self.cache.max_input_bytes = 8
+        with mock.patch.object(ingest, "convert_to_feather") as convert:
+            self.assertFalse(self.cache.attach(self._input("big.csv", b"a,b\n" * 10), "d5"))
+            self.cache.wait()
+        convert.assert_not_called()
+
+    def test_conversion_runs_with_limits_and_is_keyed_by_pandas_version(self):
+        with mock.patch.object(ingest, "convert_to_feather", side_effect=_fake_convert) as convert:
+            self.cache.attach(self._input("data.csv"), "d6")
+            self.cache.wait()
+
+        limits = convert.call_args.kwargs
+        self.assertEqual(limits["memory_bytes"], self.cache.memory_bytes)
+        self.assertEqual(limits["cpu_seconds"], self.cache.cpu_seconds)
+        self.assertEqual(limits["timeout"], self.cache.timeout_seconds)
+        self.assertEqual(os.listdir(self.cache.root), [f"d6.pandas-{ingest._pandas_version()}.feather"])
+
+        # pandas 升级后不沿用旧版本的转换结果
+        self.cache.pandas_version = "0.0.0"
+        self.assertFalse(self.cache.attach(self._input("data.csv"), "d6"))
+        self.cache.wait()
+
+    def test_prune_evicts_least_recently_used(self):
+        os.makedirs(self.cache.root)
+        for index, name in enumerate(("old", "new")):
+            path = os.path.join(self.cache.root, f"{name}.feather")
+            with open(path, "wb") as f:
+                f.write(b"x" * 10)
+            os.utime(path, (1000 + index, 1000 + index))
+        self.cache.max_bytes = 15
+
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertEqual(os.listdir(self.cache.root), ["new.feather"])
+
+
+@unittest.skipUnless(HAS_PANDAS, "pandas not installed")
+class ConversionLimitTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+        self.src = os.path.join(self.tmp_dir, "data.csv")
+        with open(self.src, "w") as f:
+            f.write("a,b\n1,2\n")
+
+    @unittest.skipUnless(HAS_ARROW, "pyarrow not installed")
+    def test_memory_limit_applies_to_the_parser(self):
+        with self.assertRaises(subprocess.CalledProcessError):
+            ingest.convert_to_feather(self.src, self.src + ".feather", "read_csv", memory_bytes=32 * 1024 * 1024)
+        self.assertFalse(os.path.exists(self.src + ".feather"))
+
+        ingest.convert_to_feather(self.src, self.src + ".feather", "read_csv", memory_bytes=2 * 1024 * 1024 * 1024)
+        self.assertTrue(os.path.exists(self.src + ".feather"))
+
+    def test_slow_conversion_is_killed(self):
+        with self.assertRaises(subprocess.TimeoutExpired):
+            ingest.convert_to_feather(self.src, self.src + ".feather", "read_csv", timeout=0.01)
+
+
+class TabularReaderTests(unittest.TestCase):
+    def test_patched_reader_uses_sidecar_only_with_default_options(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, True)
+        path = os.path.join(tmp_dir, "data.csv")
+        for name in (path, path + ".feather"):
+            open(name, "w").close()
+        pd = types.SimpleNamespace(
+            read_csv=lambda p, *a, **kw: ("parsed", p, kw),
+            read_excel=lambda p, *a, **kw: ("parsed", p, kw),
+        )
+
+        tabular.install(pd)
+        tabular.install(pd)
+        with mock.patch.object(tabular, "load_sidecar", return_value="mapped") as load:
+            self.assertEqual(pd.read_csv(path), "mapped")
+            self.assertEqual(pd.read_csv(path, sep=";"), ("parsed", path, {"sep": ";"}))
+            self.assertEqual(pd.read_excel(os.path.join(tmp_dir, "missing.xlsx"))[0], "parsed")
+        load.assert_called_once_with(path + ".feather")
+
+    @unittest.skipUnless(HAS_ARROW, "pandas/pyarrow not installed")
+    def test_round_trip_through_feather(self):
+        import pandas as pd
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, True)
+        path = os.path.join(tmp_dir, "data.csv")
+        with open(path, "w") as f:
+            f.write("name,value\nx,1\ny,2\n")
+
+        ingest.convert_to_feather(path, path + ".feather", "read_csv")
+
+        pd.testing.assert_frame_equal(tabular.read_csv(path), pd.read_csv(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,4 @@
 import os
-import shutil
 import unittest
 from unittest.mock import patch
 from typing import Dict, Optional
@@ -31,7 +30,7 @@ class DownloadInputFilesTests(unittest.TestCase):
         self.executor = CodeExecutor(Settings())
 
     def tearDown(self):
-        shutil.rmtree("/tmp/python_executor/unittest", ignore_errors=True)
+        self.executor._cleanup("unittest")
 
     @patch("requests.get")
     def test_download_uses_filename_query_param(self, mock_get):
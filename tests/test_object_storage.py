@@ -0,0 +1,124 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import requests
+
+from common.artifacts import ArtifactStore
+from common.metrics import MetricsRegistry
+from common.object_storage import FakeS3Server, LocalArtifactBackend, S3ArtifactBackend, create_artifact_backend
+from common.settings import Settings
+
+
+class S3BackendTests(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeS3Server(access_key="ak", secret_key="sk").start()
+        self.backend = S3ArtifactBackend(self.server.endpoint, "bucket", "ak", "sk")
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _file(self, content: bytes) -> str:
+        path = os.path.join(self.tmp_dir, "obj.bin")
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_upload_presign_and_delete(self):
+        self.backend.upload("images/plot 1.png", self._file(b"png-bytes"), "image/png")
+        self.assertEqual(self.server.get_object("bucket", "images/plot 1.png"), b"png-bytes")
+
+        response = requests.get(self.backend.url("images/plot 1.png", 60), timeout=5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"png-bytes")
+        self.assertEqual(response.headers["Content-Type"], "image/png")
+        self.assertIn("immutable", response.headers["Cache-Control"])
+
+        self.backend.delete("images/plot 1.png")
+        self.assertIsNone(self.server.get_object("bucket", "images/plot 1.png"))
+
+    def test_rejects_bad_credentials_tampered_and_expired_urls(self):
+        wrong = S3ArtifactBackend(self.server.endpoint, "bucket", "ak", "wrong")
+        with self.assertRaises(RuntimeError):
+            wrong.upload("files/a.txt", self._file(b"a"), "text/plain")
+
+        self.backend.upload("files/a.txt", self._file(b"a"), "text/plain")
+        url = self.backend.presign("files/a.txt", 60)
+        self.assertEqual(requests.get(url.replace("files/a.txt", "files/b.txt"), timeout=5).status_code, 403)
+        expired = self.backend.presign("files/a.txt", 60, now=time.time() - 120)
+        self.assertEqual(requests.get(expired, timeout=5).status_code, 403)
+
+    def test_public_url_returns_direct_link(self):
+        backend = S3ArtifactBackend(self.server.endpoint, "bucket", "ak", "sk", public_url="https://cdn.example.com/")
+        self.assertEqual(backend.url("images/a.png", 60), "https://cdn.example.com/images/a.png")
+
+    def test_factory(self):
+        self.assertIsInstance(create_artifact_backend(Settings()), LocalArtifactBackend)
+        with self.assertRaises(ValueError):
+            create_artifact_backend(Settings(artifact_backend="s3"))
+
+
+class ArtifactPublishTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.server = FakeS3Server(access_key="ak", secret_key="sk").start()
+        self.metrics = MetricsRegistry()
+        settings = Settings(
+            image_store_path=os.path.join(self.tmp_dir, "images"),
+            file_store_path=os.path.join(self.tmp_dir, "files"),
+            artifact_backend="s3",
+            artifact_s3_endpoint=self.server.endpoint,
+            artifact_s3_bucket="bucket",
+            artifact_s3_access_key="ak",
+            artifact_s3_secret_key="sk",
+            artifact_s3_prefix="exec",
+        )
+        self.store = ArtifactStore(settings, self.metrics)
+
+    def tearDown(self):
+        self.store.close()
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _put(self, kind: str, name: str, content: bytes):
+        fd, path = tempfile.mkstemp(dir=self.tmp_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        return self.store.put(kind, "e1", name, path)
+
+    def test_publish_uploads_in_parallel_and_drops_local_copy(self):
+        self._put("images", "plot_e1_1.png", b"one")
+        self._put("files", "out_e1_1_a.csv", b"a,b")
+        prepared = []
+
+        results = asyncio.run(
+            self.store.publish(
+                [("images", "plot_e1_1.png"), ("files", "out_e1_1_a.csv")],
+                prepare=lambda kind, name, path: prepared.append(name),
+            )
+        )
+
+        self.assertEqual(set(results.values()), {True})
+        self.assertEqual(sorted(prepared), ["out_e1_1_a.csv", "plot_e1_1.png"])
+        self.assertEqual(self.server.get_object("bucket", "exec/images/plot_e1_1.png"), b"one")
+        self.assertTrue(self.store.get("images", "plot_e1_1.png").uploaded)
+        self.assertIsNone(self.store.resolve("images", "plot_e1_1.png"))
+        self.assertEqual(requests.get(self.store.url("files", "out_e1_1_a.csv"), timeout=5).content, b"a,b")
+        self.assertEqual(self.metrics.value("artifact_uploads_total", kind="images", status="ok"), 1)
+
+    def test_eviction_deletes_remote_object(self):
+        self._put("images", "plot_e1_1.png", b"one")
+        asyncio.run(self.store.publish([("images", "plot_e1_1.png")]))
+
+        self.assertEqual(self.store.evict_expired(now=time.time() + 8 * 24 * 3600), 1)
+
+        self.assertIsNone(self.server.get_object("bucket", "exec/images/plot_e1_1.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
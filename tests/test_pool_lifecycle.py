@@ -0,0 +1,109 @@
+import asyncio
+import unittest
+
+from common.contracts import ExecuteRequest
+from common.settings import Settings
+from executors.docker_executor import CodeExecutor
+
+
+class _FakeDocker:
+    """记录 docker 调用并模拟 `docker run` 的耗时"""
+
+    def __init__(self, run_delays=None):
+        self.run_delays = list(run_delays or [])
+        self.running = set()
+        self.active_runs = 0
+        self.max_active_runs = 0
+        self.removed = []
+        self.active_removes = 0
+        self.max_active_removes = 0
+
+    async def __call__(self, *cmd, **_kwargs):
+        op = cmd[1]
+        if op == "inspect":
+            return (0, "true", "") if cmd[-1] in self.running else (1, "", "No such object")
+        if op == "run":
+            self.active_runs += 1
+            self.max_active_runs = max(self.max_active_runs, self.active_runs)
+            await asyncio.sleep(self.run_delays.pop(0) if self.run_delays else 0.05)
+            self.active_runs -= 1
+            self.running.add(cmd[cmd.index("--name") + 1])
+            return 0, "", ""
+        if op == "rm":
+            self.active_removes += 1
+            self.max_active_removes = max(self.max_active_removes, self.active_removes)
+            await asyncio.sleep(0.05)
+            self.active_removes -= 1
+            self.removed.append(cmd[-1])
+            self.running.discard(cmd[-1])
+        return 0, "", ""
+
+
+class PoolLifecycleTests(unittest.TestCase):
+    def _executor(self, docker, **overrides):
+        settings = Settings(
+            max_workers=4,
+            resource_profiles="standard:1g:1:4",
+            pool_bootstrap_concurrency=2,
+            **overrides,
+        )
+        executor = CodeExecutor(settings)
+        executor._run_docker = docker
+        return executor
+
+    def test_bootstrap_is_parallel_and_bounded(self):
+        docker = _FakeDocker()
+
+        async def scenario():
+            executor = self._executor(docker)
+            await executor.initialize()
+            idle = list(executor.container_pool["standard"])
+            await executor.shutdown()
+            return idle
+
+        idle = asyncio.run(scenario())
+
+        self.assertEqual(len(idle), 4)
+        self.assertEqual(docker.max_active_runs, 2)
+        self.assertEqual(sorted(docker.removed), sorted(idle))
+        self.assertEqual(docker.max_active_removes, 2)
+
+    def test_serves_when_n_ready(self):
+        docker = _FakeDocker(run_delays=[0.01, 1, 1, 1])
+
+        async def scenario():
+            executor = self._executor(docker, pool_ready_min=1)
+            await executor.initialize()
+            ready_at_start = len(executor.container_pool["standard"])
+            await executor.shutdown()
+            return ready_at_start
+
+        self.assertEqual(asyncio.run(scenario()), 1)
+
+    def test_shutdown_drains_in_flight_jobs(self):
+        docker = _FakeDocker()
+
+        async def scenario():
+            executor = self._executor(docker, pool_ready_min=0, shutdown_drain_seconds=5)
+            await executor.initialize()
+            profile = executor.default_profile
+            await executor.scheduler.acquire(profile)
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.2, executor.scheduler.release, profile)
+
+            start = loop.time()
+            shutdown = asyncio.ensure_future(executor.shutdown())
+            await asyncio.sleep(0)
+            rejected = await executor.execute(ExecuteRequest(code="print(1)"))
+            await shutdown
+            return loop.time() - start, rejected
+
+        elapsed, rejected = asyncio.run(scenario())
+
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 2)
+        self.assertIn("shutting down", rejected.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
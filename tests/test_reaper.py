@@ -0,0 +1,110 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from common.settings import Settings
+from executors.docker_executor import CodeExecutor
+from executors.reaper import ContainerInfo, find_orphans, parse_container_listing, parse_created_at
+
+PREFIX = "python_exec_pool_local_"
+
+
+class FindOrphansTests(unittest.TestCase):
+    def test_parses_docker_ps_listing(self):
+        stdout = (
+            f"{PREFIX}standard_0\t2024-01-02 03:04:05 +0000 UTC\t{PREFIX}\ttrue\n"
+            "python_exec_abc\t2024-01-02 03:04:05 +0000 UTC\t\t\n"
+            "not_ours_python_exec_x\t2024-01-02 03:04:05 +0000 UTC\t\t\n"
+        )
+
+        containers = parse_container_listing(stdout)
+
+        self.assertEqual([c.name for c in containers], [f"{PREFIX}standard_0", "python_exec_abc"])
+        self.assertTrue(containers[0].pool)
+        self.assertEqual(containers[0].instance, PREFIX)
+        self.assertEqual(containers[1].created_at, parse_created_at("2024-01-02 03:04:05 +0000 UTC"))
+        self.assertIsNone(parse_created_at("yesterday"))
+
+    def test_reconciles_against_live_state(self):
+        now = 10_000.0
+        containers = [
+            ContainerInfo(f"{PREFIX}standard_0", now, PREFIX, True),
+            ContainerInfo(f"{PREFIX}standard_0_deadbeef", now, PREFIX, True),
+            ContainerInfo("python_exec_pool_other_standard_0", now, "python_exec_pool_other_", True),
+            ContainerInfo("python_exec_run_live", now, PREFIX),
+            ContainerInfo("python_exec_run_finished", now, PREFIX),
+            ContainerInfo("python_exec_legacy_old", now - 1000),
+            ContainerInfo("python_exec_legacy_new", now - 10),
+        ]
+
+        orphans = find_orphans(
+            containers,
+            instance=PREFIX,
+            live_containers={f"{PREFIX}standard_0", "python_exec_run_live"},
+            max_cold_age_seconds=600,
+            now=now,
+        )
+
+        self.assertEqual(orphans.pool_containers, [f"{PREFIX}standard_0_deadbeef"])
+        self.assertEqual(orphans.cold_containers, ["python_exec_run_finished", "python_exec_legacy_old"])
+
+
+class _ListingDocker:
+    def __init__(self, listing):
+        self.listing = listing
+        self.removed = []
+
+    async def __call__(self, *cmd, **_kwargs):
+        if cmd[1] == "ps":
+            return 0, self.listing, ""
+        if cmd[1] == "rm":
+            self.removed.append(cmd[-1])
+        return 0, "", ""
+
+
+class ReaperTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_reaps_orphaned_containers_and_workspaces(self):
+        stale = os.path.join(self.tmp_dir, "stale")
+        os.makedirs(stale)
+        old = time.time() - 1000
+        os.utime(stale, (old, old))
+        os.makedirs(os.path.join(self.tmp_dir, "fresh"))
+        docker = _ListingDocker(
+            f"{PREFIX}standard_0\t\t{PREFIX}\ttrue\n"
+            f"{PREFIX}standard_3_deadbeef\t\t{PREFIX}\ttrue\n"
+            f"python_exec_gone\t\t{PREFIX}\t\n"
+        )
+        executor = CodeExecutor(
+            Settings(
+                resource_profiles="standard:1g:1:1",
+                scratch_dir=self.tmp_dir,
+                execution_timeout=30,
+                reaper_orphan_grace_seconds=60,
+            )
+        )
+        executor._run_docker = docker
+
+        report = asyncio.run(executor.reap_orphans())
+
+        self.assertEqual(report.pool_containers, (f"{PREFIX}standard_3_deadbeef",))
+        self.assertEqual(report.cold_containers, ("python_exec_gone",))
+        self.assertEqual(report.workspaces, 1)
+        self.assertEqual(sorted(docker.removed), sorted([f"{PREFIX}standard_3_deadbeef", "python_exec_gone"]))
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, "fresh")))
+        self.assertIn('executor_orphans_reaped_total{kind="pool"} 1', executor.metrics.render_prometheus())
+        executor.executor.shutdown()
+        executor.background_executor.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import unittest
+
+from executors.recycling import CONTAINER_PROBE_SCRIPT, ContainerProbe, PooledContainer, RecyclePolicy
+
+RUNTIME_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "executors", "runtime")
+
+
+class RecyclePolicyTests(unittest.TestCase):
+    def setUp(self):
+        self.policy = RecyclePolicy(
+            max_uses=3,
+            max_age_seconds=60,
+            max_memory_bytes=100,
+            max_disk_bytes=1000,
+        )
+
+    def test_fresh_container_is_kept(self):
+        container = PooledContainer(name="c", slot=0, created_at=0, uses=1)
+        probe = ContainerProbe(memory_bytes=10, disk_bytes=10)
+        self.assertIsNone(self.policy.retire_reason(container, probe, now=10))
+
+    def test_retire_after_max_uses_and_age(self):
+        container = PooledContainer(name="c", slot=0, created_at=0, uses=3)
+        self.assertEqual(self.policy.retire_reason(container, now=10), "max_uses")
+        container.uses = 0
+        self.assertEqual(self.policy.retire_reason(container, now=60), "max_age")
+
+    def test_retire_on_resource_growth(self):
+        container = PooledContainer(name="c", slot=0, created_at=0)
+        self.assertEqual(
+            self.policy.retire_reason(container, ContainerProbe(memory_bytes=200), now=1),
+            "memory",
+        )
+        self.assertEqual(
+            self.policy.retire_reason(container, ContainerProbe(disk_bytes=2000), now=1),
+            "disk",
+        )
+
+    def test_leftover_processes_taint_container(self):
+        container = PooledContainer(name="c", slot=0, created_at=0)
+        probe = ContainerProbe(leftover_processes=2)
+        self.assertTrue(self.policy.is_tainted(probe))
+        self.assertEqual(self.policy.retire_reason(container, probe, now=1), "leftover_processes")
+
+    def test_zero_threshold_disables_check(self):
+        policy = RecyclePolicy(max_uses=0, max_age_seconds=0)
+        container = PooledContainer(name="c", slot=0, created_at=0, uses=10_000)
+        self.assertIsNone(policy.retire_reason(container, now=10_000_000))
+
+    def test_probe_parses_last_json_line(self):
+        probe = ContainerProbe.from_json('noise\n{"memory_bytes": 5, "disk_bytes": 6, "leftover_processes": 1}\n')
+        self.assertEqual(probe, ContainerProbe(memory_bytes=5, disk_bytes=6, leftover_processes=1))
+        self.assertIsNone(ContainerProbe.from_json("not json"))
+
+    def test_killed_leftovers_do_not_taint_container(self):
+        # 探测脚本已杀掉的残留进程不再让容器下线，只有杀不掉的才算
+        probe = ContainerProbe.from_json('{"leftover_processes": 0, "killed_processes": 3}')
+        self.assertEqual(probe.killed_processes, 3)
+        self.assertFalse(self.policy.is_tainted(probe))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# 在独立 PID 命名空间（及私有 /tmp）中充当 pid 1（相当于容器的 init）：
+# 启动 zygote，执行一段改写 /tmp/pyexec/zygote.pid 并留下后台进程的用户代码，再运行清理探测
+PROBE_SCENARIO = r"""
+import json, os, subprocess, sys, time
+
+runtime_dir, probe_script = sys.argv[1:3]
+state_dir = "/tmp/pyexec"
+env = dict(os.environ, PYEXEC_PRELOAD="json")
+env.pop("PYEXEC_STATE_DIR", None)
+identity = subprocess.run(
+    [sys.executable, os.path.join(runtime_dir, "zygote.py"), "--detach"],
+    env=env, capture_output=True, text=True, check=True,
+).stdout.strip()
+deadline = time.time() + 10
+while not os.path.exists(os.path.join(state_dir, "zygote.sock")) and time.time() < deadline:
+    time.sleep(0.05)
+
+pids_path = os.path.join(state_dir, "escaped.json")
+script = os.path.join(state_dir, "script.py")
+with open(script, "w") as f:
+    f.write(
+        "import json, os, subprocess, time\n"
+        "if os.fork() == 0:\n"
+        "    os.setsid()\n"
+        "    with open(%r, 'w') as f:\n"
+        "        f.write(str(os.getpid()))\n"
+        "    child = subprocess.Popen(['sleep', '60'])\n"
+        "    with open(%r, 'w') as f:\n"
+        "        json.dump([os.getpid(), child.pid], f)\n"
+        "    time.sleep(60)\n"
+        "    os._exit(0)\n"
+        "while not os.path.exists(%r):\n"
+        "    time.sleep(0.01)\n"
+        % (os.path.join(state_dir, "zygote.pid"), pids_path, pids_path)
+    )
+subprocess.run(
+    [sys.executable, os.path.join(runtime_dir, "client.py"), script],
+    env=env, cwd=state_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30,
+)
+with open(pids_path) as f:
+    escaped = json.load(f)
+
+probe = subprocess.run(
+    [sys.executable, "-c", probe_script, identity], capture_output=True, text=True, timeout=30,
+)
+
+def alive(pid):
+    try:
+        os.waitpid(pid, os.WNOHANG)
+    except ChildProcessError:
+        pass
+    try:
+        with open("/proc/%d/stat" % pid) as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return False
+
+print(json.dumps({
+    "probe": probe.stdout.strip().splitlines()[-1] if probe.stdout.strip() else probe.stderr,
+    "escaped_alive": [alive(pid) for pid in escaped],
+    "zygote_alive": alive(int(identity.split(":")[0])),
+}))
+"""
+
+UNSHARE_COMMAND = ["unshare", "--user", "--map-root-user", "--pid", "--fork", "--mount-proc"]
+PRIVATE_TMP = 'mount -t tmpfs tmpfs /tmp && exec "$@"'
+
+
+def _can_unshare_pid_namespace() -> bool:
+    if shutil.which("unshare") is None:
+        return False
+    try:
+        process = subprocess.run(
+            UNSHARE_COMMAND + ["sh", "-c", PRIVATE_TMP, "sh", "true"], capture_output=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return process.returncode == 0
+
+
+@unittest.skipUnless(sys.platform.startswith("linux") and _can_unshare_pid_namespace(), "需要可用的 unshare（PID 命名空间）")
+class ContainerProbeScriptTests(unittest.TestCase):
+    def test_rewritten_pid_file_does_not_exempt_escaped_processes(self):
+        process = subprocess.run(
+            UNSHARE_COMMAND
+            + ["sh", "-c", PRIVATE_TMP, "sh", sys.executable, "-c", PROBE_SCENARIO, RUNTIME_DIR, CONTAINER_PROBE_SCRIPT],
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+
+        self.assertEqual(process.returncode, 0, process.stderr)
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        probe = ContainerProbe.from_json(result["probe"])
+        self.assertEqual(result["escaped_alive"], [False, False])
+        self.assertTrue(result["zygote_alive"])
+        self.assertTrue(probe.zygote_alive)
+        self.assertEqual(probe.leftover_processes, 0)
+        self.assertGreaterEqual(probe.killed_processes, 2)
@@ -0,0 +1,63 @@
+import subprocess
+import unittest
+
+from common.contracts import ResourceUsage
+from common.metrics import MetricsRegistry
+from common.settings import Settings
+from executors.docker_executor import CodeExecutor
+from executors.runtime.runner import USAGE_MARKER
+
+
+class ResourceUsageTests(unittest.TestCase):
+    def setUp(self):
+        self.executor = CodeExecutor(Settings())
+
+    def _completed(self, returncode: int, stderr: str, stdout: str = "ok\n"):
+        return subprocess.CompletedProcess(args=[], returncode=returncode, stdout=stdout, stderr=stderr)
+
+    def test_usage_line_is_stripped_from_stderr(self):
+        stderr = 'Traceback...\nZeroDivisionError\n\n' + USAGE_MARKER + '{"cpu_user_seconds": 0.5, "process_count": 2}\n'
+        result = self.executor._process_result(self._completed(1, stderr))
+
+        self.assertEqual(result["error"], "Traceback...\nZeroDivisionError\n")
+        self.assertEqual(result["resource_usage"]["process_count"], 2)
+        self.assertEqual(result["output"], "ok")
+
+    def test_timeout_without_stderr_reports_error(self):
+        stderr = "\n" + USAGE_MARKER + '{"timeout_hit": true, "exit_code": -9}\n'
+        result = self.executor._process_result(self._completed(124, stderr))
+
+        self.assertEqual(result["error"], "Execution timeout")
+        usage = ResourceUsage.from_dict(result["resource_usage"], "abc")
+        self.assertTrue(usage.timeout_hit)
+        self.assertEqual(usage.to_dict()["code_hash"], "abc")
+
+    def test_success_without_marker(self):
+        result = self.executor._process_result(self._completed(0, "warning\n"))
+        self.assertIsNone(result["error"])
+        self.assertIsNone(result["resource_usage"])
+
+
+class MetricsRegistryTests(unittest.TestCase):
+    def test_render_prometheus(self):
+        registry = MetricsRegistry()
+        registry.describe("jobs_total", "counter", "Jobs")
+        registry.inc("jobs_total", profile="small")
+        registry.inc("jobs_total", 2, profile="small")
+        registry.observe("latency_seconds", 0.5)
+        registry.observe("latency_seconds", 1.5)
+        registry.gauge_callback("queue_size", lambda: [({}, 3)])
+
+        text = registry.render_prometheus()
+
+        self.assertIn("# HELP jobs_total Jobs", text)
+        self.assertIn('jobs_total{profile="small"} 3', text)
+        self.assertIn("latency_seconds_count 2", text)
+        self.assertIn("latency_seconds_sum 2", text)
+        self.assertIn("latency_seconds_max 1.5", text)
+        self.assertIn("queue_size 3", text)
+        self.assertEqual(registry.value("jobs_total", profile="small"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+
+from common.resources import ResourceProfile, format_memory, parse_memory, parse_resource_profiles
+from executors.scheduler import ResourceScheduler
+
+
+class ResourceProfileTests(unittest.TestCase):
+    def test_parse_memory_units(self):
+        self.assertEqual(parse_memory("512m"), 512 * 1024 ** 2)
+        self.assertEqual(parse_memory("1g"), 1024 ** 3)
+        self.assertEqual(parse_memory("1.5G"), int(1.5 * 1024 ** 3))
+        self.assertEqual(parse_memory("2048"), 2048)
+        with self.assertRaises(ValueError):
+            parse_memory("lots")
+
+    def test_format_memory_round_trips(self):
+        self.assertEqual(format_memory(1024 ** 3), "1g")
+        self.assertEqual(format_memory(1536 * 1024 ** 2), "1536m")
+        self.assertEqual(format_memory(1000), "1000b")
+
+    def test_parse_profiles(self):
+        profiles = parse_resource_profiles("small:512m:0.5:1, Large:4g:2")
+        self.assertEqual(list(profiles), ["small", "large"])
+        self.assertEqual(profiles["small"].docker_args(), ["--memory=512m", "--cpus=0.5"])
+        self.assertEqual(profiles["large"].warm_size, 1)
+        with self.assertRaises(ValueError):
+            parse_resource_profiles("bad")
+
+
+class ResourceSchedulerTests(unittest.TestCase):
+    small = ResourceProfile("small", 512 * 1024 ** 2, 0.5)
+    large = ResourceProfile("large", 4 * 1024 ** 3, 2)
+
+    def test_bin_packs_by_cpu(self):
+        async def scenario():
+            scheduler = ResourceScheduler(max_jobs=10, cpus=2, memory_bytes=8 * 1024 ** 3)
+            await scheduler.acquire(self.large)
+            blocked = asyncio.ensure_future(scheduler.acquire(self.small))
+            await asyncio.sleep(0)
+            self.assertFalse(blocked.done())
+            scheduler.release(self.large)
+            await asyncio.wait_for(blocked, 1)
+            for _ in range(3):
+                await asyncio.wait_for(scheduler.acquire(self.small), 1)
+            self.assertEqual(scheduler.active, 4)
+            self.assertAlmostEqual(scheduler.used_cpus, 2.0)
+
+        asyncio.run(scenario())
+
+    def test_small_jobs_pass_queued_large_job_until_skip_limit(self):
+        async def scenario():
+            scheduler = ResourceScheduler(max_jobs=10, cpus=1, max_skips=1)
+            await scheduler.acquire(self.small)
+            await scheduler.acquire(self.small)
+            large = asyncio.ensure_future(scheduler.acquire(self.large))
+            first = asyncio.ensure_future(scheduler.acquire(self.small))
+            second = asyncio.ensure_future(scheduler.acquire(self.small))
+            await asyncio.sleep(0)
+            # 队首大任务放不下，小任务可以先行
+            scheduler.release(self.small)
+            await asyncio.sleep(0)
+            self.assertFalse(large.done())
+            self.assertTrue(first.done())
+            self.assertFalse(second.done())
+            # 大任务已到跳过上限，后面的小任务不能再插队
+            scheduler.release(self.small)
+            await asyncio.sleep(0)
+            self.assertFalse(large.done())
+            self.assertFalse(second.done())
+            scheduler.release(self.small)
+            await asyncio.wait_for(large, 1)
+            self.assertFalse(second.done())
+            scheduler.release(self.large)
+            await asyncio.wait_for(second, 1)
+
+        asyncio.run(scenario())
+
+    def test_oversized_job_runs_on_idle_host(self):
+        async def scenario():
+            scheduler = ResourceScheduler(max_jobs=2, cpus=1)
+            await asyncio.wait_for(scheduler.acquire(self.large), 1)
+            self.assertEqual(scheduler.active, 1)
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
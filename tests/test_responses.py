@@ -0,0 +1,97 @@
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import JSONResponse
+
+from common.analysis import CodeAnalyzer
+from common.contracts import ExecuteResult, OutputFile
+from common.metrics import MetricsRegistry
+from common.settings import Settings
+from common.tenancy import TenantRegistry
+from common.utils import UtilsClass
+from gateway import responses
+from gateway.routes import router
+
+
+class DumpsTests(unittest.TestCase):
+    def test_matches_json_response_bytes(self):
+        result = ExecuteResult(
+            stdout="中文\t\"quoted\"\n\\path ",
+            stderr=None,
+            execution_time=0.5,
+            files=[OutputFile(filename="out_e_1_a.csv", original_name="a.csv", size_bytes=3)],
+        )
+        payload = result.to_legacy_dict()
+
+        self.assertEqual(responses.dumps(payload), JSONResponse(content=payload).body)
+
+    def test_values_orjson_rejects_fall_back_to_stdlib(self):
+        self.assertEqual(json.loads(responses.dumps({"n": 2 ** 70})), {"n": 2 ** 70})
+        self.assertEqual(responses.dumps({"s": "\ud800"}), '{"s":"\ud800"}'.encode("utf-8", "surrogatepass"))
+
+    def test_compression_is_negotiated(self):
+        payload = {"result": "x" * 5000}
+        body, encoding = responses.encode_body(payload, "br;q=0, gzip", compress_min_bytes=1000)
+        self.assertEqual(encoding, "gzip")
+        self.assertEqual(gzip.decompress(body), responses.dumps(payload))
+        self.assertEqual(responses.encode_body(payload, "identity", 1000)[1], "")
+        self.assertEqual(responses.encode_body(payload, "gzip", 0)[1], "")
+        self.assertEqual(responses.encode_body(payload, "gzip", 10000)[1], "")
+
+
+class _StaticService:
+    def __init__(self, stdout):
+        self.stdout = stdout
+
+    async def execute(self, request):
+        return ExecuteResult(stdout=self.stdout, stderr=None, execution_time=0.1)
+
+
+class ExecuteResponseTests(unittest.TestCase):
+    def _client(self, stdout):
+        settings = Settings(response_compress_min_bytes=1024)
+        app = FastAPI()
+        app.include_router(router)
+        image_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, image_dir, True)
+        app.state.settings = settings
+        app.state.utils = UtilsClass(image_dir=image_dir)
+        app.state.execution_service = _StaticService(stdout)
+        app.state.code_analyzer = CodeAnalyzer(settings)
+        app.state.metrics = MetricsRegistry()
+        app.state.tenants = TenantRegistry()
+        return TestClient(app)
+
+    def test_large_stdout_is_compressed_off_the_event_loop(self):
+        stdout = "中文输出\n" + "".join("row %d\n" % i for i in range(60000))
+        client = self._client(stdout)
+
+        response = client.post("/api/v1/execute", json={"code": "print(1)"}, headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        self.assertEqual(response.headers["content-type"], "application/json")
+        self.assertIn("X-Execution-ID", response.headers)
+        self.assertEqual(response.json()["result"], stdout)
+
+        plain = client.post("/api/v1/execute", json={"code": "print(1)"}, headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", plain.headers)
+        self.assertEqual(plain.json()["result"], stdout)
+
+    def test_small_results_are_not_compressed(self):
+        response = self._client("1\n").post(
+            "/api/v1/execute", json={"code": "print(1)"}, headers={"Accept-Encoding": "gzip"}
+        )
+
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.json()["result"], "1\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
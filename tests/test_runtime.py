@@ -0,0 +1,310 @@
+import hashlib
+import json
+import marshal
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from common.contracts import ExecuteResult
+from common.settings import Settings
+from executors.docker_executor import PROFILE_DIR_NAME, CodeExecutor
+from executors.runtime.runner import USAGE_MARKER
+
+RUNTIME_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "executors", "runtime")
+
+
+class ZygoteTests(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp(prefix="pyexec_test_")
+        self.env = dict(os.environ, PYEXEC_STATE_DIR=self.state_dir, PYEXEC_PRELOAD="json")
+        self.zygote = subprocess.Popen(
+            [sys.executable, os.path.join(RUNTIME_DIR, "zygote.py")],
+            env=self.env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.time() + 10
+        while not os.path.exists(os.path.join(self.state_dir, "zygote.sock")):
+            if time.time() > deadline:
+                self.fail("zygote did not start")
+            time.sleep(0.05)
+
+    def tearDown(self):
+        self.zygote.terminate()
+        self.zygote.wait(5)
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+
+    def _run(self, code: str, timeout: float = 10, **limits):
+        script = os.path.join(self.state_dir, "script.py")
+        with open(script, "w") as f:
+            f.write(code)
+        return subprocess.run(
+            [sys.executable, os.path.join(RUNTIME_DIR, "client.py"), script],
+            env=dict(self.env, **limits),
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            cwd=self.state_dir,
+        )
+
+    def test_runs_script_in_warm_spare(self):
+        process = self._run("import sys, os\nprint(__name__, 'json' in sys.modules, os.getcwd())\n")
+
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertEqual(process.stdout.strip(), f"__main__ True {self.state_dir}")
+        self.assertIn(USAGE_MARKER, process.stderr)
+
+    def test_reports_exit_code_and_traceback(self):
+        process = self._run("print('before')\n1/0\n")
+
+        self.assertEqual(process.returncode, 1)
+        self.assertIn("ZeroDivisionError", process.stderr)
+        self.assertNotIn("runpy", process.stderr)
+
+        process = self._run("import sys\nsys.exit(3)\n")
+        self.assertEqual(process.returncode, 3)
+
+    def test_user_code_cannot_plant_cached_code(self):
+        script = os.path.join(self.state_dir, "script.py")
+        source = b"print('genuine')\n"
+        digest = hashlib.sha256(source)
+        digest.update(("\0%s\0%s" % (script, sys.implementation.cache_tag)).encode("utf-8"))
+        # 旧版本的磁盘缓存位置，以及 spare 内继承的缓存副本，都不能影响之后的执行
+        cache_dir = os.path.join(self.state_dir, "code-cache")
+        os.makedirs(cache_dir)
+        with open(os.path.join(cache_dir, digest.hexdigest() + ".bin"), "wb") as f:
+            marshal.dump(compile("print('planted')", script, "exec"), f)
+        plant = (
+            "import gc, marshal\n"
+            "caches = [o for o in gc.get_objects() if isinstance(o, dict) and 'CODE_CACHE' in o]\n"
+            "print(len(caches), [len(g['CODE_CACHE']) for g in caches])\n"
+            "for g in caches:\n"
+            f"    g['CODE_CACHE'][{digest.hexdigest().encode()!r}] = marshal.dumps(compile(\"print('planted')\", 'x', 'exec'))\n"
+        )
+        self.assertEqual(self._run("print('genuine')\n").stdout.strip(), "genuine")
+        # 用户代码开始前 spare 已清空继承来的副本
+        self.assertEqual(self._run(plant).stdout.strip(), "1 [0]")
+        for _ in range(2):
+            self.assertEqual(self._run("print('genuine')\n").stdout.strip(), "genuine")
+
+        process = self._run("print('unclosed'\n")
+        self.assertEqual(process.returncode, 1)
+        self.assertIn("SyntaxError", process.stderr)
+        self.assertNotIn("zygote", process.stderr)
+
+    def test_next_spare_is_ready_after_a_run(self):
+        for i in range(3):
+            process = self._run(f"print({i})\n")
+            self.assertEqual(process.stdout.strip(), str(i))
+
+    def _usage(self, process):
+        return json.loads(process.stderr[process.stderr.rfind(USAGE_MARKER) + len(USAGE_MARKER):].splitlines()[0])
+
+    def test_wall_clock_limit_kills_whole_tree(self):
+        pid_file = os.path.join(self.state_dir, "grandchild.pid")
+        code = (
+            "import subprocess, sys, time\n"
+            # 孙进程另开进程组，pkill -f /code/script.py 也匹配不到它
+            "p = subprocess.Popen([sys.executable, '-c', 'import os, time; os.setpgid(0, 0); time.sleep(60)'])\n"
+            f"open({pid_file!r}, 'w').write(str(p.pid))\n"
+            "time.sleep(60)\n"
+        )
+        started = time.monotonic()
+        process = self._run(code, PYEXEC_TIMEOUT="1")
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(process.returncode, 124)
+        self.assertLess(elapsed, 5)
+        usage = self._usage(process)
+        self.assertTrue(usage["timeout_hit"])
+        self.assertFalse(usage["memory_limit_hit"])
+        with open(pid_file) as f:
+            grandchild = int(f.read())
+        time.sleep(0.1)
+        self.assertFalse(_alive(grandchild))
+
+    def test_cpu_limit_counts_all_processes(self):
+        code = (
+            "import multiprocessing\n"
+            "def spin(_):\n"
+            "    while True:\n"
+            "        pass\n"
+            "if __name__ == '__main__':\n"
+            "    multiprocessing.Pool(2).map(spin, range(2))\n"
+        )
+        process = self._run(code, PYEXEC_TIMEOUT="20", PYEXEC_CPU_SECONDS="1")
+
+        usage = self._usage(process)
+        self.assertTrue(usage["cpu_limit_hit"], process.stderr)
+        self.assertFalse(usage["timeout_hit"])
+        self.assertNotEqual(process.returncode, 0)
+
+    def test_profiles_script_in_spare(self):
+        profile_dir = os.path.join(self.state_dir, "profile")
+        code = "def hot():\n    return sum(i * i for i in range(200000))\nfor _ in range(5):\n    hot()\n"
+
+        process = self._run(code, PYEXEC_PROFILE="cprofile", PYEXEC_PROFILE_DIR=profile_dir, PYEXEC_PROFILE_TOP="5")
+
+        self.assertEqual(process.returncode, 0, process.stderr)
+        with open(os.path.join(profile_dir, "summary.json")) as f:
+            summary = json.load(f)
+        self.assertEqual(summary["mode"], "cprofile")
+        self.assertEqual(len(summary["top"]), 5)
+        self.assertIn(summary["top"][0]["function"], ("<genexpr>", "<built-in method builtins.sum>"))
+        stats = pstats.Stats(os.path.join(profile_dir, "profile.pstats"))
+        hot = next(value for key, value in stats.stats.items() if key[2] == "hot")
+        self.assertEqual(hot[1], 5)
+        with open(os.path.join(profile_dir, "profile.collapsed.txt")) as f:
+            stacks = f.read().splitlines()
+        self.assertTrue(any(line.startswith("<module> (") and ";hot (" in line for line in stacks), stacks)
+        self.assertFalse(any("runpy" in line or "zygote" in line for line in stacks))
+
+
+class ProfilerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix="pyexec_profile_")
+        self.profile_dir = os.path.join(self.tmp_dir, "output", PROFILE_DIR_NAME)
+        self.script = os.path.join(self.tmp_dir, "script.py")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _run(self, code: str, mode: str):
+        with open(self.script, "w") as f:
+            f.write(code)
+        env = dict(os.environ, PYEXEC_PROFILE=mode, PYEXEC_PROFILE_DIR=self.profile_dir, PYEXEC_PROFILE_INTERVAL="0.002")
+        return subprocess.run(
+            [sys.executable, os.path.join(RUNTIME_DIR, "runner.py"), self.script],
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=30,
+            cwd=self.tmp_dir,
+        )
+
+    def test_sampling_profile_via_runner(self):
+        code = (
+            "import time\n"
+            "def spin(seconds):\n"
+            "    deadline = time.perf_counter() + seconds\n"
+            "    while time.perf_counter() < deadline:\n"
+            "        pass\n"
+            "spin(0.5)\n"
+            "print('done')\n"
+        )
+
+        process = self._run(code, "sampling")
+
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertEqual(process.stdout.strip(), "done")
+        with open(os.path.join(self.profile_dir, "summary.json")) as f:
+            summary = json.load(f)
+        self.assertEqual(summary["mode"], "sampling")
+        self.assertGreater(summary["samples"], 10)
+        self.assertEqual(summary["top"][0]["function"], "spin")
+        with open(os.path.join(self.profile_dir, "profile.pstats"), "rb") as f:
+            self.assertTrue(marshal.load(f))
+        with open(os.path.join(self.profile_dir, "profile.collapsed.txt")) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(all(line.startswith("<module> (%s:1)" % self.script) for line in lines), lines)
+
+    def test_profile_is_written_when_script_fails(self):
+        process = self._run("def boom():\n    raise ValueError('x')\nboom()\n", "cprofile")
+
+        self.assertEqual(process.returncode, 1)
+        self.assertIn("ValueError", process.stderr)
+        self.assertNotIn("profiler.py", process.stderr)
+        self.assertTrue(os.path.exists(os.path.join(self.profile_dir, "summary.json")))
+
+    def test_gateway_stores_profile_artifacts(self):
+        self.assertEqual(self._run("print(sum(range(10)))\n", "cprofile").returncode, 0)
+        executor = CodeExecutor(Settings(file_store_path=os.path.join(self.tmp_dir, "files")))
+        self.addCleanup(executor.artifact_store.close)
+
+        report = executor._persist_profile("exec", os.path.join(self.tmp_dir, "output"))
+
+        self.assertEqual(report.mode, "cprofile")
+        self.assertEqual(
+            [f.filename for f in report.files],
+            ["profile_exec_profile.pstats", "profile_exec_profile.collapsed.txt"],
+        )
+        self.assertTrue(os.path.isfile(executor.artifact_store.resolve("files", "profile_exec_profile.pstats")))
+        payload = ExecuteResult(stdout="45", stderr=None, execution_time=0.1, profile=report).to_legacy_dict()
+        self.assertEqual(payload["profile"]["files"][0]["url"], "/files/profile_exec_profile.pstats")
+        self.assertNotIn("profile", ExecuteResult(stdout="", stderr=None, execution_time=0.1).to_legacy_dict())
+
+
+class PrepareCodeFileTests(unittest.TestCase):
+    def test_preamble_is_a_runtime_call(self):
+        scratch = tempfile.mkdtemp(prefix="pyexec_prepare_")
+        self.addCleanup(shutil.rmtree, scratch, True)
+        executor = CodeExecutor(Settings(scratch_dir=scratch))
+        self.addCleanup(executor.artifact_store.close)
+
+        code_file = executor._prepare_code_file("exec", "import matplotlib.pyplot as plt\nplt.plot([1, 2])\n")
+
+        with open(code_file) as f:
+            source = f.read()
+        compile(source, code_file, "exec")
+        self.assertIn("import pyexec.preamble as _pyexec_preamble", source)
+        self.assertIn("_pyexec_preamble.configure_matplotlib()", source)
+        self.assertNotIn("def install_package", source)
+        self.assertIn("_pyexec_save_all_figures(", source)
+
+
+class CodeCacheTests(unittest.TestCase):
+    def setUp(self):
+        # zygote 以脚本方式运行，导入时会把运行时目录插到 sys.path 前面
+        saved = list(sys.path)
+        from executors.runtime import zygote
+
+        sys.path[:] = saved
+        self.zygote = zygote
+        self.addCleanup(zygote.CODE_CACHE.clear)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+        self.script = os.path.join(self.tmp_dir, "script.py")
+        with open(self.script, "w") as f:
+            f.write("value = 6 * 7\n")
+
+    def _load(self):
+        read_fd, write_fd = os.pipe()
+        try:
+            code = self.zygote.load_code(self.script, write_fd)
+        finally:
+            os.close(write_fd)
+        with os.fdopen(read_fd, "rb") as f:
+            return code, f.read()
+
+    def test_compiled_code_is_reported_to_the_zygote_and_reused(self):
+        code, report = self._load()
+        key, _, data = report.partition(b"\n")
+        self.assertEqual(marshal.loads(data).co_consts, code.co_consts)
+
+        self.zygote.remember_code(report)
+        cached, hit = self._load()
+
+        namespace = {}
+        exec(cached, namespace)
+        self.assertEqual(namespace["value"], 42)
+        # 命中时只回报哈希（更新 LRU 顺序）
+        self.assertEqual(hit, key + b"\n")
+        self.zygote.remember_code(b"short\n" + data)
+        self.assertEqual(list(self.zygote.CODE_CACHE), [key])
+
+
+def _alive(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return False
+
+
+if __name__ == "__main__":
+    unittest.main()
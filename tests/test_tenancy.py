@@ -0,0 +1,172 @@
+import asyncio
+import shutil
+import tempfile
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common.analysis import CodeAnalyzer
+from common.contracts import ExecuteResult
+from common.metrics import MetricsRegistry
+from common.resources import ResourceProfile
+from common.settings import Settings
+from common.tenancy import DEFAULT_TENANT, TenantRegistry, TokenBucket, parse_api_keys, parse_weights
+from common.utils import UtilsClass
+from executors.scheduler import ResourceScheduler
+from gateway.routes import router
+
+SMALL = ResourceProfile("small", 256 * 1024 ** 2, 1.0)
+
+
+class TenantRegistryTests(unittest.TestCase):
+    def test_header_identification_and_weights(self):
+        tenants = TenantRegistry(weights=parse_weights("gold:3"))
+
+        self.assertEqual(tenants.identify({}).name, DEFAULT_TENANT)
+        gold = tenants.identify({"X-Tenant-ID": "gold"})
+        self.assertEqual((gold.name, gold.weight), ("gold", 3.0))
+        self.assertEqual(tenants.identify({"X-Tenant-ID": "a b/../c"}).name, "a_b_.._c")
+
+    def test_api_keys_required_when_configured(self):
+        tenants = TenantRegistry(api_keys=parse_api_keys("k1:alpha, k2:beta"))
+
+        self.assertIsNone(tenants.identify({"x-tenant-id": "alpha"}))
+        self.assertIsNone(tenants.identify({"x-api-key": "K1"}))
+        self.assertEqual(tenants.identify({"x-api-key": "k1"}).name, "alpha")
+        self.assertEqual(tenants.identify({"authorization": "Bearer k2"}).name, "beta")
+
+    def test_invalid_config_entries_raise(self):
+        with self.assertRaises(ValueError):
+            parse_api_keys("no-tenant")
+        with self.assertRaises(ValueError):
+            parse_weights("gold:0")
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=2.0, burst=2, now=0.0)
+
+        self.assertEqual(bucket.take(0.0), 0.0)
+        self.assertEqual(bucket.take(0.0), 0.0)
+        self.assertAlmostEqual(bucket.take(0.0), 0.5)
+        self.assertEqual(bucket.take(0.5), 0.0)
+
+    def test_rate_limit_is_per_tenant(self):
+        tenants = TenantRegistry(rate_per_second=1.0, burst=1)
+        a, b = tenants.get("a"), tenants.get("b")
+
+        self.assertEqual(tenants.try_acquire(a, now=10.0), 0.0)
+        self.assertGreater(tenants.try_acquire(a, now=10.0), 0.0)
+        self.assertEqual(tenants.try_acquire(b, now=10.0), 0.0)
+
+
+class FairQueueTests(unittest.TestCase):
+    def _run_order(self, submissions, max_active=0):
+        async def scenario():
+            scheduler = ResourceScheduler(max_jobs=1, cpus=1.0)
+            order = []
+            gate = asyncio.Event()
+
+            async def job(tenant, weight):
+                async with scheduler.reserve(SMALL, tenant, weight, max_active):
+                    order.append(tenant)
+                    await gate.wait()
+
+            tasks = []
+            for tenant, weight in submissions:
+                tasks.append(asyncio.create_task(job(tenant, weight)))
+                await asyncio.sleep(0)
+            # 逐个放行
+            while len(order) < len(submissions):
+                gate.set()
+                await asyncio.sleep(0)
+                gate.clear()
+                await asyncio.sleep(0)
+            gate.set()
+            await asyncio.gather(*tasks)
+            return order
+
+        return asyncio.run(scenario())
+
+    def test_light_tenant_is_not_starved_by_backlog(self):
+        order = self._run_order([("heavy", 1.0)] * 5 + [("light", 1.0)] * 2)
+
+        # light 提交在 heavy 的积压之后，仍与 heavy 交替执行
+        self.assertEqual(order[:5], ["heavy", "light", "heavy", "light", "heavy"])
+
+    def test_weight_gives_proportional_share(self):
+        order = self._run_order([("a", 1.0)] * 4 + [("b", 3.0)] * 4)
+
+        self.assertEqual(order[1:6].count("b"), 4)
+
+    def test_tenant_cap_does_not_block_other_tenants(self):
+        async def scenario():
+            scheduler = ResourceScheduler(max_jobs=4, cpus=4.0)
+            await scheduler.acquire(SMALL, "a", max_active=1)
+            blocked = asyncio.create_task(scheduler.acquire(SMALL, "a", max_active=1))
+            await asyncio.sleep(0)
+            self.assertEqual(scheduler.queued_by_tenant(), {"a": 1})
+
+            # 其他租户不受 a 的上限影响
+            await asyncio.wait_for(scheduler.acquire(SMALL, "b", max_active=1), 1)
+            self.assertEqual(scheduler.tenant_active, {"a": 1, "b": 1})
+
+            scheduler.release(SMALL, "a")
+            await asyncio.wait_for(blocked, 1)
+            self.assertEqual(scheduler.tenant_active, {"a": 1, "b": 1})
+
+        asyncio.run(scenario())
+
+
+class _RecordingService:
+    def __init__(self):
+        self.requests = []
+
+    async def execute(self, request):
+        self.requests.append(request)
+        return ExecuteResult(stdout="ok\n", stderr="", execution_time=0.1)
+
+
+class GatewayTenancyTests(unittest.TestCase):
+    def _client(self, tenants):
+        settings = Settings()
+        app = FastAPI()
+        app.include_router(router)
+        image_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, image_dir, True)
+        self.service = _RecordingService()
+        self.metrics = MetricsRegistry()
+        app.state.settings = settings
+        app.state.utils = UtilsClass(image_dir=image_dir)
+        app.state.execution_service = self.service
+        app.state.code_analyzer = CodeAnalyzer(settings)
+        app.state.metrics = self.metrics
+        app.state.tenants = tenants
+        return TestClient(app)
+
+    def test_unknown_api_key_is_rejected(self):
+        client = self._client(TenantRegistry(api_keys={"secret": "alpha"}))
+
+        response = client.post("/api/v1/execute", json={"code": "print(1)"}, headers={"X-API-Key": "nope"})
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("Unauthorized", response.json()["error"])
+        self.assertEqual(self.service.requests, [])
+
+        response = client.post("/api/v1/execute", json={"code": "print(1)"}, headers={"X-API-Key": "secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.service.requests[0].tenant, "alpha")
+
+    def test_rate_limited_request_returns_429_with_retry_after(self):
+        client = self._client(TenantRegistry(rate_per_second=0.01, burst=1))
+
+        first = client.post("/api/v1/execute", json={"code": "print(1)"}, headers={"X-Tenant-ID": "t1"})
+        second = client.post("/api/v1/execute", json={"code": "print(1)"}, headers={"X-Tenant-ID": "t1"})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 429)
+        self.assertGreaterEqual(int(second.headers["Retry-After"]), 1)
+        self.assertEqual(len(self.service.requests), 1)
+        self.assertEqual(self.metrics.value("tenant_requests_total", tenant="t1", status="rate_limited"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
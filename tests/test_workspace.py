@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from common.metrics import MetricsRegistry
+from common.settings import Settings
+from executors.workspace import WorkspaceManager
+
+
+class WorkspaceManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.metrics = MetricsRegistry()
+        self.workspaces = WorkspaceManager(
+            Settings(scratch_dir=os.path.join(self.tmp_dir, "scratch"), scratch_stale_seconds=60),
+            self.metrics,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_work_dir_is_created_once_and_released(self):
+        work_dir = self.workspaces.work_dir("e1")
+
+        self.assertEqual(self.workspaces.work_dir("e1"), work_dir)
+        self.assertEqual(os.path.dirname(work_dir), os.path.join(self.tmp_dir, "scratch"))
+        self.assertEqual(os.stat(os.path.join(work_dir, "output")).st_mode & 0o777, 0o777)
+        self.assertIn("executor_workspaces_active 1", self.metrics.render_prometheus())
+
+        self.workspaces.release("e1")
+        self.assertFalse(os.path.exists(work_dir))
+
+    def test_falls_back_to_disk_when_tmpfs_is_full(self):
+        self.workspaces.min_free_bytes = 1 << 62
+        self.workspaces.fallback_root = os.path.join(self.tmp_dir, "disk")
+
+        work_dir = self.workspaces.work_dir("e1")
+
+        self.assertEqual(os.path.dirname(work_dir), os.path.join(self.tmp_dir, "disk"))
+        self.assertEqual(self.metrics.value("executor_workspace_fallbacks_total"), 1)
+
+    def test_sweep_removes_only_stale_inactive_dirs(self):
+        root = os.path.join(self.tmp_dir, "scratch")
+        active = self.workspaces.work_dir("active")
+        os.makedirs(os.path.join(root, "orphan", "output"))
+        os.makedirs(os.path.join(root, ".runtime"))
+
+        removed = self.workspaces.sweep(now=time.time() + 120)
+
+        self.assertEqual(removed, 1)
+        self.assertFalse(os.path.exists(os.path.join(root, "orphan")))
+        self.assertTrue(os.path.isdir(active))
+        self.assertTrue(os.path.isdir(os.path.join(root, ".runtime")))
+        self.assertEqual(self.workspaces.sweep(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()